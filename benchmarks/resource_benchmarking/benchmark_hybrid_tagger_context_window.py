@@ -0,0 +1,125 @@
+import tempfile
+from pathlib import Path
+import time
+
+import typer
+
+from pymusas.spacy_api.taggers.rule_based import RuleBasedTagger
+
+import benchmarking_utils
+
+language_code_help = (
+    "The language code of the hybrid tagger to benchmark. "
+    "When using the Multilingual tagger (`xx` as the language code) the tagger "
+    "will be benchmarked on English data and tokenized using the English spaCy tokenizer."
+)
+tagger_size_help = (
+    "The size of the neural tagger model to use in the hybrid tagger."
+)
+context_windows_help = (
+    "The context window sizes to benchmark, can be given multiple times, e.g. "
+    "`--context-windows 2 --context-windows 8`. The whole document is always "
+    "benchmarked as the baseline."
+)
+token_limit_help = (
+    "The minimum number of tokens to process in the benchmark, once we have "
+    "downloaded a sufficient number of Wikipedia articles to reach this limit, "
+    "these tokens are used as the benchmark."
+)
+device_help = (
+    "The device to use for the neural tagger model within the hybrid tagger. This should be a "
+    "[torch device string like cpu or cuda](https://docs.pytorch.org/docs/stable/tensor_attributes.html#torch.device)."
+)
+
+
+def main(language_code: benchmarking_utils.LanguageCodes = typer.Argument(help=language_code_help),
+         tagger_size: benchmarking_utils.NeuralTaggerSizes = typer.Argument(help=tagger_size_help),
+         context_windows: list[int] = typer.Option([2, 5, 10, 20], help=context_windows_help),
+         token_limit: int = typer.Option(5_000, help=token_limit_help),
+         device: str = typer.Option("cpu", help=device_help)
+         ) -> None:
+    """
+    Compares the speed, in tokens per second, and the tags of the hybrid
+    tagger (`pymusas.spacy_api.taggers.hybrid.HybridTagger`) when the neural
+    tagger is given the whole document against when it is only given a
+    context window around each token that the rule based tagger cannot tag
+    (the `context_window` setting).
+
+    The script performs the following steps:
+    * Loads the hybrid tagger for the specified language code and tagger size.
+    * Downloads a sufficient number of Wikipedia articles to reach the token limit.
+    * Tokenises, lemmatises, and POS tags each article using spaCy.
+    * Tags all of the articles with the whole document as context and then for each context window size.
+
+    As there is no gold standard data the accuracy of each context window size
+    is reported as the agreement with the tags predicted when using the whole
+    document, for the tokens tagged by the neural tagger, both for the most
+    likely tag (Top 1 Agreement) and for all `top_n` tags (Top N Agreement).
+
+    Outputs to stdout a markdown table of the results.
+    """
+    wikipedia_dataset_id = "HuggingFaceFW/finewiki"
+    temp_file_prefix = "document_"
+    component_name = "pymusas_hybrid_tagger"
+
+    spacy_model = benchmarking_utils.load_hybrid_tagger(language_code, tagger_size, device)
+    hybrid_tagger = spacy_model.get_pipe(component_name)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spacy_nlp = benchmarking_utils.load_spacy_pipeline_as_tokenizer(language_code)
+        benchmarking_utils.wikipedia_dataset_to_directory(wikipedia_dataset_id,
+                                                          temp_dir,
+                                                          temp_file_prefix,
+                                                          spacy_nlp,
+                                                          token_limit,
+                                                          language_code)
+        with spacy_model.select_pipes(disable=[component_name]):
+            docs = list(spacy_model.pipe(benchmarking_utils.text_from_files(Path(temp_dir), temp_file_prefix)))
+    number_tokens = sum(len(doc) for doc in docs)
+
+    # The tokens that the rule based tagger cannot tag and are therefore tagged by the neural tagger.
+    neural_token_indexes: list[list[int]] = []
+    for doc in docs:
+        RuleBasedTagger.__call__(hybrid_tagger, doc)
+        neural_token_indexes.append([token.i for token in doc
+                                     if getattr(token._, hybrid_tagger.pymusas_tags_token_attr) == ["Z99"]])
+    number_neural_tokens = sum(len(token_indexes) for token_indexes in neural_token_indexes)
+
+    def tag_docs() -> tuple[float, list[list[str]]]:
+        start_time = time.perf_counter()
+        for doc in docs:
+            hybrid_tagger(doc)
+        tagging_time = time.perf_counter() - start_time
+        neural_tags = [getattr(doc[token_index]._, hybrid_tagger.pymusas_tags_token_attr)
+                       for doc, token_indexes in zip(docs, neural_token_indexes)
+                       for token_index in token_indexes]
+        return tagging_time, neural_tags
+
+    print(f"Language: {language_code.value}, Tagger size: {tagger_size.value}, Device: {device}")
+    print(f"Number of Tokens Processed: {number_tokens:,}, "
+          f"Number of Tokens Tagged by the Neural Tagger: {number_neural_tokens:,}")
+    print("")
+    print("| Context Window | Tokens Per Second | Speed Up | Top 1 Agreement | Top N Agreement |")
+    print("| --- | --- | --- | --- | --- |")
+
+    hybrid_tagger.context_window = None
+    # Warm up the model before timing.
+    hybrid_tagger(docs[0])
+    document_time, document_tags = tag_docs()
+    print(f"| Whole document | {number_tokens / document_time:.2f} | 1.00 | 100.00% | 100.00% |")
+
+    for context_window in context_windows:
+        hybrid_tagger.context_window = context_window
+        window_time, window_tags = tag_docs()
+        top_1_agreement = sum(document_token_tags[0] == window_token_tags[0]
+                              for document_token_tags, window_token_tags in zip(document_tags, window_tags))
+        top_n_agreement = sum(document_token_tags == window_token_tags
+                              for document_token_tags, window_token_tags in zip(document_tags, window_tags))
+        number_compared = max(1, len(document_tags))
+        print(f"| {context_window} | {number_tokens / window_time:.2f} | "
+              f"{document_time / window_time:.2f} | {100 * top_1_agreement / number_compared:.2f}% | "
+              f"{100 * top_n_agreement / number_compared:.2f}% |")
+
+
+if __name__ == "__main__":
+    typer.run(main)
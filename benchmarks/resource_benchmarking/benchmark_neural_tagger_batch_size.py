@@ -0,0 +1,114 @@
+import tempfile
+from pathlib import Path
+import time
+from typing import Callable
+
+import torch
+import typer
+
+from pymusas.taggers.neural import NeuralTagger
+
+import benchmarking_utils
+
+language_code_help = (
+    "The language code of the Wikipedia articles and the spaCy tokenizer to use."
+)
+model_help = (
+    "The HuggingFace Hub model id or local path of the neural tagger model to benchmark."
+)
+max_tokens_per_batch_help = (
+    "The maximum number of sub-word tokens per batch to benchmark, can be given "
+    "multiple times, e.g. `--max-tokens-per-batch 512 --max-tokens-per-batch 4096`."
+)
+number_of_repeats_help = (
+    "The number of times to run each benchmark, the fastest run is reported."
+)
+token_limit_help = (
+    "The minimum number of tokens to process in the benchmark, once we have "
+    "downloaded a sufficient number of Wikipedia articles to reach this limit, "
+    "these tokens are used as the benchmark."
+)
+number_threads_help = (
+    "The number of threads PyTorch uses, if not given the PyTorch default is used."
+)
+
+
+def fastest_time(function: Callable[[], object], number_repeats: int) -> float:
+    """
+    Returns:
+        float: The fastest time in seconds, out of `number_repeats` runs, to run the `function`.
+    """
+    times: list[float] = []
+    for _ in range(number_repeats):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+def main(language_code: benchmarking_utils.LanguageCodes = typer.Argument(help=language_code_help),
+         model: str = typer.Option("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", help=model_help),
+         max_tokens_per_batch: list[int] = typer.Option([256, 1024, 4096, 16384],
+                                                        help=max_tokens_per_batch_help),
+         token_limit: int = typer.Option(5_000, help=token_limit_help),
+         number_repeats: int = typer.Option(3, help=number_of_repeats_help),
+         number_threads: int | None = typer.Option(None, help=number_threads_help)
+         ) -> None:
+    """
+    Compares the speed, in tokens per second, of the neural tagger
+    (`pymusas.taggers.neural.NeuralTagger`) on CPU when tagging one sentence
+    at a time, through `NeuralTagger.__call__`, against tagging batches of
+    sentences, through `NeuralTagger.tag_batch`, for different batch sizes.
+    The batch size is the maximum number of sub-word tokens per batch.
+
+    The script performs the following steps:
+    * Loads the neural tagger on CPU.
+    * Downloads a sufficient number of Wikipedia articles to reach the token limit.
+    * Tokenises and sentence splits each article using spaCy.
+    * Tags all of the sentences one at a time and then in batches for each batch size.
+
+    Outputs to stdout a markdown table of the results.
+    """
+    wikipedia_dataset_id = "HuggingFaceFW/finewiki"
+    temp_file_prefix = "document_"
+
+    if number_threads is not None:
+        torch.set_num_threads(number_threads)
+    tagger = NeuralTagger(model, top_n=5, device="cpu")
+
+    sentences: list[list[str]] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spacy_nlp = benchmarking_utils.load_spacy_pipeline_as_tokenizer(language_code)
+        benchmarking_utils.wikipedia_dataset_to_directory(wikipedia_dataset_id,
+                                                          temp_dir,
+                                                          temp_file_prefix,
+                                                          spacy_nlp,
+                                                          token_limit,
+                                                          language_code)
+        spacy_nlp.add_pipe("sentencizer")
+        for spacy_doc in spacy_nlp.pipe(benchmarking_utils.text_from_files(Path(temp_dir), temp_file_prefix)):
+            for sentence in spacy_doc.sents:
+                sentences.append([token.text for token in sentence])
+    number_tokens = sum(len(tokens) for tokens in sentences)
+
+    print(f"Model: {model}, PyTorch threads: {torch.get_num_threads()}")
+    print(f"Number of Sentences: {len(sentences):,}, Number of Tokens Processed: {number_tokens:,}")
+    print("")
+    print("| Method | Max Tokens Per Batch | Tokens Per Second | Speed Up |")
+    print("| --- | --- | --- | --- |")
+
+    # Warm up the model before timing.
+    tagger.tag_batch(sentences[:8])
+
+    sequential_time = fastest_time(lambda: [tagger(tokens) for tokens in sentences], number_repeats)
+    print(f"| `__call__` | - | {number_tokens / sequential_time:.2f} | 1.00 |")
+
+    for batch_tokens in max_tokens_per_batch:
+        batch_time = fastest_time(lambda: tagger.tag_batch(sentences, max_tokens_per_batch=batch_tokens),
+                                  number_repeats)
+        print(f"| `tag_batch` | {batch_tokens:,} | {number_tokens / batch_time:.2f} | "
+              f"{sequential_time / batch_time:.2f} |")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,128 @@
+import tempfile
+from pathlib import Path
+import time
+from typing import Callable
+
+import torch
+import typer
+
+from pymusas.taggers.neural import NeuralTagger
+
+import benchmarking_utils
+
+language_code_help = (
+    "The language code of the Wikipedia articles and the spaCy tokenizer to use."
+)
+model_help = (
+    "The HuggingFace Hub model id or local path of the neural tagger model to benchmark."
+)
+compile_cache_path_help = (
+    "The file to save the compiled artifacts to, if the file already exists "
+    "the compiled artifacts are loaded from it. Run the script twice with the "
+    "same file to measure the compile time saved by the cache."
+)
+number_of_repeats_help = (
+    "The number of times to run each benchmark, the fastest run is reported."
+)
+token_limit_help = (
+    "The minimum number of tokens to process in the benchmark, once we have "
+    "downloaded a sufficient number of Wikipedia articles to reach this limit, "
+    "these tokens are used as the benchmark."
+)
+number_threads_help = (
+    "The number of threads PyTorch uses, if not given the PyTorch default is used."
+)
+
+
+def fastest_time(function: Callable[[], object], number_repeats: int) -> float:
+    """
+    Returns:
+        float: The fastest time in seconds, out of `number_repeats` runs, to run the `function`.
+    """
+    times: list[float] = []
+    for _ in range(number_repeats):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+def main(language_code: benchmarking_utils.LanguageCodes = typer.Argument(help=language_code_help),
+         model: str = typer.Option("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", help=model_help),
+         compile_cache_path: Path | None = typer.Option(None, help=compile_cache_path_help),
+         token_limit: int = typer.Option(5_000, help=token_limit_help),
+         number_repeats: int = typer.Option(3, help=number_of_repeats_help),
+         number_threads: int | None = typer.Option(None, help=number_threads_help)
+         ) -> None:
+    """
+    Compares the speed, in tokens per second, of the neural tagger
+    (`pymusas.taggers.neural.NeuralTagger`) on CPU when the model is run
+    eagerly against when the model is compiled with `torch.compile`
+    (`compile_model=True`), both through `NeuralTagger.tag_batch`.
+
+    The script performs the following steps:
+    * Loads the neural tagger on CPU with and without compiling the model.
+    * Downloads a sufficient number of Wikipedia articles to reach the token limit.
+    * Tokenises and sentence splits each article using spaCy.
+    * Tags all of the sentences once, the time of this first run includes the
+      time to compile the model for each batch shape.
+    * Tags all of the sentences again `number_repeats` times.
+
+    The percentage of tokens whose tags are the same for both models is also
+    reported.
+
+    Outputs to stdout a markdown table of the results.
+    """
+    wikipedia_dataset_id = "HuggingFaceFW/finewiki"
+    temp_file_prefix = "document_"
+
+    if number_threads is not None:
+        torch.set_num_threads(number_threads)
+    eager_tagger = NeuralTagger(model, top_n=5, device="cpu")
+    compile_start_time = time.perf_counter()
+    compiled_tagger = NeuralTagger(model, top_n=5, device="cpu", compile_model=True,
+                                   compile_cache_path=compile_cache_path)
+    compile_load_time = time.perf_counter() - compile_start_time
+
+    sentences: list[list[str]] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spacy_nlp = benchmarking_utils.load_spacy_pipeline_as_tokenizer(language_code)
+        benchmarking_utils.wikipedia_dataset_to_directory(wikipedia_dataset_id,
+                                                          temp_dir,
+                                                          temp_file_prefix,
+                                                          spacy_nlp,
+                                                          token_limit,
+                                                          language_code)
+        spacy_nlp.add_pipe("sentencizer")
+        for spacy_doc in spacy_nlp.pipe(benchmarking_utils.text_from_files(Path(temp_dir), temp_file_prefix)):
+            for sentence in spacy_doc.sents:
+                sentences.append([token.text for token in sentence])
+    number_tokens = sum(len(tokens) for tokens in sentences)
+
+    print(f"Model: {model}, PyTorch threads: {torch.get_num_threads()}, "
+          f"Compile cache: {compile_cache_path}")
+    print(f"Number of Sentences: {len(sentences):,}, Number of Tokens Processed: {number_tokens:,}")
+    print("")
+    print("| Model | First Run Time (s) | Tokens Per Second | Speed Up | Tag Agreement (%) |")
+    print("| --- | --- | --- | --- | --- |")
+
+    first_run_start_time = time.perf_counter()
+    eager_output = eager_tagger.tag_batch(sentences)
+    eager_first_run_time = time.perf_counter() - first_run_start_time
+    eager_time = fastest_time(lambda: eager_tagger.tag_batch(sentences), number_repeats)
+    print(f"| Eager | {eager_first_run_time:.2f} | {number_tokens / eager_time:.2f} | 1.00 | 100.00 |")
+
+    first_run_start_time = time.perf_counter()
+    compiled_output = compiled_tagger.tag_batch(sentences)
+    compiled_first_run_time = compile_load_time + time.perf_counter() - first_run_start_time
+    compiled_time = fastest_time(lambda: compiled_tagger.tag_batch(sentences), number_repeats)
+    tag_agreement = sum(eager_tags == compiled_tags
+                        for eager_sentence, compiled_sentence in zip(eager_output, compiled_output)
+                        for (eager_tags, _), (compiled_tags, _) in zip(eager_sentence, compiled_sentence))
+    model_name = "Compiled" if compiled_tagger._text_encoder is not None else "Compiled (failed, eager fallback)"
+    print(f"| {model_name} | {compiled_first_run_time:.2f} | {number_tokens / compiled_time:.2f} | "
+          f"{eager_time / compiled_time:.2f} | {100 * tag_agreement / number_tokens:.2f} |")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,113 @@
+import multiprocessing
+import resource
+import sys
+import time
+
+import psutil
+import typer
+
+from pymusas.taggers.neural import NeuralTagger
+
+model_help = (
+    "The HuggingFace Hub model id or local path of the neural tagger model to benchmark."
+)
+number_of_repeats_help = (
+    "The number of times to load the model for each loading method, each time "
+    "in a new process, the fastest load time and the lowest memory are reported."
+)
+
+TEST_TOKENS = ["The", "river", "bank", "was", "full", "of", "fish", "."]
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns:
+        float: The peak resident set size (RSS) of the process in MB, on Linux
+            `ru_maxrss` is in KB and on macOS it is in bytes.
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak_rss / (1024 ** 2)
+    return peak_rss / 1024
+
+
+def load_tagger(model: str, low_memory_load: bool
+                ) -> tuple[float, float, float, list[tuple[list[str], list[tuple[int, int]]]]]:
+    """
+    Loads the neural tagger on CPU, and tags `TEST_TOKENS`, within the current
+    process, which is expected to be a new process so that the peak RSS is
+    only that of loading the tagger.
+
+    Args:
+        model (str): The HuggingFace Hub model id or local path of the neural tagger model.
+        low_memory_load (bool): Whether to load the model with low memory.
+
+    Returns:
+        tuple[float, float, float, list[tuple[list[str], list[tuple[int, int]]]]]: The
+            load time in seconds, the increase in the peak RSS in MB from loading,
+            the RSS in MB after loading, and the tags of `TEST_TOKENS`.
+    """
+    peak_rss_before = peak_rss_mb()
+    start_time = time.perf_counter()
+    tagger = NeuralTagger(model, top_n=5, device="cpu", low_memory_load=low_memory_load)
+    load_time = time.perf_counter() - start_time
+    return (load_time, peak_rss_mb() - peak_rss_before, psutil.Process().memory_info().rss / (1024 ** 2),
+            tagger(TEST_TOKENS))
+
+
+def main(model: str = typer.Option("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", help=model_help),
+         number_repeats: int = typer.Option(3, help=number_of_repeats_help)
+         ) -> None:
+    """
+    Compares the time and memory it takes to load the neural tagger
+    (`pymusas.taggers.neural.NeuralTagger`) on CPU with the default loading,
+    `BEM.from_pretrained` which initialises the model's weights and then
+    copies the saved weights into them, against low memory loading
+    (`low_memory_load=True`) which memory maps the weights from the model's
+    safetensors file and assigns them to a model whose weights are not
+    initialised.
+
+    The script performs the following steps:
+    * Downloads the model, so that the download time is not part of the load time.
+    * For each loading method, and each repeat, loads the neural tagger in a new
+      process and reports the load time, the increase in the peak RSS
+      (`ru_maxrss`), and the RSS once the tagger has been loaded.
+    * Checks that both loading methods give the same tags.
+
+    Outputs to stdout a markdown table of the results, the peak RSS increase
+    is the peak RSS minus the peak RSS before the tagger was loaded, exits
+    with exit code 1 if the loading methods do not give the same tags.
+    """
+    multiprocessing_context = multiprocessing.get_context("spawn")
+    with multiprocessing_context.Pool(1) as pool:
+        pool.apply(load_tagger, (model, False))
+
+    print(f"Model: {model}, Number of repeats: {number_repeats}")
+    print("")
+    print("| Loading | Load Time (seconds) | Peak RSS Increase (MB) | RSS After Load (MB) | Speed Up |")
+    print("| --- | --- | --- | --- | --- |")
+    tags: list[list[tuple[list[str], list[tuple[int, int]]]]] = []
+    baseline_load_time: float | None = None
+    for low_memory_load in [False, True]:
+        results = []
+        for _ in range(number_repeats):
+            # A new process for every load so that the peak RSS is only that of the load.
+            with multiprocessing_context.Pool(1) as pool:
+                results.append(pool.apply(load_tagger, (model, low_memory_load)))
+        load_time = min(result[0] for result in results)
+        peak_rss_increase = min(result[1] for result in results)
+        rss = min(result[2] for result in results)
+        tags.append(results[0][3])
+        if baseline_load_time is None:
+            baseline_load_time = load_time
+        loading = "Low memory (`low_memory_load=True`)" if low_memory_load else "Default"
+        print(f"| {loading} | {load_time:.2f} | {peak_rss_increase:.2f} | {rss:.2f} | "
+              f"{baseline_load_time / load_time:.2f} |")
+
+    if tags[0] != tags[1]:
+        print("The default and low memory loading do not give the same tags.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,184 @@
+import gc
+import io
+import tempfile
+from pathlib import Path
+import time
+from typing import Any, Callable
+
+import psutil
+import torch
+import typer
+
+from pymusas.taggers.neural import NeuralTagger
+
+import benchmarking_utils
+
+language_code_help = (
+    "The language code of the Wikipedia articles and the spaCy tokenizer to use."
+)
+model_help = (
+    "The HuggingFace Hub model id or local path of the neural tagger model to benchmark."
+)
+top_n_help = (
+    "The number of tags to predict per token, used to report the top-n agreement."
+)
+number_of_repeats_help = (
+    "The number of times to run each benchmark, the fastest run is reported."
+)
+token_limit_help = (
+    "The minimum number of tokens to process in the benchmark, once we have "
+    "downloaded a sufficient number of Wikipedia articles to reach this limit, "
+    "these tokens are used as the benchmark."
+)
+number_threads_help = (
+    "The number of threads PyTorch uses, if not given the PyTorch default is used."
+)
+minimum_agreement_help = (
+    "The minimum top 1 agreement, as a percentage, with the fp32 model that "
+    "each reduced precision model has to reach, if any model does not reach "
+    "it the script exits with exit code 1."
+)
+
+# The name of each precision and the `NeuralTagger` arguments that create it.
+PRECISIONS: list[tuple[str, dict[str, Any]]] = [
+    ("fp32", {}),
+    ("bfloat16", {"dtype": "bfloat16"}),
+    ("bfloat16 autocast", {"dtype": "bfloat16", "autocast": True}),
+    ("dynamic-int8", {"quantize": "dynamic-int8"}),
+]
+
+
+def fastest_time(function: Callable[[], object], number_repeats: int) -> float:
+    """
+    Returns:
+        float: The fastest time in seconds, out of `number_repeats` runs, to run the `function`.
+    """
+    times: list[float] = []
+    for _ in range(number_repeats):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+def model_size_mb(tagger: NeuralTagger) -> float:
+    """
+    Returns:
+        float: The size, in MB, of the serialised state dictionary of the tagger's model.
+    """
+    buffer = io.BytesIO()
+    torch.save(tagger.wsd_model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes / (1024 ** 2)
+
+
+def load_tagger(model: str, top_n: int, precision_kwargs: dict[str, Any]) -> tuple[NeuralTagger, float]:
+    """
+    Returns:
+        tuple[NeuralTagger, float]: The neural tagger and the increase in the
+            Resident Set Size (RSS), in MB, of this process from loading it.
+    """
+    gc.collect()
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    tagger = NeuralTagger(model, top_n=top_n, device="cpu", **precision_kwargs)
+    gc.collect()
+    return tagger, (process.memory_info().rss - rss_before) / (1024 ** 2)
+
+
+def main(language_code: benchmarking_utils.LanguageCodes = typer.Argument(help=language_code_help),
+         model: str = typer.Option("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", help=model_help),
+         top_n: int = typer.Option(5, help=top_n_help),
+         token_limit: int = typer.Option(5_000, help=token_limit_help),
+         number_repeats: int = typer.Option(3, help=number_of_repeats_help),
+         number_threads: int | None = typer.Option(None, help=number_threads_help),
+         minimum_agreement: float = typer.Option(95.0, help=minimum_agreement_help)
+         ) -> None:
+    """
+    Compares the neural tagger (`pymusas.taggers.neural.NeuralTagger`) on CPU
+    at its original precision (fp32) against running it at a reduced
+    precision, `bfloat16` (`dtype="bfloat16"`), `bfloat16` through
+    `torch.autocast` (`dtype="bfloat16", autocast=True`), and with dynamic
+    int8 quantisation (`quantize="dynamic-int8"`), reporting the speed in
+    tokens per second, the memory used, and how often the tags of each
+    reduced precision model agree with the tags of the fp32 model.
+
+    The script performs the following steps:
+    * Loads the neural tagger at each precision on CPU.
+    * Downloads a sufficient number of Wikipedia articles to reach the token limit.
+    * Tokenises and sentence splits each article using spaCy.
+    * Tags all of the sentences, through `NeuralTagger.tag_batch`, with each tagger.
+
+    The memory used is reported as both the size of the model's serialised
+    state dictionary and the increase in the Resident Set Size (RSS) of the
+    process from loading the tagger, the latter is only an estimate. Top 1
+    agreement is the percentage of tokens whose most likely tag is the same,
+    top n agreement is the percentage of tokens whose fp32 most likely tag
+    is within the reduced precision model's top n tags. A `bfloat16` model is
+    only faster on CPUs that support `bfloat16` instructions, e.g. AVX512-BF16
+    or AMX.
+
+    Outputs to stdout a markdown table of the results.
+    """
+    wikipedia_dataset_id = "HuggingFaceFW/finewiki"
+    temp_file_prefix = "document_"
+
+    if number_threads is not None:
+        torch.set_num_threads(number_threads)
+    taggers = [(name, *load_tagger(model, top_n, precision_kwargs))
+               for name, precision_kwargs in PRECISIONS]
+
+    sentences: list[list[str]] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spacy_nlp = benchmarking_utils.load_spacy_pipeline_as_tokenizer(language_code)
+        benchmarking_utils.wikipedia_dataset_to_directory(wikipedia_dataset_id,
+                                                          temp_dir,
+                                                          temp_file_prefix,
+                                                          spacy_nlp,
+                                                          token_limit,
+                                                          language_code)
+        spacy_nlp.add_pipe("sentencizer")
+        for spacy_doc in spacy_nlp.pipe(benchmarking_utils.text_from_files(Path(temp_dir), temp_file_prefix)):
+            for sentence in spacy_doc.sents:
+                sentences.append([token.text for token in sentence])
+    number_tokens = sum(len(tokens) for tokens in sentences)
+
+    print(f"Model: {model}, PyTorch threads: {torch.get_num_threads()}")
+    print(f"Number of Sentences: {len(sentences):,}, Number of Tokens Processed: {number_tokens:,}")
+    print("")
+    print("| Precision | Tokens Per Second | Speed Up | Model Size (MB) | RSS Increase (MB) | "
+          "Top 1 Agreement (%) | Top n Agreement (%) |")
+    print("| --- | --- | --- | --- | --- | --- | --- |")
+
+    fp32_output: list[list[tuple[list[str], list[tuple[int, int]]]]] = []
+    fp32_time = 0.0
+    below_minimum_agreement: list[str] = []
+    for name, tagger, rss in taggers:
+        # Warm up the model before timing.
+        tagger.tag_batch(sentences[:8])
+        tagger_time = fastest_time(lambda: tagger.tag_batch(sentences), number_repeats)
+        output = tagger.tag_batch(sentences)
+        if not fp32_output:
+            fp32_output = output
+            fp32_time = tagger_time
+        top_1_agreement = 0
+        top_n_agreement = 0
+        for fp32_sentence, sentence in zip(fp32_output, output):
+            for (fp32_tags, _), (tags, _) in zip(fp32_sentence, sentence):
+                top_1_agreement += int(fp32_tags[0] == tags[0])
+                top_n_agreement += int(fp32_tags[0] in tags)
+        top_1_agreement_percentage = 100 * top_1_agreement / number_tokens
+        if top_1_agreement_percentage < minimum_agreement:
+            below_minimum_agreement.append(name)
+        print(f"| {name} | {number_tokens / tagger_time:.2f} | {fp32_time / tagger_time:.2f} | "
+              f"{model_size_mb(tagger):.2f} | {rss:.2f} | "
+              f"{top_1_agreement_percentage:.2f} | {100 * top_n_agreement / number_tokens:.2f} |")
+
+    if below_minimum_agreement:
+        print("")
+        print(f"The top 1 agreement of {', '.join(below_minimum_agreement)} is below "
+              f"the minimum agreement of {minimum_agreement:.2f}%")
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,125 @@
+import tempfile
+from pathlib import Path
+import sys
+import time
+from typing import Callable
+
+import typer
+
+from pymusas.taggers.neural import NeuralTagger, SubWordCache
+
+import benchmarking_utils
+
+language_code_help = (
+    "The language code of the Wikipedia articles and the spaCy tokenizer to use."
+)
+model_help = (
+    "The HuggingFace Hub model id or local path of the neural tagger model to benchmark."
+)
+sub_word_cache_size_help = (
+    "The maximum number of tokens whose sub-word token ids are stored in the sub-word cache."
+)
+number_of_repeats_help = (
+    "The number of times to run each benchmark, the fastest run is reported."
+)
+token_limit_help = (
+    "The minimum number of tokens to process in the benchmark, once we have "
+    "downloaded a sufficient number of Wikipedia articles to reach this limit, "
+    "these tokens are used as the benchmark."
+)
+
+
+def fastest_time(function: Callable[[], object], number_repeats: int) -> float:
+    """
+    Returns:
+        float: The fastest time in seconds, out of `number_repeats` runs, to run the `function`.
+    """
+    times: list[float] = []
+    for _ in range(number_repeats):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+def main(language_code: benchmarking_utils.LanguageCodes = typer.Argument(help=language_code_help),
+         model: str = typer.Option("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", help=model_help),
+         sub_word_cache_size: int = typer.Option(50_000, help=sub_word_cache_size_help),
+         token_limit: int = typer.Option(5_000, help=token_limit_help),
+         number_repeats: int = typer.Option(3, help=number_of_repeats_help)
+         ) -> None:
+    """
+    Compares the time spent tokenizing sentences into sub-word token ids for
+    the neural tagger (`pymusas.taggers.neural.NeuralTagger`) when calling the
+    HuggingFace tokenizer on every sentence against the sub-word cache
+    (`pymusas.taggers.neural.SubWordCache`), which only calls the tokenizer
+    on tokens that are not in the cache. The tokenization time is also given
+    as a percentage of the time it takes to tag all of the sentences through
+    `NeuralTagger.tag_batch`.
+
+    The script performs the following steps:
+    * Loads the neural tagger on CPU.
+    * Downloads a sufficient number of Wikipedia articles to reach the token limit.
+    * Tokenises and sentence splits each article using spaCy.
+    * Checks that the sub-word cache gives the same sub-word token ids as the tokenizer.
+    * Times the tokenizer, the sub-word cache when it is empty (cold), and when
+      it has already seen the sentences (warm).
+
+    Outputs to stdout a markdown table of the results, exits with exit code 1
+    if the sub-word cache does not give the same sub-word token ids as the tokenizer.
+    """
+    wikipedia_dataset_id = "HuggingFaceFW/finewiki"
+    temp_file_prefix = "document_"
+
+    tagger = NeuralTagger(model, top_n=5, device="cpu")
+    tokenizer = tagger.tokenizer
+
+    sentences: list[list[str]] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spacy_nlp = benchmarking_utils.load_spacy_pipeline_as_tokenizer(language_code)
+        benchmarking_utils.wikipedia_dataset_to_directory(wikipedia_dataset_id,
+                                                          temp_dir,
+                                                          temp_file_prefix,
+                                                          spacy_nlp,
+                                                          token_limit,
+                                                          language_code)
+        spacy_nlp.add_pipe("sentencizer")
+        for spacy_doc in spacy_nlp.pipe(benchmarking_utils.text_from_files(Path(temp_dir), temp_file_prefix)):
+            for sentence in spacy_doc.sents:
+                sentences.append([token.text for token in sentence])
+    number_tokens = sum(len(tokens) for tokens in sentences)
+
+    def tokenize() -> tuple[list[list[int]], list[list[int | None]]]:
+        sub_word_tokens = tokenizer(sentences, padding=False, truncation=False, is_split_into_words=True)
+        return (sub_word_tokens["input_ids"],
+                [sub_word_tokens.word_ids(index) for index in range(len(sentences))])
+
+    sub_word_cache = SubWordCache(tokenizer, sub_word_cache_size)
+    if tokenize() != sub_word_cache(sentences):
+        print("The sub-word cache does not give the same sub-word token ids as the tokenizer.")
+        sys.exit(1)
+    warm_hit_rate_start = (sub_word_cache.cache.hits, sub_word_cache.cache.misses)
+
+    tag_batch_time = fastest_time(lambda: tagger.tag_batch(sentences), number_repeats)
+    tokenizer_time = fastest_time(tokenize, number_repeats)
+    cold_time = fastest_time(lambda: SubWordCache(tokenizer, sub_word_cache_size)(sentences), number_repeats)
+    warm_time = fastest_time(lambda: sub_word_cache(sentences), number_repeats)
+    warm_hits = sub_word_cache.cache.hits - warm_hit_rate_start[0]
+    warm_misses = sub_word_cache.cache.misses - warm_hit_rate_start[1]
+    warm_hit_rate = warm_hits / max(warm_hits + warm_misses, 1)
+
+    print(f"Model: {model}, Sub-word cache size: {sub_word_cache_size:,}")
+    print(f"Number of Sentences: {len(sentences):,}, Number of Tokens Processed: {number_tokens:,}")
+    print(f"`tag_batch` time: {tag_batch_time:.3f} seconds")
+    print("")
+    print("| Method | Tokenization Time (seconds) | % of `tag_batch` Time | Speed Up | Cache Hit Rate |")
+    print("| --- | --- | --- | --- | --- |")
+    print(f"| Tokenizer | {tokenizer_time:.4f} | {100 * tokenizer_time / tag_batch_time:.2f} | 1.00 | - |")
+    print(f"| Sub-word cache (cold) | {cold_time:.4f} | {100 * cold_time / tag_batch_time:.2f} | "
+          f"{tokenizer_time / cold_time:.2f} | - |")
+    print(f"| Sub-word cache (warm) | {warm_time:.4f} | {100 * warm_time / tag_batch_time:.2f} | "
+          f"{tokenizer_time / warm_time:.2f} | {warm_hit_rate:.2f} |")
+
+
+if __name__ == "__main__":
+    typer.run(main)
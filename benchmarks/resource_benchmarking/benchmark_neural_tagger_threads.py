@@ -0,0 +1,127 @@
+import os
+import tempfile
+from pathlib import Path
+import time
+import warnings
+
+import spacy
+import typer
+
+import benchmarking_utils
+
+language_code_help = (
+    "The language code of the Wikipedia articles, the spaCy tokenizer, and the neural tagger to use."
+)
+tagger_size_help = (
+    "The size of the neural tagger model to benchmark."
+)
+processes_help = (
+    "The number of processes (`nlp.pipe(n_process=N)`) to benchmark, can be given "
+    "multiple times, e.g. `--processes 1 --processes 4`."
+)
+threads_help = (
+    "The number of PyTorch threads per process to benchmark, can be given multiple "
+    "times, e.g. `--threads 1 --threads 4`."
+)
+batch_size_help = (
+    "The number of texts given to each process at a time (`nlp.pipe(batch_size=N)`)."
+)
+token_limit_help = (
+    "The minimum number of tokens to process in the benchmark, once we have "
+    "downloaded a sufficient number of Wikipedia articles to reach this limit, "
+    "these tokens are used as the benchmark."
+)
+
+
+def load_neural_tagger(language_code: str, size: str, threads: int) -> spacy.Language:
+    """
+    Loads a spaCy model with the neural tagger, on CPU, that uses `threads`
+    PyTorch threads in every process and is warmed up when it is loaded.
+
+    Args:
+        language_code (str): The language code to load the spaCy and neural tagger for.
+        size (str): The size of the neural tagger to load.
+        threads (int): The number of PyTorch threads per process.
+
+    Returns:
+        spacy.Language: The loaded spaCy model with the neural tagger.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        spacy_model = benchmarking_utils.load_spacy_pipeline_as_tokenizer(language_code)
+        config_prefix = "components.pymusas_neural_tagger"
+        neural_model = spacy.load(benchmarking_utils.language_code_to_pymusas_neural_model[language_code][size],
+                                  config={f"{config_prefix}.device": "cpu",
+                                          f"{config_prefix}.num_threads": threads,
+                                          f"{config_prefix}.worker_num_threads": threads,
+                                          f"{config_prefix}.warm_up_on_load": True})
+        spacy_model.add_pipe('pymusas_neural_tagger', source=neural_model)
+        return spacy_model
+
+
+def main(language_code: benchmarking_utils.LanguageCodes = typer.Argument(help=language_code_help),
+         tagger_size: benchmarking_utils.NeuralTaggerSizes = typer.Argument(help=tagger_size_help),
+         processes: list[int] = typer.Option([1, 2, 4], help=processes_help),
+         threads: list[int] = typer.Option([1, 2, 4], help=threads_help),
+         batch_size: int = typer.Option(16, help=batch_size_help),
+         token_limit: int = typer.Option(5_000, help=token_limit_help)
+         ) -> None:
+    """
+    Compares the speed, in tokens per second, of the spaCy neural tagger
+    (`pymusas.spacy_api.taggers.neural.NeuralTagger`) on CPU for different
+    numbers of processes (`nlp.pipe(n_process=N)`) and PyTorch threads per
+    process (the `num_threads` and `worker_num_threads` settings). When the
+    total number of threads, processes multiplied by threads, is greater than
+    the number of CPU cores the threads compete for the cores
+    (oversubscription), which is normally slower.
+
+    The script performs the following steps:
+    * Downloads a sufficient number of Wikipedia articles to reach the token limit.
+    * For each number of threads loads, and warms up (`warm_up_on_load`), the neural tagger on CPU.
+    * For each number of processes tags all of the articles through `nlp.pipe`.
+
+    Outputs to stdout a markdown table of the results.
+    """
+    wikipedia_dataset_id = "HuggingFaceFW/finewiki"
+    temp_file_prefix = "document_"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spacy_nlp = benchmarking_utils.load_spacy_pipeline_as_tokenizer(language_code)
+        benchmarking_utils.wikipedia_dataset_to_directory(wikipedia_dataset_id,
+                                                          temp_dir,
+                                                          temp_file_prefix,
+                                                          spacy_nlp,
+                                                          token_limit,
+                                                          language_code)
+        texts = list(benchmarking_utils.text_from_files(Path(temp_dir), temp_file_prefix))
+    number_tokens = sum(len(doc) for doc in spacy_nlp.pipe(texts))
+    number_cores = os.cpu_count()
+
+    print(f"Language: {language_code.value}, Tagger size: {tagger_size.value}, CPU cores: {number_cores}")
+    print(f"Number of Texts: {len(texts):,}, Number of Tokens Processed: {number_tokens:,}")
+    print("")
+    print("| Processes | Threads Per Process | Total Threads | Oversubscribed | Load Time (s) | "
+          "Tokens Per Second | Speed Up |")
+    print("| --- | --- | --- | --- | --- | --- | --- |")
+
+    baseline_time: float | None = None
+    for number_threads in threads:
+        start_time = time.perf_counter()
+        spacy_model = load_neural_tagger(language_code, tagger_size, number_threads)
+        load_time = time.perf_counter() - start_time
+        for number_processes in processes:
+            start_time = time.perf_counter()
+            for _ in spacy_model.pipe(texts, n_process=number_processes, batch_size=batch_size):
+                pass
+            tagging_time = time.perf_counter() - start_time
+            if baseline_time is None:
+                baseline_time = tagging_time
+            total_threads = number_processes * number_threads
+            oversubscribed = "Yes" if number_cores is not None and total_threads > number_cores else "No"
+            print(f"| {number_processes} | {number_threads} | {total_threads} | {oversubscribed} | "
+                  f"{load_time:.2f} | {number_tokens / tagging_time:.2f} | "
+                  f"{baseline_time / tagging_time:.2f} |")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1,7 +1,10 @@
+import sys
 import tempfile
 from pathlib import Path
+import time
 import timeit
 
+import spacy
 import typer
 
 import benchmarking_utils
@@ -23,17 +26,73 @@ token_limit_help = (
     "downloaded a sufficient number of Wikipedia articles to reach this limit, "
     "these tokens are used as the benchmark."
 )
+batch_size_help = (
+    "The number of documents the rule based tagger tags at a time through its "
+    "`pipe` method, which is compared against tagging one document at a time."
+)
 large_text_token_limit_help = (
     "The minimum number of tokens to process for the large text benchmark. "
     "The tokens come from the Wikipedia articles, once this token limit is reached "
     "no more tokens are added to the large text that will be processed as one text."
 )
 
+def component_speed_test(spacy_model: spacy.Language,
+                         texts: list[str],
+                         batch_size: int) -> tuple[float, float]:
+    """
+    Compares the speed of the rule based tagger component on its own when it
+    tags one document at a time, `RuleBasedTagger.__call__`, against tagging
+    batches of documents, `RuleBasedTagger.pipe`. The documents are created by
+    the rest of the spaCy pipeline before the timing starts.
+
+    Args:
+        spacy_model (spacy.Language): The spaCy pipeline that includes the
+            rule-based tagger, which can be created using the
+            `benchmarking_utils.load_rule_based_tagger` function.
+        texts (list[str]): The texts to tag.
+        batch_size (int): The number of documents to tag at a time through
+            `RuleBasedTagger.pipe`.
+
+    Returns:
+        tuple[float, float]: The tokens per second of `RuleBasedTagger.__call__`
+            and `RuleBasedTagger.pipe`.
+
+    Raises:
+        SystemExit: If `RuleBasedTagger.__call__` and `RuleBasedTagger.pipe`
+            do not give the same tags.
+    """
+    tagger_name = "pymusas_rule_based_tagger"
+    tagger = spacy_model.get_pipe(tagger_name)
+    with spacy_model.select_pipes(disable=[tagger_name]):
+        call_docs = list(spacy_model.pipe(texts))
+        pipe_docs = list(spacy_model.pipe(texts))
+    number_tokens = sum(len(doc) for doc in call_docs)
+
+    start_time = time.perf_counter()
+    for doc in call_docs:
+        tagger(doc)
+    call_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for _ in tagger.pipe(pipe_docs, batch_size=batch_size):
+        pass
+    pipe_time = time.perf_counter() - start_time
+
+    for call_doc, pipe_doc in zip(call_docs, pipe_docs):
+        for call_token, pipe_token in zip(call_doc, pipe_doc):
+            if (call_token._.pymusas_tags != pipe_token._.pymusas_tags
+                    or call_token._.pymusas_mwe_indexes != pipe_token._.pymusas_mwe_indexes):
+                print("The rule based tagger's `__call__` and `pipe` methods do not give the same tags.")
+                sys.exit(1)
+    return number_tokens / call_time, number_tokens / pipe_time
+
+
 def main(language_code: benchmarking_utils.LanguageCodes = typer.Argument(help=language_code_help),
          output_file: Path = typer.Argument(help="The file to which the output will be written."),
          token_limit: int = typer.Option(1_000, help=token_limit_help),
          number_repeats: int = typer.Option(1, help=number_of_repeats_help),
          number_of_repeat_calls: int = typer.Option(1, help=number_of_repeat_calls_help),
+         batch_size: int = typer.Option(128, help=batch_size_help),
          large_text_token_limit: int = typer.Option(1_000, help=large_text_token_limit_help)
          ) -> None:
     """
@@ -42,6 +101,11 @@ def main(language_code: benchmarking_utils.LanguageCodes = typer.Argument(help=l
     * Downloads a sufficient number of Wikipedia articles to reach the token limit.
     * Processes the downloaded articles and tags the text using the rule based tagger.
     * Calculates the benchmark statistics, including memory requirements and tokens per second.
+    * Compares the tokens per second of the rule based tagger component on its
+      own when tagging one document at a time (`RuleBasedTagger.__call__`)
+      against batches of `--batch-size` documents (`RuleBasedTagger.pipe`),
+      printing the comparison to stdout as a markdown table, it is not written
+      to the output file, exits with exit code 1 if they do not give the same tags.
     * Appends the benchmark statistics to the specified output file in JSON format.
 
     The benchmark statistics in the JSON output file are as follows:
@@ -115,6 +179,18 @@ def main(language_code: benchmarking_utils.LanguageCodes = typer.Argument(help=l
         tokens_per_seconds = round(number_tokens / average_time, 2)
         output_statistics[tokens_per_second_key] = tokens_per_seconds
 
+        call_tokens_per_second, pipe_tokens_per_second = component_speed_test(
+            benchmarking_utils.load_rule_based_tagger(language_code),
+            list(benchmarking_utils.text_from_files(Path(temp_dir), temp_file_prefix)),
+            batch_size)
+        print(f"Language: {language_code.value}, Batch size: {batch_size}")
+        print("")
+        print("| Method | Tokens Per Second | Speed Up |")
+        print("| --- | --- | --- |")
+        print(f"| One document at a time (`RuleBasedTagger.__call__`) | {call_tokens_per_second:.2f} | 1.00 |")
+        print(f"| Batches of documents (`RuleBasedTagger.pipe`) | {pipe_tokens_per_second:.2f} | "
+              f"{pipe_tokens_per_second / call_tokens_per_second:.2f} |")
+
         large_text = ""
         for line in benchmarking_utils.text_from_files(Path(temp_dir), temp_file_prefix):
             large_text += line
@@ -0,0 +1,150 @@
+from concurrent.futures import ProcessPoolExecutor
+import sys
+import sysconfig
+import tempfile
+from pathlib import Path
+import time
+from typing import Callable
+
+import typer
+
+from pymusas.taggers.rule_based import RuleBasedTagger
+
+import benchmarking_utils
+
+language_code_help = (
+    "The language code of the rule based tagger to benchmark."
+)
+workers_help = (
+    "The number of threads/processes to benchmark, can be given multiple times, e.g. `--workers 1 --workers 4`."
+)
+number_of_repeats_help = (
+    "The number of times to run each benchmark, the fastest run is reported."
+)
+token_limit_help = (
+    "The minimum number of tokens to process in the benchmark, once we have "
+    "downloaded a sufficient number of Wikipedia articles to reach this limit, "
+    "these tokens are used as the benchmark."
+)
+
+Sentence = tuple[list[str], list[str], list[str]]
+
+# The tagger of a process pool worker.
+_WORKER_TAGGER: RuleBasedTagger | None = None
+
+
+def _initialise_worker(tagger: RuleBasedTagger) -> None:
+    global _WORKER_TAGGER
+    _WORKER_TAGGER = tagger
+
+
+def _worker_tag(sentence: Sentence) -> list[tuple[list[str], list[tuple[int, int]]]]:
+    assert _WORKER_TAGGER is not None
+    return _WORKER_TAGGER(*sentence)
+
+
+def gil_enabled() -> bool:
+    """
+    Returns:
+        bool: False if this is a free-threaded Python build with the GIL disabled.
+    """
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    if is_gil_enabled is None:
+        return True
+    return bool(is_gil_enabled())
+
+
+def fastest_time(function: Callable[[], object], number_repeats: int) -> float:
+    """
+    Returns:
+        float: The fastest time in seconds, out of `number_repeats` runs, to run the `function`.
+    """
+    times: list[float] = []
+    for _ in range(number_repeats):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return min(times)
+
+
+def main(language_code: benchmarking_utils.LanguageCodes = typer.Argument(help=language_code_help),
+         workers: list[int] = typer.Option([1, 2, 4, 8], help=workers_help),
+         token_limit: int = typer.Option(10_000, help=token_limit_help),
+         number_repeats: int = typer.Option(3, help=number_of_repeats_help)
+         ) -> None:
+    """
+    Compares the speed, in tokens per second, of tagging with the rule based
+    tagger (`pymusas.taggers.rule_based.RuleBasedTagger`) using a thread pool,
+    through `RuleBasedTagger.tag_sentences`, against a process pool for
+    different numbers of workers.
+
+    The script performs the following steps:
+    * Loads the rule based tagger for the specified language code.
+    * Downloads a sufficient number of Wikipedia articles to reach the token limit.
+    * Tokenises, lemmatises, and POS tags each article using spaCy, each article is a sentence to tag.
+    * Tags all of the articles using a thread pool and then a process pool for each number of workers.
+
+    The process pool workers are started, and the tagger copied to each worker,
+    before timing starts, therefore the start up cost of the process pool is
+    not included in the tokens per second.
+
+    Run this script with both a standard and a free-threaded (e.g. `python3.13t`)
+    Python build to compare them, on a standard build the thread pool is
+    limited by the Global Interpreter Lock (GIL).
+
+    Outputs to stdout a markdown table of the results.
+    """
+    wikipedia_dataset_id = "HuggingFaceFW/finewiki"
+    temp_file_prefix = "document_"
+
+    spacy_model = benchmarking_utils.load_rule_based_tagger(language_code)
+    spacy_tagger = spacy_model.get_pipe("pymusas_rule_based_tagger")
+    tagger = RuleBasedTagger(spacy_tagger.rules, spacy_tagger.ranker,
+                             spacy_tagger.default_punctuation_tags,
+                             spacy_tagger.default_number_tags)
+
+    sentences: list[Sentence] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spacy_nlp = benchmarking_utils.load_spacy_pipeline_as_tokenizer(language_code)
+        benchmarking_utils.wikipedia_dataset_to_directory(wikipedia_dataset_id,
+                                                          temp_dir,
+                                                          temp_file_prefix,
+                                                          spacy_nlp,
+                                                          token_limit,
+                                                          language_code)
+        with spacy_model.select_pipes(disable=["pymusas_rule_based_tagger"]):
+            for spacy_doc in spacy_model.pipe(benchmarking_utils.text_from_files(Path(temp_dir), temp_file_prefix)):
+                sentences.append(([token.text for token in spacy_doc],
+                                  [getattr(token, spacy_tagger.lemma_attribute) for token in spacy_doc],
+                                  [getattr(token, spacy_tagger.pos_attribute) for token in spacy_doc]))
+    number_tokens = sum(len(tokens) for tokens, _, _ in sentences)
+
+    python_build = "standard (GIL)" if gil_enabled() else "free-threaded (no GIL)"
+    print(f"Python {sys.version.split()[0]}, {python_build}, Py_GIL_DISABLED={sysconfig.get_config_var('Py_GIL_DISABLED')}")
+    print(f"Language: {language_code.value}, Number of Tokens Processed: {number_tokens:,}")
+    print("")
+    print("| Executor | Workers | Tokens Per Second | Speed Up |")
+    print("| --- | --- | --- | --- |")
+
+    sequential_time = fastest_time(lambda: tagger.tag_sentences(sentences), number_repeats)
+    print(f"| Sequential | 1 | {number_tokens / sequential_time:.2f} | 1.00 |")
+
+    for number_workers in workers:
+        thread_time = fastest_time(lambda: tagger.tag_sentences(sentences, num_workers=number_workers),
+                                   number_repeats)
+        print(f"| Threads | {number_workers} | {number_tokens / thread_time:.2f} | "
+              f"{sequential_time / thread_time:.2f} |")
+
+        with ProcessPoolExecutor(number_workers, initializer=_initialise_worker,
+                                 initargs=(tagger,)) as executor:
+            # Start all of the workers before timing.
+            list(executor.map(_worker_tag, sentences[:number_workers]))
+            chunk_size = max(1, len(sentences) // (number_workers * 4))
+            process_time = fastest_time(lambda: list(executor.map(_worker_tag, sentences, chunksize=chunk_size)),
+                                        number_repeats)
+        print(f"| Processes | {number_workers} | {number_tokens / process_time:.2f} | "
+              f"{sequential_time / process_time:.2f} |")
+
+
+if __name__ == "__main__":
+    typer.run(main)
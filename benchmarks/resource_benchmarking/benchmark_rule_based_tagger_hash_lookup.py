@@ -0,0 +1,146 @@
+import sys
+import tempfile
+from pathlib import Path
+import time
+import warnings
+
+import spacy
+import typer
+
+import benchmarking_utils
+
+language_code_help = (
+    "The language code of the Wikipedia articles, the spaCy model, and the rule based tagger to use."
+)
+number_of_repeats_help = (
+    "The number of times to tag all of the documents for each tagging method, "
+    "the fastest time is reported."
+)
+batch_size_help = (
+    "The number of documents the rule based tagger tags at a time through its `pipe` method."
+)
+token_limit_help = (
+    "The minimum number of tokens to process in the benchmark, once we have "
+    "downloaded a sufficient number of Wikipedia articles to reach this limit, "
+    "these tokens are used as the benchmark."
+)
+
+
+def load_rule_based_tagger(language_code: str, hash_lexicon_lookup: bool) -> spacy.Language:
+    """
+    Loads a spaCy model with the rule-based tagger for the given language code,
+    whose single word rules match on the spaCy StringStore ids of the tokens
+    if `hash_lexicon_lookup` is `True`.
+
+    Args:
+        language_code (str): The language code to load the spaCy and rule based
+            tagger for.
+        hash_lexicon_lookup (bool): The `hash_lexicon_lookup` setting of the
+            rule based tagger.
+
+    Returns:
+        spacy.Language: The loaded spaCy model with the rule-based tagger.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        spacy_model = spacy.load(benchmarking_utils.LANGUAGE_CODE_TO_SPACY_MODEL[language_code],
+                                 exclude=['parser', 'ner'])
+        rule_based_tagger = spacy.load(
+            benchmarking_utils.language_code_to_pymusas_rule_based_model[language_code],
+            config={"components.pymusas_rule_based_tagger.hash_lexicon_lookup": hash_lexicon_lookup})
+        spacy_model.add_pipe('pymusas_rule_based_tagger', source=rule_based_tagger)
+        return spacy_model
+
+
+def tags(docs: list[spacy.tokens.Doc]) -> list[list[tuple[list[str], list[tuple[int, int]]]]]:
+    """
+    Args:
+        docs (list[spacy.tokens.Doc]): The documents tagged by the rule based tagger.
+
+    Returns:
+        list[list[tuple[list[str], list[tuple[int, int]]]]]: The tags and MWE
+            indexes of each token in each document.
+    """
+    return [[(token._.pymusas_tags, token._.pymusas_mwe_indexes) for token in doc] for doc in docs]
+
+
+def main(language_code: benchmarking_utils.LanguageCodes = typer.Argument(help=language_code_help),
+         number_repeats: int = typer.Option(3, help=number_of_repeats_help),
+         batch_size: int = typer.Option(128, help=batch_size_help),
+         token_limit: int = typer.Option(10_000, help=token_limit_help)
+         ) -> None:
+    """
+    Compares the speed, in tokens per second, of the rule based tagger
+    component (`pymusas.spacy_api.taggers.rule_based.RuleBasedTagger`) on its
+    own when the single word rules match on the strings of the tokens, the
+    default, against matching on the spaCy StringStore ids of the tokens
+    (`hash_lexicon_lookup=True`), for both tagging one document at a time
+    (`RuleBasedTagger.__call__`) and batches of documents (`RuleBasedTagger.pipe`).
+
+    The script performs the following steps:
+    * Downloads a sufficient number of Wikipedia articles to reach the token limit.
+    * For each `hash_lexicon_lookup` setting loads the rule based tagger and
+      creates the documents with the rest of the spaCy pipeline before the
+      timing starts.
+    * For each tagging method tags all of the documents `--number-repeats`
+      times, each time with new documents.
+    * Checks that all of the settings and methods give the same tags.
+
+    Outputs to stdout a markdown table of the results, exits with exit code 1
+    if the settings or methods do not give the same tags.
+    """
+    wikipedia_dataset_id = "HuggingFaceFW/finewiki"
+    temp_file_prefix = "document_"
+    tagger_name = "pymusas_rule_based_tagger"
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        spacy_nlp = benchmarking_utils.load_spacy_pipeline_as_tokenizer(language_code)
+        benchmarking_utils.wikipedia_dataset_to_directory(wikipedia_dataset_id,
+                                                          temp_dir,
+                                                          temp_file_prefix,
+                                                          spacy_nlp,
+                                                          token_limit,
+                                                          language_code)
+        texts = list(benchmarking_utils.text_from_files(Path(temp_dir), temp_file_prefix))
+
+    print(f"Language: {language_code.value}, Batch size: {batch_size}, Number of repeats: {number_repeats}")
+    print("")
+    print("| Lexicon Matching | Method | Tokens Per Second | Speed Up |")
+    print("| --- | --- | --- | --- |")
+    all_tags: list[list[list[tuple[list[str], list[tuple[int, int]]]]]] = []
+    baseline_tokens_per_second: float | None = None
+    for hash_lexicon_lookup in [False, True]:
+        spacy_model = load_rule_based_tagger(language_code, hash_lexicon_lookup)
+        tagger = spacy_model.get_pipe(tagger_name)
+        with spacy_model.select_pipes(disable=[tagger_name]):
+            docs_bytes = [doc.to_bytes() for doc in spacy_model.pipe(texts)]
+        for method in ["__call__", "pipe"]:
+            tagging_time: float | None = None
+            for _ in range(number_repeats):
+                docs = [spacy.tokens.Doc(spacy_model.vocab).from_bytes(doc_bytes) for doc_bytes in docs_bytes]
+                start_time = time.perf_counter()
+                if method == "__call__":
+                    for doc in docs:
+                        tagger(doc)
+                else:
+                    for _ in tagger.pipe(docs, batch_size=batch_size):
+                        pass
+                repeat_time = time.perf_counter() - start_time
+                if tagging_time is None or repeat_time < tagging_time:
+                    tagging_time = repeat_time
+            assert tagging_time is not None
+            all_tags.append(tags(docs))
+            tokens_per_second = sum(len(doc) for doc in docs) / tagging_time
+            if baseline_tokens_per_second is None:
+                baseline_tokens_per_second = tokens_per_second
+            lexicon_matching = "StringStore ids (`hash_lexicon_lookup=True`)" if hash_lexicon_lookup else "Strings"
+            print(f"| {lexicon_matching} | `RuleBasedTagger.{method}` | {tokens_per_second:.2f} | "
+                  f"{tokens_per_second / baseline_tokens_per_second:.2f} |")
+
+    if any(method_tags != all_tags[0] for method_tags in all_tags[1:]):
+        print("The rule based tagger does not give the same tags for all of the settings and methods.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,256 @@
+"""
+Batching of work that is submitted from many callers, e.g. threads within a
+server, so that it can be processed together, e.g. in one forward pass of a
+neural model. The :class:`BackgroundBatcher` processes the batches within a
+background thread.
+"""
+
+from collections import Counter
+from concurrent.futures import Future
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, List, NamedTuple, Optional, Tuple, TypeVar
+
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class BatchingStatistics(NamedTuple):
+    '''
+    Statistics of the batches processed by a :class:`BackgroundBatcher`.
+
+    # Attributes
+
+    queue_depth : `int`
+        The number of items waiting to be processed.
+    number_of_batches : `int`
+        The number of batches processed.
+    number_of_items : `int`
+        The number of items processed.
+    batch_size_histogram : `Dict[int, int]`
+        The number of batches processed of each batch size.
+    queue_depth_histogram : `Dict[int, int]`
+        The number of batches processed for each queue depth, the number of
+        items waiting, including those in the batch, when the batch was
+        processed. A queue depth larger than the batch size shows that the
+        items are submitted faster than they can be processed.
+    '''
+    queue_depth: int
+    number_of_batches: int
+    number_of_items: int
+    batch_size_histogram: Dict[int, int]
+    queue_depth_histogram: Dict[int, int]
+
+
+class BackgroundBatcher(Generic[T, R]):
+    '''
+    Queues items that are submitted, through :func:`submit`, from any
+    thread and processes them in batches within a background thread, a
+    batch is processed once it contains `max_batch_size` items or the first
+    item in the batch has waited `max_wait` seconds, whichever comes first.
+    Each item is given a `concurrent.futures.Future` which is set to the
+    result of the item, or to the exception raised when processing it.
+
+    If processing a batch raises an exception, or does not return one result
+    per item, each item of the batch is processed again in a batch by itself,
+    so that only the futures of the items that fail are set to an exception,
+    rather than those of every item that happened to be in the same batch.
+    An item that, in a batch by itself, does not return one result has its
+    future set to a `ValueError`.
+
+    The background thread is started when the first item is submitted, it
+    is a daemon thread therefore it does not stop the Python process from
+    exiting, call :func:`close` to stop it.
+
+    The size of each batch and the queue depth when it is processed are
+    recorded, see :func:`statistics`.
+
+    # Parameters
+
+    process_batch : `Callable[[List[T]], List[R]]`
+        A function that processes a batch of items and returns one result
+        per item, in the same order as the items.
+    max_batch_size : `int`, optional (default = `32`)
+        The maximum number of items within a batch.
+    max_wait : `float`, optional (default = `0.005`)
+        The maximum number of seconds the first item of a batch waits for
+        more items before the batch is processed.
+
+    # Instance Attributes
+
+    max_batch_size : `int`
+        The given `max_batch_size`.
+    max_wait : `float`
+        The given `max_wait`.
+
+    # Raises
+
+    `ValueError`
+        If `max_batch_size` is less than 1 or `max_wait` is negative.
+
+    # Examples
+    ``` python
+    >>> from pymusas.batching import BackgroundBatcher
+    >>> with BackgroundBatcher(lambda batch: [item * 2 for item in batch]) as batcher:
+    ...     futures = [batcher.submit(item) for item in range(3)]
+    ...     results = [future.result() for future in futures]
+    >>> assert results == [0, 2, 4]
+
+    ```
+    '''
+
+    def __init__(self, process_batch: Callable[[List[T]], List[R]],
+                 max_batch_size: int = 32,
+                 max_wait: float = 0.005) -> None:
+        if max_batch_size < 1:
+            raise ValueError(f'The `max_batch_size` has to be at least 1 and not {max_batch_size}')
+        if max_wait < 0:
+            raise ValueError(f'The `max_wait` cannot be negative: {max_wait}')
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._process_batch = process_batch
+        # `None` tells the background thread to stop.
+        self._queue: queue.Queue[Optional[Tuple[T, Future[R]]]] = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._batch_size_histogram: Counter[int] = Counter()
+        self._queue_depth_histogram: Counter[int] = Counter()
+
+    def submit(self, item: T) -> 'Future[R]':
+        '''
+        Queues the `item` to be processed in the next batch.
+
+        # Parameters
+
+        item : `T`
+            The item to process.
+
+        # Returns
+
+        `concurrent.futures.Future[R]`
+
+        # Raises
+
+        `RuntimeError`
+            If the batcher has been closed.
+        '''
+        future: Future[R] = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Cannot submit as the `BackgroundBatcher` has been closed.')
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True,
+                                                name='pymusas-background-batcher')
+                self._thread.start()
+            self._queue.put((item, future))
+        return future
+
+    def _next_batch(self) -> Tuple[List[Tuple[T, 'Future[R]']], bool]:
+        '''
+        Waits for the next batch of items, returns the batch and whether the
+        batcher has been closed.
+        '''
+        request = self._queue.get()
+        if request is None:
+            return [], True
+        batch = [request]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self) -> None:
+        closed = False
+        while not closed:
+            batch, closed = self._next_batch()
+            if not batch:
+                continue
+            with self._lock:
+                self._queue_depth_histogram[len(batch) + self._queue.qsize()] += 1
+            # Items whose future has been cancelled are not processed.
+            batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            with self._lock:
+                self._batch_size_histogram[len(batch)] += 1
+            self._process(batch)
+
+    def _process(self, batch: List[Tuple[T, 'Future[R]']]) -> None:
+        '''
+        Processes the batch and sets the future of each item. If the batch
+        fails, and it contains more than one item, each item is processed in
+        a batch by itself.
+        '''
+        try:
+            results = self._process_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f'`process_batch` returned {len(results)} results '
+                                 f'for a batch of {len(batch)} items.')
+        except Exception as error:
+            if len(batch) == 1:
+                batch[0][1].set_exception(error)
+            else:
+                for request in batch:
+                    self._process([request])
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    @property
+    def queue_depth(self) -> int:
+        '''
+        The number of items waiting to be processed.
+        '''
+        return self._queue.qsize()
+
+    def statistics(self) -> BatchingStatistics:
+        '''
+        Returns the statistics of the batches processed so far.
+
+        # Returns
+
+        :class:`BatchingStatistics`
+        '''
+        with self._lock:
+            batch_size_histogram = dict(sorted(self._batch_size_histogram.items()))
+            queue_depth_histogram = dict(sorted(self._queue_depth_histogram.items()))
+        return BatchingStatistics(self.queue_depth, sum(batch_size_histogram.values()),
+                                  sum(batch_size * number_of_batches
+                                      for batch_size, number_of_batches in batch_size_histogram.items()),
+                                  batch_size_histogram, queue_depth_histogram)
+
+    def close(self, wait: bool = True) -> None:
+        '''
+        Stops the background thread once all of the items that have been
+        submitted have been processed. Items can no longer be submitted.
+
+        # Parameters
+
+        wait : `bool`, optional (default = `True`)
+            Whether to wait for the background thread to stop.
+        '''
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            if thread is not None:
+                self._queue.put(None)
+        if wait and thread is not None:
+            thread.join()
+
+    def __enter__(self) -> 'BackgroundBatcher[T, R]':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
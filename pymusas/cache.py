@@ -0,0 +1,358 @@
+"""
+Caches that are used by the taggers to store and re-use the results of
+expensive computations, e.g. the tags of a sentence that has already been
+tagged. The :class:`LRUCache` is a size bounded in memory cache and the
+:class:`SQLiteCache` is a persistent cache stored in a SQLite database file.
+"""
+
+from collections import OrderedDict
+from hashlib import blake2b
+from pathlib import Path
+import sqlite3
+import threading
+from typing import Any, Dict, Generic, Hashable, Iterable, Optional, Sequence, Tuple, TypeVar, Union, cast
+
+import srsly
+
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+def sequences_hash(*sequences: Sequence[str]) -> bytes:
+    '''
+    Returns a 16 byte hash digest of the given sequences of strings, this is
+    used as a memory efficient cache key for a sequence of tokens and their
+    associated lemmas and POS tags.
+
+    The sequences are serialised as a whole before hashing, therefore
+    `(['a b'], ['c'])` and `(['a', 'b'], ['c'])` create different hashes.
+
+    # Parameters
+
+    *sequences : `Sequence[str]`
+        The sequences of strings to hash.
+
+    # Returns
+
+    `bytes`
+
+    # Examples
+    ``` python
+    >>> from pymusas.cache import sequences_hash
+    >>> tokens = ['Hello', 'world']
+    >>> pos_tags = ['INTJ', 'NOUN']
+    >>> assert sequences_hash(tokens, pos_tags) == sequences_hash(tokens, pos_tags)
+    >>> assert sequences_hash(tokens, pos_tags) != sequences_hash(pos_tags, tokens)
+
+    ```
+    '''
+    serialised_sequences = cast(bytes, srsly.msgpack_dumps([list(sequence) for sequence in sequences]))
+    return blake2b(serialised_sequences, digest_size=16).digest()
+
+
+class LRUCache(Generic[K, V]):
+    '''
+    A Least Recently Used (LRU) cache that stores at most `maxsize` items,
+    when the cache is full the least recently used item is removed to make
+    room for the new item.
+
+    The cache keeps a record of the number of cache hits and misses so that
+    the effectiveness of the cache can be measured through the `hit_rate`.
+
+    The cache is thread safe, all reads and writes are guarded by a lock.
+
+    # Parameters
+
+    maxsize : `int`
+        The maximum number of items to store in the cache.
+
+    # Instance Attributes
+
+    maxsize : `int`
+        The given `maxsize`.
+    hits : `int`
+        The number of times :func:`get` has found the requested key.
+    misses : `int`
+        The number of times :func:`get` has not found the requested key.
+
+    # Raises
+
+    `ValueError`
+        If `maxsize` is less than 1.
+
+    # Examples
+    ``` python
+    >>> from pymusas.cache import LRUCache
+    >>> cache: LRUCache[str, int] = LRUCache(2)
+    >>> cache.put('a', 1)
+    >>> cache.put('b', 2)
+    >>> assert cache.get('a') == 1
+    >>> # `b` is now the least recently used item so it is removed.
+    >>> cache.put('c', 3)
+    >>> assert cache.get('b') is None
+    >>> assert (cache.hits, cache.misses, cache.hit_rate) == (1, 1, 0.5)
+
+    ```
+    '''
+
+    def __init__(self, maxsize: int) -> None:
+        if maxsize < 1:
+            raise ValueError(f'The `maxsize` of the cache has to be at least 1 and not {maxsize}')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[K, V] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> Optional[V]:
+        '''
+        Returns the value associated with the `key`, or `None` if the `key`
+        is not in the cache. If found the `key` becomes the most recently used.
+
+        # Parameters
+
+        key : `K`
+            The key to look up.
+
+        # Returns
+
+        `Optional[V]`
+        '''
+        with self._lock:
+            value = self._data.get(key, None)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        '''
+        Stores the `value` under the `key`, removing the least recently used
+        item if the cache is full.
+
+        # Parameters
+
+        key : `K`
+            The key to store the `value` under.
+        value : `V`
+            The value to store.
+        '''
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        '''
+        Removes all items from the cache, the `hits` and `misses` statistics
+        are not reset.
+        '''
+        with self._lock:
+            self._data.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        '''
+        The fraction of :func:`get` calls that found the requested key,
+        `0.0` if :func:`get` has not been called.
+
+        # Returns
+
+        `float`
+        '''
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The lock cannot be pickled.
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class SQLiteCache():
+    '''
+    A persistent cache that is stored in a SQLite database file, so that the
+    cached values can be re-used across Python processes, e.g. when
+    re-running a tagger over the same corpus. The keys are `bytes`, e.g.
+    created by :func:`sequences_hash`, and the values can be any value that
+    can be serialised with [msgpack](https://github.com/explosion/srsly),
+    e.g. `List[List[str]]`.
+
+    The cache has no size limit and keeps a record of the number of cache
+    hits and misses, like the :class:`LRUCache`.
+
+    The cache is thread safe, all reads and writes are guarded by a lock.
+    When the cache is pickled only the `path` is pickled, the database
+    connection is re-opened when it is un-pickled.
+
+    # Parameters
+
+    path : `Union[str, Path]`
+        The path to the SQLite database file, it is created if it does not
+        exist.
+
+    # Instance Attributes
+
+    path : `Path`
+        The given `path`.
+    hits : `int`
+        The number of times :func:`get` has found the requested key.
+    misses : `int`
+        The number of times :func:`get` has not found the requested key.
+
+    # Examples
+    ``` python
+    >>> from pathlib import Path
+    >>> from tempfile import TemporaryDirectory
+    >>> from pymusas.cache import SQLiteCache
+    >>> with TemporaryDirectory() as temp_dir:
+    ...     cache = SQLiteCache(Path(temp_dir, 'cache.sqlite'))
+    ...     cache.put(b'a', [['Z1', 'Z2']])
+    ...     assert cache.get(b'a') == [['Z1', 'Z2']]
+    ...     assert cache.get(b'b') is None
+    ...     cache.close()
+    ...     # The values persist after the cache has been closed.
+    ...     cache = SQLiteCache(Path(temp_dir, 'cache.sqlite'))
+    ...     assert cache.get(b'a') == [['Z1', 'Z2']]
+    ...     assert (cache.hits, cache.misses) == (1, 0)
+    ...     cache.close()
+
+    ```
+    '''
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        with connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS cache '
+                               '(key BLOB PRIMARY KEY, value BLOB NOT NULL)')
+        return connection
+
+    def get(self, key: bytes) -> Optional[Any]:
+        '''
+        Returns the value associated with the `key`, or `None` if the `key`
+        is not in the cache.
+
+        # Parameters
+
+        key : `bytes`
+            The key to look up.
+
+        # Returns
+
+        `Optional[Any]`
+        '''
+        with self._lock:
+            row = self._connection.execute('SELECT value FROM cache WHERE key = ?',
+                                           (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return srsly.msgpack_loads(row[0])
+
+    def put(self, key: bytes, value: Any) -> None:
+        '''
+        Stores the `value` under the `key`, replacing any existing value.
+
+        # Parameters
+
+        key : `bytes`
+            The key to store the `value` under.
+        value : `Any`
+            The value to store, it has to be serialisable with msgpack.
+        '''
+        self.put_many([(key, value)])
+
+    def put_many(self, items: Iterable[Tuple[bytes, Any]]) -> None:
+        '''
+        Stores all of the `(key, value)` pairs within one database
+        transaction, which is a lot faster than calling :func:`put` for each
+        pair.
+
+        # Parameters
+
+        items : `Iterable[Tuple[bytes, Any]]`
+            The `(key, value)` pairs to store.
+        '''
+        rows = [(key, srsly.msgpack_dumps(value)) for key, value in items]
+        with self._lock, self._connection:
+            self._connection.executemany('INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)',
+                                         rows)
+
+    def clear(self) -> None:
+        '''
+        Removes all items from the cache, the `hits` and `misses` statistics
+        are not reset.
+        '''
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM cache')
+
+    def close(self) -> None:
+        '''
+        Closes the database connection, the cache cannot be used after it has
+        been closed.
+        '''
+        with self._lock:
+            self._connection.close()
+
+    @property
+    def hit_rate(self) -> float:
+        '''
+        The fraction of :func:`get` calls that found the requested key,
+        `0.0` if :func:`get` has not been called.
+
+        # Returns
+
+        `float`
+        '''
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        return self.hits / total
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int(self._connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0])
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, bytes):
+            return False
+        with self._lock:
+            row = self._connection.execute('SELECT 1 FROM cache WHERE key = ?', (key,)).fetchone()
+        return row is not None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The lock and database connection cannot be pickled.
+        state = self.__dict__.copy()
+        del state['_lock']
+        del state['_connection']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._connection = self._connect()
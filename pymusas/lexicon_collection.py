@@ -3,6 +3,7 @@ from collections.abc import MutableMapping
 import csv
 from dataclasses import dataclass
 from enum import Enum, unique
+from functools import partial
 from os import PathLike
 import re
 from typing import DefaultDict, Dict, Generator, List, Optional, Set, Tuple, Union, cast
@@ -145,6 +146,10 @@ class LexiconCollection(MutableMapping):
     This data type is used for single word lexicons, to store Multi Word
     Expression (MWE) see the :class:`MWELexiconCollection`.
 
+    **Note** the collection can be read, e.g. `collection[key]`, from
+    multiple threads at the same time, including on free-threaded Python
+    builds, but it should not be modified while it is being read.
+
     # Parameters
 
     data: `Dict[str, List[str]]`, optional (default = `None`)
@@ -569,6 +574,11 @@ class MWELexiconCollection(MutableMapping):
     added to this collection, in addition a `UserWarning` will be raised stating
     this.
 
+    **Note** the collection can be read, e.g. :func:`mwe_match`, from
+    multiple threads at the same time, including on free-threaded Python
+    builds, as reading never modifies the collection, but it should not be
+    modified while it is being read.
+
     # Parameters
 
     data: `Dict[str, List[str]]`, optional (default = `None`)
@@ -662,14 +672,16 @@ class MWELexiconCollection(MutableMapping):
         self.longest_wildcard_mwe_template = 0
         self.longest_mwe_template = 0
         self.most_wildcards_in_mwe_template = 0
+        # `partial` is used rather than `lambda` so that the collection can be pickled.
         self.mwe_regular_expression_lookup: DefaultDict[int, DefaultDict[str, Dict[str, re.Pattern]]]\
-            = collections.defaultdict(lambda: collections.defaultdict(dict))
+            = collections.defaultdict(partial(collections.defaultdict, dict))
 
         self.pos_mapper: Dict[str, List[str]] = {}
         self.one_to_many_pos_tags: Set[str] = set()
         self.pos_mapping_lookup: Dict[str, str] = {}
         self.pos_mapping_regular_expression_lookup: DefaultDict[LexiconType, DefaultDict[int, DefaultDict[str, Dict[str, re.Pattern]]]]\
-            = collections.defaultdict(lambda: collections.defaultdict(lambda: collections.defaultdict(dict)))
+            = collections.defaultdict(partial(collections.defaultdict,
+                                              partial(collections.defaultdict, dict)))
         
         if pos_mapper is not None:
             self.pos_mapper = pos_mapper
@@ -735,8 +747,15 @@ class MWELexiconCollection(MutableMapping):
                 n_gram_length = len(mwe_template.split())
                 mwe_template_length = len(mwe_template)
                 if mwe_template_length > 0:
+                    # `get` is used rather than `[]` so that matching does not
+                    # add empty buckets to the lookup, as matching has to be
+                    # safe to call concurrently from multiple threads.
+                    regular_expression_lookup: Dict[str, Dict[str, re.Pattern]] = {}
+                    if mwe_type in self.pos_mapping_regular_expression_lookup:
+                        regular_expression_lookup \
+                            = self.pos_mapping_regular_expression_lookup[mwe_type].get(n_gram_length,
+                                                                                       regular_expression_lookup)
                     for character_lookup in ['*', mwe_template[0]]:
-                        regular_expression_lookup = self.pos_mapping_regular_expression_lookup[mwe_type][n_gram_length]
                         if character_lookup not in regular_expression_lookup:
                             continue
 
@@ -758,9 +777,9 @@ class MWELexiconCollection(MutableMapping):
                 n_gram_length = len(mwe_template.split())
                 mwe_template_length = len(mwe_template)
                 if mwe_template_length > 0:
+                    regular_expression_lookup = self.mwe_regular_expression_lookup.get(n_gram_length, {})
                     # By default all MWE matches can start with a * as it covers all characters.
                     for character_lookup in ['*', mwe_template[0]]:
-                        regular_expression_lookup = self.mwe_regular_expression_lookup[n_gram_length]
                         if character_lookup not in regular_expression_lookup:
                             continue
 
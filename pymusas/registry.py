@@ -0,0 +1,235 @@
+"""
+Process-wide registries of the resources that the taggers load, e.g. the
+rules, that contain the lexicons, and the neural models, so that when a
+process contains many taggers, e.g. many spaCy pipelines, identical resources
+are only loaded once and shared between the taggers.
+
+A :class:`ResourceRegistry` only holds weak references to the resources,
+therefore a resource is released once none of the taggers use it.
+"""
+
+from hashlib import blake2b
+import threading
+from typing import Callable, Dict, Generic, Hashable, Iterable, List, TypeVar, cast
+import weakref
+
+import srsly
+
+from pymusas.base import Serialise
+
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+
+class ResourceRegistry(Generic[K, V]):
+    '''
+    A thread safe registry that maps a key, which identifies a resource, e.g.
+    the content hash of a lexicon, to a shared instance of that resource.
+
+    The registry only holds weak references to the resources, a resource is
+    removed from the registry once it is no longer used, e.g. once all of the
+    taggers that use it have been deleted. Therefore the resources have to
+    support weak references, e.g. instances of most classes, but not `list`
+    or `dict`.
+
+    The registry keeps a record of the number of times a resource has been
+    shared (`hits`) and loaded (`misses`).
+
+    # Instance Attributes
+
+    hits : `int`
+        The number of times :func:`get_or_create` has returned a resource
+        that was already loaded.
+    misses : `int`
+        The number of times :func:`get_or_create` has created a resource.
+
+    # Examples
+    ``` python
+    >>> from pymusas.registry import ResourceRegistry
+    >>> class Resource:
+    ...     pass
+    >>> registry: ResourceRegistry[str, Resource] = ResourceRegistry()
+    >>> resource = registry.get_or_create('key', Resource)
+    >>> assert registry.get_or_create('key', Resource) is resource
+    >>> assert (1, 1) == (registry.hits, registry.misses)
+    >>> del resource
+    >>> assert 'key' not in registry
+
+    ```
+    '''
+
+    def __init__(self) -> None:
+        self._resources: weakref.WeakValueDictionary[K, V] = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        # A lock per key that is being created, so that a resource is only
+        # created once while other resources can be created at the same time.
+        self._create_locks: Dict[K, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key: K, create: Callable[[], V]) -> V:
+        '''
+        Returns the resource of the `key`, if the registry does not contain
+        the `key` the resource is created, by calling `create`, and added to
+        the registry. When many threads request the same `key` at the same
+        time the resource is only created once.
+
+        # Parameters
+
+        key : `K`
+            The key that identifies the resource.
+        create : `Callable[[], V]`
+            A function that creates the resource.
+
+        # Returns
+
+        `V`
+        '''
+        with self._lock:
+            resource = self._resources.get(key)
+            if resource is not None:
+                self.hits += 1
+                return resource
+            create_lock = self._create_locks.setdefault(key, threading.Lock())
+        with create_lock:
+            try:
+                with self._lock:
+                    resource = self._resources.get(key)
+                    if resource is not None:
+                        self.hits += 1
+                        return resource
+                resource = create()
+                with self._lock:
+                    self._resources[key] = resource
+                    self.misses += 1
+            finally:
+                with self._lock:
+                    if self._create_locks.get(key) is create_lock:
+                        del self._create_locks[key]
+        return resource
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            return key in self._resources
+
+    def __len__(self) -> int:
+        '''
+        The number of resources in the registry that are still in use.
+        '''
+        with self._lock:
+            return len(self._resources)
+
+
+#: The process-wide registry of :class:`pymusas.base.Serialise` objects, e.g.
+#: the rules, keyed by the content hash of their serialised bytes.
+serialise_object_registry: ResourceRegistry[bytes, Serialise] = ResourceRegistry()
+#: The process-wide registry of neural models, keyed by the identity of the
+#: model and the device it is loaded on.
+model_registry: ResourceRegistry[Hashable, object] = ResourceRegistry()
+
+
+def content_hash(bytes_data: bytes) -> bytes:
+    '''
+    Returns a 16 byte hash digest of the given bytestring.
+
+    # Parameters
+
+    bytes_data : `bytes`
+        The bytestring to hash.
+
+    # Returns
+
+    `bytes`
+    '''
+    return blake2b(bytes_data, digest_size=16).digest()
+
+
+def shared_serialise_object(serialise_object: Serialise) -> Serialise:
+    '''
+    Returns the shared instance, from the :var:`serialise_object_registry`,
+    of the `serialise_object`, two objects are the same if their serialised
+    bytes, see :func:`pymusas.base.Serialise.serialise_object_to_bytes`, are
+    the same, e.g. two :class:`pymusas.taggers.rules.single_word.SingleWordRule`s
+    with the same lexicons and POS mapper. If the registry does not contain
+    the object, the `serialise_object` is added and returned.
+
+    # Parameters
+
+    serialise_object : `pymusas.base.Serialise`
+        The object to share.
+
+    # Returns
+
+    :class:`pymusas.base.Serialise`
+
+    # Examples
+    ``` python
+    >>> from pymusas.registry import shared_serialise_object
+    >>> from pymusas.taggers.rules.single_word import SingleWordRule
+    >>> rule = SingleWordRule({'example|noun': ['Z1']}, {})
+    >>> shared_rule = shared_serialise_object(rule)
+    >>> assert shared_serialise_object(SingleWordRule({'example|noun': ['Z1']}, {})) is shared_rule
+
+    ```
+    '''
+    key = content_hash(Serialise.serialise_object_to_bytes(serialise_object))
+    return serialise_object_registry.get_or_create(key, lambda: serialise_object)
+
+
+def shared_serialise_object_from_bytes(bytes_data: bytes) -> Serialise:
+    '''
+    Returns the shared instance, from the :var:`serialise_object_registry`,
+    of the object serialised in `bytes_data`, see
+    :func:`pymusas.base.Serialise.serialise_object_from_bytes`. The object is
+    only loaded from the `bytes_data` if the registry does not contain it.
+
+    # Parameters
+
+    bytes_data : `bytes`
+        The bytestring to load, created by
+        :func:`pymusas.base.Serialise.serialise_object_to_bytes`.
+
+    # Returns
+
+    :class:`pymusas.base.Serialise`
+    '''
+    return serialise_object_registry.get_or_create(content_hash(bytes_data),
+                                                   lambda: Serialise.serialise_object_from_bytes(bytes_data))
+
+
+def shared_serialise_object_list(serialise_objects: Iterable[Serialise]) -> List[Serialise]:
+    '''
+    Returns the shared instance of each of the `serialise_objects`, see
+    :func:`shared_serialise_object`.
+
+    # Parameters
+
+    serialise_objects : `Iterable[pymusas.base.Serialise]`
+        The objects to share.
+
+    # Returns
+
+    `List[pymusas.base.Serialise]`
+    '''
+    return [shared_serialise_object(serialise_object) for serialise_object in serialise_objects]
+
+
+def shared_serialise_object_list_from_bytes(bytes_data: bytes) -> List[Serialise]:
+    '''
+    Returns the shared instance of each of the objects serialised in
+    `bytes_data`, see :func:`shared_serialise_object_from_bytes`.
+
+    # Parameters
+
+    bytes_data : `bytes`
+        The bytestring to load, created by
+        :func:`pymusas.base.Serialise.serialise_object_list_to_bytes`.
+
+    # Returns
+
+    `List[pymusas.base.Serialise]`
+    '''
+    serialised_objects = cast(List[bytes], srsly.msgpack_loads(bytes_data))
+    return [shared_serialise_object_from_bytes(serialised_object)
+            for serialised_object in serialised_objects]
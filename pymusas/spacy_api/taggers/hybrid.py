@@ -1,16 +1,20 @@
 from pathlib import Path
-from typing import Any, Callable, Iterable, List, Optional, Union, cast
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union, cast
 
 from spacy.language import Language
 from spacy.tokens import Doc
 from spacy.training import Example
-from spacy.util import SimpleFrozenList
+from spacy.util import SimpleFrozenList, minibatch
 import srsly
 
 
 try:
+    import torch
     from transformers import AutoTokenizer, PreTrainedTokenizerBase
     from wsd_torch_models.bem import BEM
+
+    from pymusas.taggers.neural import maximum_sub_words, predict_tags
 except ImportError:
     pass
 
@@ -20,7 +24,7 @@ from pymusas.spacy_api.taggers.neural import NeuralTagger
 from pymusas.spacy_api.taggers.rule_based import RuleBasedTagger
 from pymusas.spacy_api.utils import remove_custom_token_extension
 from pymusas.taggers.rules.rule import Rule
-from pymusas.utils import neural_extra_installed
+from pymusas.utils import context_windows, neural_extra_installed
 
 
 class HybridTagger(RuleBasedTagger, NeuralTagger):
@@ -57,6 +61,30 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
     3. Use the `NeuralTagger` to tag the token. The tags generated by the `NeuralTagger`
     are determined by how you have initialised the `NeuralTagger`.
 
+    By default the `NeuralTagger` tags the whole `Doc` when at least one token
+    cannot be tagged. If `context_window` is set the `NeuralTagger` only tags a
+    context window of `context_window` tokens either side of each token that
+    cannot be tagged, overlapping context windows are merged and all of the
+    context windows are tagged in one batch. For long documents with few
+    tokens that cannot be tagged this is a lot faster, but the `NeuralTagger`
+    has less context to predict the tags from.
+
+    When many `Doc`s are tagged through `nlp.pipe` the `Doc`s, or their
+    context windows, that contain tokens that cannot be tagged are tagged
+    together in batches across `Doc`s, see :func:`pipe`, rather than one
+    forward pass of the model per `Doc`.
+
+    If `quantize` or `dtype` is set the model is quantized or cast the first
+    time the component is called, rather than when it is loaded, so that the
+    component can still be saved, through :func:`to_disk`, at its original
+    precision after it has been initialized.
+
+    The `NeuralTagger`'s model is shared with the other components within
+    the process that are initialised, or loaded, with the same model, see
+    :class:`pymusas.spacy_api.taggers.neural.NeuralTagger`, as are the rules
+    if `share_rules` is `True`, see
+    :class:`pymusas.spacy_api.taggers.rule_based.RuleBasedTagger`.
+
     # Assigned Attributes
 
     <table>
@@ -98,6 +126,21 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
     | top_n                    | See parameters section below |
     | device                   | See parameters section below |
     | tokenizer_kwargs         | See parameters section below |
+    | context_window           | See parameters section below |
+    | quantize                 | See parameters section below |
+    | dtype                    | See parameters section below |
+    | autocast                 | See parameters section below |
+    | max_sub_words            | See parameters section below |
+    | sub_word_stride          | See parameters section below |
+    | max_tokens_per_batch     | See parameters section below |
+    | share_memory             | See parameters section below |
+    | worker_num_threads       | See parameters section below |
+    | lazy_load                | See parameters section below |
+    | num_threads              | See parameters section below |
+    | num_interop_threads      | See parameters section below |
+    | warm_up_on_load          | See parameters section below |
+    | low_memory_load          | See parameters section below |
+    | share_rules              | See parameters section below |
 
     # Parameters
 
@@ -138,6 +181,83 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
         Keyword arguments to pass to the NeuralTagger's sub-word tokenizer's
         `transformers.AutoTokenizer.from_pretrained` method.
         These keyword arguments are only passed to the tokenizer on initialization.
+    context_window : `int | None`, optional (default = `None`)
+        The number of tokens either side of a token that cannot be tagged
+        that the NeuralTagger is given as context. If `None` the
+        NeuralTagger is given the whole `Doc`.
+    quantize : `str | None`, optional (default = `None`)
+        The quantization method to apply to the NeuralTagger's model, see
+        :func:`pymusas.taggers.neural.quantize_wsd_model`. `'dynamic-int8'`
+        makes the model a lot smaller and faster on CPU at the cost of a
+        small change in the predicted tags. It can only be used when the
+        `device` is `'cpu'`. If `None` the model is not quantized.
+    dtype : `str | None`, optional (default = `None`)
+        The precision to run the NeuralTagger's model at, either `'float32'`,
+        `'float16'`, or `'bfloat16'`, see
+        :func:`pymusas.taggers.neural.cast_wsd_model`. `'bfloat16'` is a lot
+        faster than `'float32'` on modern CPUs but can change the predicted
+        tags. If `None` the model runs at the precision it was saved with.
+    autocast : `bool`, optional (default = `False`)
+        If `True` the NeuralTagger's model is not cast to `dtype`, instead the
+        model runs within a
+        [`torch.autocast`](https://docs.pytorch.org/docs/stable/amp.html#torch.autocast)
+        context of `dtype`.
+    max_sub_words : `int | None`, optional (default = `None`)
+        The maximum number of sub-word tokens, including special tokens, the
+        NeuralTagger's model is given in one sequence. A `Doc`, or context
+        window, that has more sub-word tokens than this is split into
+        overlapping windows of tokens which are tagged in batches, see
+        :func:`pymusas.taggers.neural.predict_tags`. If `None` it is the
+        maximum sequence length of the model, see
+        :func:`pymusas.taggers.neural.maximum_sub_words`.
+    sub_word_stride : `int | None`, optional (default = `None`)
+        The minimum number of sub-word tokens between the start of one window
+        and the next, the overlap between windows is roughly
+        `max_sub_words - sub_word_stride` sub-word tokens. If `None` it is
+        half of `max_sub_words`.
+    max_tokens_per_batch : `int`, optional (default = `4096`)
+        The maximum number of padded sub-word tokens in a batch given to the
+        NeuralTagger's model.
+    share_memory : `bool`, optional (default = `False`)
+        If `True` the NeuralTagger's model is moved into shared memory when it
+        is loaded so that the worker processes of `nlp.pipe(n_process=N)` do
+        not copy it, see :class:`pymusas.spacy_api.taggers.neural.NeuralTagger`.
+        It can only be used when the `device` is `'cpu'`.
+    worker_num_threads : `int | None`, optional (default = `None`)
+        The number of threads PyTorch uses within a worker process, a process
+        other than the one the component was created in, e.g. the worker
+        processes of `nlp.pipe(n_process=N)`. As the number of threads is
+        global to the process, if `None` it is not changed. Setting it to `1`
+        stops the worker processes from using more threads than there are
+        CPU cores.
+    lazy_load : `bool`, optional (default = `False`)
+        If `True` the NeuralTagger's model and tokenizer are not loaded by
+        :func:`initialize` or :func:`from_disk`, they are loaded when the
+        first token that cannot be tagged appears, see :func:`warm_up`.
+        When loaded from disk the directory has to still exist when the
+        model is loaded. If `share_memory` is also `True` the model is only
+        shared with the worker processes of `nlp.pipe(n_process=N)` if it is
+        loaded, e.g. through :func:`warm_up`, before they are started.
+    num_threads : `int | None`, optional (default = `None`)
+        The number of intra-op threads PyTorch uses within the process the
+        NeuralTagger's model is loaded in, set when the model is loaded, see
+        :class:`pymusas.spacy_api.taggers.neural.NeuralTagger`. If `None` it
+        is not changed.
+    num_interop_threads : `int | None`, optional (default = `None`)
+        The number of inter-op threads PyTorch uses within the process the
+        NeuralTagger's model is loaded in, set when the model is loaded, if
+        PyTorch allows it to be set. If `None` it is not changed.
+    warm_up_on_load : `bool`, optional (default = `False`)
+        Whether to warm up the NeuralTagger's model, see :func:`warm_up`, once
+        it is loaded, when `lazy_load` is `True` this is when the model is
+        first required. If `quantize` or `dtype` is set the warm up quantizes
+        or casts the model, therefore the component cannot be saved afterwards.
+    low_memory_load : `bool`, optional (default = `False`)
+        Whether to load the NeuralTagger's model with low memory, see
+        :class:`pymusas.spacy_api.taggers.neural.NeuralTagger`.
+    share_rules : `bool`, optional (default = `False`)
+        Whether to share the rules with the other components in the process,
+        see :class:`pymusas.spacy_api.taggers.rule_based.RuleBasedTagger`.
 
     # Instance Attributes
 
@@ -190,6 +310,49 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
         or will be passed to the tokenizer's `transformers.AutoTokenizer.from_pretrained`
         method. These keyword arguments are only passed to the tokenizer on
         initialization.
+    context_window : `int | None`
+        The given `context_window`.
+    quantize : `str | None`
+        For the NeuralTagger.
+        The given `quantize`.
+    dtype : `str | None`
+        For the NeuralTagger.
+        The given `dtype`.
+    autocast : `bool`
+        For the NeuralTagger.
+        The given `autocast`.
+    max_sub_words : `int | None`
+        For the NeuralTagger.
+        The given `max_sub_words`.
+    sub_word_stride : `int | None`
+        For the NeuralTagger.
+        The given `sub_word_stride`.
+    max_tokens_per_batch : `int`
+        For the NeuralTagger.
+        The given `max_tokens_per_batch`.
+    share_memory : `bool`
+        For the NeuralTagger.
+        The given `share_memory`.
+    worker_num_threads : `int | None`
+        For the NeuralTagger.
+        The given `worker_num_threads`.
+    lazy_load : `bool`
+        The given `lazy_load`.
+    num_threads : `int | None`
+        For the NeuralTagger.
+        The given `num_threads`.
+    num_interop_threads : `int | None`
+        For the NeuralTagger.
+        The given `num_interop_threads`.
+    warm_up_on_load : `bool`
+        For the NeuralTagger.
+        The given `warm_up_on_load`.
+    low_memory_load : `bool`
+        For the NeuralTagger.
+        The given `low_memory_load`.
+    share_rules : `bool`
+        For the RuleBasedTagger.
+        The given `share_rules`.
 
     # Class Attributes
 
@@ -202,7 +365,24 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
     # Raises
     
     `ValueError`
-        If `top_n` is 0 or less than -1.
+        If `top_n` is 0 or less than -1, or if `context_window` is less than 0.
+
+    `ValueError`
+        If `quantize` is not `None` or `'dynamic-int8'`, or if `quantize` is
+        set and the `device` is not `'cpu'`.
+
+    `ValueError`
+        If `dtype` is not `None`, `'float32'`, `'float16'`, or `'bfloat16'`, if
+        `autocast` is `True` and `dtype` is `None`, or if `quantize` is set and
+        `dtype` is not `None` or `'float32'`.
+
+    `ValueError`
+        If `max_sub_words`, `sub_word_stride`, `max_tokens_per_batch`,
+        `worker_num_threads`, `num_threads`, or `num_interop_threads` are less
+        than 1.
+
+    `ValueError`
+        If `share_memory` is `True` and the `device` is not `'cpu'`.
 
     # Examples
 
@@ -258,19 +438,48 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
                  top_n: int = 5,
                  device: str = 'cpu',
                  tokenizer_kwargs: dict[str, Any] | None = None,
+                 context_window: int | None = None,
+                 quantize: str | None = None,
+                 dtype: str | None = None,
+                 autocast: bool = False,
+                 max_sub_words: int | None = None,
+                 sub_word_stride: int | None = None,
+                 max_tokens_per_batch: int = 4096,
+                 share_memory: bool = False,
+                 worker_num_threads: int | None = None,
+                 lazy_load: bool = False,
+                 num_threads: int | None = None,
+                 num_interop_threads: int | None = None,
+                 warm_up_on_load: bool = False,
+                 low_memory_load: bool = False,
+                 share_rules: bool = False,
                  ) -> None:
-        RuleBasedTagger.__init__(self, name, pymusas_tags_token_attr, pymusas_mwe_indexes_attr, pos_attribute, lemma_attribute)
+        RuleBasedTagger.__init__(self, name, pymusas_tags_token_attr, pymusas_mwe_indexes_attr, pos_attribute,
+                                 lemma_attribute, share_rules=share_rules)
         # These custom token extension/attributes are also set by the NeuralTagger
         # if they are set more than once they generate a User Warning, thus
         # this is to mitigate this.
         remove_custom_token_extension(pymusas_tags_token_attr)
         remove_custom_token_extension(pymusas_mwe_indexes_attr)
-        NeuralTagger.__init__(self, name, pymusas_tags_token_attr, pymusas_mwe_indexes_attr, top_n, device, tokenizer_kwargs)
+        NeuralTagger.__init__(self, name, pymusas_tags_token_attr, pymusas_mwe_indexes_attr, top_n, device,
+                              tokenizer_kwargs, quantize, dtype, autocast, max_sub_words,
+                              sub_word_stride, max_tokens_per_batch, share_memory, worker_num_threads,
+                              num_threads, num_interop_threads, warm_up_on_load, low_memory_load)
+        if context_window is not None and context_window < 0:
+            raise ValueError('The `context_window` has to be at least 0 or `None` '
+                             f'and not {context_window}')
+        self.context_window = context_window
+        self.lazy_load = lazy_load
+        # The model path, tokenizer path, and tokenizer keyword arguments
+        # of the model that has not been loaded yet, when `lazy_load` is `True`.
+        self._lazy_model_paths: Optional[Tuple[str | Path, str | Path, Dict[str, Any]]] = None
+        self._load_lock = threading.Lock()
 
     def _validate(self) -> None:
         '''
         Checks that: `self.rules`, `self.ranker`, `self.wsd_model`,
-        and `self.tokenizer` are not `None`.
+        and `self.tokenizer` are not `None`, the `self.wsd_model` and
+        `self.tokenizer` can be `None` if they are to be lazily loaded.
 
         In addition if the `self.wsd_model` is not loaded onto `self.device`,
         the model is loaded onto `self.device`.
@@ -287,6 +496,10 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
         
         if self.ranker is None:
             raise ValueError(error_msg.format('ranker'))
+
+        if self.wsd_model is None and self._lazy_model_paths is not None:
+            self._validated = True
+            return
         
         if self.wsd_model is None:
             raise ValueError(error_msg.format('wsd_model'))
@@ -298,6 +511,76 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
             self.wsd_model.to(self.device)
 
         self._validated = True
+
+    def _load_lazy_model(self) -> None:
+        '''
+        Loads the lazily loaded model and tokenizer, if they have not been
+        loaded yet, converts the model, see :func:`_convert_model`, moves
+        it into shared memory if `share_memory` is `True`, and warms it up if
+        `warm_up_on_load` is `True`.
+        '''
+        if self._lazy_model_paths is None:
+            return
+        model_path, tokenizer_path, tokenizer_kwargs = self._lazy_model_paths
+        self._set_torch_threads()
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_path,  # type: ignore
+                                                  **tokenizer_kwargs)
+        assert isinstance(tokenizer, PreTrainedTokenizerBase)
+        self.tokenizer = tokenizer
+        self.wsd_model = self._load_wsd_model(model_path)
+        self.wsd_model.to(self.device)
+        self._converted = False
+        self._convert_model()
+        self._share_model_memory()
+        if self.warm_up_on_load:
+            self._warm_up_model()
+        # Other threads wait for the model to be loaded until this is `None`.
+        self._lazy_model_paths = None
+
+    def _load_model(self) -> None:
+        '''
+        Loads the lazily loaded model and tokenizer, see `lazy_load`, if they
+        have not been loaded yet. It is thread safe, the model is only loaded
+        once when many threads call it at the same time.
+        '''
+        if self._lazy_model_paths is None:
+            return
+        with self._load_lock:
+            self._load_lazy_model()
+
+    def warm_up(self, tokens: Optional[List[str]] = None) -> None:
+        '''
+        Loads the NeuralTagger's model, if it is lazily loaded, see
+        `lazy_load`, and tags the `tokens` with it so that the first `Doc`
+        does not pay the cost of loading the model, nor of the first forward
+        pass, e.g. for latency sensitive services.
+
+        # Parameters
+
+        tokens : `List[str]`, optional (default = `None`)
+            The tokens to tag. If `None` the tokens `['Warm', 'up']` are
+            tagged.
+
+        # Raises
+
+        `ValueError`
+            If the component has not been initialized or loaded from disk.
+        '''
+        if not self._validated:
+            self._validate()
+        self._load_model()
+        self._convert_model()
+        self._warm_up_model(tokens)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # A lock cannot be pickled, it is created again when unpickled.
+        state = self.__dict__.copy()
+        del state['_load_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._load_lock = threading.Lock()
     
     def initialize(self,
                    get_examples: Optional[Callable[[], Iterable[Example]]] = None,
@@ -356,7 +639,7 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
 
         # Taken from RuleBasedTagger
         if rules is not None:
-            self.rules = rules
+            self.rules = self._load_rules(rules)
         
         if ranker is not None:
             self.ranker = ranker
@@ -370,16 +653,27 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
         # Taken from NeuralTagger
         neural_extra_installed()
         if pretrained_model_name_or_path is not None:
-            self.wsd_model = BEM.from_pretrained(pretrained_model_name_or_path)
             tokenizer_kwargs = {}
             if self._tokenizer_kwargs is not None:
                 tokenizer_kwargs = self._tokenizer_kwargs
-            tokenizer = AutoTokenizer.from_pretrained(pretrained_model_name_or_path,  # type: ignore
-                                                      **tokenizer_kwargs)
-            assert isinstance(tokenizer, PreTrainedTokenizerBase)
-            self.tokenizer = tokenizer
+            if self.lazy_load:
+                self.wsd_model = None
+                self.tokenizer = None
+                self._lazy_model_paths = (pretrained_model_name_or_path, pretrained_model_name_or_path,
+                                          tokenizer_kwargs)
+            else:
+                self._set_torch_threads()
+                self.wsd_model = self._load_wsd_model(pretrained_model_name_or_path)
+                self._converted = False
+                tokenizer = AutoTokenizer.from_pretrained(pretrained_model_name_or_path,  # type: ignore
+                                                          **tokenizer_kwargs)
+                assert isinstance(tokenizer, PreTrainedTokenizerBase)
+                self.tokenizer = tokenizer
         
         self._validate()
+        self._share_model_memory()
+        if self.warm_up_on_load and self.wsd_model is not None:
+            self.warm_up()
     
     def __call__(self, doc: Doc) -> Doc:
         '''
@@ -399,20 +693,86 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
         '''
         if not self._validated:
             self._validate()
+        self._configure_process()
         RuleBasedTagger.__call__(self, doc)
-
-        self.tokenizer = cast(PreTrainedTokenizerBase, self.tokenizer)
-        self.wsd_model = cast(BEM, self.wsd_model)
         
         # Try, catch error handling reference:
         # https://github.com/explosion/spaCy/blob/6af6c2e86cc7b08573b261563786bd1ab87d45e9/spacy/pipeline/lemmatizer.py#L131
         error_handler = self.get_error_handler()
 
         try:
-            # We have made the assumption that all unknown tokens are single word
-            # expressions, i.e. they only affect one token.
-            unknown_token_indexes: list[int] = []
-            token_texts: list[str] = []
+            self._set_neural_tags([doc])
+        except Exception as e:
+            error_handler(self.name, self, [doc], e)
+        
+        return doc
+
+    def pipe(self, stream: Iterable[Doc], *, batch_size: int = 128) -> Iterator[Doc]:
+        '''
+        Applies the tagger to a stream of spaCy documents, modifying them in
+        place, and yields them in order. This usually happens under the hood
+        when the `nlp` object is called through
+        [`Language.pipe`](https://spacy.io/api/language#pipe).
+
+        The documents are tagged in batches of `batch_size` documents. The
+        rules tag all of the documents in the batch together, see
+        :func:`pymusas.spacy_api.taggers.rule_based.RuleBasedTagger.pipe`,
+        then all of the documents, or
+        context windows when `context_window` is set, with tokens that the
+        rules cannot tag are given to the NeuralTagger's model together, see
+        :func:`pymusas.taggers.neural.predict_tags`, which sorts them by
+        length and tags them in batches of at most `max_tokens_per_batch`
+        sub-word tokens. For many short documents, e.g. social media posts,
+        this is a lot faster than one forward pass per document through
+        :func:`__call__`, the tags are the same.
+
+        # Parameters
+
+        stream : `Iterable[Doc]`
+            The [spaCy `Doc`s](https://spacy.io/api/doc) to tag.
+        batch_size : `int`, optional (default = `128`)
+            The number of documents to tag in one batch, when called through
+            `Language.pipe` this is the `batch_size` given to `Language.pipe`.
+
+        # Returns
+
+        `Iterator[Doc]`
+
+        # Raises
+
+        `ValueError`
+            If `batch_size` is less than 1.
+        '''
+        if batch_size < 1:
+            raise ValueError(f'The `batch_size` has to be at least 1 and not {batch_size}')
+        if not self._validated:
+            self._validate()
+        self._configure_process()
+        error_handler = self.get_error_handler()
+        docs: List[Doc]
+        for docs in minibatch(stream, size=batch_size):  # type: ignore[no-untyped-call]
+            try:
+                self._set_rule_based_tags(docs)
+                self._set_neural_tags(docs)
+            except Exception as e:
+                error_handler(self.name, self, docs, e)
+            yield from docs
+
+    def _set_neural_tags(self, docs: List[Doc]) -> None:
+        '''
+        Predicts the tags of the tokens in the `docs` that the rules cannot
+        tag, the tokens tagged `Z99`, and assigns them to these tokens. All
+        of the `docs`, or their context windows, that contain these tokens
+        are given to the model in one call of
+        :func:`pymusas.taggers.neural.predict_tags`.
+        '''
+        # We have made the assumption that all unknown tokens are single word
+        # expressions, i.e. they only affect one token.
+        docs_unknown_token_indexes: List[Tuple[Doc, List[str], List[int], List[Tuple[int, int]]]] = []
+        sequences: List[List[str]] = []
+        for doc in docs:
+            unknown_token_indexes: List[int] = []
+            token_texts: List[str] = []
             for token in doc:
                 token_texts.append(token.text)
                 rule_based_tags = getattr(token._, self.pymusas_tags_token_attr)
@@ -420,21 +780,45 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
                     tag_indexes = getattr(token._, self.pymusas_mwe_indexes_attr)
                     unknown_token_index = tag_indexes[0][0]
                     unknown_token_indexes.append(unknown_token_index)
-            if unknown_token_indexes:
-                predicted_tags_candidates = self.wsd_model.predict(token_texts,
-                                                                   sub_word_tokenizer=self.tokenizer,
-                                                                   top_n=self.top_n)
-                for token_index in unknown_token_indexes:
-                    token_text = token_texts[token_index]
-                    neural_tags = predicted_tags_candidates[token_index]
-                    if token_text.strip() == "":
-                        neural_tags = ["Z9"]
-                    token = doc[token_index]
-                    setattr(token._, self.pymusas_tags_token_attr, neural_tags)
-        except Exception as e:
-            error_handler(self.name, self, [doc], e)
-        
-        return doc
+            if not unknown_token_indexes:
+                continue
+            # Only the tags of the tokens within a context window are
+            # predicted, the other tokens are never used.
+            windows = [(0, len(token_texts))]
+            if self.context_window is not None:
+                windows = context_windows(unknown_token_indexes, len(token_texts), self.context_window)
+            docs_unknown_token_indexes.append((doc, token_texts, unknown_token_indexes, windows))
+            sequences.extend(token_texts[start: end] for start, end in windows)
+        if not sequences:
+            return
+
+        self._load_model()
+        self._convert_model()
+        self.tokenizer = cast(PreTrainedTokenizerBase, self.tokenizer)
+        self.wsd_model = cast(BEM, self.wsd_model)
+        max_sub_words = self.max_sub_words
+        if max_sub_words is None:
+            max_sub_words = maximum_sub_words(self.wsd_model, self.tokenizer)
+        with torch.inference_mode(mode=True):
+            sequences_predicted_tags = predict_tags(self.wsd_model, self.tokenizer, sequences,
+                                                    self.top_n, self.max_tokens_per_batch,
+                                                    autocast_dtype=self._autocast_dtype,
+                                                    max_sub_words=max_sub_words,
+                                                    sub_word_stride=self.sub_word_stride)
+
+        sequence_index = 0
+        for doc, token_texts, unknown_token_indexes, windows in docs_unknown_token_indexes:
+            predicted_tags_candidates: List[List[str]] = [[] for _ in token_texts]
+            for start, end in windows:
+                predicted_tags_candidates[start: end] = sequences_predicted_tags[sequence_index]
+                sequence_index += 1
+            for token_index in unknown_token_indexes:
+                token_text = token_texts[token_index]
+                neural_tags = predicted_tags_candidates[token_index]
+                if token_text.strip() == "":
+                    neural_tags = ["Z9"]
+                token = doc[token_index]
+                setattr(token._, self.pymusas_tags_token_attr, neural_tags)
     
     def to_bytes(self, *, exclude: Iterable[str] = SimpleFrozenList()) -> bytes:
         """
@@ -480,6 +864,12 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
 
         `None`
 
+        # Raises
+
+        `ValueError`
+            If the model has been quantized or cast to `dtype`, as it would not
+            be saved at its original precision.
+
         # Examples
 
         ```python
@@ -506,6 +896,11 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
         '''
         if not self._validated:
             self._validate()
+        self._load_model()
+        if self._converted:
+            raise ValueError('The model has been quantized or cast to a different '
+                             'precision and cannot be saved, save the component '
+                             'before it is first called.')
         RuleBasedTagger.to_disk(self, path, exclude=exclude)
         NeuralTagger.to_disk(self, path, exclude=exclude)
 
@@ -577,8 +972,7 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
 
         rules_path = Path(component_folder, 'rules.bin')
         serialised_rules = srsly.read_msgpack(rules_path)
-        rules = Rule.serialise_object_list_from_bytes(serialised_rules)
-        self.rules = cast(List[Rule], rules)
+        self.rules = self._load_rules_from_bytes(serialised_rules)
 
         default_punctuation_tags_path = Path(component_folder,
                                              'default_punctuation_tags.bin')
@@ -591,13 +985,22 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
 
         # Taken from NeuralTagger
         model_path = component_folder / "model"
-        self.wsd_model = BEM.from_pretrained(model_path)
-
         tokenizer_path = component_folder / "tokenizer"
-        self.tokenizer = cast(PreTrainedTokenizerBase,
-                              AutoTokenizer.from_pretrained(tokenizer_path))  # type: ignore[no-untyped-call]
+        if self.lazy_load:
+            self.wsd_model = None
+            self.tokenizer = None
+            self._lazy_model_paths = (model_path, tokenizer_path, {})
+        else:
+            self._set_torch_threads()
+            self.wsd_model = self._load_wsd_model(model_path)
+            self._converted = False
+            self.tokenizer = cast(PreTrainedTokenizerBase,
+                                  AutoTokenizer.from_pretrained(tokenizer_path))  # type: ignore[no-untyped-call]
 
         self._validate()
+        self._share_model_memory()
+        if self.warm_up_on_load and self.wsd_model is not None:
+            self.warm_up()
         return self
         
     @property
@@ -625,7 +1028,22 @@ class HybridTagger(RuleBasedTagger, NeuralTagger):
                                   'lemma_attribute': 'lemma_',
                                   'top_n': 5,
                                   'device': 'cpu',
-                                  'tokenizer_kwargs': None})
+                                  'tokenizer_kwargs': None,
+                                  'context_window': None,
+                                  'quantize': None,
+                                  'dtype': None,
+                                  'autocast': False,
+                                  'max_sub_words': None,
+                                  'sub_word_stride': None,
+                                  'max_tokens_per_batch': 4096,
+                                  'share_memory': False,
+                                  'worker_num_threads': None,
+                                  'lazy_load': False,
+                                  'num_threads': None,
+                                  'num_interop_threads': None,
+                                  'warm_up_on_load': False,
+                                  'low_memory_load': False,
+                                  'share_rules': False})
 def make_usas_hybrid_tagger(nlp: Language,
                             name: str,
                             pymusas_tags_token_attr: str,
@@ -634,7 +1052,22 @@ def make_usas_hybrid_tagger(nlp: Language,
                             lemma_attribute: str,
                             top_n: int,
                             device: str,
-                            tokenizer_kwargs: None | dict[str, Any]
+                            tokenizer_kwargs: None | dict[str, Any],
+                            context_window: None | int,
+                            quantize: None | str,
+                            dtype: None | str,
+                            autocast: bool,
+                            max_sub_words: None | int,
+                            sub_word_stride: None | int,
+                            max_tokens_per_batch: int,
+                            share_memory: bool,
+                            worker_num_threads: None | int,
+                            lazy_load: bool,
+                            num_threads: None | int,
+                            num_interop_threads: None | int,
+                            warm_up_on_load: bool,
+                            low_memory_load: bool,
+                            share_rules: bool
                             ) -> HybridTagger:
     return HybridTagger(name,
                         pymusas_tags_token_attr,
@@ -643,4 +1076,19 @@ def make_usas_hybrid_tagger(nlp: Language,
                         lemma_attribute,
                         top_n,
                         device,
-                        tokenizer_kwargs)
+                        tokenizer_kwargs,
+                        context_window,
+                        quantize,
+                        dtype,
+                        autocast,
+                        max_sub_words,
+                        sub_word_stride,
+                        max_tokens_per_batch,
+                        share_memory,
+                        worker_num_threads,
+                        lazy_load,
+                        num_threads,
+                        num_interop_threads,
+                        warm_up_on_load,
+                        low_memory_load,
+                        share_rules)
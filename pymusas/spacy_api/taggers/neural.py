@@ -1,4 +1,5 @@
 import json
+import os
 from pathlib import Path
 from typing import Any, Callable, Iterable, List, Optional, Union, cast
 
@@ -13,10 +14,23 @@ try:
     import torch
     from transformers import AutoTokenizer, PreTrainedTokenizerBase
     from wsd_torch_models.bem import BEM
+
+    from pymusas.taggers.neural import (
+        cast_wsd_model,
+        load_wsd_model,
+        maximum_sub_words,
+        predict_tags,
+        quantize_wsd_model,
+        set_torch_threads,
+        share_wsd_model_memory,
+        torch_dtype,
+        wsd_model_identity,
+    )
 except ImportError:
     pass
 
 from pymusas.file_utils import ensure_path
+from pymusas.registry import model_registry
 from pymusas.spacy_api.utils import set_custom_token_extension
 from pymusas.utils import neural_extra_installed
 
@@ -41,6 +55,55 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
       will return only one tag which will be the `Z9` tag and no other tags,
       even if `top_n` is greater than 1.
 
+    If `quantize` or `dtype` is set the model is quantized or cast the first
+    time the component is called, rather than when it is loaded, so that the
+    component can still be saved, through :func:`to_disk`, at its original
+    precision after it has been initialized.
+
+    **Multiple processes**
+    When the component is used within
+    [`nlp.pipe`](https://spacy.io/api/language#pipe) with `n_process`
+    greater than 1 each worker process has its own copy of the model, unless
+    `share_memory` is `True`, in which case the model is moved into shared
+    memory, see :func:`pymusas.taggers.neural.share_wsd_model_memory`, when
+    it is loaded, through :func:`initialize` or :func:`from_disk`, and the
+    worker processes use the same memory. As the model cannot be changed once
+    it is shared, if `quantize` or `dtype` is set the model is quantized or
+    cast when it is loaded, therefore the component cannot be saved after it
+    has been loaded. The quantized weights of a quantized model are not moved
+    into shared memory. In a worker process the number of threads PyTorch
+    uses is set to `worker_num_threads`, if it is not `None`, e.g. `1` so
+    that the worker processes do not use more threads than there are CPU
+    cores.
+
+    **Threads and warm-up**
+    The number of threads PyTorch uses within the process the model is
+    loaded in, through :func:`initialize` or :func:`from_disk`, can be set
+    through `num_threads` and `num_interop_threads`, see
+    :func:`pymusas.taggers.neural.set_torch_threads`, so that the component
+    does not compete for the CPU cores with other processes. If
+    `warm_up_on_load` is `True` the component is warmed up, see
+    :func:`warm_up`, once the model is loaded so that the first `Doc` does
+    not pay the one off costs of the first forward pass.
+
+    **Low memory loading**
+    If `low_memory_load` is `True` the model is loaded, through
+    :func:`initialize` or :func:`from_disk`, without initialising its weights
+    and its weights are memory mapped from the model's safetensors file, see
+    :func:`pymusas.taggers.neural.load_wsd_model`, therefore the peak memory
+    when loading is close to the size of the model, rather than roughly
+    twice its size.
+
+    **Shared models**
+    When a process contains many pipelines, e.g. a neural and a hybrid
+    pipeline for the same language, the components that load the same model
+    onto the same device share one instance of the model, through the
+    process-wide :var:`pymusas.registry.model_registry`, rather than each
+    loading their own copy, the model is released once none of the components
+    use it. Models are the same if they have the same HuggingFace Hub id, or
+    if their directories contain the same files. A model that is quantized,
+    or cast without `autocast`, is not shared as it is converted in place.
+
     # Assigned Attributes
 
     <table>
@@ -81,6 +144,18 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
     | top_n                    | See parameters section below |
     | device                   | See parameters section below |
     | tokenizer_kwargs         | See parameters section below |
+    | quantize                 | See parameters section below |
+    | dtype                    | See parameters section below |
+    | autocast                 | See parameters section below |
+    | max_sub_words            | See parameters section below |
+    | sub_word_stride          | See parameters section below |
+    | max_tokens_per_batch     | See parameters section below |
+    | share_memory             | See parameters section below |
+    | worker_num_threads       | See parameters section below |
+    | num_threads              | See parameters section below |
+    | num_interop_threads      | See parameters section below |
+    | warm_up_on_load          | See parameters section below |
+    | low_memory_load          | See parameters section below |
 
     # Parameters
 
@@ -109,6 +184,67 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
         implemented. If you save this component to disk when it is loaded
         this will become `None` as the tokenizer itself `self.tokenizer` will
         contain the the contents of `tokenizer_kwargs`.
+    quantize : `str | None`, optional (default = `None`)
+        The quantization method to apply to the model, see
+        :func:`pymusas.taggers.neural.quantize_wsd_model`. `'dynamic-int8'`
+        makes the model a lot smaller and faster on CPU at the cost of a
+        small change in the predicted tags. It can only be used when the
+        `device` is `'cpu'`. If `None` the model is not quantized.
+    dtype : `str | None`, optional (default = `None`)
+        The precision to run the model at, either `'float32'`, `'float16'`, or
+        `'bfloat16'`, see :func:`pymusas.taggers.neural.cast_wsd_model`.
+        `'bfloat16'` is a lot faster than `'float32'` on modern CPUs but
+        can change the predicted tags. If `None` the model runs at the
+        precision it was saved with.
+    autocast : `bool`, optional (default = `False`)
+        If `True` the model is not cast to `dtype`, instead the model runs within
+        a [`torch.autocast`](https://docs.pytorch.org/docs/stable/amp.html#torch.autocast)
+        context of `dtype`.
+    max_sub_words : `int | None`, optional (default = `None`)
+        The maximum number of sub-word tokens, including special tokens, the
+        model is given in one sequence. A `Doc` that has more sub-word tokens
+        than this is split into overlapping windows of tokens which are tagged
+        in batches, see :func:`pymusas.taggers.neural.predict_tags`, therefore
+        the memory required does not grow with the length of the `Doc`. If
+        `None` it is the maximum sequence length of the model, see
+        :func:`pymusas.taggers.neural.maximum_sub_words`.
+    sub_word_stride : `int | None`, optional (default = `None`)
+        The minimum number of sub-word tokens between the start of one window
+        and the next, the overlap between windows is roughly
+        `max_sub_words - sub_word_stride` sub-word tokens. A token that is in
+        more than one window is assigned the tags from the window in which it
+        is the furthest from the window's edge. If `None` it is half of
+        `max_sub_words`.
+    max_tokens_per_batch : `int`, optional (default = `4096`)
+        The maximum number of padded sub-word tokens in a batch of windows.
+    share_memory : `bool`, optional (default = `False`)
+        If `True` the model is moved into shared memory when it is loaded so
+        that the worker processes of `nlp.pipe(n_process=N)` do not copy it.
+        It can only be used when the `device` is `'cpu'`.
+    worker_num_threads : `int | None`, optional (default = `None`)
+        The number of threads PyTorch uses within a worker process, a process
+        other than the one the component was created in, e.g. the worker
+        processes of `nlp.pipe(n_process=N)`. As the number of threads is
+        global to the process, if `None` it is not changed. Setting it to `1`
+        stops the worker processes from using more threads than there are
+        CPU cores.
+    num_threads : `int | None`, optional (default = `None`)
+        The number of intra-op threads PyTorch uses within the process the
+        model is loaded in, set when the model is loaded. If `None` it is not
+        changed.
+    num_interop_threads : `int | None`, optional (default = `None`)
+        The number of inter-op threads PyTorch uses within the process the
+        model is loaded in, set when the model is loaded, if PyTorch allows it
+        to be set. If `None` it is not changed.
+    warm_up_on_load : `bool`, optional (default = `False`)
+        Whether to warm up the component, see :func:`warm_up`, once the model
+        is loaded. If `quantize` or `dtype` is set the warm up quantizes or
+        casts the model, therefore the component cannot be saved afterwards.
+    low_memory_load : `bool`, optional (default = `False`)
+        Whether to load the model with low memory, see
+        :func:`pymusas.taggers.neural.load_wsd_model`. The model's files must
+        not be overwritten, e.g. by saving the component to the directory it
+        was loaded from, while the model is in use.
 
     # Instance Attributes
 
@@ -136,6 +272,30 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
         or will be passed to the tokenizer's `transformers.AutoTokenizer.from_pretrained`
         method. These keyword arguments are only passed to the tokenizer on
         initialization.
+    quantize : `str | None`
+        The given `quantize`.
+    dtype : `str | None`
+        The given `dtype`.
+    autocast : `bool`
+        The given `autocast`.
+    max_sub_words : `int | None`
+        The given `max_sub_words`.
+    sub_word_stride : `int | None`
+        The given `sub_word_stride`.
+    max_tokens_per_batch : `int`
+        The given `max_tokens_per_batch`.
+    share_memory : `bool`
+        The given `share_memory`.
+    worker_num_threads : `int | None`
+        The given `worker_num_threads`.
+    num_threads : `int | None`
+        The given `num_threads`.
+    num_interop_threads : `int | None`
+        The given `num_interop_threads`.
+    warm_up_on_load : `bool`
+        The given `warm_up_on_load`.
+    low_memory_load : `bool`
+        The given `low_memory_load`.
 
     # Class Attributes
 
@@ -150,6 +310,23 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
     `ValueError`
         If `top_n` is 0 or less than -1.
 
+    `ValueError`
+        If `quantize` is not `None` or `'dynamic-int8'`, or if `quantize` is
+        set and the `device` is not `'cpu'`.
+
+    `ValueError`
+        If `dtype` is not `None`, `'float32'`, `'float16'`, or `'bfloat16'`, if
+        `autocast` is `True` and `dtype` is `None`, or if `quantize` is set and
+        `dtype` is not `None` or `'float32'`.
+
+    `ValueError`
+        If `max_sub_words`, `sub_word_stride`, `max_tokens_per_batch`,
+        `worker_num_threads`, `num_threads`, or `num_interop_threads` are less
+        than 1.
+
+    `ValueError`
+        If `share_memory` is `True` and the `device` is not `'cpu'`.
+
     # Examples
 
     ``` python
@@ -185,7 +362,19 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
                  pymusas_mwe_indexes_attr: str = 'pymusas_mwe_indexes',
                  top_n: int = 5,
                  device: str = 'cpu',
-                 tokenizer_kwargs: dict[str, Any] | None = None
+                 tokenizer_kwargs: dict[str, Any] | None = None,
+                 quantize: str | None = None,
+                 dtype: str | None = None,
+                 autocast: bool = False,
+                 max_sub_words: int | None = None,
+                 sub_word_stride: int | None = None,
+                 max_tokens_per_batch: int = 4096,
+                 share_memory: bool = False,
+                 worker_num_threads: int | None = None,
+                 num_threads: int | None = None,
+                 num_interop_threads: int | None = None,
+                 warm_up_on_load: bool = False,
+                 low_memory_load: bool = False
                  ) -> None:
         neural_extra_installed()
 
@@ -204,6 +393,49 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
         self.top_n = top_n
         self.device = torch.device(device)
 
+        if quantize not in (None, 'dynamic-int8'):
+            raise ValueError('The `quantize` argument has to be either `None` or '
+                             f'`dynamic-int8` and not `{quantize}`')
+        if quantize is not None and self.device.type != 'cpu':
+            raise ValueError('Dynamic int8 quantization is only supported on CPU '
+                             f'and not on the device: {device}')
+        self.quantize = quantize
+        autocast_dtype = torch_dtype(dtype) if dtype is not None else None
+        if autocast and autocast_dtype is None:
+            raise ValueError('The `dtype` has to be set when `autocast` is `True`')
+        if quantize is not None and dtype not in (None, 'float32'):
+            raise ValueError('The model can only be quantized at the `float32` '
+                             f'precision and not `{dtype}`')
+        self.dtype = dtype
+        self.autocast = autocast
+        self._autocast_dtype = autocast_dtype if autocast else None
+        self._converted = False
+        for argument_name, argument_value in [('max_sub_words', max_sub_words),
+                                              ('sub_word_stride', sub_word_stride),
+                                              ('max_tokens_per_batch', max_tokens_per_batch),
+                                              ('worker_num_threads', worker_num_threads),
+                                              ('num_threads', num_threads),
+                                              ('num_interop_threads', num_interop_threads)]:
+            if argument_value is not None and argument_value < 1:
+                raise ValueError(f'The `{argument_name}` argument has to be at least 1 '
+                                 f'and not {argument_value}')
+        self.max_sub_words = max_sub_words
+        self.sub_word_stride = sub_word_stride
+        self.max_tokens_per_batch = max_tokens_per_batch
+        if share_memory and self.device.type != 'cpu':
+            raise ValueError('Only a model on the CPU can be moved into shared memory '
+                             f'and not on the device: {device}')
+        self.share_memory = share_memory
+        self.worker_num_threads = worker_num_threads
+        self.num_threads = num_threads
+        self.num_interop_threads = num_interop_threads
+        self.warm_up_on_load = warm_up_on_load
+        self.low_memory_load = low_memory_load
+        # The process the component was created in, any other process is a
+        # worker process.
+        self._process_id = os.getpid()
+        self._configured_process_id = self._process_id
+
         self.wsd_model: BEM | None = None
         self.tokenizer: PreTrainedTokenizerBase | None = None
         
@@ -233,6 +465,107 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
             self.wsd_model.to(self.device)
 
         self._validated = True
+
+    def _convert_model(self) -> None:
+        '''
+        Casts the `wsd_model` to `dtype`, unless `autocast` is `True`, and
+        quantizes it using the `quantize` method, if it has not already been
+        converted.
+        '''
+        if self._converted:
+            return
+        if not self.autocast and self.dtype is not None:
+            cast_wsd_model(cast(BEM, self.wsd_model), self.dtype)
+            self._converted = True
+        if self.quantize is not None:
+            quantize_wsd_model(cast(BEM, self.wsd_model), self.quantize)
+            self._converted = True
+
+    def _share_model_memory(self) -> None:
+        '''
+        Converts the `wsd_model`, see :func:`_convert_model`, and moves it into
+        shared memory if `share_memory` is `True`.
+        '''
+        if self.share_memory and self.wsd_model is not None:
+            self._convert_model()
+            share_wsd_model_memory(self.wsd_model)
+
+    def _configure_process(self) -> None:
+        '''
+        Sets the number of threads PyTorch uses to `worker_num_threads` the
+        first time the component is called within a worker process.
+        '''
+        process_id = os.getpid()
+        if process_id == self._configured_process_id:
+            return
+        if self.worker_num_threads is not None and process_id != self._process_id:
+            torch.set_num_threads(self.worker_num_threads)
+        self._configured_process_id = process_id
+
+    def _set_torch_threads(self) -> None:
+        '''
+        Sets the number of threads PyTorch uses to `num_threads` and
+        `num_interop_threads`, see :func:`pymusas.taggers.neural.set_torch_threads`,
+        called before the model is loaded.
+        '''
+        set_torch_threads(self.num_threads, self.num_interop_threads)
+
+    def _load_wsd_model(self, pretrained_model_name_or_path: str | Path) -> BEM:
+        '''
+        Loads the model, with low memory if `low_memory_load` is `True`, see
+        :func:`pymusas.taggers.neural.load_wsd_model`, onto the `device` in
+        evaluation mode.
+
+        The model is shared with the other components within the process that
+        load the same model onto the same device, through the
+        :var:`pymusas.registry.model_registry`, unless it is converted in
+        place, when `quantize`, or `dtype` without `autocast`, is set. Models
+        are the same if they have the same identity, the HuggingFace Hub id
+        and commit hash, or the directory path and the size and modification
+        time of its files, see :func:`pymusas.taggers.neural.wsd_model_identity`.
+        '''
+        def load() -> BEM:
+            return load_wsd_model(pretrained_model_name_or_path, self.low_memory_load).to(self.device).eval()
+
+        if self.quantize is not None or (self.dtype is not None and not self.autocast):
+            return load()
+        model_identity = wsd_model_identity(pretrained_model_name_or_path)
+        return cast(BEM, model_registry.get_or_create(('BEM', model_identity, str(self.device)), load))
+
+    def _warm_up_model(self, tokens: Optional[List[str]] = None) -> None:
+        '''
+        Tags the `tokens`, `['Warm', 'up']` if `None`, with the loaded and
+        converted `wsd_model` without assigning the tags to a `Doc`.
+        '''
+        if tokens is None:
+            tokens = ['Warm', 'up']
+        with torch.inference_mode(mode=True):
+            predict_tags(cast(BEM, self.wsd_model), cast(PreTrainedTokenizerBase, self.tokenizer),
+                         [tokens], self.top_n, self.max_tokens_per_batch,
+                         autocast_dtype=self._autocast_dtype)
+
+    def warm_up(self, tokens: Optional[List[str]] = None) -> None:
+        '''
+        Tags the `tokens` with the model so that the first `Doc` does not pay
+        the one off costs of the first forward pass, e.g. for latency
+        sensitive services. If `quantize` or `dtype` is set the model is
+        quantized or cast, therefore the component cannot be saved afterwards.
+
+        # Parameters
+
+        tokens : `List[str]`, optional (default = `None`)
+            The tokens to tag. If `None` the tokens `['Warm', 'up']` are
+            tagged.
+
+        # Raises
+
+        `ValueError`
+            If the component has not been initialized or loaded from disk.
+        '''
+        if not self._validated:
+            self._validate()
+        self._convert_model()
+        self._warm_up_model(tokens)
     
     def initialize(self,
                    get_examples: Optional[Callable[[], Iterable[Example]]] = None,
@@ -270,7 +603,9 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
         '''
         neural_extra_installed()
         if pretrained_model_name_or_path is not None:
-            self.wsd_model = BEM.from_pretrained(pretrained_model_name_or_path)
+            self._set_torch_threads()
+            self.wsd_model = self._load_wsd_model(pretrained_model_name_or_path)
+            self._converted = False
             tokenizer_kwargs = {}
             if self._tokenizer_kwargs is not None:
                 tokenizer_kwargs = self._tokenizer_kwargs
@@ -280,6 +615,9 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
             self.tokenizer = tokenizer
         
         self._validate()
+        self._share_model_memory()
+        if self.warm_up_on_load:
+            self.warm_up()
     
     def __call__(self, doc: Doc) -> Doc:
         '''
@@ -299,6 +637,8 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
         '''
         if not self._validated:
             self._validate()
+        self._configure_process()
+        self._convert_model()
         self.tokenizer = cast(PreTrainedTokenizerBase, self.tokenizer)
         self.wsd_model = cast(BEM, self.wsd_model)
         
@@ -310,9 +650,15 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
             for token in doc:
                 tokens.append(token.text)
 
-            predicted_tags_candidates = self.wsd_model.predict(tokens,
-                                                               sub_word_tokenizer=self.tokenizer,
-                                                               top_n=self.top_n)
+            max_sub_words = self.max_sub_words
+            if max_sub_words is None:
+                max_sub_words = maximum_sub_words(self.wsd_model, self.tokenizer)
+            with torch.inference_mode(mode=True):
+                predicted_tags_candidates = predict_tags(self.wsd_model, self.tokenizer, [tokens],
+                                                         self.top_n, self.max_tokens_per_batch,
+                                                         autocast_dtype=self._autocast_dtype,
+                                                         max_sub_words=max_sub_words,
+                                                         sub_word_stride=self.sub_word_stride)[0]
             for token_index, predicted_tag_candidates in enumerate(predicted_tags_candidates):
                 start_end_index = [(token_index, token_index + 1)]
                 assigned_tags = predicted_tag_candidates
@@ -349,6 +695,12 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
 
         `None`
 
+        # Raises
+
+        `ValueError`
+            If the model has been quantized or cast to `dtype`, as it would not
+            be saved at its original precision.
+
         # Examples
 
         ```python
@@ -364,6 +716,10 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
         '''
         if not self._validated:
             self._validate()
+        if self._converted:
+            raise ValueError('The model has been quantized or cast to a different '
+                             'precision and cannot be saved, save the component '
+                             'before it is first called.')
         tokenizer = cast(PreTrainedTokenizerBase, self.tokenizer)
         wsd_model = cast(BEM, self.wsd_model)
 
@@ -438,13 +794,18 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
         component_folder = ensure_path(path)
         
         model_path = component_folder / "model"
-        self.wsd_model = BEM.from_pretrained(model_path)
+        self._set_torch_threads()
+        self.wsd_model = self._load_wsd_model(model_path)
+        self._converted = False
 
         tokenizer_path = component_folder / "tokenizer"
         self.tokenizer = cast(PreTrainedTokenizerBase,
                               AutoTokenizer.from_pretrained(tokenizer_path))  # type: ignore[no-untyped-call]
 
         self._validate()
+        self._share_model_memory()
+        if self.warm_up_on_load:
+            self.warm_up()
         return self
         
     @property
@@ -462,18 +823,54 @@ class NeuralTagger(spacy.pipeline.pipe.Pipe):
                                   'pymusas_mwe_indexes_attr': 'pymusas_mwe_indexes',
                                   'top_n': 5,
                                   'device': 'cpu',
-                                  'tokenizer_kwargs': None})
+                                  'tokenizer_kwargs': None,
+                                  'quantize': None,
+                                  'dtype': None,
+                                  'autocast': False,
+                                  'max_sub_words': None,
+                                  'sub_word_stride': None,
+                                  'max_tokens_per_batch': 4096,
+                                  'share_memory': False,
+                                  'worker_num_threads': None,
+                                  'num_threads': None,
+                                  'num_interop_threads': None,
+                                  'warm_up_on_load': False,
+                                  'low_memory_load': False})
 def make_usas_neural_tagger(nlp: Language,
                             name: str,
                             pymusas_tags_token_attr: str,
                             pymusas_mwe_indexes_attr: str,
                             top_n: int,
                             device: str,
-                            tokenizer_kwargs: None | dict[str, Any]
+                            tokenizer_kwargs: None | dict[str, Any],
+                            quantize: None | str,
+                            dtype: None | str,
+                            autocast: bool,
+                            max_sub_words: None | int,
+                            sub_word_stride: None | int,
+                            max_tokens_per_batch: int,
+                            share_memory: bool,
+                            worker_num_threads: None | int,
+                            num_threads: None | int,
+                            num_interop_threads: None | int,
+                            warm_up_on_load: bool,
+                            low_memory_load: bool
                             ) -> NeuralTagger:
     return NeuralTagger(name,
                         pymusas_tags_token_attr,
                         pymusas_mwe_indexes_attr,
                         top_n,
                         device,
-                        tokenizer_kwargs)
+                        tokenizer_kwargs,
+                        quantize,
+                        dtype,
+                        autocast,
+                        max_sub_words,
+                        sub_word_stride,
+                        max_tokens_per_batch,
+                        share_memory,
+                        worker_num_threads,
+                        num_threads,
+                        num_interop_threads,
+                        warm_up_on_load,
+                        low_memory_load)
@@ -1,18 +1,36 @@
+import itertools
 from pathlib import Path
-from typing import Callable, Iterable, List, Optional, Union, cast
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union, cast
+import weakref
 
+import numpy
 import spacy
+from spacy.attrs import LEMMA, LOWER, NORM, ORTH, POS, TAG
 from spacy.language import Language
 from spacy.tokens import Doc
 from spacy.training import Example
-from spacy.util import SimpleFrozenList
+from spacy.util import SimpleFrozenList, minibatch
 import srsly
 
+from pymusas.cache import LRUCache, sequences_hash
 from pymusas.file_utils import ensure_path
 from pymusas.rankers.lexicon_entry import LexiconEntryRanker
 from pymusas.rankers.ranking_meta_data import RankingMetaData
-from pymusas.spacy_api.utils import set_custom_token_extension
+from pymusas.registry import content_hash, shared_serialise_object_list, shared_serialise_object_list_from_bytes
+from pymusas.spacy_api.taggers.rules import SingleWordRuleHashLookup
+from pymusas.spacy_api.utils import set_custom_token_extension, set_token_extension_values
+from pymusas.taggers.rule_based import best_ranks_to_tags_indexes, updated_cache_state
 from pymusas.taggers.rules.rule import Rule
+from pymusas.taggers.rules.single_word import SingleWordRule
+
+
+# The spaCy attribute ids of the `Token` attributes that can be used as the
+# `pos_attribute` and `lemma_attribute` when `hash_lexicon_lookup` is `True`.
+HASH_LOOKUP_ATTRIBUTES = {'text': ORTH, 'orth_': ORTH, 'lower_': LOWER, 'norm_': NORM,
+                          'lemma_': LEMMA, 'pos_': POS, 'tag_': TAG}
+# The components whose `share_rules` is `True`, so that clearing the cache of
+# one component clears the caches of all of the components that share its rules.
+_rule_sharing_taggers: "weakref.WeakSet[RuleBasedTagger]" = weakref.WeakSet()
 
 
 class RuleBasedTagger(spacy.pipeline.pipe.Pipe):
@@ -43,6 +61,19 @@ class RuleBasedTagger(spacy.pipeline.pipe.Pipe):
     lemmatiser in your spaCy pipeline this ok, just use the default
     `pos_attribute` and `lemma_attribute`.
 
+    **Shared rules**
+    When a process contains many pipelines and `share_rules` is `True`, the
+    components that are initialised, or loaded, with the same rules, e.g.
+    rules with the same lexicons and POS mapper, share one instance of each
+    rule, through the process-wide
+    :var:`pymusas.registry.serialise_object_registry`, rather than each
+    keeping their own copy of the lexicons, a rule is released once none of
+    the components use it. Rules are the same if their serialised bytes are
+    the same, see :func:`pymusas.registry.shared_serialise_object`. The shared
+    rules are read-only, a rule modified in place is modified for all of the
+    components that share it, therefore to modify a rule copy it and assign
+    the copy to the `rules` attribute.
+
     # Assigned Attributes
 
     <table>
@@ -81,6 +112,9 @@ class RuleBasedTagger(spacy.pipeline.pipe.Pipe):
     | pymusas_mwe_indexes_attr | See parameters section below |
     | pos_attribute            | See parameters section below |
     | lemma_attribute          | See parameters section below |
+    | cache_size               | See parameters section below |
+    | hash_lexicon_lookup      | See parameters section below |
+    | share_rules              | See parameters section below |
 
     # Parameters
 
@@ -109,6 +143,27 @@ class RuleBasedTagger(spacy.pipeline.pipe.Pipe):
         lemma information or if you do not have a lemmatiser. **NOTE** that if you
         do not have a lemmatiser the default value for `Token.lemma_` is an empty
         string.
+    cache_size : `int`, optional (default = `0`)
+        The maximum number of sentences whose tags are stored in a
+        :class:`pymusas.cache.LRUCache`, so that a `Doc` that has already
+        been tagged, e.g. boilerplate text, is not tagged again. The cache key
+        is a hash of the token texts, lemmas, and POS tags of the `Doc`. If `0`
+        no cache is used.
+    hash_lexicon_lookup : `bool`, optional (default = `False`)
+        If `True` the :class:`pymusas.taggers.rules.single_word.SingleWordRule`s
+        match the tokens on their spaCy StringStore ids, through
+        :class:`pymusas.spacy_api.taggers.rules.SingleWordRuleHashLookup`,
+        rather than on their strings, which is faster as the strings of each
+        token only have to be created for the other rules, e.g.
+        :class:`pymusas.taggers.rules.mwe.MWERule`. The tags are the same as
+        when `False`. The `pos_attribute` and `lemma_attribute` have to be one
+        of the `Token` attributes in `HASH_LOOKUP_ATTRIBUTES`, e.g. `pos_`,
+        `tag_`, or `lemma_`.
+    share_rules : `bool`, optional (default = `False`)
+        If `True` the rules are shared with the other components in the
+        process whose `share_rules` is `True`, see the Shared rules section
+        above. If `False` the component uses the rules it is given, or its own
+        copy of the rules when loaded from bytes or disk.
 
     # Instance Attributes
 
@@ -132,6 +187,16 @@ class RuleBasedTagger(spacy.pipeline.pipe.Pipe):
         The given `pos_attribute`
     lemma_attribute : `str`, optional (default = `lemma_`)
         The given `lemma_attribute`
+    hash_lexicon_lookup : `bool`, optional (default = `False`)
+        The given `hash_lexicon_lookup`
+    share_rules : `bool`, optional (default = `False`)
+        The given `share_rules`
+    cache : `pymusas.cache.LRUCache`, optional (default = `None`)
+        The sentence cache, `None` if `cache_size` is `0`. The cache hit rate
+        can be found through `cache.hit_rate`. The cache is cleared when any
+        of the `rules`, `ranker`, `default_punctuation_tags`, or
+        `default_number_tags` attributes are re-assigned, if a rule or the
+        ranker is modified in place call :func:`clear_cache`.
 
     # Class Attributes
 
@@ -187,7 +252,10 @@ class RuleBasedTagger(spacy.pipeline.pipe.Pipe):
                  pymusas_tags_token_attr: str = 'pymusas_tags',
                  pymusas_mwe_indexes_attr: str = 'pymusas_mwe_indexes',
                  pos_attribute: str = 'pos_',
-                 lemma_attribute: str = 'lemma_'
+                 lemma_attribute: str = 'lemma_',
+                 cache_size: int = 0,
+                 hash_lexicon_lookup: bool = False,
+                 share_rules: bool = False
                  ) -> None:
         self.name = name
         
@@ -205,9 +273,104 @@ class RuleBasedTagger(spacy.pipeline.pipe.Pipe):
         
         self.default_punctuation_tags = set(['punc'])
         self.default_number_tags = set(['num'])
+
+        if cache_size < 0:
+            raise ValueError(f'The `cache_size` cannot be negative: {cache_size}')
+        self.cache: Optional[LRUCache[bytes, List[Tuple[List[str], List[Tuple[int, int]]]]]] = None
+        if cache_size:
+            self.cache = LRUCache(cache_size)
+        self._cache_state: Optional[Tuple[Any, ...]] = None
+
+        if hash_lexicon_lookup:
+            for attribute in [pos_attribute, lemma_attribute]:
+                if attribute not in HASH_LOOKUP_ATTRIBUTES:
+                    raise ValueError(f'The `{attribute}` attribute cannot be used with '
+                                     '`hash_lexicon_lookup`, the attribute has to be one '
+                                     f'of: {sorted(HASH_LOOKUP_ATTRIBUTES)}')
+        self._hash_lexicon_lookup = hash_lexicon_lookup
+        # The rules and their hash lookup, `None` for rules that are not a
+        # `SingleWordRule`, for the `rules` that the lookups were created for.
+        self._rule_hash_lookups: Optional[Tuple[List[Rule],
+                                                List[Optional[SingleWordRuleHashLookup]]]] = None
+
+        self._share_rules = share_rules
         
         self._validated = False
 
+    def clear_cache(self) -> None:
+        '''
+        Removes all of the sentences from the cache, and the rule lookups
+        created when `hash_lexicon_lookup` is `True`, this should be called if
+        any of the `rules` or the `ranker` are modified in place, e.g. a
+        lexicon entry is added to a rule's lexicon. If `share_rules` is `True`
+        the caches of the other components that share any of the `rules` are
+        also cleared.
+        '''
+        self._clear_component_cache()
+        if self.share_rules and self.rules is not None:
+            rule_ids = set(id(rule) for rule in self.rules)
+            for tagger in list(_rule_sharing_taggers):
+                if (tagger is not self and tagger.rules is not None
+                        and any(id(rule) in rule_ids for rule in tagger.rules)):
+                    tagger._clear_component_cache()
+
+    def _clear_component_cache(self) -> None:
+        '''
+        Clears the cache and rule lookups of this component only.
+        '''
+        if self.cache is not None:
+            self.cache.clear()
+        self._rule_hash_lookups = None
+
+    def _load_rules(self, rules: List[Rule]) -> List[Rule]:
+        '''
+        Returns the shared instance of each of the `rules` if `share_rules` is
+        `True`, else the `rules`.
+        '''
+        if self.share_rules:
+            _rule_sharing_taggers.add(self)
+            return cast(List[Rule], shared_serialise_object_list(rules))
+        return rules
+
+    def _load_rules_from_bytes(self, bytes_data: bytes) -> List[Rule]:
+        '''
+        Returns the rules serialised in `bytes_data`, the shared instance of
+        each rule if `share_rules` is `True`.
+        '''
+        if self.share_rules:
+            _rule_sharing_taggers.add(self)
+            return cast(List[Rule], shared_serialise_object_list_from_bytes(bytes_data))
+        return cast(List[Rule], Rule.serialise_object_list_from_bytes(bytes_data))
+
+    def _get_rule_hash_lookups(self, rules: List[Rule]) -> List[Optional[SingleWordRuleHashLookup]]:
+        '''
+        Returns the hash lookup of each of the `rules`, `None` for the rules
+        that are not a :class:`pymusas.taggers.rules.single_word.SingleWordRule`,
+        the lookups are only created again when the `rules` change.
+        '''
+        if (self._rule_hash_lookups is None
+                or len(rules) != len(self._rule_hash_lookups[0])
+                or any(rule is not lookup_rule
+                       for rule, lookup_rule in zip(rules, self._rule_hash_lookups[0]))):
+            hash_lookups = [SingleWordRuleHashLookup(rule) if isinstance(rule, SingleWordRule) else None
+                            for rule in rules]
+            self._rule_hash_lookups = (list(rules), hash_lookups)
+        return self._rule_hash_lookups[1]
+
+    def _check_cache_state(self) -> None:
+        '''
+        Clears the cache if any of the `rules`, `ranker`,
+        `default_punctuation_tags`, or `default_number_tags` have changed
+        since the cache was last used.
+        '''
+        cache_state = updated_cache_state(self._cache_state, cast(List[Rule], self.rules),
+                                          cast(LexiconEntryRanker, self.ranker),
+                                          self.default_punctuation_tags,
+                                          self.default_number_tags)
+        if cache_state is not None:
+            self._clear_component_cache()
+            self._cache_state = cache_state
+
     def _validate(self) -> None:
         '''
         Checks that `rules` and `ranker` are not `None`
@@ -263,7 +426,7 @@ class RuleBasedTagger(spacy.pipeline.pipe.Pipe):
             to the `default_number_tags` attribute.
         '''
         if rules is not None:
-            self.rules = rules
+            self.rules = self._load_rules(rules)
         
         if ranker is not None:
             self.ranker = ranker
@@ -295,57 +458,173 @@ class RuleBasedTagger(spacy.pipeline.pipe.Pipe):
         if not self._validated:
             self._validate()
         
-        ranker = cast(LexiconEntryRanker, self.ranker)
-        rules = cast(List[Rule], self.rules)
-        
         # Try, catch error handling reference:
         # https://github.com/explosion/spaCy/blob/6af6c2e86cc7b08573b261563786bd1ab87d45e9/spacy/pipeline/lemmatizer.py#L131
         error_handler = self.get_error_handler()
         try:
-            tokens: List[str] = []
-            lemmas: List[str] = []
-            pos_tags: List[str] = []
-            for token in doc:
-                tokens.append(token.text)
-                lemmas.append(getattr(token, self.lemma_attribute))
-                pos_tags.append(getattr(token, self.pos_attribute))
-            token_ranking_meta_data: List[List[RankingMetaData]] \
-                = [[] for _ in range(len(tokens))]
-            for rule in rules:
-                rule_ranking_meta_data = rule(tokens, lemmas, pos_tags)
-                for token_index, ranking_meta_data in enumerate(rule_ranking_meta_data):
-                    token_ranking_meta_data[token_index].extend(ranking_meta_data)
-            
-            token_ranks, token_best_rank = ranker(token_ranking_meta_data)
-            
-            for token_index, best_rank in enumerate(token_best_rank):
-                token = doc[token_index]
-                if best_rank is None:
-                    pos_tag = pos_tags[token_index]
-                    if pos_tag in self.default_punctuation_tags:
-                        setattr(token._, self.pymusas_tags_token_attr, ['PUNCT'])
-                        setattr(token._, self.pymusas_mwe_indexes_attr,
-                                [(token_index, token_index + 1)])
-                    elif pos_tag in self.default_number_tags:
-                        setattr(token._, self.pymusas_tags_token_attr, ['N1'])
-                        setattr(token._, self.pymusas_mwe_indexes_attr,
-                                [(token_index, token_index + 1)])
-                    else:
-                        setattr(token._, self.pymusas_tags_token_attr, ['Z99'])
-                        setattr(token._, self.pymusas_mwe_indexes_attr,
-                                [(token_index, token_index + 1)])
-                    continue
-                tags = list(best_rank.semantic_tags)
-                indexes = [(best_rank.token_match_start_index,
-                            best_rank.token_match_end_index)]
-            
-                setattr(token._, self.pymusas_tags_token_attr, tags)
-                setattr(token._, self.pymusas_mwe_indexes_attr, indexes)
+            self._set_rule_based_tags([doc])
         except Exception as e:
             error_handler(self.name, self, [doc], e)
         
         return doc
 
+    def pipe(self, stream: Iterable[Doc], *, batch_size: int = 128) -> Iterator[Doc]:
+        '''
+        Applies the tagger to a stream of spaCy documents, modifying them in
+        place, and yields them in order. This usually happens under the hood
+        when the `nlp` object is called through
+        [`Language.pipe`](https://spacy.io/api/language#pipe).
+
+        The documents are tagged in batches of `batch_size` documents. Each
+        rule is applied to the batch of documents, see
+        :func:`pymusas.taggers.rules.rule.Rule.call_batch`, so that the
+        lexicons are only searched once for a token that occurs many times
+        within the batch. The ranker ranks the matches of each document, as
+        the ranking depends on all of the matches within the document. The
+        tags are the same as those from :func:`__call__`.
+
+        # Parameters
+
+        stream : `Iterable[Doc]`
+            The [spaCy `Doc`s](https://spacy.io/api/doc) to tag.
+        batch_size : `int`, optional (default = `128`)
+            The number of documents to tag in one batch, when called through
+            `Language.pipe` this is the `batch_size` given to `Language.pipe`.
+
+        # Returns
+
+        `Iterator[Doc]`
+
+        # Raises
+
+        `ValueError`
+            If `batch_size` is less than 1.
+        '''
+        if batch_size < 1:
+            raise ValueError(f'The `batch_size` has to be at least 1 and not {batch_size}')
+        if not self._validated:
+            self._validate()
+        error_handler = self.get_error_handler()
+        docs: List[Doc]
+        for docs in minibatch(stream, size=batch_size):  # type: ignore[no-untyped-call]
+            try:
+                self._set_rule_based_tags(docs)
+            except Exception as e:
+                error_handler(self.name, self, docs, e)
+            yield from docs
+
+    def _set_rule_based_tags(self, docs: List[Doc]) -> None:
+        '''
+        Tags the `docs`, see :func:`pipe`, and assigns the tags and MWE
+        indexes to their tokens.
+
+        The `docs` are tagged one at a time, so that only the rule matches of
+        one `Doc` are kept in memory, while the rules share their work across
+        all of the `docs` through :func:`pymusas.taggers.rules.rule.Rule.call_batch`.
+        '''
+        ranker = cast(LexiconEntryRanker, self.ranker)
+        rules = cast(List[Rule], self.rules)
+        if self.cache is not None:
+            self._check_cache_state()
+
+        rule_hash_lookups: List[Optional[SingleWordRuleHashLookup]] = [None] * len(rules)
+        if self.hash_lexicon_lookup:
+            rule_hash_lookups = self._get_rule_hash_lookups(rules)
+        string_rules = any(hash_lookup is None for hash_lookup in rule_hash_lookups)
+        token_attribute_ids = [ORTH, HASH_LOOKUP_ATTRIBUTES[self.lemma_attribute],
+                               HASH_LOOKUP_ATTRIBUTES[self.pos_attribute]] \
+            if self.hash_lexicon_lookup else []
+        # StringStore id -> string, of the strings created from the ids.
+        id_strings: Dict[int, str] = {}
+
+        def ids_to_strings(string_ids: List[int], doc: Doc) -> List[str]:
+            strings: List[str] = []
+            for string_id in string_ids:
+                string = id_strings.get(string_id)
+                if string is None:
+                    string = doc.vocab.strings[string_id]
+                    id_strings[string_id] = string
+                strings.append(string)
+            return strings
+
+        def sentences_to_tag() -> Iterator[Tuple[Doc, bytes, Optional[numpy.ndarray],
+                                                 Tuple[List[str], List[str], List[str]]]]:
+            '''
+            Yields the `Doc`s, with their token attribute ids if
+            `hash_lexicon_lookup` is `True`, and tokens, lemmas, and POS
+            tags, that are not in the cache, the `Doc`s in the cache are
+            assigned their tags. When all of the rules use their hash lookup
+            only the POS tags are created, for the default tags.
+            '''
+            for doc in docs:
+                token_ids: Optional[numpy.ndarray] = None
+                tokens: List[str] = []
+                lemmas: List[str] = []
+                pos_tags: List[str] = []
+                cache_key = b''
+                if self.hash_lexicon_lookup:
+                    token_ids = doc.to_array(token_attribute_ids)
+                    if self.cache is not None:
+                        cache_key = content_hash(token_ids.tobytes())
+                        cached_tags_indexes = self.cache.get(cache_key)
+                        if cached_tags_indexes is not None:
+                            self._set_doc_tags(doc, cached_tags_indexes)
+                            continue
+                    pos_tags = ids_to_strings(token_ids[:, 2].tolist(), doc)
+                    if string_rules:
+                        tokens = ids_to_strings(token_ids[:, 0].tolist(), doc)
+                        lemmas = ids_to_strings(token_ids[:, 1].tolist(), doc)
+                    yield doc, cache_key, token_ids, (tokens, lemmas, pos_tags)
+                    continue
+                for token in doc:
+                    tokens.append(token.text)
+                    lemmas.append(getattr(token, self.lemma_attribute))
+                    pos_tags.append(getattr(token, self.pos_attribute))
+                if self.cache is not None:
+                    cache_key = sequences_hash(tokens, lemmas, pos_tags)
+                    cached_tags_indexes = self.cache.get(cache_key)
+                    if cached_tags_indexes is not None:
+                        self._set_doc_tags(doc, cached_tags_indexes)
+                        continue
+                yield doc, cache_key, token_ids, (tokens, lemmas, pos_tags)
+
+        # Each rule consumes its own copy of the sentences in step with this
+        # loop, therefore a sentence is only extracted once it is tagged.
+        docs_to_tag, *rules_sentences = itertools.tee(sentences_to_tag(), len(rules) + 1)
+        rules_ranking_meta_data: List[Iterator[List[List[RankingMetaData]]]] = []
+        for rule, hash_lookup, rule_sentences in zip(rules, rule_hash_lookups, rules_sentences):
+            if hash_lookup is not None:
+                rules_ranking_meta_data.append(
+                    hash_lookup.call_batch((cast(numpy.ndarray, token_ids), doc.vocab.strings)
+                                           for doc, _, token_ids, _ in rule_sentences))
+            else:
+                rules_ranking_meta_data.append(
+                    rule.call_batch(sentence for _, _, _, sentence in rule_sentences))
+        for doc, cache_key, _, (_, _, pos_tags) in docs_to_tag:
+            token_ranking_meta_data: List[List[RankingMetaData]] \
+                = [[] for _ in range(len(doc))]
+            for rule_ranking_meta_data in rules_ranking_meta_data:
+                for token_index, ranking_meta_data in enumerate(next(rule_ranking_meta_data)):
+                    token_ranking_meta_data[token_index].extend(ranking_meta_data)
+            _, token_best_ranks = ranker(token_ranking_meta_data)
+            tags_indexes = best_ranks_to_tags_indexes(token_best_ranks, pos_tags,
+                                                      self.default_punctuation_tags,
+                                                      self.default_number_tags)
+            if self.cache is not None:
+                self.cache.put(cache_key, tags_indexes)
+            self._set_doc_tags(doc, tags_indexes)
+
+    def _set_doc_tags(self, doc: Doc, tags_indexes: List[Tuple[List[str], List[Tuple[int, int]]]]) -> None:
+        '''
+        Assigns a copy of the tags and MWE indexes to the tokens of the `doc`,
+        in bulk where possible, see
+        :func:`pymusas.spacy_api.utils.set_token_extension_values`.
+        '''
+        set_token_extension_values(doc, self.pymusas_tags_token_attr,
+                                   (list(tags) for tags, _ in tags_indexes))
+        set_token_extension_values(doc, self.pymusas_mwe_indexes_attr,
+                                   (list(indexes) for _, indexes in tags_indexes))
+
     def to_bytes(self, *, exclude: Iterable[str] = SimpleFrozenList()) -> bytes:
         '''
         Serialises the tagger to a bytestring.
@@ -429,8 +708,7 @@ class RuleBasedTagger(spacy.pipeline.pipe.Pipe):
         '''
         serialise_data = srsly.msgpack_loads(bytes_data)
 
-        self.rules = cast(List[Rule],
-                          Rule.serialise_object_list_from_bytes(serialise_data['rules']))
+        self.rules = self._load_rules_from_bytes(serialise_data['rules'])
 
         self.ranker \
             = cast(LexiconEntryRanker,
@@ -561,8 +839,7 @@ class RuleBasedTagger(spacy.pipeline.pipe.Pipe):
 
         rules_path = Path(component_folder, 'rules.bin')
         serialised_rules = srsly.read_msgpack(rules_path)
-        rules = Rule.serialise_object_list_from_bytes(serialised_rules)
-        self.rules = cast(List[Rule], rules)
+        self.rules = self._load_rules_from_bytes(serialised_rules)
 
         default_punctuation_tags_path = Path(component_folder,
                                              'default_punctuation_tags.bin')
@@ -592,19 +869,34 @@ class RuleBasedTagger(spacy.pipeline.pipe.Pipe):
     def lemma_attribute(self) -> str:
         return self._lemma_attribute
 
+    @property
+    def hash_lexicon_lookup(self) -> bool:
+        return self._hash_lexicon_lookup
+
+    @property
+    def share_rules(self) -> bool:
+        return self._share_rules
+
 
 @Language.factory(RuleBasedTagger.COMPONENT_NAME, requires=['token.pos', 'token.lemma'],
                   assigns=['token._.pymusas_tags', 'token._.pymusas_mwe_indexes'],
                   default_config={'pymusas_tags_token_attr': 'pymusas_tags',
                                   'pymusas_mwe_indexes_attr': 'pymusas_mwe_indexes',
                                   'pos_attribute': 'pos_',
-                                  'lemma_attribute': 'lemma_'})
+                                  'lemma_attribute': 'lemma_',
+                                  'cache_size': 0,
+                                  'hash_lexicon_lookup': False,
+                                  'share_rules': False})
 def make_usas_rule_based_tagger(nlp: Language, name: str,
                                 pymusas_tags_token_attr: str,
                                 pymusas_mwe_indexes_attr: str,
                                 pos_attribute: str,
-                                lemma_attribute: str
+                                lemma_attribute: str,
+                                cache_size: int,
+                                hash_lexicon_lookup: bool,
+                                share_rules: bool
                                 ) -> RuleBasedTagger:
     return RuleBasedTagger(name, pymusas_tags_token_attr,
                            pymusas_mwe_indexes_attr,
-                           pos_attribute, lemma_attribute)
+                           pos_attribute, lemma_attribute, cache_size,
+                           hash_lexicon_lookup, share_rules)
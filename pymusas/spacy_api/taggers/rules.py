@@ -5,10 +5,15 @@ spaCy registered functions for creating the following tagger rules:
 
 And helper functions for the rules.
 '''
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
+import numpy
 import spacy
+from spacy.strings import StringStore, get_string_id
 
+from pymusas.lexicon_collection import LexiconType
+from pymusas.rankers.lexical_match import LexicalMatch
+from pymusas.rankers.ranking_meta_data import RankingMetaData
 from pymusas.taggers.rules.mwe import MWERule
 from pymusas.taggers.rules.rule import Rule
 from pymusas.taggers.rules.single_word import SingleWordRule
@@ -79,3 +84,184 @@ def rule_list(*rules: Rule) -> List[Rule]:
     `List[Rule]`
     '''
     return list(rules)
+
+
+class SingleWordRuleHashLookup:
+    '''
+    The lexicons of a :class:`pymusas.taggers.rules.single_word.SingleWordRule`
+    re-keyed on spaCy [StringStore](https://spacy.io/api/stringstore) ids,
+    the 64 bit hashes that spaCy uses to represent strings, e.g. `Token.orth`,
+    `Token.lemma`, and `Token.pos`, so that the tokens of a `Doc` can be
+    matched from the attribute ids returned by
+    [`Doc.to_array`](https://spacy.io/api/doc#to_array) without creating
+    the strings of every token and the `{token}|{POS}` lexicon keys. Strings
+    are only created for the lexicon entries that match, and to lower case
+    each unique token and lemma.
+
+    The matches are the same as those of the
+    :func:`pymusas.taggers.rules.single_word.SingleWordRule.__call__`. The
+    lookup is created from the lexicons of the rule when it is initialised,
+    therefore if the rule is modified the lookup has to be created again.
+
+    # Parameters
+
+    rule : `pymusas.taggers.rules.single_word.SingleWordRule`
+        The rule whose lexicons are used for matching.
+
+    # Examples
+    ``` python
+    >>> import spacy
+    >>> from spacy.attrs import LEMMA, ORTH, POS
+    >>> from pymusas.taggers.rules.single_word import SingleWordRule
+    >>> from pymusas.spacy_api.taggers.rules import SingleWordRuleHashLookup
+    >>> rule = SingleWordRule({'river|NOUN': ['W3']}, {'bank': ['I1.1']})
+    >>> lookup = SingleWordRuleHashLookup(rule)
+    >>> nlp = spacy.blank('en')
+    >>> doc = nlp('River bank')
+    >>> doc[0].pos_ = 'NOUN'
+    >>> token_ids = doc.to_array([ORTH, LEMMA, POS])
+    >>> ranking_meta_data = lookup(token_ids, doc.vocab.strings)
+    >>> assert ranking_meta_data[0][0].lexicon_entry_match == 'river|NOUN'
+    >>> assert ranking_meta_data[1][0].semantic_tags == ('I1.1',)
+    >>> tokens = [token.text for token in doc]
+    >>> lemmas = [token.lemma_ for token in doc]
+    >>> pos_tags = [token.pos_ for token in doc]
+    >>> assert ranking_meta_data == rule(tokens, lemmas, pos_tags)
+
+    ```
+    '''
+    def __init__(self, rule: SingleWordRule) -> None:
+        # POS id -> word id -> (lexicon entry, semantic tags). A lexicon
+        # entry is added for every `|` that it contains, as either side of
+        # the `|` could contain a `|`, e.g. `a|b|c` could be matched by the
+        # token `a|b` with the POS tag `c` or the token `a` with the POS tag
+        # `b|c`.
+        self._pos_lookup: Dict[int, Dict[int, Tuple[str, Tuple[str, ...]]]] = {}
+        for lexicon_entry, semantic_tags in rule.lexicon_collection.data.items():
+            entry_value = (lexicon_entry, tuple(semantic_tags))
+            split_index = lexicon_entry.find('|')
+            while split_index != -1:
+                word_lookup = self._pos_lookup.setdefault(get_string_id(lexicon_entry[split_index + 1:]), {})
+                word_lookup[get_string_id(lexicon_entry[:split_index])] = entry_value
+                split_index = lexicon_entry.find('|', split_index + 1)
+
+        self._lemma_lookup: Dict[int, Tuple[str, Tuple[str, ...]]] = {
+            get_string_id(lexicon_entry): (lexicon_entry, tuple(semantic_tags))
+            for lexicon_entry, semantic_tags in rule.lemma_lexicon_collection.data.items()
+        }
+
+        self._pos_mapper: Optional[Dict[int, Tuple[int, ...]]] = None
+        if rule.pos_mapper is not None:
+            self._pos_mapper = {
+                get_string_id(pos): tuple(get_string_id(mapped_pos) for mapped_pos in mapped_pos_tags)
+                for pos, mapped_pos_tags in rule.pos_mapper.items()
+            }
+
+    def __call__(self, token_ids: numpy.ndarray, strings: StringStore
+                 ) -> List[List[RankingMetaData]]:
+        '''
+        Given the attribute ids of each token in a text, it returns for each
+        token a `List` of rule matches, the same as
+        :func:`pymusas.taggers.rules.single_word.SingleWordRule.__call__`.
+
+        # Parameters
+
+        token_ids : `numpy.ndarray`
+            An array of shape `(number of tokens, 3)` whose columns are the
+            ids of the token, the lemma, and the POS tag, e.g. from
+            `Doc.to_array([ORTH, LEMMA, POS])`.
+        strings : `spacy.strings.StringStore`
+            The StringStore that contains the tokens and lemmas, e.g.
+            `Doc.vocab.strings`.
+
+        # Returns
+
+        `List[List[RankingMetaData]]`
+        '''
+        return next(self.call_batch([(token_ids, strings)]))
+
+    def call_batch(self, sentences: Iterable[Tuple[numpy.ndarray, StringStore]]
+                   ) -> Iterator[List[List[RankingMetaData]]]:
+        '''
+        Yields the output of :func:`__call__` for each sentence, in the same
+        order as the given `sentences`. The lexicon matches of each unique
+        token, lemma, and POS tag combination are only searched for once
+        across all of the `sentences`, like
+        :func:`pymusas.taggers.rules.single_word.SingleWordRule.call_batch`.
+
+        # Parameters
+
+        sentences : `Iterable[Tuple[numpy.ndarray, spacy.strings.StringStore]]`
+            Each sentence is a `Tuple` of token ids and StringStore, see
+            :func:`__call__`.
+
+        # Returns
+
+        `Iterator[List[List[RankingMetaData]]]`
+        '''
+        token_matches_cache: Dict[Tuple[int, ...],
+                                  List[Tuple[str, bool, LexicalMatch, Tuple[str, ...]]]] = {}
+        lower_ids: Dict[int, int] = {}
+        for token_ids, strings in sentences:
+
+            def lower_id(string_id: int) -> int:
+                string_lower_id = lower_ids.get(string_id)
+                if string_lower_id is None:
+                    string_lower_id = get_string_id(strings[string_id].lower())
+                    lower_ids[string_id] = string_lower_id
+                return string_lower_id
+
+            token_ranking_meta_data: List[List[RankingMetaData]] = []
+            for start_index, token_lemma_pos_ids in enumerate(map(tuple, token_ids.tolist())):
+                token_matches = token_matches_cache.get(token_lemma_pos_ids)
+                if token_matches is None:
+                    token_id, lemma_id, pos_id = token_lemma_pos_ids
+                    token_lower_id = lower_id(token_id)
+                    lemma_lower_id = token_lower_id if lemma_id == token_id else lower_id(lemma_id)
+                    token_matches = self._token_matches(token_id, token_lower_id, lemma_id,
+                                                        lemma_lower_id, pos_id)
+                    token_matches_cache[token_lemma_pos_ids] = token_matches
+                end_index = start_index + 1
+                token_ranking_meta_data.append(
+                    [RankingMetaData(LexiconType.SINGLE_NON_SPECIAL, 1, 0,
+                                     exclude_pos_information, lexical_match,
+                                     start_index, end_index,
+                                     lexicon_entry, semantic_tags)
+                     for lexicon_entry, exclude_pos_information, lexical_match, semantic_tags
+                     in token_matches])
+            yield token_ranking_meta_data
+
+    def _token_matches(self, token_id: int, token_lower_id: int, lemma_id: int,
+                       lemma_lower_id: int, initial_pos_id: int
+                       ) -> List[Tuple[str, bool, LexicalMatch, Tuple[str, ...]]]:
+        '''
+        Returns the lexicon matches of the token, in the same order as
+        :func:`pymusas.taggers.rules.single_word.SingleWordRule._token_matches`.
+        '''
+        token_matches: List[Tuple[str, bool, LexicalMatch, Tuple[str, ...]]] = []
+        lexical_value_type = [(token_id, LexicalMatch.TOKEN),
+                              (lemma_id, LexicalMatch.LEMMA),
+                              (token_lower_id, LexicalMatch.TOKEN_LOWER),
+                              (lemma_lower_id, LexicalMatch.LEMMA_LOWER)]
+
+        pos_ids: Tuple[int, ...] = (initial_pos_id,)
+        if self._pos_mapper is not None:
+            pos_ids = self._pos_mapper.get(initial_pos_id, ())
+
+        # All of these use POS information
+        for pos_id in pos_ids:
+            word_lookup = self._pos_lookup.get(pos_id)
+            if word_lookup is None:
+                continue
+            for lexical_value_id, lexical_type in lexical_value_type:
+                match = word_lookup.get(lexical_value_id)
+                if match is not None:
+                    token_matches.append((match[0], False, lexical_type, match[1]))
+
+        # All of these do not use POS information
+        for lexical_value_id, lexical_type in lexical_value_type:
+            match = self._lemma_lookup.get(lexical_value_id)
+            if match is not None:
+                token_matches.append((match[0], True, lexical_type, match[1]))
+
+        return token_matches
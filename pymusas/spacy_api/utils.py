@@ -4,11 +4,14 @@ base.
 '''
 
 import copy
+from functools import lru_cache
+from typing import Any, Dict, Iterable, cast
 import warnings
 
 from spacy.language import Language
 from spacy.pipe_analysis import validate_attrs
-from spacy.tokens import Token
+from spacy.tokens import Doc, Token
+from spacy.vocab import Vocab
 
 
 def set_custom_token_extension(extension_name: str) -> None:
@@ -59,6 +62,56 @@ def remove_custom_token_extension(extension_name: str) -> None:
         Token.remove_extension(extension_name)
 
 
+def set_token_extension_values(doc: Doc, extension_name: str, values: Iterable[Any]) -> None:
+    '''
+    Sets `Token._.{extension_name}` of each token in the `doc` to the
+    respective value in `values`.
+
+    If the custom attribute only stores a value, as created by
+    :func:`set_custom_token_extension`, and spaCy stores the values of
+    `Token._` in `Doc.user_data` with the key layout that it currently uses,
+    checked once per custom attribute through `Token._`, the values are
+    written in bulk to `Doc.user_data`, which is faster than setting them
+    through the `Token._` of each token, else they are set through the
+    `Token._` of each token.
+
+    # Parameters
+
+    doc : `Doc`
+        The spaCy document whose tokens are assigned the values.
+    extension_name : `str`
+        Name of the custom attribute, `Token._.{extension_name}`.
+    values : `Iterable[Any]`
+        The value of each token in the `doc`.
+
+    # Returns
+
+    `None`
+    '''
+    if (Token.get_extension(extension_name) == (None, None, None, None)
+            and _token_extension_user_data_layout(extension_name)):
+        user_data = cast(Dict[Any, Any], doc.user_data)
+        user_data.update((('._.', extension_name, token.idx, None), value)
+                         for token, value in zip(doc, values))
+    else:
+        for token, value in zip(doc, values):
+            setattr(token._, extension_name, value)
+
+
+@lru_cache(maxsize=None)
+def _token_extension_user_data_layout(extension_name: str) -> bool:
+    '''
+    Returns `True` if setting `Token._.{extension_name}` stores the value in
+    `Doc.user_data` under the key `('._.', extension_name, token.idx, None)`,
+    the key layout spaCy uses, which is not part of spaCy's public API.
+    '''
+    doc = Doc(Vocab(), words=['layout', 'check'])
+    value = object()
+    setattr(doc[1]._, extension_name, value)
+    user_data = cast(Dict[Any, Any], doc.user_data)
+    return user_data == {('._.', extension_name, doc[1].idx, None): value}
+
+
 def update_factory_attributes(meta_information_to_update: str,
                               factory_name: str,
                               new_attribute_name: str,
@@ -0,0 +1,360 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+import os
+import sys
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple, Union, cast
+
+from pymusas.taggers.rule_based import RuleBasedTagger
+
+
+TagsIndexes = List[Tuple[List[str], List[Tuple[int, int]]]]
+Sentence = Tuple[List[str], List[str], List[str]]
+
+# The tagger of a process pool worker, set by `_initialise_worker`.
+_WORKER_TAGGER: Optional[Callable[..., TagsIndexes]] = None
+
+
+def _tag_sentences(tagger: Callable[..., TagsIndexes],
+                   sentences: List[Sentence]
+                   ) -> List[Union[TagsIndexes, Exception]]:
+    '''
+    Tags each sentence, a sentence being a `Tuple` of tokens, lemmas, and POS
+    tags. Taggers that are not a
+    :class:`pymusas.taggers.rule_based.RuleBasedTagger`, e.g. the
+    :class:`pymusas.taggers.neural.NeuralTagger`, are only given the tokens.
+    The sentences are tagged together through the tagger's batch method if
+    it has one, :func:`pymusas.taggers.rule_based.RuleBasedTagger.tag_sentences`
+    or `tag_batch`, e.g. :func:`pymusas.taggers.neural.NeuralTagger.tag_batch`.
+    If this raises an `Exception` each sentence is tagged separately, and if
+    tagging a sentence raises an `Exception` the `Exception` is returned in
+    place of the tags so that it only affects that sentence.
+    '''
+    is_rule_based = isinstance(tagger, RuleBasedTagger)
+    try:
+        if is_rule_based:
+            return list(cast(RuleBasedTagger, tagger).tag_sentences(sentences))
+        tag_batch = getattr(tagger, 'tag_batch', None)
+        if tag_batch is not None:
+            return list(tag_batch([tokens for tokens, _, _ in sentences]))
+    except Exception:
+        pass
+
+    batch_tags: List[Union[TagsIndexes, Exception]] = []
+    for tokens, lemmas, pos_tags in sentences:
+        try:
+            if is_rule_based:
+                batch_tags.append(tagger(tokens, lemmas, pos_tags))
+            else:
+                batch_tags.append(tagger(tokens))
+        except Exception as error:
+            batch_tags.append(error)
+    return batch_tags
+
+
+def _initialise_worker(tagger: Callable[..., TagsIndexes]) -> None:
+    global _WORKER_TAGGER
+    _WORKER_TAGGER = tagger
+
+
+def _worker_tag_sentences(sentences: List[Sentence]
+                          ) -> List[Union[TagsIndexes, Exception]]:
+    assert _WORKER_TAGGER is not None
+    return _tag_sentences(_WORKER_TAGGER, sentences)
+
+
+class AsyncTagger():
+    '''
+    Wraps a tagger, e.g. :class:`pymusas.taggers.rule_based.RuleBasedTagger`,
+    :class:`pymusas.taggers.neural.NeuralTagger`, or
+    :class:`pymusas.taggers.hybrid.HybridTagger`, so that it can be awaited
+    from an `asyncio` event loop, through :func:`__call__` or
+    :func:`tag_sentences`, without blocking the event loop.
+
+    The tagging is run within an executor that is managed by this class. A
+    thread pool is best for the neural and hybrid taggers as PyTorch releases
+    the Global Interpreter Lock (GIL), whereas a process pool is best for the
+    rule based tagger as it is pure Python. When using a process pool the
+    tagger is copied to each worker process once, when the worker process
+    starts, therefore the tagger has to be picklable.
+
+    Concurrent requests that are waiting for the executor are coalesced into
+    batches of at most `max_batch_size` sentences, each batch is tagged by
+    one executor job, and at most `max_concurrency` jobs are run at the same
+    time. If the tagger has a batch method, e.g.
+    :func:`pymusas.taggers.neural.NeuralTagger.tag_batch` or
+    :func:`pymusas.taggers.rule_based.RuleBasedTagger.tag_sentences`, each
+    batch is tagged through it.
+
+    The executor is shut down by :func:`close`, or when leaving either the
+    `async with` or `with` block of the tagger. `async with` waits for the
+    batches that are being tagged to finish without blocking the event loop,
+    whereas `with` does not wait for them, as waiting would block the event
+    loop.
+
+    A request can be cancelled, e.g. through `asyncio.Task.cancel` or
+    `asyncio.wait_for`, if the request has not yet been sent to the executor
+    it will not be tagged, otherwise the tagging continues within the
+    executor but the result is discarded.
+
+    # Parameters
+
+    tagger : `Callable[..., List[Tuple[List[str], List[Tuple[int, int]]]]]`
+        The tagger to wrap.
+    executor : `str`, optional (default = `'auto'`)
+        The type of executor to use, either `'thread'`, `'process'`, or
+        `'auto'`. `'auto'` uses a process pool if the `tagger` is a
+        :class:`pymusas.taggers.rule_based.RuleBasedTagger`, and not a sub
+        class of it like the :class:`pymusas.taggers.hybrid.HybridTagger`,
+        else a thread pool.
+    max_workers : `int`, optional (default = `None`)
+        The maximum number of threads or processes of the executor. If `None`
+        the default of the executor is used, see
+        [`concurrent.futures`](https://docs.python.org/3/library/concurrent.futures.html).
+    max_concurrency : `int`, optional (default = `None`)
+        The maximum number of batches that are tagged at the same time. If
+        `None` this is the same as the number of executor workers.
+    max_batch_size : `int`, optional (default = `32`)
+        The maximum number of sentences within a batch.
+
+    # Instance Attributes
+
+    tagger : `Callable[..., List[Tuple[List[str], List[Tuple[int, int]]]]]`
+        The given `tagger`.
+    executor_type : `str`
+        Either `'thread'` or `'process'`.
+    max_concurrency : `int`
+        The maximum number of batches that are tagged at the same time.
+    max_batch_size : `int`
+        The given `max_batch_size`.
+
+    # Raises
+
+    `ValueError`
+        If `executor` is not one of `'auto'`, `'thread'`, or `'process'`, or if
+        `max_concurrency` or `max_batch_size` are less than 1.
+
+    # Examples
+    ``` python
+    >>> import asyncio
+    >>> from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker
+    >>> from pymusas.taggers.async_tagger import AsyncTagger
+    >>> from pymusas.taggers.rule_based import RuleBasedTagger
+    >>> from pymusas.taggers.rules.single_word import SingleWordRule
+    >>> rules = [SingleWordRule({'river|noun': ['W3']}, {})]
+    >>> ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+    >>> tagger = RuleBasedTagger(rules, ranker)
+    >>> async def tag() -> list:
+    ...     with AsyncTagger(tagger, executor='thread') as async_tagger:
+    ...         return await asyncio.gather(
+    ...             async_tagger(['The', 'river'], ['the', 'river'], ['det', 'noun']),
+    ...             async_tagger(['A', 'river'], ['a', 'river'], ['det', 'noun']))
+    >>> assert asyncio.run(tag()) == [[(['Z99'], [(0, 1)]), (['W3'], [(1, 2)])],
+    ...                               [(['Z99'], [(0, 1)]), (['W3'], [(1, 2)])]]
+
+    ```
+    '''
+
+    def __init__(self, tagger: Callable[..., TagsIndexes],
+                 executor: str = 'auto',
+                 max_workers: Optional[int] = None,
+                 max_concurrency: Optional[int] = None,
+                 max_batch_size: int = 32) -> None:
+        if executor not in ('auto', 'thread', 'process'):
+            raise ValueError('The `executor` has to be one of `auto`, `thread`, '
+                             f'or `process` and not `{executor}`')
+        if executor == 'auto':
+            executor = 'process' if type(tagger) is RuleBasedTagger else 'thread'
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError(f'The `max_concurrency` has to be at least 1 and not {max_concurrency}')
+        if max_batch_size < 1:
+            raise ValueError(f'The `max_batch_size` has to be at least 1 and not {max_batch_size}')
+
+        if max_workers is None:
+            # The defaults of `ProcessPoolExecutor` and `ThreadPoolExecutor`.
+            cpu_count = os.cpu_count() or 1
+            max_workers = cpu_count if executor == 'process' else min(32, cpu_count + 4)
+            if executor == 'process' and sys.platform == 'win32':
+                max_workers = min(61, max_workers)
+
+        self.tagger = tagger
+        self.executor_type = executor
+        self._executor: Executor
+        if executor == 'process':
+            self._executor = ProcessPoolExecutor(max_workers,
+                                                 initializer=_initialise_worker,
+                                                 initargs=(tagger,))
+        else:
+            self._executor = ThreadPoolExecutor(max_workers)
+
+        if max_concurrency is None:
+            max_concurrency = max_workers
+        self.max_concurrency = max_concurrency
+        self.max_batch_size = max_batch_size
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._pending: List[Tuple[Sentence, asyncio.Future[TagsIndexes]]] = []
+        self._flush_scheduled = False
+        self._batch_tasks: Set[asyncio.Task[None]] = set()
+        self._closed = False
+
+    async def __call__(self, tokens: List[str],
+                       lemmas: Optional[List[str]] = None,
+                       pos_tags: Optional[List[str]] = None) -> TagsIndexes:
+        '''
+        Returns the same output as calling the `tagger` with the given
+        `tokens`, `lemmas`, and `pos_tags`.
+
+        # Parameters
+
+        tokens : `List[str]`
+            A List of full text form of the tokens to be tagged.
+        lemmas : `List[str]`, optional (default = `None`)
+            The List of lemma/base form of the tokens to be tagged. If `None`
+            a `List` of empty strings is used. Not used by the
+            :class:`pymusas.taggers.neural.NeuralTagger`.
+        pos_tags : `List[str]`, optional (default = `None`)
+            The List of POS tags of the tokens to be tagged. If `None`
+            a `List` of empty strings is used. Not used by the
+            :class:`pymusas.taggers.neural.NeuralTagger`.
+
+        # Returns
+
+        `List[Tuple[List[str], List[Tuple[int, int]]]]`
+
+        # Raises
+
+        `RuntimeError`
+            If the tagger has been closed.
+        '''
+        if self._closed:
+            raise RuntimeError('Cannot tag as the `AsyncTagger` has been closed.')
+        if lemmas is None:
+            lemmas = ['' for _ in tokens]
+        if pos_tags is None:
+            pos_tags = ['' for _ in tokens]
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[TagsIndexes] = loop.create_future()
+        self._pending.append(((tokens, lemmas, pos_tags), future))
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        return await future
+
+    async def tag_sentences(self, sentences: Iterable[Sentence]) -> List[TagsIndexes]:
+        '''
+        Tags each sentence concurrently, returning the tags in the same order
+        as the given `sentences`.
+
+        # Parameters
+
+        sentences : `Iterable[Tuple[List[str], List[str], List[str]]]`
+            Each sentence is a `Tuple` of tokens, lemmas, and POS tags.
+
+        # Returns
+
+        `List[List[Tuple[List[str], List[Tuple[int, int]]]]]`
+        '''
+        return list(await asyncio.gather(*[self(tokens, lemmas, pos_tags)
+                                           for tokens, lemmas, pos_tags in sentences]))
+
+    def _flush(self) -> None:
+        '''
+        Splits all of the pending requests into batches, each batch is tagged
+        by a separate task.
+        '''
+        self._flush_scheduled = False
+        pending = [request for request in self._pending if not request[1].done()]
+        self._pending = []
+        for start_index in range(0, len(pending), self.max_batch_size):
+            batch = pending[start_index: start_index + self.max_batch_size]
+            task = asyncio.ensure_future(self._tag_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _tag_batch(self, batch: List[Tuple[Sentence, 'asyncio.Future[TagsIndexes]']]
+                         ) -> None:
+        async with self._semaphore:
+            # Requests that were cancelled while waiting are not tagged, and
+            # if the tagger was closed while waiting the requests are cancelled.
+            batch = [request for request in batch if not request[1].done()]
+            if self._closed:
+                for _, future in batch:
+                    future.cancel()
+                return
+            if not batch:
+                return
+            sentences = [sentence for sentence, _ in batch]
+            loop = asyncio.get_running_loop()
+            try:
+                if self.executor_type == 'process':
+                    batch_tags = await loop.run_in_executor(self._executor,
+                                                            _worker_tag_sentences,
+                                                            sentences)
+                else:
+                    batch_tags = await loop.run_in_executor(self._executor,
+                                                            _tag_sentences,
+                                                            self.tagger, sentences)
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+
+            for (_, future), tags in zip(batch, batch_tags):
+                if future.done():
+                    continue
+                if isinstance(tags, Exception):
+                    future.set_exception(tags)
+                else:
+                    future.set_result(tags)
+
+    def _cancel_pending(self) -> None:
+        '''
+        Stops new requests and cancels the requests that have not been sent to
+        the executor. As `asyncio` futures are not thread safe this has to be
+        called from the thread of the event loop the requests were made in.
+        '''
+        self._closed = True
+        for _, future in self._pending:
+            future.cancel()
+        self._pending = []
+
+    def close(self, wait: bool = True) -> None:
+        '''
+        Shuts down the executor, any requests that have not been sent to the
+        executor are cancelled. If requests have been made this should be
+        called from the thread of their event loop, as `asyncio` futures are
+        not thread safe.
+
+        # Parameters
+
+        wait : `bool`, optional (default = `True`)
+            Whether to wait for the batches that are being tagged to finish.
+        '''
+        self._cancel_pending()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def __enter__(self) -> 'AsyncTagger':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        # Does not wait for the batches that are being tagged so that it
+        # does not block the event loop when used within a coroutine.
+        self.close(wait=False)
+
+    async def __aenter__(self) -> 'AsyncTagger':
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        # The requests are cancelled within the event loop, only waiting for
+        # the executor to shut down is done in another thread so that it
+        # does not block the event loop.
+        self._cancel_pending()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, partial(self._executor.shutdown, wait=True, cancel_futures=True))
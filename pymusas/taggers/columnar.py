@@ -0,0 +1,254 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union, overload
+
+import numpy as np
+import numpy.typing as npt
+
+
+class TagSequenceVocabulary():
+    '''
+    Interns sequences of semantic tags, each unique sequence of tags, e.g.
+    `('Z99',)` or `('W3', 'M4')`, is stored once and is represented by an
+    integer id. The same vocabulary can be shared across many
+    :class:`ColumnarTags` so that a tag sequence is only stored once for a
+    whole corpus.
+
+    # Examples
+    ``` python
+    >>> from pymusas.taggers.columnar import TagSequenceVocabulary
+    >>> vocabulary = TagSequenceVocabulary()
+    >>> assert 0 == vocabulary.add(['W3', 'M4'])
+    >>> assert 1 == vocabulary.add(['Z99'])
+    >>> assert 0 == vocabulary.add(('W3', 'M4'))
+    >>> assert ('W3', 'M4') == vocabulary[0]
+    >>> assert 2 == len(vocabulary)
+
+    ```
+    '''
+
+    def __init__(self) -> None:
+        self._tag_sequence_to_id: Dict[Tuple[str, ...], int] = {}
+        self._tag_sequences: List[Tuple[str, ...]] = []
+
+    def add(self, tags: Iterable[str]) -> int:
+        '''
+        Returns the id of the given sequence of `tags`, adding the sequence to
+        the vocabulary if it is not already in the vocabulary.
+
+        # Parameters
+
+        tags : `Iterable[str]`
+            The sequence of tags.
+
+        # Returns
+
+        `int`
+        '''
+        tag_sequence = tuple(tags)
+        tag_sequence_id = self._tag_sequence_to_id.get(tag_sequence, None)
+        if tag_sequence_id is None:
+            tag_sequence_id = len(self._tag_sequences)
+            self._tag_sequence_to_id[tag_sequence] = tag_sequence_id
+            self._tag_sequences.append(tag_sequence)
+        return tag_sequence_id
+
+    def __getitem__(self, tag_sequence_id: int) -> Tuple[str, ...]:
+        return self._tag_sequences[tag_sequence_id]
+
+    def __len__(self) -> int:
+        return len(self._tag_sequences)
+
+    def __contains__(self, tags: object) -> bool:
+        if not isinstance(tags, (list, tuple)):
+            return False
+        return tuple(tags) in self._tag_sequence_to_id
+
+
+class ColumnarTags(Sequence[Tuple[List[str], List[Tuple[int, int]]]]):
+    '''
+    A memory efficient alternative to the
+    `List[Tuple[List[str], List[Tuple[int, int]]]]` output of the taggers,
+    e.g. :func:`pymusas.taggers.rule_based.RuleBasedTagger.__call__`. Rather
+    than a `List` of tags and a `List` of one `Tuple` per token, the tags of
+    each token are stored as an id into a :class:`TagSequenceVocabulary` and
+    the start and end token index of the token's Multi Word Expression (MWE)
+    are stored in NumPy arrays.
+
+    Indexing returns a view of a token that looks like the original output,
+    `(tags, [(start_index, end_index)])`, which is created when it is accessed.
+    Slicing returns a :class:`ColumnarTags` that shares the same NumPy arrays.
+
+    **NOTE** only one `(start_index, end_index)` span per token is supported,
+    i.e. discontinuous MWEs are not supported. None of the taggers currently
+    predict discontinuous MWEs.
+
+    # Parameters
+
+    tag_sequence_ids : `numpy.ndarray`
+        The tag sequence id, from the `vocabulary`, of each token.
+    start_indexes : `numpy.ndarray`
+        The start token index of the MWE of each token.
+    end_indexes : `numpy.ndarray`
+        The end token index of the MWE of each token.
+    vocabulary : `TagSequenceVocabulary`
+        The vocabulary that maps the `tag_sequence_ids` to tag sequences.
+
+    # Instance Attributes
+
+    tag_sequence_ids : `numpy.ndarray`
+        The given `tag_sequence_ids` as a `numpy.int32` array.
+    start_indexes : `numpy.ndarray`
+        The given `start_indexes` as a `numpy.int32` array.
+    end_indexes : `numpy.ndarray`
+        The given `end_indexes` as a `numpy.int32` array.
+    vocabulary : `TagSequenceVocabulary`
+        The given `vocabulary`.
+
+    # Raises
+
+    `ValueError`
+        If the `tag_sequence_ids`, `start_indexes`, and `end_indexes` are not
+        one dimensional arrays of the same length.
+
+    # Examples
+    ``` python
+    >>> from pymusas.taggers.columnar import ColumnarTags
+    >>> tags_indexes = [(['Z99'], [(0, 1)]), (['W3', 'M4'], [(1, 3)]),
+    ...                 (['W3', 'M4'], [(1, 3)])]
+    >>> columnar_tags = ColumnarTags.from_tags_indexes(tags_indexes)
+    >>> assert len(columnar_tags) == 3
+    >>> assert columnar_tags[1] == (['W3', 'M4'], [(1, 3)])
+    >>> assert columnar_tags.tags(1) == ('W3', 'M4')
+    >>> assert columnar_tags.tag_sequence_ids.tolist() == [0, 1, 1]
+    >>> assert columnar_tags.start_indexes.tolist() == [0, 1, 1]
+    >>> assert columnar_tags == tags_indexes
+    >>> assert list(columnar_tags[1:]) == tags_indexes[1:]
+
+    ```
+    '''
+
+    def __init__(self, tag_sequence_ids: npt.ArrayLike,
+                 start_indexes: npt.ArrayLike,
+                 end_indexes: npt.ArrayLike,
+                 vocabulary: TagSequenceVocabulary) -> None:
+        self.tag_sequence_ids = np.asarray(tag_sequence_ids, dtype=np.int32)
+        self.start_indexes = np.asarray(start_indexes, dtype=np.int32)
+        self.end_indexes = np.asarray(end_indexes, dtype=np.int32)
+        shapes = [self.tag_sequence_ids.shape, self.start_indexes.shape,
+                  self.end_indexes.shape]
+        if any(len(shape) != 1 for shape in shapes) or len(set(shapes)) != 1:
+            raise ValueError('The `tag_sequence_ids`, `start_indexes`, and '
+                             '`end_indexes` have to be one dimensional arrays '
+                             f'of the same length, their shapes: {shapes}')
+        self.vocabulary = vocabulary
+
+    @staticmethod
+    def from_tags_indexes(tags_indexes: Iterable[Tuple[Sequence[str], Sequence[Tuple[int, int]]]],
+                          vocabulary: Optional[TagSequenceVocabulary] = None
+                          ) -> 'ColumnarTags':
+        '''
+        Converts the output of a tagger,
+        `List[Tuple[List[str], List[Tuple[int, int]]]]`, into a
+        :class:`ColumnarTags`.
+
+        # Parameters
+
+        tags_indexes : `Iterable[Tuple[Sequence[str], Sequence[Tuple[int, int]]]]`
+            The tags and MWE start and end token indexes of each token.
+        vocabulary : `TagSequenceVocabulary`, optional (default = `None`)
+            The vocabulary to add the tag sequences too, if `None` a new
+            vocabulary is created.
+
+        # Returns
+
+        :class:`ColumnarTags`
+
+        # Raises
+
+        `ValueError`
+            If a token does not have exactly one MWE `(start, end)` span.
+        '''
+        if vocabulary is None:
+            vocabulary = TagSequenceVocabulary()
+        tag_sequence_ids: List[int] = []
+        start_indexes: List[int] = []
+        end_indexes: List[int] = []
+        for token_index, (tags, indexes) in enumerate(tags_indexes):
+            if len(indexes) != 1:
+                raise ValueError('Each token has to have exactly one MWE (start, end) '
+                                 f'span, the token at index {token_index} has '
+                                 f'{len(indexes)}: {indexes}')
+            tag_sequence_ids.append(vocabulary.add(tags))
+            start_index, end_index = indexes[0]
+            start_indexes.append(start_index)
+            end_indexes.append(end_index)
+        return ColumnarTags(tag_sequence_ids, start_indexes, end_indexes, vocabulary)
+
+    def tags(self, index: int) -> Tuple[str, ...]:
+        '''
+        Returns the tags of the token at the given `index` without creating a
+        new `List`.
+
+        # Parameters
+
+        index : `int`
+            The index of the token.
+
+        # Returns
+
+        `Tuple[str, ...]`
+        '''
+        return self.vocabulary[int(self.tag_sequence_ids[index])]
+
+    def to_list(self) -> List[Tuple[List[str], List[Tuple[int, int]]]]:
+        '''
+        Returns the tags in the same format as the tagger output,
+        `List[Tuple[List[str], List[Tuple[int, int]]]]`.
+
+        # Returns
+
+        `List[Tuple[List[str], List[Tuple[int, int]]]]`
+        '''
+        return list(self)
+
+    def __len__(self) -> int:
+        return int(self.tag_sequence_ids.shape[0])
+
+    @overload
+    def __getitem__(self, index: int) -> Tuple[List[str], List[Tuple[int, int]]]:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> 'ColumnarTags':
+        ...
+
+    def __getitem__(self, index: Union[int, slice]
+                    ) -> Union[Tuple[List[str], List[Tuple[int, int]]], 'ColumnarTags']:
+        if isinstance(index, slice):
+            return ColumnarTags(self.tag_sequence_ids[index], self.start_indexes[index],
+                                self.end_indexes[index], self.vocabulary)
+        return (list(self.tags(index)),
+                [(int(self.start_indexes[index]), int(self.end_indexes[index]))])
+
+    def __iter__(self) -> Iterator[Tuple[List[str], List[Tuple[int, int]]]]:
+        vocabulary = self.vocabulary
+        for tag_sequence_id, start_index, end_index in zip(self.tag_sequence_ids.tolist(),
+                                                           self.start_indexes.tolist(),
+                                                           self.end_indexes.tolist()):
+            yield list(vocabulary[tag_sequence_id]), [(start_index, end_index)]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, ColumnarTags):
+            if len(self) != len(other):
+                return False
+            if not (np.array_equal(self.start_indexes, other.start_indexes)
+                    and np.array_equal(self.end_indexes, other.end_indexes)):
+                return False
+            if self.vocabulary is other.vocabulary:
+                return bool(np.array_equal(self.tag_sequence_ids, other.tag_sequence_ids))
+            return all(self.tags(index) == other.tags(index) for index in range(len(self)))
+        if isinstance(other, list):
+            return self.to_list() == other
+        return False
+
+    def __repr__(self) -> str:
+        return f'ColumnarTags({self.to_list()!r})'
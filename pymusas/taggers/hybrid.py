@@ -1,8 +1,12 @@
-from typing import List, Optional, Set, Tuple
+from concurrent.futures import Future
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
 
+from pymusas.batching import BackgroundBatcher
 from pymusas.rankers.lexicon_entry import LexiconEntryRanker
 from pymusas.taggers.rule_based import RuleBasedTagger
 from pymusas.taggers.rules.rule import Rule
+from pymusas.utils import context_windows
 
 
 try:
@@ -12,6 +16,20 @@ except ImportError:
     neural_extra_installed()
 
 
+class _NeuralRequest(NamedTuple):
+    '''
+    The work the `NeuralTagger` has to do to complete the rule based tags of
+    a sequence of tokens, see :func:`HybridTagger._neural_request`.
+    '''
+    tokens: List[str]
+    rule_based_tags_indexes: List[Tuple[List[str], List[Tuple[int, int]]]]
+    unknown_token_indexes: List[int]
+    ambiguous_token_indexes: List[int]
+    # The (start, end) token indexes of the sequences the `NeuralTagger` tags.
+    windows: List[Tuple[int, int]]
+    windows_candidate_tags: Optional[List[List[Optional[List[str]]]]]
+
+
 class HybridTagger(RuleBasedTagger):
     '''
     This is a hybrid tagger which uses both the :class:`pymusas.taggers.rule_based.RuleBasedTagger`
@@ -41,6 +59,38 @@ class HybridTagger(RuleBasedTagger):
     3. Use the `NeuralTagger` to tag the token. The tags generated by the `NeuralTagger`
     are determined by how you have initialised the `NeuralTagger`.
 
+    By default the `NeuralTagger` tags the whole sequence of tokens when at least
+    one token cannot be tagged. If `context_window` is set the `NeuralTagger`
+    only tags a context window of `context_window` tokens either side of each
+    token that cannot be tagged, overlapping context windows are merged and
+    all of the context windows are tagged in one batch, see
+    :func:`pymusas.taggers.neural.NeuralTagger.tag_batch`. For long sequences
+    with few tokens that cannot be tagged this is a lot faster, but the
+    `NeuralTagger` has less context to predict the tags from.
+
+    If `neural_disambiguation` is `True` the `NeuralTagger` is also used to
+    disambiguate the tokens that the `RuleBasedTagger` tags, as a single word
+    expression, with more than one tag, e.g. a token that a lexicon lists
+    with many tags. The tags of these tokens are re-ranked by the
+    `NeuralTagger`, whereby the `NeuralTagger` only scores the tags from the
+    `RuleBasedTagger`, see the `candidate_tags` of
+    :func:`pymusas.taggers.neural.NeuralTagger.__call__`, which is a lot
+    less work than scoring all of the tags. The tags ranked by the
+    `NeuralTagger`, at most its `top_n`, come first followed by the
+    remaining tags in their original order. The tokens are tagged in the same
+    `NeuralTagger` call as the tokens that cannot be tagged.
+
+    If the `NeuralTagger` is created with `lazy_load=True` its model is only
+    loaded when the first token that cannot be tagged, or is re-ranked,
+    appears, therefore a workload that the rules can fully tag never loads
+    the model. To load the model before the first call use
+    :func:`pymusas.taggers.neural.NeuralTagger.warm_up`.
+
+    For latency sensitive services :func:`tag_deferred` returns the rule
+    based tags at once along with a `Future` of the hybrid tags, the tokens
+    the `NeuralTagger` has to tag are tagged in batches, of at most
+    `deferred_max_batch_size` calls, within a background thread.
+
     # Parameters
 
     rules : `List[pymusas.taggers.rules.rule.Rule]`
@@ -58,6 +108,20 @@ class HybridTagger(RuleBasedTagger):
     default_number_tags : `Set[str]`, optional (default = `None`)
         The POS tags that represent numbers. If `None` then we will use
         the `Set`: `set(['num'])`.
+    context_window : `int`, optional (default = `None`)
+        The number of tokens either side of a token that cannot be tagged
+        that the `NeuralTagger` is given as context. If `None` the
+        `NeuralTagger` is given the whole sequence of tokens.
+    neural_disambiguation : `bool`, optional (default = `False`)
+        Whether the `NeuralTagger` re-ranks the tags of tokens that the
+        `RuleBasedTagger` tags with more than one tag.
+    deferred_max_batch_size : `int`, optional (default = `32`)
+        The maximum number of :func:`tag_deferred` calls whose tokens are
+        given to the `NeuralTagger` in one batch.
+    deferred_max_wait : `float`, optional (default = `0.005`)
+        The maximum number of seconds a :func:`tag_deferred` call waits for
+        other calls to batch with before its tokens are given to the
+        `NeuralTagger`.
     
     # Instance Attributes
 
@@ -72,6 +136,20 @@ class HybridTagger(RuleBasedTagger):
         The given `default_punctuation_tags`
     default_number_tags : `Set[str]`
         The given `default_number_tags`
+    context_window : `int`, optional (default = `None`)
+        The given `context_window`
+    neural_disambiguation : `bool`
+        The given `neural_disambiguation`
+    deferred_max_batch_size : `int`
+        The given `deferred_max_batch_size`
+    deferred_max_wait : `float`
+        The given `deferred_max_wait`
+
+    # Raises
+
+    `ValueError`
+        If `context_window` is less than 0, if `deferred_max_batch_size` is
+        less than 1, or if `deferred_max_wait` is negative.
 
     # Examples
     ``` python
@@ -104,9 +182,29 @@ class HybridTagger(RuleBasedTagger):
                  ranker: LexiconEntryRanker,
                  neural_tagger: NeuralTagger,
                  default_punctuation_tags: Optional[Set[str]] = None,
-                 default_number_tags: Optional[Set[str]] = None) -> None:
+                 default_number_tags: Optional[Set[str]] = None,
+                 context_window: Optional[int] = None,
+                 neural_disambiguation: bool = False,
+                 deferred_max_batch_size: int = 32,
+                 deferred_max_wait: float = 0.005) -> None:
         super().__init__(rules, ranker, default_punctuation_tags, default_number_tags)
         self.neural_tagger = neural_tagger
+        if context_window is not None and context_window < 0:
+            raise ValueError('The `context_window` has to be at least 0 or `None` '
+                             f'and not {context_window}')
+        self.context_window = context_window
+        self.neural_disambiguation = neural_disambiguation
+        if deferred_max_batch_size < 1:
+            raise ValueError('The `deferred_max_batch_size` has to be at least 1 '
+                             f'and not {deferred_max_batch_size}')
+        if deferred_max_wait < 0:
+            raise ValueError(f'The `deferred_max_wait` cannot be negative: {deferred_max_wait}')
+        self.deferred_max_batch_size = deferred_max_batch_size
+        self.deferred_max_wait = deferred_max_wait
+        self._deferred_batcher: Optional[BackgroundBatcher[_NeuralRequest,
+                                                           List[Tuple[List[str], List[Tuple[int, int]]]]]] = None
+        self._deferred_batcher_lock = threading.Lock()
+        self._deferred_closed = False
 
     def __call__(self, tokens: List[str],
                  lemmas: List[str],
@@ -134,7 +232,8 @@ class HybridTagger(RuleBasedTagger):
         **NOTE** we recommend for the `NeuralTagger` that the number of tokens
         in the list should represent a sentence, in addition the more tokens
         in the list the more memory the `NeuralTagger` model requires and on
-        CPU at least the more time it will take to predict the tags.
+        CPU at least the more time it will take to predict the tags, unless
+        the `context_window` is set.
         
         # Parameters
 
@@ -160,22 +259,185 @@ class HybridTagger(RuleBasedTagger):
             predicted/returned.
         '''
 
-        hybrid_tags_indexes: List[Tuple[List[str], List[Tuple[int, int]]]] = []
         rule_based_tags_indexes = super().__call__(tokens, lemmas, pos_tags)
-        
+        neural_request = self._neural_request(tokens, rule_based_tags_indexes)
+        if neural_request is None:
+            return rule_based_tags_indexes
+        return self._tag_neural_requests([neural_request])[0]
+
+    def _neural_request(self, tokens: List[str],
+                        rule_based_tags_indexes: List[Tuple[List[str], List[Tuple[int, int]]]]
+                        ) -> Optional[_NeuralRequest]:
+        '''
+        Returns the work the `NeuralTagger` has to do to complete the given
+        rule based tags, `None` if there are no unknown or ambiguous tokens.
+        '''
         # We have made the assumption that all unknown tokens are single word
         # expressions, i.e. they only affect one token.
         unknown_token_indexes: list[int] = []
-        for rule_based_tags, indexes in rule_based_tags_indexes:
+        ambiguous_token_indexes: list[int] = []
+        for token_index, (rule_based_tags, indexes) in enumerate(rule_based_tags_indexes):
             if rule_based_tags == ["Z99"]:
                 unknown_token_index = indexes[0][0]
                 unknown_token_indexes.append(unknown_token_index)
-            hybrid_tags_indexes.append((rule_based_tags, indexes))
+            elif (self.neural_disambiguation and len(rule_based_tags) > 1
+                  and indexes == [(token_index, token_index + 1)]):
+                ambiguous_token_indexes.append(token_index)
+
+        # Only run the Neural Tagger if there are unknown or ambiguous tokens
+        neural_token_indexes = sorted(unknown_token_indexes + ambiguous_token_indexes)
+        if not neural_token_indexes:
+            return None
 
-        # Only run the Neural Tagger if there are unknown tokens
-        if unknown_token_indexes:
-            neural_tags_indexes = self.neural_tagger(tokens)
+        # The tags of the tokens that are not unknown are only scored against
+        # their rule based tags, which is less work than scoring all tags.
+        candidate_tags: Optional[List[Optional[List[str]]]] = None
+        if ambiguous_token_indexes:
+            candidate_tags = [rule_based_tags for rule_based_tags, _ in rule_based_tags_indexes]
             for token_index in unknown_token_indexes:
-                hybrid_tags_indexes[token_index] = neural_tags_indexes[token_index]
+                candidate_tags[token_index] = None
+
+        windows = [(0, len(tokens))]
+        if self.context_window is not None:
+            windows = context_windows(neural_token_indexes, len(tokens), self.context_window)
+        windows_candidate_tags = None
+        if candidate_tags is not None:
+            windows_candidate_tags = [candidate_tags[start: end] for start, end in windows]
+        # Copies so that modifying the given tags does not modify the request.
+        rule_based_tags_indexes = [(list(tags), list(indexes)) for tags, indexes in rule_based_tags_indexes]
+        return _NeuralRequest(tokens, rule_based_tags_indexes, unknown_token_indexes,
+                              ambiguous_token_indexes, windows, windows_candidate_tags)
+
+    def _tag_neural_requests(self, neural_requests: List[_NeuralRequest]
+                             ) -> List[List[Tuple[List[str], List[Tuple[int, int]]]]]:
+        '''
+        Tags the windows of all of the `neural_requests` in one
+        :func:`pymusas.taggers.neural.NeuralTagger.tag_batch` call and returns
+        the completed tags of each request.
+        '''
+        windows_tokens: List[List[str]] = []
+        windows_candidate_tags: List[List[Optional[List[str]]]] = []
+        for neural_request in neural_requests:
+            for window_index, (start, end) in enumerate(neural_request.windows):
+                windows_tokens.append(neural_request.tokens[start: end])
+                if neural_request.windows_candidate_tags is None:
+                    windows_candidate_tags.append([None for _ in range(start, end)])
+                else:
+                    windows_candidate_tags.append(neural_request.windows_candidate_tags[window_index])
+        has_candidate_tags = any(neural_request.windows_candidate_tags is not None
+                                 for neural_request in neural_requests)
+        windows_tags_indexes = self.neural_tagger.tag_batch(windows_tokens,
+                                                            candidate_tags=windows_candidate_tags
+                                                            if has_candidate_tags else None)
+
+        requests_tags_indexes: List[List[Tuple[List[str], List[Tuple[int, int]]]]] = []
+        window_offset = 0
+        for neural_request in neural_requests:
+            neural_tags_by_token_index: dict[int, List[str]] = {}
+            for (start, end), window_tags_indexes in zip(neural_request.windows,
+                                                         windows_tags_indexes[window_offset:]):
+                for token_index in range(start, end):
+                    neural_tags_by_token_index[token_index] = window_tags_indexes[token_index - start][0]
+            window_offset += len(neural_request.windows)
+
+            hybrid_tags_indexes = list(neural_request.rule_based_tags_indexes)
+            for token_index in neural_request.unknown_token_indexes:
+                hybrid_tags_indexes[token_index] = (neural_tags_by_token_index[token_index],
+                                                    [(token_index, token_index + 1)])
+            for token_index in neural_request.ambiguous_token_indexes:
+                rule_based_tags, indexes = hybrid_tags_indexes[token_index]
+                ranked_tags = [tag for tag in neural_tags_by_token_index[token_index] if tag in rule_based_tags]
+                ranked_tags.extend(tag for tag in rule_based_tags if tag not in ranked_tags)
+                hybrid_tags_indexes[token_index] = (ranked_tags, indexes)
+            requests_tags_indexes.append(hybrid_tags_indexes)
+        return requests_tags_indexes
+
+    def tag_deferred(self, tokens: List[str],
+                     lemmas: List[str],
+                     pos_tags: List[str]
+                     ) -> Tuple[List[Tuple[List[str], List[Tuple[int, int]]]],
+                                'Future[List[Tuple[List[str], List[Tuple[int, int]]]]]']:
+        '''
+        Returns the rule based tags at once, without waiting for the
+        `NeuralTagger`, along with a `concurrent.futures.Future` of the same
+        output as :func:`__call__`. This is for latency sensitive services
+        whereby the latency of the rule based tags should not depend on the
+        `NeuralTagger`.
+
+        The rule based tags are the same as the tags from the
+        :class:`pymusas.taggers.rule_based.RuleBasedTagger`, i.e. the tokens
+        that cannot be tagged are tagged `Z99`. The tokens that the
+        `NeuralTagger` has to tag, from all of the calls to this method, are
+        queued and tagged in batches within a background thread, see
+        :class:`pymusas.batching.BackgroundBatcher`, once tagged the `Future`
+        is set to the tags of all of the tokens. If the `NeuralTagger` is not
+        required the `Future` is already set. Use
+        `Future.add_done_callback` to be called when the tags are set. Call
+        :func:`close` to stop the background thread.
+
+        # Parameters
+
+        tokens : `List[str]`
+            A List of full text form of the tokens to be tagged.
+        lemmas : `List[str]`
+            The List of lemma/base form of the tokens to be tagged.
+        pos_tags : `List[str]`
+            The List of POS tags of the tokens to be tagged.
+
+        # Returns
+
+        `Tuple[List[Tuple[List[str], List[Tuple[int, int]]]], Future[List[Tuple[List[str], List[Tuple[int, int]]]]]]`
+
+        # Raises
+
+        `ValueError`
+            If the length of the `tokens`, `lemmas`, and `pos_tags` are not of
+            the same length.
+
+        `RuntimeError`
+            If the tagger has been closed, see :func:`close`.
+        '''
+        rule_based_tags_indexes = super().__call__(tokens, lemmas, pos_tags)
+        neural_request = self._neural_request(tokens, rule_based_tags_indexes)
+        if neural_request is None:
+            future: Future[List[Tuple[List[str], List[Tuple[int, int]]]]] = Future()
+            future.set_result([(list(tags), list(indexes)) for tags, indexes in rule_based_tags_indexes])
+            return rule_based_tags_indexes, future
+        with self._deferred_batcher_lock:
+            if self._deferred_batcher is None:
+                if self._deferred_closed:
+                    raise RuntimeError('Cannot tag as the `HybridTagger` has been closed.')
+                self._deferred_batcher = BackgroundBatcher(self._tag_neural_requests,
+                                                           self.deferred_max_batch_size,
+                                                           self.deferred_max_wait)
+            deferred_batcher = self._deferred_batcher
+        return rule_based_tags_indexes, deferred_batcher.submit(neural_request)
+
+    def close(self, wait: bool = True) -> None:
+        '''
+        Stops the background thread of :func:`tag_deferred` once all of the
+        queued tokens have been tagged, :func:`tag_deferred` can no longer be
+        called. Does nothing if :func:`tag_deferred` has not been called.
+
+        # Parameters
+
+        wait : `bool`, optional (default = `True`)
+            Whether to wait for the background thread to stop.
+        '''
+        with self._deferred_batcher_lock:
+            self._deferred_closed = True
+            deferred_batcher = self._deferred_batcher
+        if deferred_batcher is not None:
+            deferred_batcher.close(wait)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The background thread and lock cannot be pickled, they are created
+        # again when required.
+        state = self.__dict__.copy()
+        state['_deferred_batcher'] = None
+        del state['_deferred_batcher_lock']
+        return state
 
-        return hybrid_tags_indexes
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._deferred_batcher_lock = threading.Lock()
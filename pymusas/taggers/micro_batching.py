@@ -0,0 +1,213 @@
+from concurrent.futures import Future
+from typing import Any, List, Optional, Tuple
+
+from pymusas.batching import BackgroundBatcher, BatchingStatistics
+
+
+try:
+    from pymusas.taggers.neural import NeuralTagger, validate_candidate_tags
+except ImportError:
+    from pymusas.utils import neural_extra_installed
+    neural_extra_installed()
+
+
+TagsIndexes = List[Tuple[List[str], List[Tuple[int, int]]]]
+# The tokens of a sentence and their, optional, candidate tags.
+_Sentence = Tuple[List[str], Optional[List[Optional[List[str]]]]]
+
+
+class MicroBatchScheduler():
+    '''
+    Schedules the sentences given to a
+    :class:`pymusas.taggers.neural.NeuralTagger` by many concurrent callers,
+    e.g. the threads or `asyncio` tasks of a server, into micro batches so
+    that the model runs one batched forward pass, through
+    :func:`pymusas.taggers.neural.NeuralTagger.tag_batch`, rather than one
+    forward pass per caller. The tags of each sentence are routed back to
+    its caller, they are the same as tagging the sentence by itself, through
+    :func:`pymusas.taggers.neural.NeuralTagger.__call__`, as the padding
+    within a batch does not change the tags, see
+    :func:`pymusas.taggers.neural.padded_text_encoding`.
+
+    The sentences are queued and a batch is tagged, within a background
+    thread, once it contains `max_batch_size` sentences or the first sentence
+    in the batch has waited `max_wait` seconds, whichever comes first, see
+    :class:`pymusas.batching.BackgroundBatcher`. A larger `max_wait`
+    creates larger batches, which gives a higher throughput, at the cost of
+    latency when there are few callers. The queue depth and a histogram of
+    the batch sizes can be found through :func:`statistics`.
+
+    Callers within a thread call the scheduler, :func:`__call__`, which
+    waits for the tags, and callers within an `asyncio` event loop await
+    `asyncio.wrap_future(scheduler.submit(tokens))`, see :func:`submit`.
+
+    # Parameters
+
+    neural_tagger : `pymusas.taggers.neural.NeuralTagger`
+        The tagger that tags the batches.
+    max_batch_size : `int`, optional (default = `32`)
+        The maximum number of sentences within a batch.
+    max_wait : `float`, optional (default = `0.005`)
+        The maximum number of seconds a sentence waits for other sentences to
+        batch with.
+    max_tokens_per_batch : `int`, optional (default = `4096`)
+        The `max_tokens_per_batch` of
+        :func:`pymusas.taggers.neural.NeuralTagger.tag_batch`.
+
+    # Instance Attributes
+
+    neural_tagger : `pymusas.taggers.neural.NeuralTagger`
+        The given `neural_tagger`.
+    max_batch_size : `int`
+        The given `max_batch_size`.
+    max_wait : `float`
+        The given `max_wait`.
+    max_tokens_per_batch : `int`
+        The given `max_tokens_per_batch`.
+
+    # Raises
+
+    `ValueError`
+        If `max_batch_size` or `max_tokens_per_batch` are less than 1, or if
+        `max_wait` is negative.
+
+    # Examples
+    ``` python
+    >>> from concurrent.futures import ThreadPoolExecutor
+    >>> from pymusas.taggers.micro_batching import MicroBatchScheduler
+    >>> from pymusas.taggers.neural import NeuralTagger
+    >>> tokenizer_kwargs = {"add_prefix_space": True}
+    >>> neural_tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM",
+    ...                              device="cpu", top_n=2, tokenizer_kwargs=tokenizer_kwargs)
+    >>> sentences = [["The", "river", "bank"], ["Hello"]]
+    >>> with MicroBatchScheduler(neural_tagger, max_wait=0.01) as scheduler:
+    ...     with ThreadPoolExecutor(2) as executor:
+    ...         tags = list(executor.map(scheduler, sentences))
+    >>> assert tags == [neural_tagger(tokens) for tokens in sentences]
+
+    ```
+    '''
+
+    def __init__(self, neural_tagger: NeuralTagger,
+                 max_batch_size: int = 32,
+                 max_wait: float = 0.005,
+                 max_tokens_per_batch: int = 4096) -> None:
+        if max_tokens_per_batch < 1:
+            raise ValueError('The `max_tokens_per_batch` has to be at least 1 '
+                             f'and not {max_tokens_per_batch}')
+        self._batcher: BackgroundBatcher[_Sentence, TagsIndexes] \
+            = BackgroundBatcher(self._tag_batch, max_batch_size, max_wait)
+        self.neural_tagger = neural_tagger
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_tokens_per_batch = max_tokens_per_batch
+
+    def _tag_batch(self, sentences: List[_Sentence]) -> List[TagsIndexes]:
+        candidate_tags: Optional[List[List[Optional[List[str]]]]] = None
+        if any(sentence_candidate_tags is not None for _, sentence_candidate_tags in sentences):
+            candidate_tags = [[None for _ in tokens] if sentence_candidate_tags is None
+                              else sentence_candidate_tags
+                              for tokens, sentence_candidate_tags in sentences]
+        return self.neural_tagger.tag_batch([tokens for tokens, _ in sentences],
+                                            self.max_tokens_per_batch, candidate_tags)
+
+    def submit(self, tokens: List[str],
+               candidate_tags: Optional[List[Optional[List[str]]]] = None
+               ) -> 'Future[TagsIndexes]':
+        '''
+        Queues the `tokens` to be tagged in the next batch and returns a
+        `concurrent.futures.Future` of the same output as
+        :func:`pymusas.taggers.neural.NeuralTagger.__call__`.
+
+        # Parameters
+
+        tokens : `List[str]`
+            A List of full text form of the tokens to be tagged.
+        candidate_tags : `List[Optional[List[str]]]`, optional (default = `None`)
+            The candidate tags of each token, see
+            :func:`pymusas.taggers.neural.NeuralTagger.__call__`.
+
+        # Returns
+
+        `concurrent.futures.Future[List[Tuple[List[str], List[Tuple[int, int]]]]]`
+
+        # Raises
+
+        `ValueError`
+            If `candidate_tags` is given and it is not the same length as
+            `tokens`.
+
+        `RuntimeError`
+            If the scheduler has been closed.
+        '''
+        if candidate_tags is not None:
+            # Validated here so that it does not affect the other sentences in the batch.
+            validate_candidate_tags([tokens], [candidate_tags])
+        return self._batcher.submit((tokens, candidate_tags))
+
+    def __call__(self, tokens: List[str],
+                 candidate_tags: Optional[List[Optional[List[str]]]] = None
+                 ) -> TagsIndexes:
+        '''
+        Returns the same output as
+        :func:`pymusas.taggers.neural.NeuralTagger.__call__`, waiting for the
+        batch that contains the `tokens` to be tagged, see :func:`submit`.
+
+        # Parameters
+
+        tokens : `List[str]`
+            A List of full text form of the tokens to be tagged.
+        candidate_tags : `List[Optional[List[str]]]`, optional (default = `None`)
+            The candidate tags of each token, see
+            :func:`pymusas.taggers.neural.NeuralTagger.__call__`.
+
+        # Returns
+
+        `List[Tuple[List[str], List[Tuple[int, int]]]]`
+
+        # Raises
+
+        `ValueError`
+            If `candidate_tags` is given and it is not the same length as
+            `tokens`.
+
+        `RuntimeError`
+            If the scheduler has been closed.
+        '''
+        return self.submit(tokens, candidate_tags).result()
+
+    @property
+    def queue_depth(self) -> int:
+        '''
+        The number of sentences waiting to be tagged.
+        '''
+        return self._batcher.queue_depth
+
+    def statistics(self) -> BatchingStatistics:
+        '''
+        Returns the statistics of the batches tagged so far, including the
+        queue depth and the batch size histogram.
+
+        # Returns
+
+        :class:`pymusas.batching.BatchingStatistics`
+        '''
+        return self._batcher.statistics()
+
+    def close(self, wait: bool = True) -> None:
+        '''
+        Stops the background thread once all of the queued sentences have
+        been tagged, sentences can no longer be submitted.
+
+        # Parameters
+
+        wait : `bool`, optional (default = `True`)
+            Whether to wait for the background thread to stop.
+        '''
+        self._batcher.close(wait)
+
+    def __enter__(self) -> 'MicroBatchScheduler':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
@@ -1,16 +1,1117 @@
+from contextlib import nullcontext
+from functools import partial
+from hashlib import blake2b
+import json
+import os
 from pathlib import Path
-from typing import Any, List, Tuple
+import tempfile
+import threading
+from typing import Any, Callable, ContextManager, Dict, Iterable, List, Mapping, Optional, Set, Tuple, cast
+import warnings
+
+from pymusas.cache import LRUCache, SQLiteCache, sequences_hash
+from pymusas.taggers.columnar import ColumnarTags, TagSequenceVocabulary
+from pymusas.utils import sliding_windows
 
 
 try:
+    from huggingface_hub import hf_hub_download, snapshot_download
+    from safetensors.torch import load_file
     import torch
-    from transformers import AutoTokenizer, PreTrainedTokenizerBase
+    from transformers import AutoConfig, AutoModel, AutoTokenizer, PreTrainedTokenizerBase
+    from transformers.modeling_utils import no_init_weights
     from wsd_torch_models.bem import BEM
+    from wsd_torch_models.scalar_mix import ScalarMix
+    from wsd_torch_models.utils import tiny_value_of_dtype
 except ImportError:
     from pymusas.utils import neural_extra_installed
     neural_extra_installed()
 
 
+# A function that encodes a batch of sub-word token ids given their attention
+# mask, e.g. :func:`padded_text_encoding`.
+TextEncoder = Callable[[torch.Tensor, torch.Tensor], torch.Tensor]
+
+_FLOATING_POINT_DTYPES: Dict[str, torch.dtype] = {
+    'float32': torch.float32,
+    'float16': torch.float16,
+    'bfloat16': torch.bfloat16
+}
+
+
+class SubWordCache():
+    '''
+    Tokenizes sentences of tokens into sub-word token ids, like calling the
+    `tokenizer` with `is_split_into_words=True`, whereby the sub-word token
+    ids of each token are stored in a Least Recently Used (LRU) cache,
+    :class:`pymusas.cache.LRUCache`, so that frequent tokens are only given
+    to the `tokenizer` once. The sub-word token ids of a sentence are the
+    special tokens the `tokenizer` adds to the start of a sequence, the
+    sub-word token ids of each token, and then the special tokens the
+    `tokenizer` adds to the end of a sequence, of which these special tokens
+    are found by tokenizing a one token sentence.
+
+    **NOTE** this assumes that the `tokenizer` tokenizes each token
+    independently of the other tokens in the sentence when
+    `is_split_into_words=True`, which is the case for the WordPiece,
+    byte level BPE, and SentencePiece tokenizers of the
+    HuggingFace `tokenizers` library.
+
+    # Parameters
+
+    tokenizer : `transformers.PreTrainedTokenizerBase`
+        The sub-word tokenizer, it has to be a fast tokenizer as the
+        `word_ids` of the tokenized sentences are required.
+    maxsize : `int`
+        The maximum number of tokens to store in the cache.
+
+    # Instance Attributes
+
+    tokenizer : `transformers.PreTrainedTokenizerBase`
+        The given `tokenizer`.
+    cache : `pymusas.cache.LRUCache`
+        The cache of the sub-word token ids of each token, the cache
+        statistics can be found through `cache.hits`, `cache.misses`, and
+        `cache.hit_rate`.
+
+    # Raises
+
+    `ValueError`
+        If `maxsize` is less than 1.
+    '''
+
+    def __init__(self, tokenizer: PreTrainedTokenizerBase, maxsize: int) -> None:
+        self.tokenizer = tokenizer
+        self.cache: LRUCache[str, Tuple[int, ...]] = LRUCache(maxsize)
+        special_tokens = tokenizer([['a']], padding=False, truncation=False, is_split_into_words=True)
+        special_token_ids: List[int] = special_tokens['input_ids'][0]
+        word_ids = special_tokens.word_ids(0)
+        first_index = word_ids.index(0)
+        last_index = len(word_ids) - word_ids[::-1].index(0)
+        self._start_ids = special_token_ids[:first_index]
+        self._end_ids = special_token_ids[last_index:]
+
+    def __call__(self, sentences: List[List[str]]
+                 ) -> Tuple[List[List[int]], List[List[Optional[int]]]]:
+        '''
+        Returns the sub-word token ids of each sentence and, for each
+        sub-word token, the index of the token it belongs to, `None` for
+        special tokens, which are the same as the `input_ids` and `word_ids`
+        from calling the `tokenizer` with `is_split_into_words=True`.
+
+        # Parameters
+
+        sentences : `List[List[str]]`
+            The sentences of tokens to tokenize.
+
+        # Returns
+
+        `Tuple[List[List[int]], List[List[Optional[int]]]]`
+        '''
+        token_sub_word_ids: Dict[str, Tuple[int, ...]] = {}
+        uncached_tokens: List[str] = []
+        for tokens in sentences:
+            for token in tokens:
+                if token in token_sub_word_ids:
+                    continue
+                cached_sub_word_ids = self.cache.get(token)
+                if cached_sub_word_ids is None:
+                    uncached_tokens.append(token)
+                    # Placeholder so that the token is only tokenized once.
+                    token_sub_word_ids[token] = ()
+                else:
+                    token_sub_word_ids[token] = cached_sub_word_ids
+        if uncached_tokens:
+            uncached_sub_word_ids = self.tokenizer([[token] for token in uncached_tokens],
+                                                   add_special_tokens=False, padding=False,
+                                                   truncation=False, is_split_into_words=True)['input_ids']
+            for token, sub_word_ids in zip(uncached_tokens, uncached_sub_word_ids):
+                token_sub_word_ids[token] = tuple(sub_word_ids)
+                self.cache.put(token, tuple(sub_word_ids))
+
+        sentences_sub_word_ids: List[List[int]] = []
+        sentences_word_ids: List[List[Optional[int]]] = []
+        for tokens in sentences:
+            sub_word_ids = list(self._start_ids)
+            word_ids: List[Optional[int]] = [None] * len(self._start_ids)
+            for token_index, token in enumerate(tokens):
+                token_ids = token_sub_word_ids[token]
+                sub_word_ids.extend(token_ids)
+                word_ids.extend([token_index] * len(token_ids))
+            sub_word_ids.extend(self._end_ids)
+            word_ids.extend([None] * len(self._end_ids))
+            sentences_sub_word_ids.append(sub_word_ids)
+            sentences_word_ids.append(word_ids)
+        return sentences_sub_word_ids, sentences_word_ids
+
+
+def _tokenize_sub_words(tokenizer: PreTrainedTokenizerBase, sentences: List[List[str]],
+                        sub_word_cache: Optional[SubWordCache]
+                        ) -> Tuple[List[List[int]], List[List[Optional[int]]]]:
+    '''
+    Returns the sub-word token ids of each sentence and the index of the
+    token each sub-word token belongs to, using the `sub_word_cache` if given.
+    '''
+    if sub_word_cache is not None:
+        return sub_word_cache(sentences)
+    sub_word_tokens = tokenizer(sentences, padding=False, truncation=False,
+                                is_split_into_words=True)
+    return (sub_word_tokens['input_ids'],
+            [sub_word_tokens.word_ids(index) for index in range(len(sentences))])
+
+
+def predict_tags(wsd_model: BEM, tokenizer: PreTrainedTokenizerBase,
+                 sentences: List[List[str]], top_n: int = -1,
+                 max_tokens_per_batch: int = 4096,
+                 autocast_dtype: Optional[torch.dtype] = None,
+                 text_encoder: Optional[TextEncoder] = None,
+                 bucket_shapes: bool = False,
+                 label_embeddings: Optional[torch.Tensor] = None,
+                 max_sub_words: Optional[int] = None,
+                 sub_word_stride: Optional[int] = None,
+                 sub_word_cache: Optional[SubWordCache] = None,
+                 candidate_tags: Optional[List[List[Optional[List[str]]]]] = None
+                 ) -> List[List[List[str]]]:
+    '''
+    Returns the `top_n` tags predicted by the `wsd_model` for each token in
+    each sentence, in the same order as the given `sentences`. Unlike the
+    :class:`NeuralTagger` whitespace tokens are not assigned the `Z9` tag.
+
+    The sentences are sorted by their number of sub-word tokens, longest
+    first, and greedily split into batches whereby each batch contains at most
+    `max_tokens_per_batch` sub-word tokens including padding, each batch is
+    tagged in one forward pass of the `wsd_model`. A sentence that is longer
+    than `max_tokens_per_batch` is tagged in a batch by itself. If
+    `bucket_shapes` is `True` the number of sentences and the number of
+    sub-word tokens in a batch are padded up to the next power of two, so that
+    a compiled `text_encoder`, see :func:`compile_text_encoder`, is only
+    compiled for a small number of different shapes.
+
+    If `max_sub_words` is given, sentences that have more than `max_sub_words`
+    sub-word tokens, including special tokens, e.g. sentences longer than the
+    model's maximum sequence length, are split into overlapping windows of
+    tokens, see :func:`pymusas.utils.sliding_windows`, each window has at most
+    `max_sub_words` sub-word tokens and starts at least `sub_word_stride`
+    sub-word tokens after the previous window, the windows are tagged in
+    batches alongside the other sentences, therefore the memory required does
+    not depend on the length of the sentences. A token that is in more than
+    one window is assigned the tags predicted from the window in which the
+    token is the furthest from the start or end of the window, as it has the
+    most context either side of it, if this is a tie the earliest window is
+    used.
+
+    The similarity scores between the tokens and the tags, which rank the
+    tags, are calculated at the precision of the `wsd_model`'s label
+    definition embeddings, e.g. `float32`, even if the rest of the
+    `wsd_model` runs at a lower precision, see :func:`cast_wsd_model` and
+    `autocast_dtype`. The label definition embeddings never change, therefore
+    to avoid re-arranging them for every batch they can be given as
+    `label_embeddings`, see :func:`label_embedding_matrix`, in which case the
+    only work done per batch is encoding the sentences followed by one matrix
+    multiplication.
+
+    If `candidate_tags` is given, the tags of a token that has candidate tags
+    are only ranked against its candidate tags, e.g. the tags a lexicon lists
+    for the token, rather than all of the tags, which is less work, and at
+    most `top_n` of the candidate tags are returned. Candidate tags that the
+    `wsd_model` does not have are ignored, if a token has no candidate tags,
+    `None`, or none of its candidate tags are known to the `wsd_model` the
+    token is ranked against all of the tags.
+
+    This function should be called within a
+    [`torch.inference_mode`](https://docs.pytorch.org/docs/stable/generated/torch.autograd.grad_mode.inference_mode.html)
+    context.
+
+    # Parameters
+
+    wsd_model : `wsd_torch_models.bem.BEM`
+        The neural Word Sense Disambiguation (WSD) model.
+    tokenizer : `transformers.PreTrainedTokenizerBase`
+        The sub-word tokenizer of the `wsd_model`.
+    sentences : `List[List[str]]`
+        The sentences to tag, each sentence is a `List` of the full text
+        form of the tokens to be tagged.
+    top_n : `int`, optional (default = `-1`)
+        The number of tags to predict, -1 predicts all tags.
+    max_tokens_per_batch : `int`, optional (default = `4096`)
+        The maximum number of sub-word tokens, including padding, within a batch.
+    autocast_dtype : `torch.dtype`, optional (default = `None`)
+        If given the `wsd_model` encodes the sentences within a
+        [`torch.autocast`](https://docs.pytorch.org/docs/stable/amp.html#torch.autocast)
+        context of this `dtype`, e.g. `torch.bfloat16`.
+    text_encoder : `Callable[[torch.Tensor, torch.Tensor], torch.Tensor]`, optional (default = `None`)
+        The function that encodes the sub-word token ids and attention mask of
+        a batch, if `None` :func:`padded_text_encoding` is used.
+    bucket_shapes : `bool`, optional (default = `False`)
+        Whether to pad the shape of each batch up to the next power of two.
+    label_embeddings : `torch.Tensor`, optional (default = `None`)
+        The label definition embeddings of the `wsd_model` as returned by
+        :func:`label_embedding_matrix`, if `None` they are created from the
+        `wsd_model` for each batch.
+    max_sub_words : `int`, optional (default = `None`)
+        The maximum number of sub-word tokens, including special tokens, of a
+        sentence before it is split into windows. If `None` the sentences are
+        not split.
+    sub_word_stride : `int`, optional (default = `None`)
+        The minimum number of sub-word tokens between the start of one window
+        and the next, the overlap between windows is roughly
+        `max_sub_words - sub_word_stride`. If `None` it is half of
+        `max_sub_words`.
+    sub_word_cache : `SubWordCache`, optional (default = `None`)
+        If given the sentences are tokenized through the cache, which gives
+        the same sub-word token ids as the `tokenizer` but only gives each
+        token not in the cache to the `tokenizer`.
+    candidate_tags : `List[List[Optional[List[str]]]]`, optional (default = `None`)
+        The candidate tags of each token in each sentence, `None` for a token
+        that can be any tag. If `None` all tokens can be any tag.
+
+    # Returns
+
+    `List[List[List[str]]]`
+
+    # Raises
+
+    `ValueError`
+        If the `wsd_model` does not have label definition embeddings.
+
+    `ValueError`
+        If the `candidate_tags` are not the same shape as the `sentences`.
+
+    `ValueError`
+        If `max_sub_words` is not greater than the number of special tokens
+        the tokenizer adds, or if `sub_word_stride` is less than 1.
+    '''
+    predicted_tags: List[List[List[str]]] = [[] for _ in sentences]
+    sentence_indexes = [index for index, tokens in enumerate(sentences) if tokens]
+    if not sentence_indexes:
+        return predicted_tags
+
+    # A sequence is either a whole sentence or a window of a long sentence.
+    sequences = [sentences[index] for index in sentence_indexes]
+    sequence_candidate_label_indexes: Optional[List[List[Optional[List[int]]]]] = None
+    if candidate_tags is not None:
+        validate_candidate_tags(sentences, candidate_tags)
+        if wsd_model.embedding_index_to_label is None:
+            raise ValueError('The neural model requires the `embedding_index_to_label` '
+                             'attribute to be set.')
+        label_to_index = {label: index for index, label in wsd_model.embedding_index_to_label.items()}
+        sequence_candidate_label_indexes = [
+            [_candidate_label_indexes(token_candidate_tags, label_to_index)
+             for token_candidate_tags in candidate_tags[index]]
+            for index in sentence_indexes
+        ]
+    sub_word_ids, sub_word_ids_to_token_ids = _tokenize_sub_words(tokenizer, sequences, sub_word_cache)
+
+    # The token windows of each long sentence, and the index of its first window sequence.
+    sentence_windows: Dict[int, Tuple[List[Tuple[int, int]], int]] = {}
+    if max_sub_words is not None:
+        number_special_tokens = tokenizer.num_special_tokens_to_add()
+        if sub_word_stride is None:
+            sub_word_stride = max(1, max_sub_words // 2)
+        if max_sub_words <= number_special_tokens or sub_word_stride < 1:
+            raise ValueError('The `max_sub_words` has to be greater than the number of '
+                             f'special tokens, {number_special_tokens}, and the '
+                             f'`sub_word_stride` at least 1, not {max_sub_words} and '
+                             f'{sub_word_stride}')
+        window_sequences: List[List[str]] = []
+        for sequence_index in range(len(sequences)):
+            if len(sub_word_ids[sequence_index]) <= max_sub_words:
+                continue
+            tokens = sequences[sequence_index]
+            token_lengths = [0 for _ in tokens]
+            for token_index in sub_word_ids_to_token_ids[sequence_index]:
+                if token_index is not None:
+                    token_lengths[token_index] += 1
+            windows = sliding_windows(token_lengths, max_sub_words - number_special_tokens,
+                                      sub_word_stride)
+            sentence_windows[sequence_index] = (windows, len(sequences) + len(window_sequences))
+            window_sequences.extend(tokens[start: end] for start, end in windows)
+            if sequence_candidate_label_indexes is not None:
+                sentence_candidate_label_indexes = sequence_candidate_label_indexes[sequence_index]
+                sequence_candidate_label_indexes.extend(sentence_candidate_label_indexes[start: end]
+                                                        for start, end in windows)
+        if window_sequences:
+            window_sub_word_ids, window_sub_word_ids_to_token_ids = _tokenize_sub_words(
+                tokenizer, window_sequences, sub_word_cache
+            )
+            sub_word_ids.extend(window_sub_word_ids)
+            sub_word_ids_to_token_ids.extend(window_sub_word_ids_to_token_ids)
+            sequences.extend(window_sequences)
+
+    sorted_indexes = sorted((index for index in range(len(sequences)) if index not in sentence_windows),
+                            key=lambda index: len(sub_word_ids[index]),
+                            reverse=True)
+    batch_dimension_size: Callable[[int], int] = _next_power_of_two if bucket_shapes else int
+    batches: List[List[int]] = []
+    for index in sorted_indexes:
+        # As the sequences are sorted longest first, the first sequence in
+        # a batch determines the padded length of the batch.
+        if batches and (batch_dimension_size(len(batches[-1]) + 1)
+                        * batch_dimension_size(len(sub_word_ids[batches[-1][0]]))) <= max_tokens_per_batch:
+            batches[-1].append(index)
+        else:
+            batches.append([index])
+
+    sequence_predicted_tags: List[List[List[str]]] = [[] for _ in sequences]
+    for batch in batches:
+        batch_predicted_tags = _predict_sub_words(
+            wsd_model, tokenizer.pad_token_id, top_n,
+            [sub_word_ids[index] for index in batch],
+            [sub_word_ids_to_token_ids[index] for index in batch],
+            [len(sequences[index]) for index in batch],
+            autocast_dtype, text_encoder, bucket_shapes, label_embeddings,
+            None if sequence_candidate_label_indexes is None
+            else [sequence_candidate_label_indexes[index] for index in batch]
+        )
+        for index, batch_sequence_predicted_tags in zip(batch, batch_predicted_tags):
+            sequence_predicted_tags[index] = batch_sequence_predicted_tags
+
+    for sequence_index, sentence_index in enumerate(sentence_indexes):
+        if sequence_index not in sentence_windows:
+            predicted_tags[sentence_index] = sequence_predicted_tags[sequence_index]
+            continue
+        # Each token is assigned the tags from the window in which it is the
+        # furthest from the edge of the window, ties go to the earliest window.
+        windows, first_window_index = sentence_windows[sequence_index]
+        token_edge_distances = [-1 for _ in sequences[sequence_index]]
+        merged_predicted_tags: List[List[str]] = [[] for _ in sequences[sequence_index]]
+        for window_index, (start, end) in enumerate(windows, first_window_index):
+            for token_index in range(start, end):
+                edge_distance = min(token_index - start, end - 1 - token_index)
+                if edge_distance > token_edge_distances[token_index]:
+                    token_edge_distances[token_index] = edge_distance
+                    merged_predicted_tags[token_index] = sequence_predicted_tags[window_index][token_index - start]
+        predicted_tags[sentence_index] = merged_predicted_tags
+    return predicted_tags
+
+
+def label_embedding_matrix(wsd_model: BEM) -> torch.Tensor:
+    '''
+    Returns the label definition embeddings of the `wsd_model` as one
+    contiguous matrix of shape (Embedding Dimension, Number of Labels),
+    whereby column `i` is the embedding of the label
+    `wsd_model.embedding_index_to_label[i]`. The similarity scores of a batch
+    of token embeddings, shape (Number of Tokens, Embedding Dimension), with
+    all of the labels is then one matrix multiplication.
+
+    # Parameters
+
+    wsd_model : `wsd_torch_models.bem.BEM`
+        The neural Word Sense Disambiguation (WSD) model.
+
+    # Returns
+
+    `torch.Tensor`
+
+    # Raises
+
+    `ValueError`
+        If the `wsd_model` does not have label definition embeddings.
+    '''
+    if wsd_model.label_definition_embeddings is None:
+        raise ValueError('The neural model requires the `label_definition_embeddings` '
+                         'attribute to be set.')
+    label_definition_embeddings = wsd_model.label_definition_embeddings
+    embedding_dimension = label_definition_embeddings.shape[-1]
+    return label_definition_embeddings.reshape(-1, embedding_dimension).t().contiguous()
+
+
+def maximum_sub_words(wsd_model: BEM, tokenizer: PreTrainedTokenizerBase) -> int:
+    '''
+    Returns the maximum number of sub-word tokens, including special tokens,
+    that the `wsd_model` can encode in one sequence. This is the smaller of
+    the tokenizer's `model_max_length` and the `max_position_embeddings` of
+    the `wsd_model`'s base model configuration, as some tokenizers do not set
+    the `model_max_length`.
+
+    # Parameters
+
+    wsd_model : `wsd_torch_models.bem.BEM`
+        The neural Word Sense Disambiguation (WSD) model.
+    tokenizer : `transformers.PreTrainedTokenizerBase`
+        The sub-word tokenizer of the `wsd_model`.
+
+    # Returns
+
+    `int`
+    '''
+    model_max_length = int(tokenizer.model_max_length)
+    max_position_embeddings = getattr(wsd_model.base_model.config, 'max_position_embeddings', None)
+    if max_position_embeddings is not None:
+        return min(model_max_length, int(max_position_embeddings))
+    return model_max_length
+
+
+def _next_power_of_two(size: int) -> int:
+    '''
+    Returns the smallest power of two that is greater than or equal to `size`.
+    '''
+    return 1 << max(size - 1, 0).bit_length()
+
+
+def _scalar_mix(scalar_mix: ScalarMix, hidden_states: Tuple[torch.Tensor, ...],
+                attention_mask: torch.Tensor) -> torch.Tensor:
+    '''
+    Returns the `scalar_mix` of the `hidden_states` whereby the layer
+    normalisation statistics are calculated per sentence rather than across
+    the whole batch.
+    '''
+    weights = torch.softmax(torch.cat(list(scalar_mix.scalar_parameters)), dim=0)
+    if not scalar_mix.do_layer_norm:
+        return cast(torch.Tensor, scalar_mix.gamma * sum(weight * hidden_state
+                                                         for weight, hidden_state in zip(weights, hidden_states)))
+    broadcast_mask = attention_mask.unsqueeze(-1)
+    number_elements = (attention_mask.sum(dim=1) * hidden_states[0].size(-1)).view(-1, 1, 1)
+    mixture = torch.zeros_like(hidden_states[0])
+    for weight, hidden_state in zip(weights, hidden_states):
+        masked_hidden_state = hidden_state * broadcast_mask
+        mean = masked_hidden_state.sum(dim=(1, 2), keepdim=True) / number_elements
+        variance = ((((masked_hidden_state - mean) * broadcast_mask) ** 2).sum(dim=(1, 2), keepdim=True)
+                    / number_elements)
+        mixture = mixture + weight * ((hidden_state - mean)
+                                      / torch.sqrt(variance + tiny_value_of_dtype(variance.dtype)))
+    return scalar_mix.gamma * mixture
+
+
+def padded_text_encoding(wsd_model: BEM, sub_word_ids: torch.Tensor,
+                         attention_mask: torch.Tensor) -> torch.Tensor:
+    '''
+    Returns the text encoding of a padded batch of sentences, the same as
+    `wsd_model.text_encoding` except that the encoding of a sentence does not
+    depend on the other sentences in the batch or on its padding, therefore
+    it is the same as encoding the sentence by itself, e.g. through
+    `wsd_model.predict`.
+
+    `wsd_model.text_encoding` calculates the layer normalisation statistics of
+    the scalar mix across the whole batch, and the `token_model_layers`, if
+    any, attend to the padding tokens. Here the statistics are calculated per
+    sentence and the `token_model_layers` are given a padding mask, if the
+    `wsd_model` is not `batch_first` each sub-word token is encoded by the
+    `token_model_layers` independently, as `wsd_model.predict` does.
+
+    # Parameters
+
+    wsd_model : `wsd_torch_models.bem.BEM`
+        The neural Word Sense Disambiguation (WSD) model.
+    sub_word_ids : `torch.Tensor`
+        The padded sub-word token ids, shape (batch, sequence length).
+    attention_mask : `torch.Tensor`
+        The attention mask of the `sub_word_ids`, shape
+        (batch, sequence length).
+
+    # Returns
+
+    `torch.Tensor`
+    '''
+    base_model_output = wsd_model.base_model(sub_word_ids, attention_mask, output_hidden_states=True)
+    text_encoding = cast(torch.Tensor, base_model_output.last_hidden_state)
+    if wsd_model.scalar_mix is not None:
+        text_encoding = _scalar_mix(wsd_model.scalar_mix, base_model_output.hidden_states,
+                                    attention_mask)
+    if wsd_model.token_model_layers is not None:
+        if wsd_model.linear_bridge is not None:
+            text_encoding = wsd_model.linear_bridge(text_encoding)
+        if wsd_model.batch_first:
+            # A per head attention mask rather than a key padding mask, as the
+            # latter uses nested tensors which do not support autocast.
+            batch_size, number_sub_words = attention_mask.shape
+            number_heads = wsd_model.transformer_encoder_num_heads
+            padding_mask = (attention_mask == 0)[:, None, None, :].expand(
+                batch_size, number_heads, number_sub_words, number_sub_words
+            ).reshape(batch_size * number_heads, number_sub_words, number_sub_words)
+            text_encoding = wsd_model.token_transformer(text_encoding, mask=padding_mask)
+        else:
+            batch_size, number_sub_words, _ = text_encoding.shape
+            text_encoding = wsd_model.token_transformer(
+                text_encoding.reshape(1, batch_size * number_sub_words, -1)
+            ).reshape(batch_size, number_sub_words, -1)
+    return text_encoding
+
+
+def compile_text_encoder(wsd_model: BEM) -> Optional[TextEncoder]:
+    '''
+    Returns the :func:`padded_text_encoding` function of the `wsd_model` compiled with
+    [`torch.compile`](https://docs.pytorch.org/docs/stable/generated/torch.compile.html),
+    the function is compiled for each new input shape the first time it is
+    called with that shape, therefore the shapes should be bucketed, see
+    `bucket_shapes` in :func:`predict_tags`. If `torch.compile` is not
+    supported, e.g. on some platforms or Python versions, a warning is raised
+    and `None` is returned.
+
+    # Parameters
+
+    wsd_model : `wsd_torch_models.bem.BEM`
+        The neural Word Sense Disambiguation (WSD) model.
+
+    # Returns
+
+    `Callable[[torch.Tensor, torch.Tensor], torch.Tensor] | None`
+    '''
+    try:
+        return cast(TextEncoder, torch.compile(partial(padded_text_encoding, wsd_model), dynamic=False))
+    except Exception as error:
+        warnings.warn(f'Unable to compile the neural model, the model is not compiled: {error}')
+        return None
+
+
+def torch_dtype(dtype: str) -> torch.dtype:
+    '''
+    Returns the floating point `torch.dtype` of the given `dtype` name.
+
+    # Parameters
+
+    dtype : `str`
+        The name of the floating point data type, either `'float32'`,
+        `'float16'`, or `'bfloat16'`.
+
+    # Returns
+
+    `torch.dtype`
+
+    # Raises
+
+    `ValueError`
+        If `dtype` is not `'float32'`, `'float16'`, or `'bfloat16'`.
+
+    # Examples
+    ``` python
+    >>> import torch
+    >>> from pymusas.taggers.neural import torch_dtype
+    >>> assert torch.bfloat16 == torch_dtype('bfloat16')
+
+    ```
+    '''
+    if dtype not in _FLOATING_POINT_DTYPES:
+        raise ValueError(f'The `dtype` has to be one of {list(_FLOATING_POINT_DTYPES)} '
+                         f'and not `{dtype}`')
+    return _FLOATING_POINT_DTYPES[dtype]
+
+
+def cast_wsd_model(wsd_model: BEM, dtype: Optional[str]) -> BEM:
+    '''
+    Casts the floating point parameters of the `wsd_model` in place to the
+    given `dtype`, e.g. `'bfloat16'` which on modern CPUs is a lot faster
+    than `'float32'`, and returns it.
+
+    The label definition embeddings are kept at their original precision,
+    e.g. `float32`, so that the similarity scores between the tokens and the
+    tags, which rank the tags, are still calculated at that precision, see
+    :func:`predict_tags`.
+
+    # Parameters
+
+    wsd_model : `wsd_torch_models.bem.BEM`
+        The neural Word Sense Disambiguation (WSD) model to cast.
+    dtype : `str | None`
+        The name of the data type to cast to, see :func:`torch_dtype`, if
+        `None` the `wsd_model` is not cast.
+
+    # Returns
+
+    `wsd_torch_models.bem.BEM`
+
+    # Raises
+
+    `ValueError`
+        If `dtype` is not `None`, `'float32'`, `'float16'`, or `'bfloat16'`.
+    '''
+    if dtype is None:
+        return wsd_model
+    label_definition_embeddings = wsd_model.label_definition_embeddings
+    wsd_model.to(dtype=torch_dtype(dtype))
+    wsd_model.label_definition_embeddings = label_definition_embeddings
+    return wsd_model
+
+
+def quantize_wsd_model(wsd_model: BEM, quantize: Optional[str]) -> BEM:
+    '''
+    Quantizes the `wsd_model` in place, to reduce the memory it requires and
+    to make it faster on CPU, and returns it.
+
+    The quantization methods supported:
+    * `'dynamic-int8'` -
+    [PyTorch dynamic quantization](https://docs.pytorch.org/docs/stable/quantization.html#post-training-dynamic-quantization)
+    of all linear layers, the weights are stored as `int8` and the
+    activations are quantized to `int8` on the fly. This is only supported
+    on CPU.
+
+    **NOTE** a quantized model cannot be saved with `save_pretrained`.
+
+    # Parameters
+
+    wsd_model : `wsd_torch_models.bem.BEM`
+        The neural Word Sense Disambiguation (WSD) model to quantize.
+    quantize : `str | None`
+        The quantization method, if `None` the `wsd_model` is not quantized.
+
+    # Returns
+
+    `wsd_torch_models.bem.BEM`
+
+    # Raises
+
+    `ValueError`
+        If `quantize` is not `None` or a supported quantization method, or if
+        the `wsd_model` is not on the CPU.
+    '''
+    if quantize is None:
+        return wsd_model
+    if quantize != 'dynamic-int8':
+        raise ValueError('The `quantize` argument has to be either `None` or '
+                         f'`dynamic-int8` and not `{quantize}`')
+    if wsd_model.base_model.device.type != 'cpu':
+        raise ValueError('Dynamic int8 quantization is only supported on CPU, the '
+                         f'model is on: {wsd_model.base_model.device}')
+    torch.ao.quantization.quantize_dynamic(wsd_model, {torch.nn.Linear},
+                                           dtype=torch.qint8, inplace=True)  # type: ignore[no-untyped-call]
+    return wsd_model
+
+
+def lexicon_candidate_tags(tokens: List[str], lexicon_lookup: Mapping[str, List[str]],
+                           lemmas: Optional[List[str]] = None) -> List[Optional[List[str]]]:
+    '''
+    Returns the candidate tags of each token from a lexicon that does not
+    contain Part Of Speech (POS) information, e.g. a
+    :class:`pymusas.lexicon_collection.LexiconCollection` created with
+    `include_pos=False`, which can be given as the `candidate_tags` to
+    :func:`NeuralTagger.__call__`. The candidate tags of a token are the tags
+    of the first of the following that is in the `lexicon_lookup`: the token,
+    the lower cased token, the lemma, and the lower cased lemma. A token that
+    is not in the `lexicon_lookup` has no candidate tags, `None`.
+
+    # Parameters
+
+    tokens : `List[str]`
+        The tokens.
+    lexicon_lookup : `Mapping[str, List[str]]`
+        A lexicon whose keys are words or lemmas and the values are their
+        semantic tags.
+    lemmas : `List[str]`, optional (default = `None`)
+        The lemmas of the tokens.
+
+    # Returns
+
+    `List[Optional[List[str]]]`
+
+    # Raises
+
+    `ValueError`
+        If `lemmas` is given and it is not the same length as `tokens`.
+
+    # Examples
+    ``` python
+    >>> from pymusas.lexicon_collection import LexiconCollection
+    >>> from pymusas.taggers.neural import lexicon_candidate_tags
+    >>> lexicon_lookup = LexiconCollection({'bank': ['I1.1', 'W3/M4'], 'run': ['M1', 'I2.2']})
+    >>> candidate_tags = lexicon_candidate_tags(['Bank', 'ran', 'xyz'], lexicon_lookup,
+    ...                                         ['bank', 'run', 'xyz'])
+    >>> assert candidate_tags == [['I1.1', 'W3/M4'], ['M1', 'I2.2'], None]
+
+    ```
+    '''
+    if lemmas is None:
+        lemmas = tokens
+    if len(lemmas) != len(tokens):
+        raise ValueError('The `lemmas` have to be the same length as the `tokens`, '
+                         f'{len(lemmas)} != {len(tokens)}')
+    candidate_tags: List[Optional[List[str]]] = []
+    for token, lemma in zip(tokens, lemmas):
+        token_candidate_tags: Optional[List[str]] = None
+        for lexicon_key in (token, token.lower(), lemma, lemma.lower()):
+            if lexicon_key in lexicon_lookup:
+                token_candidate_tags = list(lexicon_lookup[lexicon_key])
+                break
+        candidate_tags.append(token_candidate_tags)
+    return candidate_tags
+
+
+def share_wsd_model_memory(wsd_model: BEM) -> BEM:
+    '''
+    Moves the parameters, buffers, and label definition embeddings of the
+    `wsd_model` into shared memory in place, see
+    [`torch.Tensor.share_memory_`](https://docs.pytorch.org/docs/stable/generated/torch.Tensor.share_memory_.html),
+    and returns it. Worker processes that are forked from, or are given the
+    `wsd_model` through `torch.multiprocessing` by, this process then use the
+    same memory rather than their own copy of the model. Any conversion of the
+    model, e.g. :func:`cast_wsd_model`, has to happen before the model is
+    shared.
+
+    # Parameters
+
+    wsd_model : `wsd_torch_models.bem.BEM`
+        The neural Word Sense Disambiguation (WSD) model to share.
+
+    # Returns
+
+    `wsd_torch_models.bem.BEM`
+
+    # Raises
+
+    `ValueError`
+        If the `wsd_model` is not on the CPU.
+    '''
+    if wsd_model.base_model.device.type != 'cpu':
+        raise ValueError('Only a model on the CPU can be moved into shared memory, '
+                         f'the model is on: {wsd_model.base_model.device}')
+    wsd_model.share_memory()
+    if wsd_model.label_definition_embeddings is not None:
+        wsd_model.label_definition_embeddings.share_memory_()  # type: ignore[no-untyped-call]
+    return wsd_model
+
+
+def set_torch_threads(num_threads: Optional[int] = None,
+                      num_interop_threads: Optional[int] = None) -> None:
+    '''
+    Sets the number of threads PyTorch uses within this process, the
+    intra-op threads, `num_threads`, run one operation, e.g. a matrix
+    multiplication, in parallel and the inter-op threads,
+    `num_interop_threads`, run independent operations in parallel. By
+    default PyTorch uses as many intra-op threads as there are CPU cores,
+    therefore when more than one process runs a model, e.g.
+    `nlp.pipe(n_process=N)`, the threads of the processes compete for the
+    same cores, setting `num_threads` to the number of cores divided by the
+    number of processes avoids this.
+
+    PyTorch only allows the number of inter-op threads to be set before it
+    has run any inter-op parallel work, if it can no longer be set a
+    warning is raised and the number of inter-op threads is not changed.
+
+    # Parameters
+
+    num_threads : `int | None`, optional (default = `None`)
+        The number of intra-op threads, see
+        [`torch.set_num_threads`](https://docs.pytorch.org/docs/stable/generated/torch.set_num_threads.html).
+        If `None` it is not changed.
+    num_interop_threads : `int | None`, optional (default = `None`)
+        The number of inter-op threads, see
+        [`torch.set_num_interop_threads`](https://docs.pytorch.org/docs/stable/generated/torch.set_num_interop_threads.html).
+        If `None` it is not changed.
+
+    # Raises
+
+    `ValueError`
+        If `num_threads` or `num_interop_threads` are less than 1.
+    '''
+    for argument_name, argument_value in [('num_threads', num_threads),
+                                          ('num_interop_threads', num_interop_threads)]:
+        if argument_value is not None and argument_value < 1:
+            raise ValueError(f'The `{argument_name}` argument has to be at least 1 '
+                             f'and not {argument_value}')
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    if num_interop_threads is not None and num_interop_threads != torch.get_num_interop_threads():
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError as error:
+            warnings.warn('Unable to set the number of PyTorch inter-op threads to '
+                          f'{num_interop_threads}, it has to be set before any inter-op '
+                          f'parallel work has started: {error}')
+
+
+def load_wsd_model(pretrained_model_name_or_path: str | Path,
+                   low_memory: bool = False) -> BEM:
+    '''
+    Loads the neural Word Sense Disambiguation (WSD) model, see
+    `wsd_torch_models.bem.BEM.from_pretrained`.
+
+    `BEM.from_pretrained` initialises the model's weights and then copies
+    the saved weights into them, therefore the peak memory used when loading
+    the model is roughly twice the size of the model. If `low_memory` is
+    `True` the model is created without initialising its weights, and the
+    weights from the model's safetensors file, which are memory mapped by
+    `safetensors.torch.load_file`, are assigned to the model rather than
+    copied, therefore the memory used when loading is close to the size of
+    the model, and loading is faster. The weights are only read into memory
+    when first used, or when the model is converted, e.g. moved to another
+    device, quantized, or cast. As the weights are memory mapped the model's
+    files must not be overwritten while the model is in use. If the model
+    does not have a safetensors file, or the safetensors file does not
+    contain all of the model's parameters, or contains weights that are not
+    in the model, a warning is raised and it is loaded through
+    `BEM.from_pretrained`, as a parameter that is not loaded would be left
+    uninitialised.
+
+    # Parameters
+
+    pretrained_model_name_or_path : `str | Path`
+        The string ID, of a model hosted on the HuggingFace Hub, or the path
+        to the directory of the pretrained model.
+    low_memory : `bool`, optional (default = `False`)
+        Whether to load the model with low memory.
+
+    # Returns
+
+    `wsd_torch_models.bem.BEM`
+    '''
+    if not low_memory:
+        return BEM.from_pretrained(pretrained_model_name_or_path)
+    model_directory = Path(pretrained_model_name_or_path)
+    if not model_directory.is_dir():
+        model_directory = Path(snapshot_download(str(pretrained_model_name_or_path),
+                                                 allow_patterns=['config.json', 'model.safetensors',
+                                                                 'base_model_config/*',
+                                                                 'label_definitions/*']))
+    model_file = model_directory / 'model.safetensors'
+    if not model_file.exists():
+        warnings.warn(f'The model {pretrained_model_name_or_path} does not have a '
+                      '`model.safetensors` file, it is not loaded with low memory.')
+        return BEM.from_pretrained(pretrained_model_name_or_path)
+
+    # Follows `BEM.from_pretrained` for a model within a local directory.
+    with (model_directory / 'config.json').open('r', encoding='utf-8') as config_fp:
+        model_kwargs: Dict[str, Any] = json.load(config_fp)
+    label_definitions_directory = model_directory / 'label_definitions'
+    model_kwargs['label_definitions_directory_path'] = None
+    if label_definitions_directory.is_dir():
+        model_kwargs['label_definitions_directory_path'] = label_definitions_directory
+    with no_init_weights():
+        base_model_config = AutoConfig.from_pretrained(model_directory / 'base_model_config')
+        model_kwargs['base_model'] = AutoModel.from_config(base_model_config)  # type: ignore[no-untyped-call]
+        wsd_model = BEM(**model_kwargs)
+    incompatible_keys = wsd_model.load_state_dict(load_file(model_file), strict=False, assign=True)
+    parameter_names = set(name for name, _ in wsd_model.named_parameters(remove_duplicate=False))
+    missing_parameters = sorted(parameter_names.intersection(incompatible_keys.missing_keys))
+    if missing_parameters or incompatible_keys.unexpected_keys:
+        warnings.warn(f'The `model.safetensors` file of the model {pretrained_model_name_or_path} '
+                      f'is missing the parameters {missing_parameters} and has the unexpected '
+                      f'weights {sorted(incompatible_keys.unexpected_keys)}, it is not loaded with low memory.')
+        return BEM.from_pretrained(pretrained_model_name_or_path)
+    return wsd_model
+
+
+def wsd_model_identity(pretrained_model_name_or_path: str | Path) -> str:
+    '''
+    Returns a string that identifies the version of the neural Word Sense
+    Disambiguation (WSD) model, without reading the model's weights, so that
+    two models with the same identity are the same model, e.g. for keys of
+    caches or registries of models.
+
+    For a model within a local directory the identity is a hash of the
+    resolved path of the directory, and the relative path, size, and
+    modification time of each file within it, therefore the identity changes
+    when the model is saved again, e.g. after it has been retrained. For a
+    model hosted on the HuggingFace Hub the identity is the model's ID and
+    the commit hash of the revision that is loaded, which is found by
+    downloading the model's `config.json`, this file is also downloaded
+    when loading the model.
+
+    # Parameters
+
+    pretrained_model_name_or_path : `str | Path`
+        The string ID, of a model hosted on the HuggingFace Hub, or the path
+        to the directory of the pretrained model.
+
+    # Returns
+
+    `str`
+    '''
+    model_directory = Path(pretrained_model_name_or_path)
+    if model_directory.is_dir():
+        model_directory = model_directory.resolve()
+        directory_hash = blake2b(digest_size=16)
+        directory_hash.update(str(model_directory).encode('utf-8'))
+        for file_path in sorted(path for path in model_directory.rglob('*') if path.is_file()):
+            file_stat = file_path.stat()
+            directory_hash.update(f'\x00{file_path.relative_to(model_directory).as_posix()}'
+                                  f'\x00{file_stat.st_size}\x00{file_stat.st_mtime_ns}'.encode('utf-8'))
+        return directory_hash.hexdigest()
+    # The Hub cache stores the files of a revision in `snapshots/{commit hash}/`
+    config_path = Path(hf_hub_download(str(pretrained_model_name_or_path), 'config.json'))
+    return f'{pretrained_model_name_or_path}@{config_path.parent.name}'
+
+
+def validate_candidate_tags(sentences: List[List[str]],
+                            candidate_tags: List[List[Optional[List[str]]]]) -> None:
+    '''
+    Checks that the `candidate_tags` contain one entry for each token in
+    each sentence, as required by the `candidate_tags` of
+    :func:`predict_tags` and :func:`NeuralTagger.tag_batch`.
+
+    # Parameters
+
+    sentences : `List[List[str]]`
+        The sentences, each sentence is a `List` of tokens.
+    candidate_tags : `List[List[Optional[List[str]]]]`
+        The candidate tags of each token in each sentence.
+
+    # Returns
+
+    `None`
+
+    # Raises
+
+    `ValueError`
+        If the `candidate_tags` do not contain one entry for each token in
+        each sentence.
+    '''
+    if len(candidate_tags) != len(sentences) or any(len(tokens) != len(token_candidate_tags)
+                                                    for tokens, token_candidate_tags
+                                                    in zip(sentences, candidate_tags)):
+        raise ValueError('The `candidate_tags` have to contain one entry for '
+                         'each token in each sentence.')
+
+
+def _candidate_label_indexes(candidate_tags: Optional[List[str]],
+                             label_to_index: Dict[str, int]) -> Optional[List[int]]:
+    '''
+    Returns the label indexes of the unique `candidate_tags` that are in
+    `label_to_index`, in the order given, or `None` if there are none.
+    '''
+    if candidate_tags is None:
+        return None
+    label_indexes = [label_to_index[tag] for tag in dict.fromkeys(candidate_tags)
+                     if tag in label_to_index]
+    return label_indexes if label_indexes else None
+
+
+def _rank_labels(token_embeddings: torch.Tensor, label_embeddings: torch.Tensor,
+                 top_n: int) -> List[List[int]]:
+    '''
+    Returns the `top_n` label indexes of each token, ranked by the similarity
+    of the token embeddings, shape (Number of Tokens, Embedding Dimension), to
+    all of the labels, see :func:`label_embedding_matrix`.
+    '''
+    label_similarity_scores = torch.matmul(token_embeddings, label_embeddings)
+    # torch does not support negative indexing like numpy or python does.
+    if top_n == -1:
+        top_n = label_similarity_scores.shape[-1]
+    sorted_label_indexes = torch.argsort(label_similarity_scores, dim=-1, descending=True)
+    top_n_label_indexes: List[List[int]] = sorted_label_indexes[:, :top_n].cpu().tolist()
+    return top_n_label_indexes
+
+
+def _rank_candidate_labels(token_embeddings: torch.Tensor, label_embeddings: torch.Tensor,
+                           top_n: int, candidate_label_indexes: List[Optional[List[int]]]
+                           ) -> List[List[int]]:
+    '''
+    Returns the `top_n` label indexes of each token like :func:`_rank_labels`,
+    except that a token that has candidate label indexes is only scored
+    against the embeddings of its candidate labels.
+    '''
+    top_n_label_indexes: List[List[int]] = [[] for _ in candidate_label_indexes]
+    all_label_token_indexes = [token_index for token_index, label_indexes
+                               in enumerate(candidate_label_indexes) if label_indexes is None]
+    if all_label_token_indexes:
+        all_label_top_n_indexes = _rank_labels(token_embeddings[all_label_token_indexes],
+                                               label_embeddings, top_n)
+        for token_index, label_indexes in zip(all_label_token_indexes, all_label_top_n_indexes):
+            top_n_label_indexes[token_index] = label_indexes
+
+    candidate_token_indexes = [token_index for token_index, label_indexes
+                               in enumerate(candidate_label_indexes) if label_indexes is not None]
+    if candidate_token_indexes:
+        token_candidates = [cast(List[int], candidate_label_indexes[token_index])
+                            for token_index in candidate_token_indexes]
+        max_number_candidates = max(len(label_indexes) for label_indexes in token_candidates)
+        padded_label_indexes = torch.zeros((len(token_candidates), max_number_candidates), dtype=torch.long)
+        padding_mask = torch.ones((len(token_candidates), max_number_candidates), dtype=torch.bool)
+        for row_index, label_indexes in enumerate(token_candidates):
+            padded_label_indexes[row_index, :len(label_indexes)] = torch.tensor(label_indexes, dtype=torch.long)
+            padding_mask[row_index, :len(label_indexes)] = False
+        device = label_embeddings.device
+        # Shape (Number of Tokens, Number of Candidates, Embedding Dimension)
+        candidate_embeddings = label_embeddings.t()[padded_label_indexes.to(device=device)]
+        candidate_scores = torch.bmm(candidate_embeddings,
+                                     token_embeddings[candidate_token_indexes].unsqueeze(-1)).squeeze(-1)
+        candidate_scores = candidate_scores.masked_fill(padding_mask.to(device=device), float('-inf'))
+        sorted_candidates: List[List[int]] = torch.argsort(candidate_scores, dim=-1,
+                                                           descending=True).cpu().tolist()
+        for token_index, label_indexes, candidate_order in zip(candidate_token_indexes, token_candidates,
+                                                               sorted_candidates):
+            number_candidates = len(label_indexes) if top_n == -1 else min(top_n, len(label_indexes))
+            top_n_label_indexes[token_index] = [label_indexes[candidate_index]
+                                                for candidate_index in candidate_order[:number_candidates]]
+    return top_n_label_indexes
+
+
+def _predict_sub_words(wsd_model: BEM, pad_token_id: Optional[int], top_n: int,
+                       batch_sub_word_ids: List[List[int]],
+                       batch_sub_word_ids_to_token_ids: List[List[Optional[int]]],
+                       batch_number_tokens: List[int],
+                       autocast_dtype: Optional[torch.dtype] = None,
+                       text_encoder: Optional[TextEncoder] = None,
+                       bucket_shapes: bool = False,
+                       label_embeddings: Optional[torch.Tensor] = None,
+                       batch_candidate_label_indexes: Optional[List[List[Optional[List[int]]]]] = None
+                       ) -> List[List[List[str]]]:
+    '''
+    Returns the `top_n` predicted tags of each token in each sentence of
+    the batch using one forward pass of the model, each sentence is
+    represented by its sub-word token ids, the token index of each
+    sub-word token, and the number of tokens in the sentence. If given, the
+    tags of each token are only ranked against its candidate label indexes.
+    '''
+    if wsd_model.label_definition_embeddings is None or wsd_model.embedding_index_to_label is None:
+        raise ValueError('The neural model requires the `label_definition_embeddings` '
+                         'and `embedding_index_to_label` attributes to be set.')
+    model_device = wsd_model.base_model.device
+    batch_size = len(batch_sub_word_ids)
+    max_number_sub_words = max(len(sub_word_ids) for sub_word_ids in batch_sub_word_ids)
+    if bucket_shapes:
+        batch_size = _next_power_of_two(batch_size)
+        max_number_sub_words = _next_power_of_two(max_number_sub_words)
+    if text_encoder is None:
+        text_encoder = partial(padded_text_encoding, wsd_model)
+    if pad_token_id is None:
+        pad_token_id = 0
+
+    padded_sub_word_ids = torch.full((batch_size, max_number_sub_words), pad_token_id,
+                                     dtype=torch.long)
+    attention_mask = torch.zeros((batch_size, max_number_sub_words), dtype=torch.long)
+    for batch_index, sub_word_ids in enumerate(batch_sub_word_ids):
+        padded_sub_word_ids[batch_index, :len(sub_word_ids)] = torch.tensor(sub_word_ids,
+                                                                            dtype=torch.long)
+        attention_mask[batch_index, :len(sub_word_ids)] = 1
+    # Padding sentences attend to one token so that they are never fully masked.
+    attention_mask[len(batch_sub_word_ids):, 0] = 1
+    autocast_context: ContextManager[Any] = nullcontext()
+    if autocast_dtype is not None:
+        autocast_context = torch.autocast(model_device.type, dtype=autocast_dtype)
+    token_embeddings: List[torch.Tensor] = []
+    with autocast_context:
+        text_encodings = text_encoder(padded_sub_word_ids.to(device=model_device),
+                                      attention_mask.to(device=model_device))
+
+        for batch_index, (sub_word_ids_to_token_ids, number_tokens) in enumerate(
+                zip(batch_sub_word_ids_to_token_ids, batch_number_tokens)):
+            number_sub_words = len(sub_word_ids_to_token_ids)
+            word_id_mask = torch.zeros((number_tokens, number_sub_words), dtype=torch.long)
+            for sub_word_index, token_index in enumerate(sub_word_ids_to_token_ids):
+                if token_index is not None:
+                    word_id_mask[token_index, sub_word_index] = 1
+            text_encoding = text_encodings[batch_index: batch_index + 1, :number_sub_words]
+            token_embeddings.append(
+                wsd_model.token_encoding_using_text_encoding(text_encoding,
+                                                             word_id_mask.to(device=model_device))
+            )
+
+    # The tags are ranked at the precision of the label definition embeddings
+    # even if the model has been cast to, or autocast at, a lower precision.
+    if label_embeddings is None:
+        label_embeddings = label_embedding_matrix(wsd_model)
+    all_token_embeddings = torch.cat(token_embeddings).to(dtype=label_embeddings.dtype)
+    if batch_candidate_label_indexes is None:
+        top_n_label_indexes = _rank_labels(all_token_embeddings, label_embeddings, top_n)
+    else:
+        top_n_label_indexes = _rank_candidate_labels(
+            all_token_embeddings, label_embeddings, top_n,
+            [token_candidate_label_indexes
+             for candidate_label_indexes in batch_candidate_label_indexes
+             for token_candidate_label_indexes in candidate_label_indexes]
+        )
+
+    embedding_index_to_label = wsd_model.embedding_index_to_label
+    batch_predicted_tags: List[List[List[str]]] = []
+    token_offset = 0
+    for number_tokens in batch_number_tokens:
+        batch_predicted_tags.append([
+            [embedding_index_to_label[label_index] for label_index in label_indexes]
+            for label_indexes in top_n_label_indexes[token_offset: token_offset + number_tokens]
+        ])
+        token_offset += number_tokens
+    return batch_predicted_tags
+
+
 class NeuralTagger():
     '''
     The tagger when called, through :func:`__call__`, and given a sequence of
@@ -26,6 +1127,78 @@ class NeuralTagger():
       will return only one tag which will be the `Z9` tag and no other tags,
       even if `top_n` is greater than 1.
 
+    **Prediction cache**
+    The tags predicted for a sequence of tokens can be cached so that a
+    sequence that has been tagged before, e.g. the same unknown word in the
+    same context when used within the :class:`pymusas.taggers.hybrid.HybridTagger`,
+    is not given to the model again. The cache key is a hash of the model
+    identity (`pretrained_model_name_or_path`, `tokenizer_kwargs`, `quantize`,
+    `dtype`, and `autocast`), `top_n`,
+    and the tokens, whereby the tokens are the context that the tags of each
+    token are predicted from. The cache can be in memory, `cache_size`,
+    and/or persistent, `cache_path`, when both are used the in memory cache is
+    checked first. When a persistent cache is used the model identity
+    includes the version of the model, see :func:`wsd_model_identity`, the
+    HuggingFace Hub commit hash or the size and modification time of the
+    files in the model's directory, so that the tags predicted by an older
+    version of the model are not used. The persistent cache is not cleared
+    when the model changes, to remove the tags of older versions of the
+    model call :func:`clear_cache`.
+
+    **Reduced precision**
+    The model can run at a lower precision, `dtype`, e.g. `'bfloat16'` which
+    modern CPUs run a lot faster than `'float32'`, either by casting the
+    model, or when `autocast` is `True` through
+    [`torch.autocast`](https://docs.pytorch.org/docs/stable/amp.html#torch.autocast)
+    which keeps the model's parameters at their original precision. In both
+    cases the tags are still ranked at the original precision, see
+    :func:`predict_tags`, but the lower precision can change the predicted
+    tags, benchmark the agreement with the original precision before using it.
+
+    **Compiled model**
+    If `compile_model` is `True` the model's text encoder is compiled with
+    `torch.compile`, see :func:`compile_text_encoder`. The encoder is compiled
+    for each new batch shape, to limit the number of shapes the number of
+    sentences and sub-word tokens in a batch are padded up to the next power
+    of two. Compiling is slow, therefore if `compile_cache_path` is given the
+    compiled artifacts are saved to this file, e.g. alongside the model, and
+    loaded by later processes so that they do not have to compile the model
+    again, this requires PyTorch 2.7 or later. If the model cannot be
+    compiled, a `torch._dynamo` error, a warning is raised and the uncompiled
+    model is used.
+
+    **Sub-word cache**
+    If `sub_word_cache_size` is greater than `0` the sub-word token ids of
+    each token are cached, see :class:`SubWordCache`, so that frequent tokens
+    are only given to the tokenizer once, the model is given the same
+    sub-word token ids as without the cache.
+
+    **Lazy loading**
+    If `lazy_load` is `True` the model and tokenizer are not loaded when the
+    tagger is created, they are loaded, see :func:`load`, when they are
+    first required, e.g. the first call to the tagger whose tokens are not
+    in the caches. This saves the start-up time and memory of the model when
+    it might not be used, e.g. within the :class:`pymusas.taggers.hybrid.HybridTagger`
+    when the rule based taggers can tag all of the tokens. Call
+    :func:`warm_up` to load the model before the first call.
+
+    **Threads and warm-up**
+    The number of threads PyTorch uses within the process can be set through
+    `num_threads` and `num_interop_threads`, see :func:`set_torch_threads`,
+    they are set when the model is loaded. When many processes, or many
+    taggers, run at the same time setting `num_threads` so that the total
+    number of threads is at most the number of CPU cores stops them from
+    competing for the cores. If `warm_up_on_load` is `True` the tagger is
+    warmed up, see :func:`warm_up`, once the model is loaded so that the
+    first call does not pay the one off costs of the first forward pass.
+
+    **Low memory loading**
+    If `low_memory_load` is `True` the model is loaded without initialising
+    its weights and its weights are memory mapped from the model's
+    safetensors file, see :func:`load_wsd_model`, therefore the peak memory
+    when loading is close to the size of the model, rather than roughly
+    twice its size, and the model loads faster.
+
     # Parameters
 
     pretrained_model_name_or_path : `str | Path`
@@ -55,14 +1228,61 @@ class NeuralTagger():
         Keyword arguments to pass to the tokenizer's
         `transformers.AutoTokenizer.from_pretrained` method.
         These keyword arguments are only passed to the tokenizer on initialization.
+    cache_size : `int`, optional (default = `0`)
+        The maximum number of token sequences whose predicted tags are stored
+        in the in memory Least Recently Used (LRU) cache. If `0` no in memory
+        cache is used.
+    cache_path : `str | Path | None`, optional (default = `None`)
+        The path to a SQLite database file that stores the predicted tags,
+        through a :class:`pymusas.cache.SQLiteCache`, so that they persist
+        across runs. If `None` no persistent cache is used.
+    quantize : `str | None`, optional (default = `None`)
+        The quantization method to apply to the model when it is loaded, see
+        :func:`quantize_wsd_model`. `'dynamic-int8'` makes the model a lot
+        smaller and faster on CPU at the cost of a small change in the
+        predicted tags. It can only be used when the `device` is `'cpu'`.
+        If `None` the model is not quantized.
+    dtype : `str | None`, optional (default = `None`)
+        The precision to run the model at, either `'float32'`, `'float16'`, or
+        `'bfloat16'`, see :func:`cast_wsd_model`. If `None` the model runs at
+        the precision it was saved with.
+    autocast : `bool`, optional (default = `False`)
+        If `True` the model is not cast to `dtype`, instead the model runs within
+        a `torch.autocast` context of `dtype`.
+    compile_model : `bool`, optional (default = `False`)
+        Whether to compile the model with `torch.compile`.
+    compile_cache_path : `str | Path | None`, optional (default = `None`)
+        The path to the file that stores the compiled artifacts when
+        `compile_model` is `True`. If `None` the compiled artifacts are not
+        saved.
+    sub_word_cache_size : `int`, optional (default = `0`)
+        The maximum number of tokens whose sub-word token ids are stored in
+        the :class:`SubWordCache`. If `0` no sub-word cache is used.
+    lazy_load : `bool`, optional (default = `False`)
+        If `True` the model and tokenizer are loaded when they are first
+        required rather than when the tagger is created.
+    num_threads : `int | None`, optional (default = `None`)
+        The number of intra-op threads PyTorch uses, set when the model is
+        loaded. If `None` it is not changed.
+    num_interop_threads : `int | None`, optional (default = `None`)
+        The number of inter-op threads PyTorch uses, set when the model is
+        loaded, if PyTorch allows it to be set, see :func:`set_torch_threads`.
+        If `None` it is not changed.
+    warm_up_on_load : `bool`, optional (default = `False`)
+        Whether to warm up the tagger, see :func:`warm_up`, once the model is
+        loaded.
+    low_memory_load : `bool`, optional (default = `False`)
+        Whether to load the model with low memory, see :func:`load_wsd_model`.
     
     # Instance Attributes
 
     wsd_model : `wsd_torch_models.bem.BEM`
         The neural Word Sense Disambiguation (WSD) model that was loaded using
-        the `pretrained_model_name_or_path`.
+        the `pretrained_model_name_or_path`, accessing it loads the model if
+        it has not been loaded yet.
     tokenizer : `transformers.PreTrainedTokenizerBase`
-        The tokenizer that was loaded using the `pretrained_model_name_or_path`.
+        The tokenizer that was loaded using the `pretrained_model_name_or_path`,
+        accessing it loads the tokenizer if it has not been loaded yet.
     top_n : `int`
         The number of tags to predict.
     device : `torch.device`
@@ -70,11 +1290,59 @@ class NeuralTagger():
     tokenizer_kwargs (dict[str, Any] | None): Keyword arguments to pass
         to the tokenizer's `transformers.AutoTokenizer.from_pretrained` method.
         Default None.
+    cache : `pymusas.cache.LRUCache | None`
+        The in memory cache, `None` if `cache_size` is `0`. The cache
+        statistics can be found through `cache.hits`, `cache.misses`, and
+        `cache.hit_rate`.
+    persistent_cache : `pymusas.cache.SQLiteCache | None`
+        The persistent cache, `None` if `cache_path` is `None`. The cache
+        statistics can be found through `persistent_cache.hits`,
+        `persistent_cache.misses`, and `persistent_cache.hit_rate`.
+    quantize : `str | None`
+        The given `quantize`.
+    dtype : `str | None`
+        The given `dtype`.
+    autocast : `bool`
+        The given `autocast`.
+    compile_model : `bool`
+        The given `compile_model`.
+    compile_cache_path : `Path | None`
+        The given `compile_cache_path`.
+    sub_word_cache : `SubWordCache | None`
+        The sub-word cache, `None` if `sub_word_cache_size` is `0` or the
+        model has not been loaded yet. The cache
+        statistics can be found through `sub_word_cache.cache.hits`,
+        `sub_word_cache.cache.misses`, and `sub_word_cache.cache.hit_rate`.
+    lazy_load : `bool`
+        The given `lazy_load`.
+    num_threads : `int | None`
+        The given `num_threads`.
+    num_interop_threads : `int | None`
+        The given `num_interop_threads`.
+    warm_up_on_load : `bool`
+        The given `warm_up_on_load`.
+    low_memory_load : `bool`
+        The given `low_memory_load`.
+    is_loaded : `bool`
+        Whether the model and tokenizer have been loaded.
 
     # Raises
     
     `ValueError`
-        If `top_n` is 0 or less than -1.
+        If `top_n` is 0 or less than -1, or if `cache_size` or
+        `sub_word_cache_size` are negative.
+
+    `ValueError`
+        If `num_threads` or `num_interop_threads` are less than 1.
+
+    `ValueError`
+        If `quantize` is not `None` or `'dynamic-int8'`, or if `quantize` is
+        set and the `device` is not `'cpu'`.
+
+    `ValueError`
+        If `dtype` is not `None`, `'float32'`, `'float16'`, or `'bfloat16'`, if
+        `autocast` is `True` and `dtype` is `None`, or if `quantize` is set and
+        `dtype` is not `None` or `'float32'`.
 
     # Examples
     ``` python
@@ -97,26 +1365,372 @@ class NeuralTagger():
                  pretrained_model_name_or_path: str | Path,
                  top_n: int = -1,
                  device: str = 'cpu',
-                 tokenizer_kwargs: dict[str, Any] | None = None) -> None:
+                 tokenizer_kwargs: dict[str, Any] | None = None,
+                 cache_size: int = 0,
+                 cache_path: str | Path | None = None,
+                 quantize: str | None = None,
+                 dtype: str | None = None,
+                 autocast: bool = False,
+                 compile_model: bool = False,
+                 compile_cache_path: str | Path | None = None,
+                 sub_word_cache_size: int = 0,
+                 lazy_load: bool = False,
+                 num_threads: Optional[int] = None,
+                 num_interop_threads: Optional[int] = None,
+                 warm_up_on_load: bool = False,
+                 low_memory_load: bool = False) -> None:
         
         if top_n == 0 or top_n < -1:
             raise ValueError(f"The top_n argument cannot be {top_n}, has to be either "
                              "-1 or a positive integer > 0.")
+        if cache_size < 0:
+            raise ValueError(f'The `cache_size` cannot be negative: {cache_size}')
+        if sub_word_cache_size < 0:
+            raise ValueError(f'The `sub_word_cache_size` cannot be negative: {sub_word_cache_size}')
+        if quantize not in (None, 'dynamic-int8'):
+            raise ValueError('The `quantize` argument has to be either `None` or '
+                             f'`dynamic-int8` and not `{quantize}`')
+        autocast_dtype = torch_dtype(dtype) if dtype is not None else None
+        if autocast and autocast_dtype is None:
+            raise ValueError('The `dtype` has to be set when `autocast` is `True`')
+        if quantize is not None and dtype not in (None, 'float32'):
+            raise ValueError('The model can only be quantized at the `float32` '
+                             f'precision and not `{dtype}`')
+        for argument_name, argument_value in [('num_threads', num_threads),
+                                              ('num_interop_threads', num_interop_threads)]:
+            if argument_value is not None and argument_value < 1:
+                raise ValueError(f'The `{argument_name}` argument has to be at least 1 '
+                                 f'and not {argument_value}')
 
-        self.wsd_model = BEM.from_pretrained(pretrained_model_name_or_path)
+        self._pretrained_model_name_or_path = pretrained_model_name_or_path
         if tokenizer_kwargs is None:
             tokenizer_kwargs = {}
-        tokenizer = AutoTokenizer.from_pretrained(pretrained_model_name_or_path,  # type: ignore
-                                                  **tokenizer_kwargs)
-        assert isinstance(tokenizer, PreTrainedTokenizerBase)
-        self.tokenizer = tokenizer
+        self._tokenizer_kwargs = tokenizer_kwargs
+        self._sub_word_cache_size = sub_word_cache_size
+        self.sub_word_cache: Optional[SubWordCache] = None
         self.top_n = top_n
         self.device = torch.device(device)
-        self.wsd_model.to(self.device)
-        self.wsd_model.eval()
+        self.quantize = quantize
+        self.dtype = dtype
+        self.autocast = autocast
+        self._autocast_dtype = autocast_dtype if autocast else None
+        self.compile_model = compile_model
+        self.compile_cache_path = Path(compile_cache_path) if compile_cache_path is not None else None
+        self._label_embeddings: Optional[torch.Tensor] = None
+        self._text_encoder: Optional[TextEncoder] = None
+        self._compiled_shapes: Set[Tuple[int, ...]] = set()
+        self._wsd_model: Optional[BEM] = None
+        self._tokenizer: Optional[PreTrainedTokenizerBase] = None
+        self._load_lock = threading.Lock()
+        self.num_threads = num_threads
+        self.num_interop_threads = num_interop_threads
+        self.warm_up_on_load = warm_up_on_load
+        self.low_memory_load = low_memory_load
+        self.lazy_load = lazy_load
+        if not lazy_load:
+            self.load()
+
+        self.cache: Optional[LRUCache[bytes, List[List[str]]]] = None
+        if cache_size:
+            self.cache = LRUCache(cache_size)
+        self.persistent_cache: Optional[SQLiteCache] = None
+        if cache_path is not None:
+            self.persistent_cache = SQLiteCache(cache_path)
+        # Found on the first cache lookup, see `model_identity`, as for a
+        # model on the HuggingFace Hub it downloads the model's `config.json`.
+        self._model_identity: Optional[List[str]] = None
+
+    @property
+    def model_identity(self) -> List[str]:
+        '''
+        The identity of the model and of the arguments that change its
+        predicted tags, used within the cache keys. It is found when first
+        used rather than when the tagger is created, so that a tagger created
+        with `lazy_load` does not download anything. The in memory cache only
+        lasts as long as the model is loaded, whereas the persistent cache has
+        to distinguish between versions of the model, see
+        :func:`wsd_model_identity`.
+        '''
+        if self._model_identity is None:
+            pretrained_model_name_or_path = self._pretrained_model_name_or_path
+            model_identity = str(pretrained_model_name_or_path)
+            if self.persistent_cache is not None:
+                model_identity = wsd_model_identity(pretrained_model_name_or_path)
+            elif Path(pretrained_model_name_or_path).exists():
+                model_identity = str(Path(pretrained_model_name_or_path).resolve())
+            self._model_identity = [model_identity, repr(sorted(self._tokenizer_kwargs.items())),
+                                    str(self.quantize), str(self.dtype), str(self.autocast)]
+        return self._model_identity
+
+    def _load_model(self) -> None:
+        '''
+        Sets the number of PyTorch threads, loads the model, with low memory
+        if `low_memory_load` is `True`, and tokenizer from
+        `pretrained_model_name_or_path`, and converts the model as set by
+        `device`, `quantize`, `dtype`, `autocast`, and `compile_model`. The
+        model is assigned last so that other threads only see a fully loaded
+        model, after which the tagger is warmed up if `warm_up_on_load` is
+        `True`.
+        '''
+        set_torch_threads(self.num_threads, self.num_interop_threads)
+        wsd_model = load_wsd_model(self._pretrained_model_name_or_path, self.low_memory_load)
+        tokenizer = AutoTokenizer.from_pretrained(self._pretrained_model_name_or_path,  # type: ignore
+                                                  **self._tokenizer_kwargs)
+        assert isinstance(tokenizer, PreTrainedTokenizerBase)
+        self._tokenizer = tokenizer
+        if self._sub_word_cache_size:
+            self.sub_word_cache = SubWordCache(tokenizer, self._sub_word_cache_size)
+        wsd_model.to(self.device)
+        wsd_model.eval()
+        quantize_wsd_model(wsd_model, self.quantize)
+        if not self.autocast:
+            cast_wsd_model(wsd_model, self.dtype)
+        # The label definition embeddings never change, they are arranged
+        # once for all calls, see `label_embedding_matrix`.
+        if wsd_model.label_definition_embeddings is not None:
+            self._label_embeddings = label_embedding_matrix(wsd_model)
+        if self.compile_model:
+            self._load_compile_cache()
+            self._text_encoder = compile_text_encoder(wsd_model)
+        self._wsd_model = wsd_model
+        if self.warm_up_on_load:
+            self.warm_up()
+
+    def load(self) -> None:
+        '''
+        Loads the model and tokenizer if they have not been loaded yet, this
+        is only required when `lazy_load` is `True` as the model is otherwise
+        loaded when the tagger is created. It is thread safe, the model is
+        only loaded once when many threads call it at the same time.
+        '''
+        if self._wsd_model is not None:
+            return
+        with self._load_lock:
+            if self._wsd_model is None:
+                self._load_model()
+
+    @property
+    def is_loaded(self) -> bool:
+        '''
+        Whether the model and tokenizer have been loaded.
+        '''
+        return self._wsd_model is not None
+
+    @property
+    def wsd_model(self) -> BEM:
+        self.load()
+        return cast(BEM, self._wsd_model)
+
+    @wsd_model.setter
+    def wsd_model(self, wsd_model: BEM) -> None:
+        self._wsd_model = wsd_model
+
+    @property
+    def tokenizer(self) -> PreTrainedTokenizerBase:
+        self.load()
+        return cast(PreTrainedTokenizerBase, self._tokenizer)
 
     @torch.inference_mode(mode=True)
-    def __call__(self, tokens: List[str]
+    def warm_up(self, tokens: Optional[List[str]] = None) -> None:
+        '''
+        Loads the model, see :func:`load`, and tags the `tokens` so that the
+        first call to the tagger does not pay the cost of loading the
+        model, nor of the first forward pass, e.g. for latency sensitive
+        services. The caches are not used nor modified.
+
+        # Parameters
+
+        tokens : `List[str]`, optional (default = `None`)
+            The tokens to tag. If `None` the tokens `['Warm', 'up']` are
+            tagged.
+        '''
+        if tokens is None:
+            tokens = ['Warm', 'up']
+        self._predict_tags([tokens], 4096)
+
+    def clear_cache(self) -> None:
+        '''
+        Removes all of the predicted tags from the in memory and persistent
+        caches, this should be called if the model has changed since the
+        persistent cache was created. Does nothing if the tagger has no cache.
+        '''
+        if self.cache is not None:
+            self.cache.clear()
+        if self.persistent_cache is not None:
+            self.persistent_cache.clear()
+
+    def _load_compile_cache(self) -> None:
+        '''
+        Loads the compiled artifacts from `compile_cache_path`, if it exists.
+        '''
+        if self.compile_cache_path is None or not self.compile_cache_path.exists():
+            return
+        if not hasattr(torch.compiler, 'load_cache_artifacts'):
+            warnings.warn('Loading the compiled artifacts requires PyTorch 2.7 or '
+                          f'later, the file {self.compile_cache_path} is not loaded.')
+            return
+        try:
+            torch.compiler.load_cache_artifacts(self.compile_cache_path.read_bytes())
+        except Exception as error:
+            warnings.warn('Unable to load the compiled artifacts from '
+                          f'{self.compile_cache_path}: {error}')
+
+    def _save_compile_cache(self) -> None:
+        '''
+        Saves all of the compiled artifacts of this process to
+        `compile_cache_path`, if it is not `None`. The artifacts are written
+        to a temporary file that then replaces `compile_cache_path`, so that
+        other processes never load a partially written file.
+        '''
+        if self.compile_cache_path is None or not hasattr(torch.compiler, 'save_cache_artifacts'):
+            return
+        compiled_artifacts = torch.compiler.save_cache_artifacts()
+        if compiled_artifacts is None:
+            return
+        self.compile_cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.compile_cache_path.parent,
+                                         prefix=f'{self.compile_cache_path.name}.',
+                                         suffix='.tmp', delete=False) as temporary_file:
+            temporary_file.write(compiled_artifacts[0])
+        try:
+            os.replace(temporary_file.name, self.compile_cache_path)
+        except OSError:
+            os.remove(temporary_file.name)
+            raise
+
+    def _compiled_text_encoding(self, sub_word_ids: torch.Tensor,
+                                attention_mask: torch.Tensor) -> torch.Tensor:
+        '''
+        Encodes the batch using the compiled text encoder, the compiled
+        artifacts are saved when the encoder is compiled for a new shape.
+        '''
+        assert self._text_encoder is not None
+        text_encodings = self._text_encoder(sub_word_ids, attention_mask)
+        shape = tuple(sub_word_ids.shape)
+        if shape not in self._compiled_shapes:
+            self._compiled_shapes.add(shape)
+            self._save_compile_cache()
+        return text_encodings
+
+    def _predict_tags(self, sentences: List[List[str]],
+                      max_tokens_per_batch: int,
+                      candidate_tags: Optional[List[List[Optional[List[str]]]]] = None
+                      ) -> List[List[List[str]]]:
+        '''
+        Returns the `top_n` predicted tags of each token in each sentence,
+        see :func:`predict_tags`, using the compiled model if the model has
+        been compiled, if the model cannot be compiled the uncompiled model
+        is used from then on. Errors that are not from compiling the model,
+        e.g. running out of memory, are raised.
+        '''
+        self.load()
+        if self._text_encoder is not None:
+            # Imported here as `torch._dynamo` has already been imported by
+            # `torch.compile`.
+            from torch._dynamo.exc import TorchDynamoException
+            try:
+                return predict_tags(self.wsd_model, self.tokenizer, sentences, self.top_n,
+                                    max_tokens_per_batch, self._autocast_dtype,
+                                    self._compiled_text_encoding, bucket_shapes=True,
+                                    label_embeddings=self._label_embeddings,
+                                    sub_word_cache=self.sub_word_cache,
+                                    candidate_tags=candidate_tags)
+            except TorchDynamoException as error:
+                warnings.warn('The neural model cannot be compiled, the uncompiled '
+                              f'model is used instead: {error}')
+                self._text_encoder = None
+        return predict_tags(self.wsd_model, self.tokenizer, sentences, self.top_n,
+                            max_tokens_per_batch, self._autocast_dtype,
+                            label_embeddings=self._label_embeddings,
+                            sub_word_cache=self.sub_word_cache,
+                            candidate_tags=candidate_tags)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # The compiled text encoder and the lock cannot be pickled, they are
+        # created again when unpickled.
+        state = self.__dict__.copy()
+        state['_text_encoder'] = None
+        state['_compiled_shapes'] = set()
+        del state['_load_lock']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._load_lock = threading.Lock()
+        if self.compile_model and self._wsd_model is not None:
+            self._load_compile_cache()
+            self._text_encoder = compile_text_encoder(self._wsd_model)
+
+    def _predict(self, sentences: List[List[str]],
+                 max_tokens_per_batch: int = 4096,
+                 candidate_tags: Optional[List[List[Optional[List[str]]]]] = None
+                 ) -> List[List[List[str]]]:
+        '''
+        Returns the `top_n` predicted tags of each token in each sentence,
+        see :func:`predict_tags`, the tags are taken from the caches when
+        possible and only the sentences that are not in the caches are given
+        to the model.
+        '''
+        if candidate_tags is not None:
+            validate_candidate_tags(sentences, candidate_tags)
+        if self.cache is None and self.persistent_cache is None:
+            return self._predict_tags(sentences, max_tokens_per_batch, candidate_tags)
+
+        predicted_tags: List[Optional[List[List[str]]]] = []
+        if candidate_tags is None:
+            cache_keys = [sequences_hash(self.model_identity, [str(self.top_n)], tokens)
+                          for tokens in sentences]
+        else:
+            # The candidate tags change the predicted tags, therefore they
+            # are part of the cache key.
+            cache_keys = [sequences_hash(self.model_identity, [str(self.top_n)], tokens,
+                                         [repr(sentence_candidate_tags)])
+                          for tokens, sentence_candidate_tags in zip(sentences, candidate_tags)]
+        persistent_cache_hits: List[Tuple[bytes, List[List[str]]]] = []
+        for cache_key in cache_keys:
+            cached_tags: Optional[List[List[str]]] = None
+            if self.cache is not None:
+                cached_tags = self.cache.get(cache_key)
+            if cached_tags is None and self.persistent_cache is not None:
+                cached_tags = self.persistent_cache.get(cache_key)
+                if cached_tags is not None and self.cache is not None:
+                    persistent_cache_hits.append((cache_key, cached_tags))
+            predicted_tags.append(cached_tags)
+        for cache_key, cached_tags in persistent_cache_hits:
+            assert self.cache is not None
+            self.cache.put(cache_key, cached_tags)
+
+        # The same sentence is only predicted once.
+        uncached_sentences: Dict[bytes, int] = {}
+        for sentence_index, (cache_key, sentence_predicted_tags) in enumerate(zip(cache_keys, predicted_tags)):
+            if sentence_predicted_tags is None:
+                uncached_sentences[cache_key] = sentence_index
+        if uncached_sentences:
+            uncached_candidate_tags = None
+            if candidate_tags is not None:
+                uncached_candidate_tags = [candidate_tags[sentence_index]
+                                           for sentence_index in uncached_sentences.values()]
+            uncached_predicted_tags = dict(zip(uncached_sentences.keys(),
+                                               self._predict_tags([sentences[sentence_index]
+                                                                   for sentence_index in uncached_sentences.values()],
+                                                                  max_tokens_per_batch,
+                                                                  uncached_candidate_tags)))
+            if self.cache is not None:
+                for cache_key, sentence_predicted_tags in uncached_predicted_tags.items():
+                    self.cache.put(cache_key, sentence_predicted_tags)
+            if self.persistent_cache is not None:
+                self.persistent_cache.put_many(uncached_predicted_tags.items())
+            predicted_tags = [uncached_predicted_tags[cache_key] if sentence_predicted_tags is None
+                              else sentence_predicted_tags
+                              for cache_key, sentence_predicted_tags in zip(cache_keys, predicted_tags)]
+
+        # Copies so that modifying the returned tags does not modify the cache.
+        return [[list(tags) for tags in cast(List[List[str]], sentence_predicted_tags)]
+                for sentence_predicted_tags in predicted_tags]
+
+    @torch.inference_mode(mode=True)
+    def __call__(self, tokens: List[str],
+                 candidate_tags: Optional[List[Optional[List[str]]]] = None
                  ) -> List[Tuple[List[str], List[Tuple[int, int]]]]:
         '''
         Given a `List` of tokens it returns for each token:
@@ -131,11 +1745,21 @@ class NeuralTagger():
         NOTE: we recommend that the number of tokens in the list should represent
         a sentence, in addition the more tokens in the list the more
         memory the model requires and on CPU at least the more time it will
-        take to predict the tags.
+        take to predict the tags. To tag many sentences use :func:`tag_batch`
+        which is considerably faster.
+
+        If the tagger has a `cache` or `persistent_cache` and the `tokens` have
+        been tagged before the tags are returned from the cache.
 
         NOTE: Currently the Neural Tagger is limited to only tagging single word
         expressions.
 
+        If `candidate_tags` are given the tags of a token are only chosen from
+        its candidate tags, e.g. the tags a lexicon lists for the token,
+        which is less work than ranking all of the tags, see
+        :func:`predict_tags`. A token whose candidate tags are `None`, or
+        are all unknown to the model, is ranked against all of the tags.
+
         This function is wrapped in a
         [`torch.inference_model`](https://docs.pytorch.org/docs/stable/generated/torch.autograd.grad_mode.inference_mode.html)
         decorator which makes the model run more efficiently.
@@ -144,6 +1768,9 @@ class NeuralTagger():
 
         tokens : `List[str]`
             A List of full text form of the tokens to be tagged.
+        candidate_tags : `List[Optional[List[str]]]`, optional (default = `None`)
+            The candidate tags of each token, `None` for a token that can be
+            any tag. If `None` all tokens can be any tag.
  
         # Returns
 
@@ -152,19 +1779,106 @@ class NeuralTagger():
         # Raises
 
         `ValueError`
-            If the number of tokens given is not the same as the number of tags
-            predicted/returned.
+            If `candidate_tags` is given and it is not the same length as
+            `tokens`.
         '''
 
-        predicted_tags_candidates = self.wsd_model.predict(tokens, sub_word_tokenizer=self.tokenizer, top_n=self.top_n)
-        
-        tags_indexes: List[Tuple[List[str], List[Tuple[int, int]]]] = []
+        predicted_tags = self._predict([tokens], candidate_tags=None if candidate_tags is None
+                                       else [candidate_tags])[0]
+        return self._tags_indexes(tokens, predicted_tags)
+
+    @torch.inference_mode(mode=True)
+    def tag_batch(self, sentences: Iterable[List[str]],
+                  max_tokens_per_batch: int = 4096,
+                  candidate_tags: Optional[List[List[Optional[List[str]]]]] = None
+                  ) -> List[List[Tuple[List[str], List[Tuple[int, int]]]]]:
+        '''
+        Returns the same output as :func:`__call__` for each sentence, in the
+        same order as the given `sentences`, but many sentences are tagged in
+        one forward pass of the model, which is a lot faster than tagging one
+        sentence at a time.
+
+        To minimise the amount of padding the sentences are sorted by their
+        number of sub-word tokens before being split into batches, the size
+        of a batch is limited by `max_tokens_per_batch`, which is the
+        maximum number of sub-word tokens within a batch including padding,
+        i.e. the number of sentences in the batch multiplied by the number of
+        sub-word tokens in the longest sentence of the batch. A sentence that
+        is longer than `max_tokens_per_batch` is tagged in a batch by itself.
+
+        This function is wrapped in a
+        [`torch.inference_model`](https://docs.pytorch.org/docs/stable/generated/torch.autograd.grad_mode.inference_mode.html)
+        decorator which makes the model run more efficiently.
+
+        # Parameters
+
+        sentences : `Iterable[List[str]]`
+            The sentences to tag, each sentence is a `List` of the full text
+            form of the tokens to be tagged.
+        max_tokens_per_batch : `int`, optional (default = `4096`)
+            The maximum number of sub-word tokens, including padding, within
+            a batch. The larger the value the more memory is required.
+        candidate_tags : `List[List[Optional[List[str]]]]`, optional (default = `None`)
+            The candidate tags of each token in each sentence, see
+            :func:`__call__`.
+
+        # Returns
 
-        for token_index, predicted_tag_candidates in enumerate(predicted_tags_candidates):
+        `List[List[Tuple[List[str], List[Tuple[int, int]]]]]`
+
+        # Raises
+
+        `ValueError`
+            If `max_tokens_per_batch` is less than 1.
+
+        `ValueError`
+            If `candidate_tags` is given and it is not the same shape as
+            `sentences`.
+        '''
+        if max_tokens_per_batch < 1:
+            raise ValueError('The `max_tokens_per_batch` has to be at least 1 '
+                             f'and not {max_tokens_per_batch}')
+        sentences = list(sentences)
+        predicted_tags = self._predict(sentences, max_tokens_per_batch, candidate_tags)
+        return [self._tags_indexes(tokens, sentence_predicted_tags)
+                for tokens, sentence_predicted_tags in zip(sentences, predicted_tags)]
+
+    @staticmethod
+    def _tags_indexes(tokens: List[str], predicted_tags: List[List[str]]
+                      ) -> List[Tuple[List[str], List[Tuple[int, int]]]]:
+        '''
+        Converts the predicted tags of each token into the output format of
+        :func:`__call__`, whitespace tokens are assigned the `Z9` tag.
+        '''
+        tags_indexes: List[Tuple[List[str], List[Tuple[int, int]]]] = []
+        for token_index, predicted_tag_candidates in enumerate(predicted_tags):
             start_end_index = [(token_index, token_index + 1)]
             assigned_tags = predicted_tag_candidates
             if tokens[token_index].strip() == "":
                 assigned_tags = ["Z9"]
             tags_indexes.append((assigned_tags, start_end_index))
-        
         return tags_indexes
+
+    def tag_columnar(self, tokens: List[str],
+                     vocabulary: Optional[TagSequenceVocabulary] = None
+                     ) -> ColumnarTags:
+        '''
+        Returns the same output as :func:`__call__` but as a
+        :class:`pymusas.taggers.columnar.ColumnarTags`, which requires
+        considerably less memory to store, e.g. when storing the tags of a
+        large corpus.
+
+        # Parameters
+
+        tokens : `List[str]`
+            A List of full text form of the tokens to be tagged.
+        vocabulary : `pymusas.taggers.columnar.TagSequenceVocabulary`, optional (default = `None`)
+            The vocabulary to store the tag sequences in, share the same
+            vocabulary across calls so that each unique tag sequence is only
+            stored once. If `None` a new vocabulary is created.
+
+        # Returns
+
+        :class:`pymusas.taggers.columnar.ColumnarTags`
+        '''
+        return ColumnarTags.from_tags_indexes(self(tokens), vocabulary)
@@ -1,6 +1,9 @@
-from typing import List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Iterator, List, Optional, Set, Tuple
 
-from pymusas.rankers.lexicon_entry import LexiconEntryRanker, RankingMetaData
+from pymusas.cache import LRUCache, sequences_hash
+from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker, LexiconEntryRanker, RankingMetaData
+from pymusas.taggers.columnar import ColumnarTags, TagSequenceVocabulary
 from pymusas.taggers.rules.rule import Rule
 
 
@@ -39,6 +42,12 @@ class RuleBasedTagger():
     default_number_tags : `Set[str]`, optional (default = `None`)
         The POS tags that represent numbers. If `None` then we will use
         the `Set`: `set(['num'])`.
+    cache_size : `int`, optional (default = `0`)
+        The maximum number of sentences whose tags are stored in a
+        :class:`pymusas.cache.LRUCache`, so that a sentence that has already
+        been tagged, e.g. boilerplate text, is not tagged again. The cache key
+        is a hash of the `tokens`, `lemmas`, and `pos_tags` given to
+        :func:`__call__`. If `0` no cache is used.
     
     # Instance Attributes
 
@@ -50,6 +59,22 @@ class RuleBasedTagger():
         The given `default_punctuation_tags`
     default_number_tags : `Set[str]`
         The given `default_number_tags`
+    cache : `pymusas.cache.LRUCache`, optional (default = `None`)
+        The sentence cache, `None` if `cache_size` is `0`. The cache hit rate
+        can be found through `cache.hit_rate`. The cache is cleared when any
+        of the `rules`, `ranker`, `default_punctuation_tags`, or
+        `default_number_tags` attributes are re-assigned, if a rule or the
+        ranker is modified in place call :func:`clear_cache`.
+
+    **Note** the tagger can be called from multiple threads at the same time,
+    see :func:`tag_sentences`, as tagging only reads from the `rules` and
+    `ranker`, but the `rules` and `ranker` should not be modified while
+    tagging.
+
+    # Raises
+
+    `ValueError`
+        If `cache_size` is negative.
 
     # Examples
     ``` python
@@ -71,7 +96,8 @@ class RuleBasedTagger():
 
     def __init__(self, rules: List[Rule], ranker: LexiconEntryRanker,
                  default_punctuation_tags: Optional[Set[str]] = None,
-                 default_number_tags: Optional[Set[str]] = None) -> None:
+                 default_number_tags: Optional[Set[str]] = None,
+                 cache_size: int = 0) -> None:
 
         self.rules = rules
         self.ranker = ranker
@@ -84,6 +110,36 @@ class RuleBasedTagger():
         if default_number_tags is not None:
             self.default_number_tags = default_number_tags
 
+        if cache_size < 0:
+            raise ValueError(f'The `cache_size` cannot be negative: {cache_size}')
+        self.cache: Optional[LRUCache[bytes, List[Tuple[List[str], List[Tuple[int, int]]]]]] = None
+        if cache_size:
+            self.cache = LRUCache(cache_size)
+        self._cache_state: Optional[Tuple[Any, ...]] = None
+
+    def clear_cache(self) -> None:
+        '''
+        Removes all of the sentences from the cache, this should be called if
+        any of the `rules` or the `ranker` are modified in place, e.g. a
+        lexicon entry is added to a rule's lexicon. Does nothing if the
+        tagger has no cache.
+        '''
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _check_cache_state(self) -> None:
+        '''
+        Clears the cache if any of the `rules`, `ranker`,
+        `default_punctuation_tags`, or `default_number_tags` have changed
+        since the cache was last used.
+        '''
+        cache_state = updated_cache_state(self._cache_state, self.rules, self.ranker,
+                                          self.default_punctuation_tags,
+                                          self.default_number_tags)
+        if cache_state is not None:
+            self.clear_cache()
+            self._cache_state = cache_state
+
     def __call__(self, tokens: List[str], lemmas: List[str],
                  pos_tags: List[str]) -> List[Tuple[List[str],
                                                     List[Tuple[int, int]]
@@ -105,6 +161,9 @@ class RuleBasedTagger():
         **NOTE** this tagger has been designed to be flexible with the amount of
         resources available, if you do not have POS or lemma information assign
         them a `List` of empty strings.
+
+        If the tagger has a `cache` and the `tokens`, `lemmas`, and `pos_tags`
+        have been tagged before, the tags are returned from the `cache`.
         
         # Parameters
 
@@ -125,7 +184,33 @@ class RuleBasedTagger():
             If the length of the `tokens`, `lemmas`, and `pos_tags` are not of
             the same length.
         '''
+        self._check_lengths(tokens, lemmas, pos_tags)
+
+        cache_key = b''
+        if self.cache is not None:
+            self._check_cache_state()
+            cache_key = sequences_hash(tokens, lemmas, pos_tags)
+            cached_tags_indexes = self.cache.get(cache_key)
+            if cached_tags_indexes is not None:
+                return [(list(tags), list(indexes))
+                        for tags, indexes in cached_tags_indexes]
+
+        tags_indexes = best_ranks_to_tags_indexes(self._best_ranks(tokens, lemmas, pos_tags), pos_tags,
+                                                  self.default_punctuation_tags,
+                                                  self.default_number_tags)
+
+        if self.cache is not None:
+            self.cache.put(cache_key, [(list(tags), list(indexes))
+                                       for tags, indexes in tags_indexes])
+        
+        return tags_indexes
 
+    def _check_lengths(self, tokens: List[str], lemmas: List[str],
+                       pos_tags: List[str]) -> None:
+        '''
+        Raises a `ValueError` if the `tokens`, `lemmas`, and `pos_tags` are
+        not of the same length.
+        '''
         tokens_length = len(tokens)
         pos_tags_length = len(pos_tags)
         lemmas_length = len(lemmas)
@@ -134,7 +219,13 @@ class RuleBasedTagger():
                             f' {tokens_length}, {pos_tags_length}, {lemmas_length}')
         if (tokens_length != pos_tags_length) or (tokens_length != lemmas_length):
             raise ValueError(length_error_msg)
-            
+
+    def _best_ranks(self, tokens: List[str], lemmas: List[str],
+                    pos_tags: List[str]) -> List[Optional[RankingMetaData]]:
+        '''
+        Applies the rules to the tokens and returns the best ranked rule
+        match of each token, `None` if the token has no match.
+        '''
         token_ranking_meta_data: List[List[RankingMetaData]] \
             = [[] for _ in range(len(tokens))]
         for rule in self.rules:
@@ -142,25 +233,371 @@ class RuleBasedTagger():
             for token_index, ranking_meta_data in enumerate(rule_ranking_meta_data):
                 token_ranking_meta_data[token_index].extend(ranking_meta_data)
 
-        token_ranks, token_best_rank = self.ranker(token_ranking_meta_data)
-        
-        tags_indexes: List[Tuple[List[str], List[Tuple[int, int]]]] = []
-        for token_index, best_rank in enumerate(token_best_rank):
+        _, token_best_rank = self.ranker(token_ranking_meta_data)
+        return token_best_rank
+
+    def tag_columnar(self, tokens: List[str], lemmas: List[str],
+                     pos_tags: List[str],
+                     vocabulary: Optional[TagSequenceVocabulary] = None
+                     ) -> ColumnarTags:
+        '''
+        Returns the same output as :func:`__call__` but as a
+        :class:`pymusas.taggers.columnar.ColumnarTags`, which requires
+        considerably less memory to store, e.g. when storing the tags of a
+        large corpus.
+
+        The columns are created directly from the best ranked rule match of
+        each token, without creating the `List` of tags and `List` of MWE
+        indexes of each token. If the tagger has a `cache`, or is a sub class
+        that changes :func:`__call__`, e.g. the
+        :class:`pymusas.taggers.hybrid.HybridTagger`, the columns are created
+        from the output of :func:`__call__`.
+
+        # Parameters
+
+        tokens : `List[str]`
+            A List of full text form of the tokens to be tagged.
+        lemmas : `List[str]`
+            The List of lemma/base form of the tokens to be tagged.
+        pos_tags : `List[str]`
+            The List of POS tags of the tokens to be tagged.
+        vocabulary : `pymusas.taggers.columnar.TagSequenceVocabulary`, optional (default = `None`)
+            The vocabulary to store the tag sequences in, share the same
+            vocabulary across calls so that each unique tag sequence is only
+            stored once. If `None` a new vocabulary is created.
+
+        # Returns
+
+        :class:`pymusas.taggers.columnar.ColumnarTags`
+
+        # Raises
+
+        `ValueError`
+            If the length of the `tokens`, `lemmas`, and `pos_tags` are not of
+            the same length.
+
+        # Examples
+        ``` python
+        >>> from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker
+        >>> from pymusas.taggers.columnar import TagSequenceVocabulary
+        >>> from pymusas.taggers.rule_based import RuleBasedTagger
+        >>> from pymusas.taggers.rules.single_word import SingleWordRule
+        >>> rules = [SingleWordRule({'river|noun': ['W3']}, {})]
+        >>> ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+        >>> tagger = RuleBasedTagger(rules, ranker)
+        >>> vocabulary = TagSequenceVocabulary()
+        >>> columnar_tags = tagger.tag_columnar(['The', 'river'], ['the', 'river'],
+        ...                                    ['det', 'noun'], vocabulary)
+        >>> assert columnar_tags[1] == (['W3'], [(1, 2)])
+        >>> assert columnar_tags.tag_sequence_ids.tolist() == [0, 1]
+        >>> assert vocabulary[0] == ('Z99',)
+
+        ```
+        '''
+        if self.cache is not None or type(self).__call__ is not RuleBasedTagger.__call__:
+            return ColumnarTags.from_tags_indexes(self(tokens, lemmas, pos_tags), vocabulary)
+        self._check_lengths(tokens, lemmas, pos_tags)
+        if vocabulary is None:
+            vocabulary = TagSequenceVocabulary()
+        add_tags = vocabulary.add
+        tag_sequence_ids: List[int] = []
+        start_indexes: List[int] = []
+        end_indexes: List[int] = []
+        for token_index, best_rank in enumerate(self._best_ranks(tokens, lemmas, pos_tags)):
             if best_rank is None:
-                pos_tag = pos_tags[token_index]
-                if pos_tag in self.default_punctuation_tags:
-                    tags_indexes.append((['PUNCT'],
-                                         [(token_index, token_index + 1)]))
-                elif pos_tag in self.default_number_tags:
-                    tags_indexes.append((['N1'],
-                                         [(token_index, token_index + 1)]))
-                else:
-                    tags_indexes.append((['Z99'],
-                                         [(token_index, token_index + 1)]))
+                tag_sequence_ids.append(add_tags((default_tag(pos_tags[token_index],
+                                                              self.default_punctuation_tags,
+                                                              self.default_number_tags),)))
+                start_indexes.append(token_index)
+                end_indexes.append(token_index + 1)
                 continue
-            tags = list(best_rank.semantic_tags)
-            indexes = [(best_rank.token_match_start_index,
-                        best_rank.token_match_end_index)]
-            tags_indexes.append((tags, indexes))
-        
-        return tags_indexes
+            tag_sequence_ids.append(add_tags(best_rank.semantic_tags))
+            start_indexes.append(best_rank.token_match_start_index)
+            end_indexes.append(best_rank.token_match_end_index)
+        return ColumnarTags(tag_sequence_ids, start_indexes, end_indexes, vocabulary)
+
+    def tag_sentences(self, sentences: Iterable[Tuple[List[str], List[str], List[str]]],
+                      num_workers: int = 1
+                      ) -> List[List[Tuple[List[str], List[Tuple[int, int]]]]]:
+        '''
+        Tags each sentence, returning the same output as calling :func:`__call__`
+        on each sentence, in the same order as the given `sentences`.
+
+        If `num_workers` is greater than 1 the sentences are tagged by a thread
+        pool whereby all threads share this tagger, and therefore the same
+        in memory lexicons, so unlike a process pool there is no copying or
+        pickling of the lexicons. On a free-threaded Python build (Python
+        3.13 or above) the tagging scales across the threads, whereas on a
+        standard Python build the Global Interpreter Lock (GIL) allows only one
+        thread to tag at a time, for standard builds a process pool, e.g.
+        :class:`pymusas.taggers.async_tagger.AsyncTagger`, is faster.
+
+        # Parameters
+
+        sentences : `Iterable[Tuple[List[str], List[str], List[str]]]`
+            Each sentence is a `Tuple` of tokens, lemmas, and POS tags, see
+            :func:`__call__`.
+        num_workers : `int`, optional (default = `1`)
+            The number of threads to use. If `1` the sentences are tagged in
+            the calling thread.
+
+        # Returns
+
+        `List[List[Tuple[List[str], List[Tuple[int, int]]]]]`
+
+        # Raises
+
+        `ValueError`
+            If `num_workers` is less than 1, or if the tokens, lemmas, and POS
+            tags of a sentence are not of the same length.
+
+        # Examples
+        ``` python
+        >>> from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker
+        >>> from pymusas.taggers.rule_based import RuleBasedTagger
+        >>> from pymusas.taggers.rules.single_word import SingleWordRule
+        >>> rules = [SingleWordRule({'river|noun': ['W3']}, {})]
+        >>> ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+        >>> tagger = RuleBasedTagger(rules, ranker)
+        >>> sentences = [(['river'], ['river'], ['noun']), (['The'], ['the'], ['det'])]
+        >>> assert tagger.tag_sentences(sentences, num_workers=2) == [
+        ...     [(['W3'], [(0, 1)])], [(['Z99'], [(0, 1)])]]
+
+        ```
+        '''
+        if num_workers < 1:
+            raise ValueError(f'The `num_workers` has to be at least 1 and not {num_workers}')
+        if num_workers == 1:
+            return [self(tokens, lemmas, pos_tags)
+                    for tokens, lemmas, pos_tags in sentences]
+        with ThreadPoolExecutor(num_workers) as executor:
+            return list(executor.map(lambda sentence: self(*sentence), sentences))
+
+    def tag_stream(self, token_stream: Iterable[Tuple[str, str, str]],
+                   chunk_size: int = 100,
+                   lookahead: Optional[int] = None
+                   ) -> Iterator[Tuple[List[str], List[Tuple[int, int]]]]:
+        '''
+        Tags an unsegmented stream of tokens, e.g. a transcript or a log file
+        whereby the sentence boundaries are unknown, incrementally. The output
+        for each token is the same as :func:`__call__` and is yielded in the
+        same order as the tokens in the `token_stream`, the start and end
+        token indexes of each Multi Word Expression (MWE) are relative to the
+        start of the `token_stream`.
+
+        The tokens are buffered and the buffer is tagged once it contains
+        `chunk_size + lookahead` tokens. The tags of a token are only yielded
+        once the token is more than `lookahead` tokens behind the last token
+        in the buffer (the frontier), thus any MWE match that spans the
+        boundary between two chunks is still found. If a yielded token is
+        part of a MWE match that extends into the `lookahead` tokens then all
+        of the tokens in that MWE match are yielded together, so that a MWE
+        match is never split across two chunks. The memory required is
+        therefore bounded by `chunk_size` and `lookahead` rather than the
+        length of the `token_stream`.
+
+        **NOTE** the global lowest ranked match, see
+        :class:`pymusas.rankers.lexicon_entry.LexiconEntryRanker`, is only
+        calculated within the buffer. Therefore in the rare case of a chain of
+        overlapping MWE matches that is longer than the `lookahead` the tags
+        can differ from tagging the whole stream with :func:`__call__`, to
+        reduce the likelihood of this increase the `lookahead`.
+
+        # Parameters
+
+        token_stream : `Iterable[Tuple[str, str, str]]`
+            An iterable of `(token, lemma, POS tag)` tuples. As with
+            :func:`__call__` if you do not have POS or lemma information
+            use empty strings.
+        chunk_size : `int`, optional (default = `100`)
+            The number of tokens to yield, at most, each time the buffer is
+            tagged.
+        lookahead : `int`, optional (default = `None`)
+            The number of tokens after the last yielded token that have to
+            be in the buffer before a token can be yielded. If `None` this is
+            the longest MWE template, in n-gram length, across all of the
+            `rules`, see
+            :func:`pymusas.rankers.lexicon_entry.ContextualRuleBasedRanker.get_construction_arguments`.
+
+        # Returns
+
+        `Iterator[Tuple[List[str], List[Tuple[int, int]]]]`
+
+        # Raises
+
+        `ValueError`
+            If `chunk_size` is less than 1 or `lookahead` is less than 0.
+
+        # Examples
+        ``` python
+        >>> from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker
+        >>> from pymusas.taggers.rule_based import RuleBasedTagger
+        >>> from pymusas.taggers.rules.mwe import MWERule
+        >>> from pymusas.taggers.rules.single_word import SingleWordRule
+        >>> single_word_rule = SingleWordRule({'river|noun': ['W3']}, {})
+        >>> mwe_rule = MWERule({'river_noun bank_noun': ['W3/M4']})
+        >>> rules = [single_word_rule, mwe_rule]
+        >>> ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+        >>> tagger = RuleBasedTagger(rules, ranker)
+        >>> token_stream = [('The', 'the', 'det'), ('river', 'river', 'noun'),
+        ...                 ('bank', 'bank', 'noun'), ('river', 'river', 'noun')]
+        >>> assert list(tagger.tag_stream(token_stream, chunk_size=1)) == [
+        ...     (['Z99'], [(0, 1)]), (['W3/M4'], [(1, 3)]),
+        ...     (['W3/M4'], [(1, 3)]), (['W3'], [(3, 4)])]
+
+        ```
+        '''
+        if chunk_size < 1:
+            raise ValueError(f'The `chunk_size` has to be at least 1 and not {chunk_size}')
+        if lookahead is None:
+            lookahead, _ = ContextualRuleBasedRanker.get_construction_arguments(self.rules)
+        if lookahead < 0:
+            raise ValueError(f'The `lookahead` cannot be negative: {lookahead}')
+
+        def offset_tags_indexes(tags_indexes: List[Tuple[List[str], List[Tuple[int, int]]]],
+                                offset: int
+                                ) -> Iterator[Tuple[List[str], List[Tuple[int, int]]]]:
+            for tags, indexes in tags_indexes:
+                yield tags, [(start + offset, end + offset) for start, end in indexes]
+
+        tokens: List[str] = []
+        lemmas: List[str] = []
+        pos_tags: List[str] = []
+        # The index of the first token in the buffer relative to the start of
+        # the token stream.
+        offset = 0
+        buffer_limit = chunk_size + lookahead
+        for token, lemma, pos_tag in token_stream:
+            tokens.append(token)
+            lemmas.append(lemma)
+            pos_tags.append(pos_tag)
+            if len(tokens) < buffer_limit:
+                continue
+
+            tags_indexes = self(tokens, lemmas, pos_tags)
+            # Extend the tokens to yield so that no MWE match is split between
+            # the yielded tokens and the tokens that remain in the buffer.
+            number_tokens_to_yield = chunk_size
+            token_index = 0
+            while token_index < number_tokens_to_yield:
+                for _, end_index in tags_indexes[token_index][1]:
+                    if end_index > number_tokens_to_yield:
+                        number_tokens_to_yield = end_index
+                token_index += 1
+
+            yield from offset_tags_indexes(tags_indexes[:number_tokens_to_yield], offset)
+            offset += number_tokens_to_yield
+            del tokens[:number_tokens_to_yield]
+            del lemmas[:number_tokens_to_yield]
+            del pos_tags[:number_tokens_to_yield]
+
+        if tokens:
+            yield from offset_tags_indexes(self(tokens, lemmas, pos_tags), offset)
+
+
+def updated_cache_state(cache_state: Optional[Tuple[Any, ...]], rules: List[Rule],
+                        ranker: LexiconEntryRanker, default_punctuation_tags: Set[str],
+                        default_number_tags: Set[str]) -> Optional[Tuple[Any, ...]]:
+    '''
+    Returns the new cache state of a rule based tagger if any of its `rules`,
+    `ranker`, `default_punctuation_tags`, or `default_number_tags` have
+    changed since the `cache_state` was created, in which case the tagger's
+    cache is out of date and should be cleared, otherwise `None`. The rules
+    and ranker are compared by identity, therefore changes to them in place
+    are not detected.
+
+    # Parameters
+
+    cache_state : `Tuple[Any, ...]`, optional
+        The cache state returned by the previous call, `None` if there is
+        no previous call.
+    rules : `List[pymusas.taggers.rules.rule.Rule]`
+        The rules of the tagger.
+    ranker : `pymusas.rankers.lexicon_entry.LexiconEntryRanker`
+        The ranker of the tagger.
+    default_punctuation_tags : `Set[str]`
+        The POS tags that represent punctuation.
+    default_number_tags : `Set[str]`
+        The POS tags that represent numbers.
+
+    # Returns
+
+    `Tuple[Any, ...] | None`
+    '''
+    new_cache_state = (tuple(id(rule) for rule in rules), id(ranker),
+                       frozenset(default_punctuation_tags),
+                       frozenset(default_number_tags),
+                       # Keeps a reference to the objects so that their id
+                       # cannot be re-used by a new object.
+                       tuple(rules), ranker)
+    if cache_state is None or new_cache_state[:4] != cache_state[:4]:
+        return new_cache_state
+    return None
+
+
+def default_tag(pos_tag: str, default_punctuation_tags: Set[str],
+                default_number_tags: Set[str]) -> str:
+    '''
+    Returns the tag of a token that no rule matches given its POS tag,
+    `PUNCT` if the POS tag is in `default_punctuation_tags`, `N1` if it is in
+    `default_number_tags`, otherwise `Z99`.
+
+    # Parameters
+
+    pos_tag : `str`
+        The POS tag of the token.
+    default_punctuation_tags : `Set[str]`
+        The POS tags that represent punctuation.
+    default_number_tags : `Set[str]`
+        The POS tags that represent numbers.
+
+    # Returns
+
+    `str`
+    '''
+    if pos_tag in default_punctuation_tags:
+        return 'PUNCT'
+    if pos_tag in default_number_tags:
+        return 'N1'
+    return 'Z99'
+
+
+def best_ranks_to_tags_indexes(token_best_ranks: List[Optional[RankingMetaData]],
+                               pos_tags: List[str], default_punctuation_tags: Set[str],
+                               default_number_tags: Set[str]
+                               ) -> List[Tuple[List[str], List[Tuple[int, int]]]]:
+    '''
+    Returns the tags and Multi Word Expression (MWE) indexes of each token,
+    as returned by :func:`RuleBasedTagger.__call__`, given the best ranked
+    rule match of each token, as returned by a
+    :class:`pymusas.rankers.lexicon_entry.LexiconEntryRanker`. A token
+    without a match is tagged by :func:`default_tag`.
+
+    # Parameters
+
+    token_best_ranks : `List[Optional[RankingMetaData]]`
+        The best ranked rule match of each token, `None` if the token has no
+        match.
+    pos_tags : `List[str]`
+        The POS tag of each token.
+    default_punctuation_tags : `Set[str]`
+        The POS tags that represent punctuation.
+    default_number_tags : `Set[str]`
+        The POS tags that represent numbers.
+
+    # Returns
+
+    `List[Tuple[List[str], List[Tuple[int, int]]]]`
+    '''
+    tags_indexes: List[Tuple[List[str], List[Tuple[int, int]]]] = []
+    for token_index, best_rank in enumerate(token_best_ranks):
+        if best_rank is None:
+            tags_indexes.append(([default_tag(pos_tags[token_index], default_punctuation_tags,
+                                              default_number_tags)],
+                                 [(token_index, token_index + 1)]))
+            continue
+        tags = list(best_rank.semantic_tags)
+        indexes = [(best_rank.token_match_start_index,
+                    best_rank.token_match_end_index)]
+        tags_indexes.append((tags, indexes))
+    return tags_indexes
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from pymusas.lexicon_collection import LexiconType, MWELexiconCollection
 from pymusas.rankers.lexical_match import LexicalMatch
@@ -73,6 +73,41 @@ class MWERule(Rule):
 
         `List[List[RankingMetaData]]`
         '''
+        return next(self.call_batch([(tokens, lemmas, pos_tags)]))
+
+    def call_batch(self, sentences: Iterable[Tuple[List[str], List[str], List[str]]]
+                   ) -> Iterator[List[List[RankingMetaData]]]:
+        '''
+        Yields the output of :func:`__call__` for each sentence, in the same
+        order as the given `sentences`. The MWE lexicon is only searched once,
+        see :func:`pymusas.lexicon_collection.MWELexiconCollection.mwe_match`,
+        for each unique n-gram across all of the `sentences`.
+
+        # Parameters
+
+        sentences : `Iterable[Tuple[List[str], List[str], List[str]]]`
+            Each sentence is a `Tuple` of tokens, lemmas, and POS tags, see
+            :func:`__call__`.
+
+        # Returns
+
+        `Iterator[List[List[RankingMetaData]]]`
+        '''
+        # Keyed by the MWE type and then the n-gram, strings and tuples of
+        # strings are not tracked by the garbage collector, unlike `List`s.
+        mwe_match_cache: Dict[LexiconType, Dict[str, Tuple[str, ...]]] = {
+            LexiconType.MWE_NON_SPECIAL: {}, LexiconType.MWE_WILDCARD: {}}
+        for tokens, lemmas, pos_tags in sentences:
+            yield self._sentence_ranking_meta_data(tokens, lemmas, pos_tags, mwe_match_cache)
+
+    def _sentence_ranking_meta_data(self, tokens: List[str], lemmas: List[str],
+                                    pos_tags: List[str],
+                                    mwe_match_cache: Dict[LexiconType, Dict[str, Tuple[str, ...]]]
+                                    ) -> List[List[RankingMetaData]]:
+        '''
+        Returns the output of :func:`__call__`, the MWE lexicon matches of each
+        n-gram are stored in, and re-used from, the `mwe_match_cache`.
+        '''
 
         def tag_n_gram_indexes(_n_gram_indexes: List[Tuple[int, int]],
                                mwe_type: LexiconType,
@@ -98,6 +133,7 @@ class MWERule(Rule):
                                (token_lower_pos, LexicalMatch.TOKEN_LOWER),
                                (lemma_lower_pos, LexicalMatch.LEMMA_LOWER)]
             
+            mwe_type_match_cache = mwe_match_cache[mwe_type]
             for token_list, token_type in token_list_type:
                 for n_gram_index in _n_gram_indexes:
                     start_index, end_index = n_gram_index
@@ -107,8 +143,11 @@ class MWERule(Rule):
                             mwe_template += f'{token_list[token_index]}'
                             continue
                         mwe_template += f'{token_list[token_index]} '
-                    matched_mwe_templates = self.mwe_lexicon_collection.mwe_match(mwe_template,
-                                                                                  mwe_type)
+                    matched_mwe_templates = mwe_type_match_cache.get(mwe_template)
+                    if matched_mwe_templates is None:
+                        matched_mwe_templates = tuple(self.mwe_lexicon_collection.mwe_match(mwe_template,
+                                                                                            mwe_type))
+                        mwe_type_match_cache[mwe_template] = matched_mwe_templates
                     if not matched_mwe_templates:
                         continue
 
@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import List
+from typing import Iterable, Iterator, List, Tuple
 
 from pymusas.base import Serialise
 from pymusas.rankers.ranking_meta_data import RankingMetaData
@@ -8,7 +8,8 @@ from pymusas.rankers.ranking_meta_data import RankingMetaData
 class Rule(Serialise):
     '''
     An **abstract class** that defines the basic method, `__call__`, that is
-    required for all :class:`Rule`s.
+    required for all :class:`Rule`s, and `call_batch` which applies the rule
+    to many sentences.
 
     A Rule when called, `__call__`, creates a `List` of rules matches for each
     token, whereby each rule matched is defined by the
@@ -43,6 +44,32 @@ class Rule(Serialise):
         '''
         ...  # pragma: no cover
 
+    def call_batch(self, sentences: Iterable[Tuple[List[str], List[str], List[str]]]
+                   ) -> Iterator[List[List[RankingMetaData]]]:
+        '''
+        Yields the output of :func:`__call__` for each sentence, in the same
+        order as the given `sentences`. The output of each sentence is
+        yielded once it has been created, so that only the rule matches of
+        the sentence being processed need to be kept in memory.
+
+        By default :func:`__call__` is called on each sentence, a rule can
+        override this method to share work across the sentences, e.g. to
+        only search the lexicons once for a token that occurs in many of the
+        sentences.
+
+        # Parameters
+
+        sentences : `Iterable[Tuple[List[str], List[str], List[str]]]`
+            Each sentence is a `Tuple` of tokens, lemmas, and POS tags, see
+            :func:`__call__`.
+
+        # Returns
+
+        `Iterator[List[List[RankingMetaData]]]`
+        '''
+        for tokens, lemmas, pos_tags in sentences:
+            yield self(tokens, lemmas, pos_tags)
+
     @abstractmethod
     def __eq__(self, other: object) -> bool:
         ...  # pragma: no cover
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, cast
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, cast
 
 import srsly
 
@@ -85,81 +85,101 @@ class SingleWordRule(Rule):
 
         `List[List[RankingMetaData]]`
         '''
+        return next(self.call_batch([(tokens, lemmas, pos_tags)]))
 
-        def find_match_and_add_to_ranking_data(lexicon_entry: str,
-                                               exclude_pos_information: bool,
-                                               lexical_match: LexicalMatch,
-                                               start_index: int, end_index: int,
-                                               token_ranking_meta_data: List[List[RankingMetaData]]
-                                               ) -> None:
+    def call_batch(self, sentences: Iterable[Tuple[List[str], List[str], List[str]]]
+                   ) -> Iterator[List[List[RankingMetaData]]]:
+        '''
+        Yields the output of :func:`__call__` for each sentence, in the same
+        order as the given `sentences`. The lexicon matches of each unique
+        token, lemma, and POS tag combination are only searched for once
+        across all of the `sentences`, which is faster than calling
+        :func:`__call__` on each sentence as most tokens occur many times.
+
+        # Parameters
+
+        sentences : `Iterable[Tuple[List[str], List[str], List[str]]]`
+            Each sentence is a `Tuple` of tokens, lemmas, and POS tags, see
+            :func:`__call__`.
+
+        # Returns
+
+        `Iterator[List[List[RankingMetaData]]]`
+
+        # Examples
+        ``` python
+        >>> from pymusas.taggers.rules.single_word import SingleWordRule
+        >>> rule = SingleWordRule({'river|noun': ['W3']}, {'bank': ['I1.1']})
+        >>> sentences = [(['river', 'bank'], ['river', 'bank'], ['noun', 'noun']),
+        ...              (['bank'], ['bank'], ['verb'])]
+        >>> sentences_ranking_meta_data = list(rule.call_batch(sentences))
+        >>> assert sentences_ranking_meta_data[0][0][0].semantic_tags == ('W3',)
+        >>> assert sentences_ranking_meta_data[1][0][0].semantic_tags == ('I1.1',)
+        >>> assert sentences_ranking_meta_data == [rule(*sentence) for sentence in sentences]
+
+        ```
+        '''
+        token_matches_cache: Dict[Tuple[str, str, str],
+                                  List[Tuple[str, bool, LexicalMatch, Tuple[str, ...]]]] = {}
+        for tokens, lemmas, pos_tags in sentences:
+            token_ranking_meta_data: List[List[RankingMetaData]] = []
+            for start_index, token_lemma_pos in enumerate(zip(tokens, lemmas, pos_tags)):
+                token_matches = token_matches_cache.get(token_lemma_pos)
+                if token_matches is None:
+                    token_matches = self._token_matches(*token_lemma_pos)
+                    token_matches_cache[token_lemma_pos] = token_matches
+                end_index = start_index + 1
+                token_ranking_meta_data.append(
+                    [RankingMetaData(LexiconType.SINGLE_NON_SPECIAL, 1, 0,
+                                     exclude_pos_information, lexical_match,
+                                     start_index, end_index,
+                                     lexicon_entry, semantic_tags)
+                     for lexicon_entry, exclude_pos_information, lexical_match, semantic_tags
+                     in token_matches])
+            yield token_ranking_meta_data
+
+    def _token_matches(self, token: str, lemma: str, initial_pos: str
+                       ) -> List[Tuple[str, bool, LexicalMatch, Tuple[str, ...]]]:
+        '''
+        Returns the lexicon entry, whether POS information was excluded, the
+        lexical match, and the semantic tags of each lexicon match of the
+        token, in the order that they are found.
+        '''
+        token_matches: List[Tuple[str, bool, LexicalMatch, Tuple[str, ...]]] = []
+
+        def find_match(lexicon_entry: str, exclude_pos_information: bool,
+                       lexical_match: LexicalMatch) -> None:
             collection = self.lexicon_collection
             if exclude_pos_information:
                 collection = self.lemma_lexicon_collection
             if lexicon_entry in collection:
                 semantic_tags = tuple(collection[lexicon_entry])
-                ranking_data = RankingMetaData(LexiconType.SINGLE_NON_SPECIAL,
-                                               1, 0, exclude_pos_information,
-                                               lexical_match,
-                                               start_index, end_index,
-                                               lexicon_entry, semantic_tags)
-                token_ranking_meta_data[start_index].append(ranking_data)
-
-        token_ranking_meta_data: List[List[RankingMetaData]] \
-            = [[] for _ in range(len(tokens))]
-        
-        index = 0
-
-        for token, lemma, initial_pos in zip(tokens, lemmas, pos_tags):
-
-            token_lower = token.lower()
-            lemma_lower = lemma.lower()
-
-            start_index = index
-            end_index = start_index + 1
-            
-            pos_tags = [initial_pos]
-            if self.pos_mapper is not None:
-                pos_tags = self.pos_mapper.get(initial_pos, [])
-            
-            # All of these use POS information
-            for pos in pos_tags:
-                token_pos = f'{token}|{pos}'
-                find_match_and_add_to_ranking_data(token_pos, False,
-                                                   LexicalMatch.TOKEN,
-                                                   start_index, end_index,
-                                                   token_ranking_meta_data)
-                
-                lemma_pos = f'{lemma}|{pos}'
-                find_match_and_add_to_ranking_data(lemma_pos, False,
-                                                   LexicalMatch.LEMMA,
-                                                   start_index, end_index,
-                                                   token_ranking_meta_data)
-                
-                token_lower_pos = f'{token_lower}|{pos}'
-                find_match_and_add_to_ranking_data(token_lower_pos, False,
-                                                   LexicalMatch.TOKEN_LOWER,
-                                                   start_index, end_index,
-                                                   token_ranking_meta_data)
-                
-                lemma_lower_pos = f'{lemma_lower}|{pos}'
-                find_match_and_add_to_ranking_data(lemma_lower_pos, False,
-                                                   LexicalMatch.LEMMA_LOWER,
-                                                   start_index, end_index,
-                                                   token_ranking_meta_data)
-                
-            # All of these do not use POS information
-            lexical_value_type = [(token, LexicalMatch.TOKEN),
-                                  (lemma, LexicalMatch.LEMMA),
-                                  (token_lower, LexicalMatch.TOKEN_LOWER),
-                                  (lemma_lower, LexicalMatch.LEMMA_LOWER)]
-            for lexical_value, lexical_type in lexical_value_type:
-                find_match_and_add_to_ranking_data(lexical_value, True, lexical_type,
-                                                   start_index, end_index,
-                                                   token_ranking_meta_data)
-
-            index += 1
-
-        return token_ranking_meta_data
+                token_matches.append((lexicon_entry, exclude_pos_information,
+                                      lexical_match, semantic_tags))
+
+        token_lower = token.lower()
+        lemma_lower = lemma.lower()
+
+        pos_tags = [initial_pos]
+        if self.pos_mapper is not None:
+            pos_tags = self.pos_mapper.get(initial_pos, [])
+
+        # All of these use POS information
+        for pos in pos_tags:
+            find_match(f'{token}|{pos}', False, LexicalMatch.TOKEN)
+            find_match(f'{lemma}|{pos}', False, LexicalMatch.LEMMA)
+            find_match(f'{token_lower}|{pos}', False, LexicalMatch.TOKEN_LOWER)
+            find_match(f'{lemma_lower}|{pos}', False, LexicalMatch.LEMMA_LOWER)
+
+        # All of these do not use POS information
+        lexical_value_type = [(token, LexicalMatch.TOKEN),
+                              (lemma, LexicalMatch.LEMMA),
+                              (token_lower, LexicalMatch.TOKEN_LOWER),
+                              (lemma_lower, LexicalMatch.LEMMA_LOWER)]
+        for lexical_value, lexical_type in lexical_value_type:
+            find_match(lexical_value, True, lexical_type)
+
+        return token_matches
 
     def to_bytes(self) -> bytes:
         '''
@@ -7,8 +7,9 @@ NEURAL_EXTRA_PACKAGES: `list[str]`
     The Python packages that are required for the `pymusas[neural]` extra.
 """
 
+from bisect import bisect_left, bisect_right
 import importlib.util
-from typing import Iterable, Set, Tuple
+from typing import Iterable, List, Set, Tuple
 
 
 NEURAL_EXTRA_PACKAGES: list[str] = ['transformers', 'wsd_torch_models', 'torch']
@@ -103,6 +104,123 @@ def unique_pos_tags_in_lexicon_entry(lexicon_entry: str) -> Set[str]:
     return unique_pos_tags
 
 
+def context_windows(token_indexes: Iterable[int], number_tokens: int,
+                    window_size: int) -> List[Tuple[int, int]]:
+    '''
+    Returns the `(start, end)` token indexes, end index exclusive, of the
+    context window around each of the given `token_indexes`, whereby a
+    context window contains the token and up to `window_size` tokens either
+    side of it. Context windows that overlap or are next to each other are
+    merged into one context window. The context windows are returned in
+    order.
+
+    # Parameters
+
+    token_indexes : `Iterable[int]`
+        The token indexes to create context windows for.
+    number_tokens : `int`
+        The number of tokens in the sequence, the context windows do not go
+        beyond the end of the sequence.
+    window_size : `int`
+        The number of tokens either side of each token to include in its
+        context window.
+
+    # Returns
+
+    `List[Tuple[int, int]]`
+
+    # Raises
+
+    `ValueError`
+        If the `window_size` is less than 0.
+
+    # Examples
+    ``` python
+    >>> from pymusas.utils import context_windows
+    >>> assert [(0, 3), (6, 10)] == context_windows([1, 7, 8], 10, 1)
+    >>> assert [(0, 10)] == context_windows([1, 7], 10, 3)
+
+    ```
+    '''
+    if window_size < 0:
+        raise ValueError(f'The `window_size` has to be at least 0 and not {window_size}')
+    windows: List[Tuple[int, int]] = []
+    for token_index in sorted(set(token_indexes)):
+        start = max(0, token_index - window_size)
+        end = min(number_tokens, token_index + window_size + 1)
+        if windows and start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(end, windows[-1][1]))
+        else:
+            windows.append((start, end))
+    return windows
+
+
+def sliding_windows(lengths: List[int], max_length: int,
+                    stride: int) -> List[Tuple[int, int]]:
+    '''
+    Splits a sequence of items, e.g. tokens, into overlapping windows given
+    the length of each item, e.g. the number of sub-word tokens of each token.
+    Returns the `(start, end)` item indexes, end index exclusive, of each
+    window in order, the total length of the items in a window is at most
+    `max_length`, unless a single item is longer than `max_length` in which
+    case that item is a window by itself.
+
+    The first window starts at the first item, each following window starts
+    at the first item that starts at least `stride` length after the start of
+    the previous window, but never after the end of the previous window so
+    that every item is within at least one window. The last window ends at the
+    last item, the overlap of two windows is therefore roughly
+    `max_length - stride`.
+
+    # Parameters
+
+    lengths : `List[int]`
+        The length of each item in the sequence.
+    max_length : `int`
+        The maximum total length of the items within a window.
+    stride : `int`
+        The minimum length between the start of one window and the next.
+
+    # Returns
+
+    `List[Tuple[int, int]]`
+
+    # Raises
+
+    `ValueError`
+        If the `max_length` or `stride` is less than 1.
+
+    # Examples
+    ``` python
+    >>> from pymusas.utils import sliding_windows
+    >>> assert [(0, 3), (2, 5), (4, 6)] == sliding_windows([1, 1, 1, 1, 1, 1], 3, 2)
+    >>> assert [(0, 2), (1, 3)] == sliding_windows([2, 1, 2], 3, 1)
+    >>> assert [(0, 1), (1, 2)] == sliding_windows([5, 1], 3, 2)
+
+    ```
+    '''
+    if max_length < 1 or stride < 1:
+        raise ValueError('The `max_length` and `stride` have to be at least 1 '
+                         f'and not {max_length} and {stride}')
+    number_items = len(lengths)
+    # The start offset of each item and the end offset of the last item.
+    offsets = [0]
+    for length in lengths:
+        offsets.append(offsets[-1] + length)
+
+    windows: List[Tuple[int, int]] = []
+    start = 0
+    while start < number_items:
+        end = max(start + 1, bisect_right(offsets, offsets[start] + max_length) - 1)
+        end = min(end, number_items)
+        windows.append((start, end))
+        if end == number_items:
+            break
+        next_start = bisect_left(offsets, offsets[start] + stride, lo=start + 1)
+        start = min(next_start, end)
+    return windows
+
+
 def are_packages_installed(packages: list[str]) -> bool:
     """
     Returns True if all packages are installed, False otherwise.
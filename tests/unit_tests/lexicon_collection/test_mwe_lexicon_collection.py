@@ -1,8 +1,10 @@
 from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 import importlib
 from os import PathLike
 from pathlib import Path
+import pickle
 import re
 import tempfile
 from typing import Any, DefaultDict, Dict, List, Optional, Union
@@ -175,6 +177,17 @@ def test_mwe_lexicon_collection__eq__() -> None:
     assert empty_collection != MWELexiconCollection(MWE_TEMPLATES, POS_MAPPER)
 
 
+def test_mwe_lexicon_collection_pickle() -> None:
+    lexicon_collection = MWELexiconCollection(MWE_TEMPLATES, POS_MAPPER)
+    # Populates the lazily created regular expression lookups.
+    mwe_template = 'ano_prep carta_noun'
+    expected_matches = lexicon_collection.mwe_match(mwe_template, LexiconType.MWE_WILDCARD)
+    assert expected_matches == ['ano*_prep carta_noun']
+    pickled_collection = pickle.loads(pickle.dumps(lexicon_collection))
+    assert lexicon_collection == pickled_collection
+    assert expected_matches == pickled_collection.mwe_match(mwe_template, LexiconType.MWE_WILDCARD)
+
+
 def test_mwe_lexicon_collection_set_get_del_item() -> None:
 
     empty_collection = MWELexiconCollection()
@@ -660,3 +673,28 @@ def test_mwe_lexicon_collection_tsv_merge() -> None:
     combined_lexicon_data = MWELexiconCollection.tsv_merge(*tsv_file_paths)
     assert 11 == len(combined_lexicon_data)
     assert combined_lexicon_data["South_noun Wales_noun"] == ["R2"]
+
+
+@pytest.mark.parametrize("pos_mapper", [None, POS_MAPPER])
+def test_mwe_lexicon_collection_mwe_match_threads(pos_mapper: Optional[Dict[str, List[str]]]) -> None:
+    lexicon_collection = MWELexiconCollection(MWE_TEMPLATES, pos_mapper)
+    regular_expression_lookup = deepcopy(lexicon_collection.mwe_regular_expression_lookup)
+    pos_mapping_regular_expression_lookup \
+        = deepcopy(lexicon_collection.pos_mapping_regular_expression_lookup)
+    mwe_templates = ['ano_prep carta_noun', 'a_prep carta_noun cabal_adj',
+                     'A_pnoun Arnoia_pnoun', 'no_prep match_noun', 'x', 'y_noun z_noun a_noun b_noun c_noun']
+    mwe_types = [LexiconType.MWE_NON_SPECIAL, LexiconType.MWE_WILDCARD]
+    expected_matches = [lexicon_collection.mwe_match(mwe_template, mwe_type)
+                        for mwe_template in mwe_templates for mwe_type in mwe_types]
+    # Matching does not modify the collection
+    assert regular_expression_lookup == lexicon_collection.mwe_regular_expression_lookup
+    assert pos_mapping_regular_expression_lookup \
+        == lexicon_collection.pos_mapping_regular_expression_lookup
+
+    def match_all(_: int) -> List[List[str]]:
+        return [lexicon_collection.mwe_match(mwe_template, mwe_type)
+                for mwe_template in mwe_templates for mwe_type in mwe_types]
+    
+    with ThreadPoolExecutor(8) as executor:
+        for matches in executor.map(match_all, range(32)):
+            assert expected_matches == matches
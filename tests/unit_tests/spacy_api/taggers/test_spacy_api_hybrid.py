@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import cast
+from typing import Any, cast
 
 import pytest
 import spacy
@@ -14,10 +14,13 @@ from wsd_torch_models.bem import BEM
 
 from pymusas.lexicon_collection import LexiconCollection
 from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker
+from pymusas.spacy_api.taggers import hybrid, neural
 from pymusas.spacy_api.taggers.hybrid import HybridTagger
+from pymusas.spacy_api.taggers.neural import NeuralTagger
 from pymusas.spacy_api.utils import remove_custom_token_extension as remove_extension
 from pymusas.taggers.rules.single_word import SingleWordRule
 
+from ...taggers.utils import save_token_layer_bem
 from ..utils import compare_output
 
 
@@ -308,3 +311,255 @@ def test__init__() -> None:
     tagger.device = torch.device("meta")
     tagger._validate()
     assert tagger_wsd_model.base_model.device.type == "meta"
+
+
+def test_context_window() -> None:
+    tagger = HybridTagger()
+    assert tagger.context_window is None
+    with pytest.raises(ValueError):
+        HybridTagger(context_window=-1)
+    nlp = create_empty_tagger()
+    tagger = cast(HybridTagger, nlp.add_pipe('pymusas_hybrid_tagger', config={"context_window": 1}))
+    assert tagger.context_window == 1
+
+    english_lexicon_url = 'https://raw.githubusercontent.com/UCREL/Multilingual-USAS/e5cef7be2aa6182e300152f4f55152310007f051/English/semantic_lexicon_en.tsv'
+    lexicon_lookup = LexiconCollection.from_tsv(english_lexicon_url, include_pos=True)
+    lemma_lexicon_lookup = LexiconCollection.from_tsv(english_lexicon_url, include_pos=False)
+    single_word_rule = SingleWordRule(lexicon_lookup, lemma_lexicon_lookup)
+    ranker = ContextualRuleBasedRanker(1, 0)
+    tagger = HybridTagger(top_n=2, tokenizer_kwargs={"add_prefix_space": True})
+    window_tagger = HybridTagger(top_n=2, tokenizer_kwargs={"add_prefix_space": True},
+                                 context_window=1)
+    for hybrid_tagger in [tagger, window_tagger]:
+        hybrid_tagger.initialize(rules=[single_word_rule],
+                                 ranker=ranker,
+                                 pretrained_model_name_or_path="ucrelnlp/PyMUSAS-Neural-English-Small-BEM")
+
+    test_tokens = ["The", "river", "full", "of", "creaturez", "and", "fish"]
+    test_pos = ["DET", "NOUN", "ADJ", "ADP", "NOUN", "CCONJ", "NOUN"]
+    window_doc = window_tagger(Doc(Vocab(), words=test_tokens, pos=test_pos,
+                                   lemmas=[token.lower() for token in test_tokens]))
+    # The unknown token `creaturez` is tagged using only the tokens `of creaturez and`
+    context_doc = tagger(Doc(Vocab(), words=test_tokens[3:6], pos=test_pos[3:6],
+                             lemmas=[token.lower() for token in test_tokens[3:6]]))
+    assert context_doc[1]._.pymusas_tags == window_doc[4]._.pymusas_tags
+    assert [(4, 5)] == window_doc[4]._.pymusas_mwe_indexes
+    assert ['W3/M4', 'N5+'] == window_doc[1]._.pymusas_tags
+
+
+def test_quantize() -> None:
+    assert HybridTagger().quantize is None
+    with pytest.raises(ValueError):
+        HybridTagger(quantize='int4')
+    with pytest.raises(ValueError):
+        HybridTagger(device='meta', quantize='dynamic-int8')
+    nlp = create_empty_tagger()
+    tagger = cast(HybridTagger, nlp.add_pipe('pymusas_hybrid_tagger', config={"quantize": "dynamic-int8"}))
+    assert tagger.quantize == 'dynamic-int8'
+    assert not tagger._converted
+
+
+def test_dtype() -> None:
+    tagger = HybridTagger()
+    assert tagger.dtype is None
+    assert not tagger.autocast
+    with pytest.raises(ValueError):
+        HybridTagger(dtype='int8')
+    with pytest.raises(ValueError):
+        HybridTagger(autocast=True)
+    nlp = create_empty_tagger()
+    tagger = cast(HybridTagger, nlp.add_pipe('pymusas_hybrid_tagger',
+                                             config={"dtype": "bfloat16", "autocast": True}))
+    assert tagger.dtype == 'bfloat16'
+    assert tagger.autocast
+
+
+def test_share_memory() -> None:
+    tagger = HybridTagger()
+    assert not tagger.share_memory
+    assert tagger.worker_num_threads is None
+    with pytest.raises(ValueError):
+        HybridTagger(device='meta', share_memory=True)
+    with pytest.raises(ValueError):
+        HybridTagger(worker_num_threads=0)
+    nlp = create_empty_tagger()
+    tagger = cast(HybridTagger, nlp.add_pipe('pymusas_hybrid_tagger',
+                                             config={"share_memory": True, "worker_num_threads": 1}))
+    assert tagger.share_memory
+    assert 1 == tagger.worker_num_threads
+
+
+def test_lazy_load(tmp_path: Path) -> None:
+    assert not HybridTagger().lazy_load
+    rule = SingleWordRule({}, {'river': ['W3/M4', 'N5+'], 'bank': ['I1.1']})
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments([rule]))
+    nlp = create_empty_tagger()
+    tagger = cast(HybridTagger, nlp.add_pipe('pymusas_hybrid_tagger', config={"lazy_load": True}))
+    assert tagger.lazy_load
+    tagger.initialize(rules=[rule], ranker=ranker,
+                      pretrained_model_name_or_path="ucrelnlp/PyMUSAS-Neural-English-Small-BEM")
+    loaded = [tagger.wsd_model is not None]
+
+    # The model is not loaded when the rules tag all of the tokens
+    doc = nlp('river bank')
+    assert [['W3/M4', 'N5+'], ['I1.1']] == [token._.pymusas_tags for token in doc]
+    loaded.append(tagger.wsd_model is not None)
+
+    doc = nlp('river bank fish')
+    assert [False, False] == loaded
+    assert isinstance(tagger.wsd_model, BEM)
+    assert isinstance(tagger.tokenizer, PreTrainedTokenizerBase)
+    assert 5 == len(doc[2]._.pymusas_tags)
+
+    # The model is loaded from disk when it is first required
+    nlp.to_disk(tmp_path / "lazy")
+    lazy_nlp = spacy.load(tmp_path / "lazy")
+    lazy_tagger = cast(HybridTagger, lazy_nlp.get_pipe('pymusas_hybrid_tagger'))
+    assert lazy_tagger.wsd_model is None
+    lazy_tagger.warm_up()
+    wsd_model = cast(HybridTagger, lazy_nlp.get_pipe('pymusas_hybrid_tagger')).wsd_model
+    assert isinstance(wsd_model, BEM)
+    assert wsd_model.base_model.device.type == "cpu"
+    lazy_doc = lazy_nlp('river bank fish')
+    assert [['W3/M4', 'N5+'], ['I1.1']] == [token._.pymusas_tags for token in lazy_doc[:2]]
+    assert 5 == len(lazy_doc[2]._.pymusas_tags)
+
+    # Saving a lazily loaded tagger loads the model
+    lazy_nlp = spacy.load(tmp_path / "lazy")
+    lazy_nlp.to_disk(tmp_path / "lazy_2")
+    assert isinstance(cast(HybridTagger, lazy_nlp.get_pipe('pymusas_hybrid_tagger')).wsd_model, BEM)
+
+
+def test_threads_and_warm_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    tagger = HybridTagger()
+    assert (None, None, False) == (tagger.num_threads, tagger.num_interop_threads, tagger.warm_up_on_load)
+    with pytest.raises(ValueError):
+        HybridTagger(num_threads=0)
+    with pytest.raises(ValueError):
+        HybridTagger(num_interop_threads=0)
+
+    warm_up_sentences: list[list[list[str]]] = []
+    predict_tags = neural.predict_tags
+
+    def recording_predict_tags(wsd_model: BEM, tokenizer: PreTrainedTokenizerBase,
+                               sentences: list[list[str]], *args: Any, **kwargs: Any) -> list[list[list[str]]]:
+        warm_up_sentences.append(sentences)
+        return predict_tags(wsd_model, tokenizer, sentences, *args, **kwargs)
+    monkeypatch.setattr(neural, 'predict_tags', recording_predict_tags)
+
+    rule = SingleWordRule({}, {'river': ['W3/M4', 'N5+'], 'bank': ['I1.1']})
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments([rule]))
+    number_threads = torch.get_num_threads()
+    try:
+        for lazy_load in [False, True]:
+            torch.set_num_threads(number_threads)
+            warm_up_sentences.clear()
+            nlp = create_empty_tagger()
+            config = {'num_threads': 1, 'warm_up_on_load': True, 'lazy_load': lazy_load}
+            tagger = cast(HybridTagger, nlp.add_pipe('pymusas_hybrid_tagger', config=config))
+            assert (1, True) == (tagger.num_threads, tagger.warm_up_on_load)
+            tagger.initialize(rules=[rule], ranker=ranker,
+                              pretrained_model_name_or_path="ucrelnlp/PyMUSAS-Neural-English-Small-BEM")
+            # When lazily loaded the threads are set, and the warm up happens,
+            # when the model is first required.
+            loaded = [torch.get_num_threads() == 1, len(warm_up_sentences)]
+            assert [not lazy_load or number_threads == 1, 0 if lazy_load else 1] == loaded
+            nlp('river bank fish')
+            assert 1 == torch.get_num_threads()
+            # The `Doc`s are tagged through `hybrid.predict_tags` which is not recorded.
+            assert [[['Warm', 'up']]] == warm_up_sentences
+    finally:
+        torch.set_num_threads(number_threads)
+
+
+@pytest.mark.parametrize("token_layers", [False, True])
+@pytest.mark.parametrize("context_window", [None, 1])
+def test_pipe(context_window: int | None, token_layers: bool, tmp_path: Path,
+              monkeypatch: pytest.MonkeyPatch) -> None:
+    # With `token_layers` the model's token layers attend over the sub-word
+    # tokens, the tags should still not depend on the other sequences in the
+    # batch that `pipe` gives to the model.
+    pretrained_model_name_or_path = "ucrelnlp/PyMUSAS-Neural-English-Small-BEM"
+    if token_layers:
+        pretrained_model_name_or_path = str(save_token_layer_bem(tmp_path / "model"))
+    rule = SingleWordRule({}, {'river': ['W3/M4', 'N5+'], 'bank': ['I1.1'], 'the': ['Z5']})
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments([rule]))
+    nlp = create_empty_tagger()
+    tagger = cast(HybridTagger, nlp.add_pipe('pymusas_hybrid_tagger',
+                                             config={"context_window": context_window}))
+    tagger.initialize(rules=[rule], ranker=ranker,
+                      pretrained_model_name_or_path=pretrained_model_name_or_path)
+    assert tagger.wsd_model is not None
+    assert not tagger.wsd_model.training
+    texts = ['the river bank', 'the fish swam to the river bank', 'river', 'fish  and  chips', 'the bank',
+             'a much longer text about the fish and the chips that were eaten by the river bank']
+    expected_tags = [[token._.pymusas_tags for token in nlp(text)] for text in texts]
+    expected_indexes = [[token._.pymusas_mwe_indexes for token in nlp(text)] for text in texts]
+
+    number_of_predict_calls = 0
+    predict_tags = hybrid.predict_tags
+
+    def counting_predict_tags(*args: Any, **kwargs: Any) -> list[list[list[str]]]:
+        nonlocal number_of_predict_calls
+        number_of_predict_calls += 1
+        return predict_tags(*args, **kwargs)
+    monkeypatch.setattr(hybrid, 'predict_tags', counting_predict_tags)
+
+    for batch_size, expected_number_of_predict_calls in [(100, 1), (2, 3), (1, 3)]:
+        number_of_predict_calls = 0
+        docs = list(nlp.pipe(texts, batch_size=batch_size))
+        assert expected_number_of_predict_calls == number_of_predict_calls
+        assert expected_tags == [[token._.pymusas_tags for token in doc] for doc in docs]
+        assert expected_indexes == [[token._.pymusas_mwe_indexes for token in doc] for doc in docs]
+    # Only the documents with tokens that cannot be tagged are given to the model
+    known_docs = [nlp.make_doc('the river bank'), nlp.make_doc('the bank')]
+    assert known_docs == list(tagger.pipe(known_docs))
+    assert 3 == number_of_predict_calls
+
+    with pytest.raises(ValueError):
+        list(tagger.pipe([nlp.make_doc('river')], batch_size=0))
+
+
+@pytest.mark.parametrize("lazy_load", [False, True])
+def test_low_memory_load(lazy_load: bool) -> None:
+    assert not HybridTagger().low_memory_load
+    rule = SingleWordRule({}, {'river': ['W3/M4', 'N5+'], 'bank': ['I1.1']})
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments([rule]))
+    outputs: list[list[list[str]]] = []
+    for low_memory_load in [False, True]:
+        nlp = create_empty_tagger()
+        config = {'low_memory_load': low_memory_load, 'lazy_load': lazy_load}
+        tagger = cast(HybridTagger, nlp.add_pipe('pymusas_hybrid_tagger', config=config))
+        assert low_memory_load == tagger.low_memory_load
+        tagger.initialize(rules=[rule], ranker=ranker,
+                          pretrained_model_name_or_path="ucrelnlp/PyMUSAS-Neural-English-Small-BEM")
+        outputs.append([token._.pymusas_tags for token in nlp('river bank fish swam')])
+    assert outputs[0] == outputs[1]
+    assert 5 == len(outputs[1][2])
+
+
+def test_shared_model_and_rules() -> None:
+    rule = SingleWordRule({}, {'river': ['W3/M4', 'N5+'], 'bank': ['I1.1']})
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments([rule]))
+    nlp = create_empty_tagger()
+    tagger = cast(HybridTagger, nlp.add_pipe('pymusas_hybrid_tagger', config={'share_rules': True}))
+    tagger.initialize(rules=[rule], ranker=ranker,
+                      pretrained_model_name_or_path="ucrelnlp/PyMUSAS-Neural-English-Small-BEM")
+    assert tagger.share_rules
+    # A neural pipeline for the same model shares the model with the hybrid pipeline
+    neural_tagger = NeuralTagger()
+    neural_tagger.initialize(pretrained_model_name_or_path="ucrelnlp/PyMUSAS-Neural-English-Small-BEM")
+    assert isinstance(tagger.wsd_model, BEM)
+    assert tagger.wsd_model is neural_tagger.wsd_model
+
+    # As does a lazily loaded hybrid pipeline, along with the rules
+    lazy_nlp = create_empty_tagger()
+    lazy_config = {'lazy_load': True, 'share_rules': True}
+    lazy_tagger = cast(HybridTagger, lazy_nlp.add_pipe('pymusas_hybrid_tagger', config=lazy_config))
+    lazy_tagger.initialize(rules=[SingleWordRule({}, {'river': ['W3/M4', 'N5+'], 'bank': ['I1.1']})],
+                           ranker=ranker,
+                           pretrained_model_name_or_path="ucrelnlp/PyMUSAS-Neural-English-Small-BEM")
+    assert lazy_tagger.rules is not None
+    assert lazy_tagger.rules[0] is rule
+    lazy_tagger.warm_up()
+    assert lazy_tagger.wsd_model is tagger.wsd_model
@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import cast
+from typing import Any, cast
 
 import pytest
 import spacy
@@ -11,10 +11,14 @@ import torch
 from transformers import AutoTokenizer, PreTrainedTokenizerBase
 from wsd_torch_models.bem import BEM
 
+from pymusas.spacy_api.taggers import neural
 from pymusas.spacy_api.taggers.neural import NeuralTagger
 from pymusas.spacy_api.utils import remove_custom_token_extension as remove_extension
+from pymusas.taggers.neural import load_wsd_model
+from pymusas.utils import sliding_windows
 
 from ...taggers.test_neural_tagger import EXPECTED_TAG_INDICIES, EXPECTED_TAG_OUTPUT, TEST_TOKENS
+from ...taggers.utils import save_token_layer_bem
 from ..utils import compare_output
 
 
@@ -24,12 +28,13 @@ def create_empty_tagger() -> Language:
     return English()
 
 
-def create_tagger() -> Language:
+def create_tagger(pretrained_model_name_or_path: str = "ucrelnlp/PyMUSAS-Neural-English-Small-BEM"
+                  ) -> Language:
     remove_extension('pymusas_tags')
     remove_extension('pymusas_mwe_indexes')
     nlp = English()
     nlp.config["initialize"]["components"]["pymusas_neural_tagger"] = {
-        "pretrained_model_name_or_path": "ucrelnlp/PyMUSAS-Neural-English-Small-BEM"
+        "pretrained_model_name_or_path": pretrained_model_name_or_path
     }
     return nlp
 
@@ -218,3 +223,270 @@ def test__init__() -> None:
     tagger.device = torch.device("meta")
     tagger._validate()
     assert tagger_wsd_model.base_model.device.type == "meta"
+
+
+def test_quantize(tmp_path: Path) -> None:
+    assert NeuralTagger().quantize is None
+    with pytest.raises(ValueError):
+        NeuralTagger(quantize='int4')
+    with pytest.raises(ValueError):
+        NeuralTagger(device='meta', quantize='dynamic-int8')
+
+    nlp = create_tagger()
+    tagger = cast(NeuralTagger,
+                  nlp.add_pipe('pymusas_neural_tagger', config={'quantize': 'dynamic-int8', 'top_n': 1}))
+    nlp.initialize()
+    # The model is only quantized when the tagger is first called, so it can
+    # still be saved after initialization.
+    nlp.to_disk(tmp_path / 'test_1')
+    assert not any(isinstance(module, torch.ao.nn.quantized.dynamic.Linear)
+                   for module in cast(BEM, tagger.wsd_model).modules())
+
+    output_doc = tagger(Doc(Vocab(), words=TEST_TOKENS, spaces=[True] * len(TEST_TOKENS)))
+    assert any(isinstance(module, torch.ao.nn.quantized.dynamic.Linear)
+               for module in cast(BEM, tagger.wsd_model).modules())
+    assert len(TEST_TOKENS) == len([token._.pymusas_tags for token in output_doc])
+    with pytest.raises(ValueError):
+        nlp.to_disk(tmp_path / 'test_2')
+
+    loaded_tagger = cast(NeuralTagger, spacy.load(tmp_path / 'test_1').get_pipe('pymusas_neural_tagger'))
+    assert 'dynamic-int8' == loaded_tagger.quantize
+    assert not loaded_tagger._converted
+
+
+def test_dtype(tmp_path: Path) -> None:
+    tagger = NeuralTagger()
+    assert tagger.dtype is None
+    assert not tagger.autocast
+    with pytest.raises(ValueError):
+        NeuralTagger(dtype='int8')
+    with pytest.raises(ValueError):
+        NeuralTagger(autocast=True)
+    with pytest.raises(ValueError):
+        NeuralTagger(dtype='bfloat16', quantize='dynamic-int8')
+
+    nlp = create_tagger()
+    tagger = cast(NeuralTagger,
+                  nlp.add_pipe('pymusas_neural_tagger', config={'dtype': 'bfloat16', 'top_n': 5}))
+    nlp.initialize()
+    nlp.to_disk(tmp_path / 'test_1')
+    wsd_model = cast(BEM, tagger.wsd_model)
+    assert torch.float32 == next(wsd_model.parameters()).dtype
+
+    output_doc = tagger(Doc(Vocab(), words=TEST_TOKENS, spaces=[True] * len(TEST_TOKENS)))
+    assert torch.bfloat16 == next(wsd_model.parameters()).dtype
+    assert wsd_model.label_definition_embeddings is not None
+    assert torch.float32 == wsd_model.label_definition_embeddings.dtype
+    for index, token in enumerate(output_doc):
+        assert EXPECTED_TAG_OUTPUT[index][0] in token._.pymusas_tags
+    with pytest.raises(ValueError):
+        nlp.to_disk(tmp_path / 'test_2')
+
+    # Autocast does not cast the model
+    nlp = create_tagger()
+    tagger = cast(NeuralTagger,
+                  nlp.add_pipe('pymusas_neural_tagger', config={'dtype': 'bfloat16', 'autocast': True}))
+    nlp.initialize()
+    tagger(Doc(Vocab(), words=TEST_TOKENS, spaces=[True] * len(TEST_TOKENS)))
+    assert torch.float32 == next(cast(BEM, tagger.wsd_model).parameters()).dtype
+    nlp.to_disk(tmp_path / 'test_3')
+
+
+def test_sliding_windows() -> None:
+    tagger = NeuralTagger()
+    assert tagger.max_sub_words is None
+    assert tagger.sub_word_stride is None
+    assert 4096 == tagger.max_tokens_per_batch
+    with pytest.raises(ValueError):
+        NeuralTagger(max_sub_words=0)
+    with pytest.raises(ValueError):
+        NeuralTagger(sub_word_stride=0)
+    with pytest.raises(ValueError):
+        NeuralTagger(max_tokens_per_batch=0)
+
+    # A Doc longer than the model's maximum sequence length is tagged
+    nlp = create_tagger()
+    tagger = cast(NeuralTagger, nlp.add_pipe('pymusas_neural_tagger', config={'top_n': 2}))
+    nlp.initialize()
+    long_tokens = TEST_TOKENS * 200
+    output_doc = tagger(Doc(Vocab(), words=long_tokens, spaces=[True] * len(long_tokens)))
+    assert all(2 == len(token._.pymusas_tags) for token in output_doc)
+
+    nlp = create_tagger()
+    tagger = cast(NeuralTagger,
+                  nlp.add_pipe('pymusas_neural_tagger',
+                               config={'top_n': 2, 'max_sub_words': 8, 'sub_word_stride': 3,
+                                       'max_tokens_per_batch': 64}))
+    nlp.initialize()
+    assert 8 == tagger.max_sub_words
+    assert 3 == tagger.sub_word_stride
+    assert 64 == tagger.max_tokens_per_batch
+    output_doc = tagger(Doc(Vocab(), words=long_tokens, spaces=[True] * len(long_tokens)))
+    assert all(2 == len(token._.pymusas_tags) for token in output_doc)
+
+
+def test_sliding_windows_unbatched_predictions(tmp_path: Path) -> None:
+    # The windows are tagged in padded batches, the tags should be the same
+    # as tagging each window by itself, using a model whose token layers
+    # attend over the sub-word tokens.
+    model_directory = save_token_layer_bem(tmp_path / "model")
+    wsd_model = load_wsd_model(str(model_directory)).eval()
+    tokenizer = AutoTokenizer.from_pretrained(str(model_directory))  # type: ignore[no-untyped-call]
+    long_tokens = TEST_TOKENS * 4
+    token_lengths = [len(tokenizer(token, add_special_tokens=False)["input_ids"]) for token in long_tokens]
+    windows = sliding_windows(token_lengths, 24 - tokenizer.num_special_tokens_to_add(), 10)
+    assert len(windows) > 2
+
+    expected_tags: list[list[str]] = [[] for _ in long_tokens]
+    token_edge_distances = [-1 for _ in long_tokens]
+    with torch.inference_mode():
+        for start, end in windows:
+            window_tags = wsd_model.predict(long_tokens[start: end], tokenizer, top_n=2)
+            for token_index in range(start, end):
+                edge_distance = min(token_index - start, end - 1 - token_index)
+                if edge_distance > token_edge_distances[token_index]:
+                    token_edge_distances[token_index] = edge_distance
+                    expected_tags[token_index] = window_tags[token_index - start]
+
+    for max_tokens_per_batch in [24, 4096]:
+        nlp = create_tagger(str(model_directory))
+        tagger = cast(NeuralTagger,
+                      nlp.add_pipe('pymusas_neural_tagger',
+                                   config={'top_n': 2, 'max_sub_words': 24, 'sub_word_stride': 10,
+                                           'max_tokens_per_batch': max_tokens_per_batch}))
+        nlp.initialize()
+        output_doc = tagger(Doc(Vocab(), words=long_tokens, spaces=[True] * len(long_tokens)))
+        assert expected_tags == [token._.pymusas_tags for token in output_doc]
+
+
+def test_share_memory() -> None:
+    tagger = NeuralTagger()
+    assert not tagger.share_memory
+    assert tagger.worker_num_threads is None
+    with pytest.raises(ValueError):
+        NeuralTagger(device='meta', share_memory=True)
+    with pytest.raises(ValueError):
+        NeuralTagger(worker_num_threads=0)
+
+    nlp = create_tagger()
+    tagger = cast(NeuralTagger,
+                  nlp.add_pipe('pymusas_neural_tagger',
+                               config={'share_memory': True, 'worker_num_threads': 2}))
+    nlp.initialize()
+    wsd_model = cast(BEM, tagger.wsd_model)
+    assert all(parameter.is_shared() for parameter in wsd_model.parameters())  # type: ignore[no-untyped-call]
+    assert wsd_model.label_definition_embeddings is not None
+    assert wsd_model.label_definition_embeddings.is_shared()  # type: ignore[no-untyped-call]
+
+    # The number of PyTorch threads is only set within a worker process
+    number_threads = torch.get_num_threads()
+    test_doc = Doc(Vocab(), words=TEST_TOKENS, spaces=[True] * len(TEST_TOKENS))
+    tagger(test_doc)
+    assert number_threads == torch.get_num_threads()
+    try:
+        tagger._process_id = -1
+        tagger._configured_process_id = -1
+        tagger(test_doc)
+        assert 2 == torch.get_num_threads()
+        # By default the number of threads is not changed within a worker process
+        torch.set_num_threads(number_threads)
+        tagger.worker_num_threads = None
+        tagger._configured_process_id = -1
+        tagger(test_doc)
+        assert number_threads == torch.get_num_threads()
+    finally:
+        torch.set_num_threads(number_threads)
+
+
+def test_threads_and_warm_up(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    tagger = NeuralTagger()
+    assert (None, None, False) == (tagger.num_threads, tagger.num_interop_threads, tagger.warm_up_on_load)
+    with pytest.raises(ValueError):
+        NeuralTagger(num_threads=0)
+    with pytest.raises(ValueError):
+        NeuralTagger(num_interop_threads=0)
+
+    warm_up_sentences: list[list[list[str]]] = []
+    predict_tags = neural.predict_tags
+
+    def recording_predict_tags(wsd_model: BEM, tokenizer: PreTrainedTokenizerBase,
+                               sentences: list[list[str]], *args: Any, **kwargs: Any) -> list[list[list[str]]]:
+        warm_up_sentences.append(sentences)
+        return predict_tags(wsd_model, tokenizer, sentences, *args, **kwargs)
+    monkeypatch.setattr(neural, 'predict_tags', recording_predict_tags)
+
+    number_threads = torch.get_num_threads()
+    try:
+        nlp = create_tagger()
+        tagger = cast(NeuralTagger,
+                      nlp.add_pipe('pymusas_neural_tagger',
+                                   config={'num_threads': 1, 'warm_up_on_load': True}))
+        assert (1, True) == (tagger.num_threads, tagger.warm_up_on_load)
+        nlp.initialize()
+        assert 1 == torch.get_num_threads()
+        assert [[['Warm', 'up']]] == warm_up_sentences
+        nlp.to_disk(tmp_path / "threads")
+
+        # The threads are set, and the warm up happens, when loaded from disk
+        torch.set_num_threads(number_threads)
+        loaded_nlp = spacy.load(tmp_path / "threads")
+        assert 1 == torch.get_num_threads()
+        assert [[['Warm', 'up']]] * 2 == warm_up_sentences
+        loaded_tagger = cast(NeuralTagger, loaded_nlp.get_pipe('pymusas_neural_tagger'))
+        loaded_tagger.warm_up(TEST_TOKENS)
+        assert [TEST_TOKENS] == warm_up_sentences[-1]
+    finally:
+        torch.set_num_threads(number_threads)
+
+
+def test_low_memory_load(tmp_path: Path) -> None:
+    assert not NeuralTagger().low_memory_load
+    nlp = create_tagger()
+    nlp.add_pipe('pymusas_neural_tagger')
+    nlp.initialize()
+    expected_output = [token._.pymusas_tags for token in nlp(Doc(nlp.vocab, words=TEST_TOKENS))]
+
+    low_memory_nlp = create_tagger()
+    tagger = cast(NeuralTagger,
+                  low_memory_nlp.add_pipe('pymusas_neural_tagger', config={'low_memory_load': True}))
+    assert tagger.low_memory_load
+    low_memory_nlp.initialize()
+    doc = low_memory_nlp(Doc(low_memory_nlp.vocab, words=TEST_TOKENS))
+    assert expected_output == [token._.pymusas_tags for token in doc]
+
+    # A model loaded with low memory can be saved and loaded from disk with low memory
+    low_memory_nlp.to_disk(tmp_path / "low_memory")
+    loaded_nlp = spacy.load(tmp_path / "low_memory")
+    assert cast(NeuralTagger, loaded_nlp.get_pipe('pymusas_neural_tagger')).low_memory_load
+    doc = loaded_nlp(Doc(loaded_nlp.vocab, words=TEST_TOKENS))
+    assert expected_output == [token._.pymusas_tags for token in doc]
+
+
+def test_shared_model(tmp_path: Path) -> None:
+    # Pipelines that load the same model onto the same device share the model
+    nlp = create_tagger()
+    tagger = cast(NeuralTagger, nlp.add_pipe('pymusas_neural_tagger'))
+    nlp.initialize()
+    nlp_2 = create_tagger()
+    tagger_2 = cast(NeuralTagger, nlp_2.add_pipe('pymusas_neural_tagger'))
+    nlp_2.initialize()
+    assert isinstance(tagger.wsd_model, BEM)
+    assert tagger.wsd_model is tagger_2.wsd_model
+    assert tagger.tokenizer is not tagger_2.tokenizer
+
+    # Including when they are loaded from different directories with the same files
+    nlp.to_disk(tmp_path / "shared_1")
+    nlp_2.to_disk(tmp_path / "shared_2")
+    loaded_tagger = cast(NeuralTagger, spacy.load(tmp_path / "shared_1").get_pipe('pymusas_neural_tagger'))
+    loaded_tagger_2 = cast(NeuralTagger, spacy.load(tmp_path / "shared_2").get_pipe('pymusas_neural_tagger'))
+    assert isinstance(loaded_tagger.wsd_model, BEM)
+    assert loaded_tagger.wsd_model is loaded_tagger_2.wsd_model
+
+    # A model on a different device, or that is converted in place, is not shared
+    meta_nlp = spacy.load(tmp_path / "shared_1", config={"components.pymusas_neural_tagger.device": "meta"})
+    assert cast(NeuralTagger, meta_nlp.get_pipe('pymusas_neural_tagger')).wsd_model is not loaded_tagger.wsd_model
+    quantize_nlp = create_tagger()
+    quantize_tagger = cast(NeuralTagger,
+                           quantize_nlp.add_pipe('pymusas_neural_tagger', config={'quantize': 'dynamic-int8'}))
+    quantize_nlp.initialize()
+    assert quantize_tagger.wsd_model is not tagger.wsd_model
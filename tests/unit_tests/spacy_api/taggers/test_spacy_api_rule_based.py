@@ -7,6 +7,8 @@ import spacy
 from spacy import registry
 from spacy.lang.en import English
 from spacy.language import Language
+from spacy.tokens import Doc
+from spacy.vocab import Vocab
 
 from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker
 from pymusas.spacy_api.taggers.rule_based import RuleBasedTagger
@@ -116,6 +118,18 @@ def test_rule_based_tagger__init__(nlp_callable: Callable[[bool, str, str], Lang
                                                   'token._.pymusas_mwe_indexes'])
 
 
+def test_rule_based_tagger_cache_config() -> None:
+    nlp = create_non_valid_tagger()
+    tagger = cast(RuleBasedTagger, nlp.add_pipe('pymusas_rule_based_tagger'))
+    assert tagger.cache is None
+
+    nlp = create_non_valid_tagger()
+    tagger = cast(RuleBasedTagger, nlp.add_pipe('pymusas_rule_based_tagger',
+                                                config={'cache_size': 5}))
+    assert tagger.cache is not None
+    assert 5 == tagger.cache.maxsize
+
+
 def test_rule_based_tagger_token_extension_warning() -> None:
     '''
     A token extension warning should appear if two or more
@@ -233,3 +247,69 @@ def test_can_pickle() -> None:
                          pickle.loads(pickle.dumps(initialized_tagger)))
     compare_initializer_taggers(initialized_tagger, pickle_tagger, False)
     pickle_tagger._validate()
+
+
+def test_shared_rules(tmp_path: Path) -> None:
+    # By default the rules are not shared
+    nlp = create_tagger()
+    tagger = cast(RuleBasedTagger, nlp.add_pipe('pymusas_rule_based_tagger'))
+    nlp.initialize()
+    nlp_2 = create_tagger()
+    tagger_2 = cast(RuleBasedTagger, nlp_2.add_pipe('pymusas_rule_based_tagger'))
+    nlp_2.initialize()
+    assert not tagger.share_rules
+    assert tagger.rules is not None and tagger_2.rules is not None
+    assert tagger.rules[0] == tagger_2.rules[0]
+    assert tagger.rules[0] is not tagger_2.rules[0]
+    rule = SingleWordRule({'river|noun': ['W3']}, {})
+    other_tagger = RuleBasedTagger()
+    other_tagger.initialize(rules=[rule], ranker=ContextualRuleBasedRanker(0, 0))
+    assert other_tagger.rules is not None
+    assert other_tagger.rules[0] is rule
+    assert RuleBasedTagger().from_bytes(tagger.to_bytes()).rules[0] is not tagger.rules[0]  # type: ignore[index]
+
+    # Pipelines initialised with the same rules and `share_rules` share one
+    # instance of each rule
+    nlp = create_tagger()
+    tagger = cast(RuleBasedTagger, nlp.add_pipe('pymusas_rule_based_tagger', config={'share_rules': True}))
+    nlp.initialize()
+    nlp_2 = create_tagger()
+    tagger_2 = cast(RuleBasedTagger, nlp_2.add_pipe('pymusas_rule_based_tagger', config={'share_rules': True}))
+    nlp_2.initialize()
+    assert tagger.share_rules
+    assert tagger.rules is not None and tagger_2.rules is not None
+    assert tagger.rules[0] is tagger_2.rules[0]
+
+    # Including when they are loaded from bytes or disk
+    nlp.to_disk(tmp_path / "shared")
+    loaded_tagger = cast(RuleBasedTagger, spacy.load(tmp_path / "shared").get_pipe('pymusas_rule_based_tagger'))
+    assert loaded_tagger.share_rules
+    assert loaded_tagger.rules is not None
+    assert loaded_tagger.rules[0] is tagger.rules[0]
+    bytes_tagger = RuleBasedTagger(share_rules=True).from_bytes(tagger.to_bytes())
+    assert bytes_tagger.rules is not None
+    assert bytes_tagger.rules[0] is tagger.rules[0]
+
+    # Rules with different lexicons are not shared
+    rule = SingleWordRule({'river|noun': ['W3']}, {})
+    other_tagger = RuleBasedTagger(share_rules=True)
+    other_tagger.initialize(rules=[rule], ranker=ContextualRuleBasedRanker(0, 0))
+    assert other_tagger.rules is not None
+    assert other_tagger.rules[0] is rule
+    assert other_tagger.rules[0] is not tagger.rules[0]
+
+    # Clearing the cache of a component clears the caches of the components
+    # that share its rules
+    cache_taggers: List[RuleBasedTagger] = []
+    for _ in range(2):
+        cache_tagger = RuleBasedTagger(cache_size=5, share_rules=True)
+        cache_tagger.initialize(rules=[SingleWordRule({'river|noun': ['W3']}, {})],
+                                ranker=ContextualRuleBasedRanker(1, 0))
+        cache_tagger(Doc(Vocab(), words=['river']))
+        cache_taggers.append(cache_tagger)
+    assert cache_taggers[1].cache is not None
+    assert 1 == len(cache_taggers[1].cache)
+    tagger.clear_cache()
+    assert 1 == len(cache_taggers[1].cache)
+    cache_taggers[0].clear_cache()
+    assert 0 == len(cache_taggers[1].cache)
@@ -1,9 +1,9 @@
 import json
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, cast
 
 import pytest
-from spacy.tokens import Doc
+from spacy.tokens import Doc, Token
 from spacy.vocab import Vocab
 
 from pymusas.lexicon_collection import LexiconCollection, MWELexiconCollection
@@ -114,7 +114,8 @@ def create_tagger(pymusas_tags_token_attr: str,
                   default_punctuation_tags: List[str],
                   default_number_tags: List[str],
                   rules: List[Rule],
-                  pos_attribute: str = 'tag_'
+                  pos_attribute: str = 'tag_',
+                  hash_lexicon_lookup: bool = False
                   ) -> RuleBasedTagger:
     remove_extension(pymusas_tags_token_attr)
     remove_extension(pymusas_mwe_indexes_attr)
@@ -122,7 +123,8 @@ def create_tagger(pymusas_tags_token_attr: str,
     
     tagger = RuleBasedTagger(pymusas_tags_token_attr=pymusas_tags_token_attr,
                              pymusas_mwe_indexes_attr=pymusas_mwe_indexes_attr,
-                             pos_attribute=pos_attribute)
+                             pos_attribute=pos_attribute,
+                             hash_lexicon_lookup=hash_lexicon_lookup)
     tagger.initialize(rules=rules, ranker=ranker,
                       default_punctuation_tags=default_punctuation_tags,
                       default_number_tags=default_number_tags)
@@ -142,13 +144,16 @@ def create_non_valid_tagger(pymusas_tags_token_attr: str,
 @pytest.mark.parametrize("pymusas_tags_token_attr,pymusas_mwe_indexes_attr",
                          [('pymusas_tags', 'pymusas_mwe_indexes'),
                           ('pym_tags', 'mwe_indexes')])
+@pytest.mark.parametrize("hash_lexicon_lookup", [False, True])
 def test_rule_based_tagger__call__(pymusas_tags_token_attr: str,
-                                   pymusas_mwe_indexes_attr: str
+                                   pymusas_mwe_indexes_attr: str,
+                                   hash_lexicon_lookup: bool
                                    ) -> None:
     # Test the first case where we have no rules and it should tag everything as
     # Z99
     tagger = create_tagger(pymusas_tags_token_attr, pymusas_mwe_indexes_attr,
-                           ['punc'], ['num'], [empty_word_rule()])
+                           ['punc'], ['num'], [empty_word_rule()],
+                           hash_lexicon_lookup=hash_lexicon_lookup)
     empty_doc = Doc(Vocab(), words=[' ', ' '], spaces=[True, True])
     expected_output = [
         (['Z99'], [(0, 1)]),
@@ -169,7 +174,8 @@ def test_rule_based_tagger__call__(pymusas_tags_token_attr: str,
     
     # Test the punctuation and number POS tags when set by the user
     tagger = create_tagger(pymusas_tags_token_attr, pymusas_mwe_indexes_attr,
-                           ['grammer'], ['digit'], [empty_word_rule()])
+                           ['grammer'], ['digit'], [empty_word_rule()],
+                           hash_lexicon_lookup=hash_lexicon_lookup)
     punctuation_doc = Doc(Vocab(), words=[' ', ' '], spaces=[True, True],
                           tags=['grammer', 'digit'])
     compare_output(expected_output, tagger(punctuation_doc),
@@ -179,7 +185,8 @@ def test_rule_based_tagger__call__(pymusas_tags_token_attr: str,
     test_data_file = Path(TAGGER_DATA_DIR, 'rule_based_single_input_output.json')
     
     tagger = create_tagger(pymusas_tags_token_attr, pymusas_mwe_indexes_attr,
-                           ['punc'], ['num'], [single_word_rule(None)])
+                           ['punc'], ['num'], [single_word_rule(None)],
+                           hash_lexicon_lookup=hash_lexicon_lookup)
     test_doc, expected_output = generate_test_data(test_data_file)
     compare_output(expected_output, tagger(test_doc),
                    pymusas_tags_token_attr, pymusas_mwe_indexes_attr)
@@ -188,7 +195,8 @@ def test_rule_based_tagger__call__(pymusas_tags_token_attr: str,
     rule_pos_mapper = {'adj': ['noun'], 'noun': ['adj']}
     tagger = create_tagger(pymusas_tags_token_attr, pymusas_mwe_indexes_attr,
                            ['punc'], ['num'],
-                           [single_word_rule(rule_pos_mapper)])
+                           [single_word_rule(rule_pos_mapper)],
+                           hash_lexicon_lookup=hash_lexicon_lookup)
     with pytest.raises(AssertionError):
         compare_output(expected_output, tagger(test_doc),
                        pymusas_tags_token_attr, pymusas_mwe_indexes_attr)
@@ -202,7 +210,8 @@ def test_rule_based_tagger__call__(pymusas_tags_token_attr: str,
     # Test the MWE case
     test_data_file = Path(TAGGER_DATA_DIR, 'rule_based_mwe_input_output.json')
     tagger = create_tagger(pymusas_tags_token_attr, pymusas_mwe_indexes_attr,
-                           ['punc'], ['num'], [mwe_word_rule(None)])
+                           ['punc'], ['num'], [mwe_word_rule(None)],
+                           hash_lexicon_lookup=hash_lexicon_lookup)
     test_doc, expected_output = generate_test_data(test_data_file)
     compare_output(expected_output, tagger(test_doc),
                    pymusas_tags_token_attr, pymusas_mwe_indexes_attr)
@@ -210,7 +219,8 @@ def test_rule_based_tagger__call__(pymusas_tags_token_attr: str,
     # Test the MWE case with POS Mapper
     tagger = create_tagger(pymusas_tags_token_attr, pymusas_mwe_indexes_attr,
                            ['punc'], ['num'],
-                           [mwe_word_rule(rule_pos_mapper)])
+                           [mwe_word_rule(rule_pos_mapper)],
+                           hash_lexicon_lookup=hash_lexicon_lookup)
     test_doc, expected_output = generate_test_data(test_data_file,
                                                    test_data_pos_mapper)
     compare_output(expected_output, tagger(test_doc),
@@ -220,7 +230,8 @@ def test_rule_based_tagger__call__(pymusas_tags_token_attr: str,
     test_data_file = Path(TAGGER_DATA_DIR, 'rule_based_single_mwe_input_output.json')
     tagger = create_tagger(pymusas_tags_token_attr, pymusas_mwe_indexes_attr,
                            ['punc'], ['num'],
-                           [single_word_rule(None), mwe_word_rule(None)])
+                           [single_word_rule(None), mwe_word_rule(None)],
+                           hash_lexicon_lookup=hash_lexicon_lookup)
     test_doc, expected_output = generate_test_data(test_data_file)
     compare_output(expected_output, tagger(test_doc),
                    pymusas_tags_token_attr, pymusas_mwe_indexes_attr)
@@ -233,11 +244,137 @@ def test_rule_based_tagger__call__(pymusas_tags_token_attr: str,
         tagger(test_doc)
     
     # Error case 2: error occur during tagging as the token does not contain
-    # the `pos` attribute.
+    # the `pos` attribute, with the hash lexicon lookup the attribute has to
+    # be a spaCy attribute.
+    if hash_lexicon_lookup:
+        with pytest.raises(ValueError):
+            create_tagger(pymusas_tags_token_attr, pymusas_mwe_indexes_attr,
+                          ['punc'], ['num'],
+                          [single_word_rule(None), mwe_word_rule(None)],
+                          pos_attribute='custom_pos', hash_lexicon_lookup=True)
+        return
     tagger = create_tagger(pymusas_tags_token_attr, pymusas_mwe_indexes_attr,
                            ['punc'], ['num'],
                            [single_word_rule(None), mwe_word_rule(None)],
                            pos_attribute='custom_pos')
     with pytest.raises(AttributeError):
         tagger(test_doc)
+
+
+def test_rule_based_tagger__call__cache() -> None:
+    test_data_file = Path(TAGGER_DATA_DIR, 'rule_based_single_mwe_input_output.json')
+    tagger = create_tagger('pymusas_tags', 'pymusas_mwe_indexes', ['punc'], ['num'],
+                           [single_word_rule(None), mwe_word_rule(None)])
+    assert tagger.cache is None
+    
+    remove_extension('pymusas_tags')
+    remove_extension('pymusas_mwe_indexes')
+    with pytest.raises(ValueError):
+        RuleBasedTagger(cache_size=-1)
+    remove_extension('pymusas_tags')
+    remove_extension('pymusas_mwe_indexes')
+    tagger = RuleBasedTagger(pos_attribute='tag_', cache_size=10)
+    rules: List[Rule] = [single_word_rule(None), mwe_word_rule(None)]
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+    tagger.initialize(rules=rules, ranker=ranker)
+    assert tagger.cache is not None
+    assert 10 == tagger.cache.maxsize
+
+    test_doc, expected_output = generate_test_data(test_data_file)
+    compare_output(expected_output, tagger(test_doc), 'pymusas_tags', 'pymusas_mwe_indexes')
+    test_doc, expected_output = generate_test_data(test_data_file)
+    compare_output(expected_output, tagger(test_doc), 'pymusas_tags', 'pymusas_mwe_indexes')
+    assert (1, 1) == (tagger.cache.hits, tagger.cache.misses)
     
+    # Modifying the tags of a token should not modify the cached value.
+    test_doc[0]._.pymusas_tags.append('Z1')
+    test_doc, expected_output = generate_test_data(test_data_file)
+    compare_output(expected_output, tagger(test_doc), 'pymusas_tags', 'pymusas_mwe_indexes')
+
+    # The cache is cleared when the rules change.
+    tagger.initialize(rules=[empty_word_rule()])
+    tagger(test_doc)
+    assert ['Z99'] == test_doc[0]._.pymusas_tags
+    assert 1 == len(tagger.cache)
+    tagger.clear_cache()
+    assert 0 == len(tagger.cache)
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 128])
+@pytest.mark.parametrize("cache_size", [0, 10])
+@pytest.mark.parametrize("hash_lexicon_lookup", [False, True])
+def test_rule_based_tagger_pipe(batch_size: int, cache_size: int, hash_lexicon_lookup: bool) -> None:
+    def test_docs() -> List[Tuple[Doc, List[Tuple[List[str], List[Tuple[int, int]]]]]]:
+        docs_expected_output = []
+        for test_file_name in ['rule_based_single_input_output.json',
+                               'rule_based_mwe_input_output.json',
+                               'rule_based_single_mwe_input_output.json',
+                               'rule_based_single_mwe_input_output.json']:
+            docs_expected_output.append(generate_test_data(Path(TAGGER_DATA_DIR, test_file_name)))
+        empty_doc = Doc(Vocab(), words=[' ', ' '], spaces=[True, True], tags=['punc', 'num'])
+        docs_expected_output.insert(1, (empty_doc, [(['PUNCT'], [(0, 1)]), (['N1'], [(1, 2)])]))
+        return docs_expected_output
+
+    rules: List[Rule] = [single_word_rule(None), mwe_word_rule(None)]
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+    remove_extension('pymusas_tags')
+    remove_extension('pymusas_mwe_indexes')
+    tagger = RuleBasedTagger(pos_attribute='tag_', cache_size=cache_size,
+                             hash_lexicon_lookup=hash_lexicon_lookup)
+    tagger.initialize(rules=rules, ranker=ranker)
+    assert hash_lexicon_lookup == tagger.hash_lexicon_lookup
+
+    docs_expected_output = test_docs()
+    docs = [doc for doc, _ in docs_expected_output]
+    tagged_docs = list(tagger.pipe(iter(docs), batch_size=batch_size))
+    assert len(docs) == len(tagged_docs)
+    for doc, tagged_doc, (_, expected_output) in zip(docs, tagged_docs, docs_expected_output):
+        assert doc is tagged_doc
+        compare_output(expected_output, tagged_doc, 'pymusas_tags', 'pymusas_mwe_indexes')
+    # Documents with the same tokens do not share the same tag lists
+    docs[3][0]._.pymusas_tags.append('Z1')
+    compare_output(docs_expected_output[4][1], docs[4], 'pymusas_tags', 'pymusas_mwe_indexes')
+    if tagger.cache is not None:
+        assert (1, 4) == (tagger.cache.hits, tagger.cache.misses)
+        tagged_docs = list(tagger.pipe([doc for doc, _ in test_docs()], batch_size=batch_size))
+        for tagged_doc, (_, expected_output) in zip(tagged_docs, docs_expected_output):
+            compare_output(expected_output, tagged_doc, 'pymusas_tags', 'pymusas_mwe_indexes')
+        assert (6, 4) == (tagger.cache.hits, tagger.cache.misses)
+
+    # The tags are assigned through the setters of token extensions that have them
+    tags: Dict[int, List[str]] = {}
+    Token.set_extension('pymusas_tags', getter=lambda token: tags.get(token.i),
+                        setter=lambda token, value: tags.__setitem__(token.i, value), force=True)
+    doc, expected_output = test_docs()[1]
+    list(tagger.pipe([doc], batch_size=batch_size))
+    assert {0: ['PUNCT'], 1: ['N1']} == tags
+    assert [[(0, 1)], [(1, 2)]] == [token._.pymusas_mwe_indexes for token in doc]
+
+    with pytest.raises(ValueError):
+        list(tagger.pipe(docs, batch_size=0))
+
+    # A rule modified in place is used once the cache has been cleared
+    single_rule = cast(SingleWordRule, cast(List[Rule], tagger.rules)[0])
+    doc, _ = test_docs()[0]
+    list(tagger.pipe([doc], batch_size=batch_size))
+    assert ['Z2'] == doc[0]._.pymusas_tags
+    single_rule.lexicon_collection['London|noun'] = ['Z3']
+    tagger.clear_cache()
+    list(tagger.pipe([doc], batch_size=batch_size))
+    assert ['Z3'] == doc[0]._.pymusas_tags
+    single_rule.lexicon_collection['London|noun'] = ['Z2']
+    tagger.clear_cache()
+
+    # Error case 1: Non validated tagger
+    tagger = create_non_valid_tagger('pymusas_tags', 'pymusas_mwe_indexes')
+    with pytest.raises(ValueError):
+        list(tagger.pipe(docs, batch_size=batch_size))
+
+    if hash_lexicon_lookup:
+        return
+    # Error case 2: error occur during tagging as the token does not contain
+    # the `pos` attribute.
+    tagger = create_tagger('pymusas_tags', 'pymusas_mwe_indexes', ['punc'], ['num'],
+                           rules, pos_attribute='custom_pos')
+    with pytest.raises(AttributeError):
+        list(tagger.pipe(docs, batch_size=batch_size))
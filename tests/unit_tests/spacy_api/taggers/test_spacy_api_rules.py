@@ -1,8 +1,13 @@
-from typing import Callable, Dict, List
+from typing import Callable, Dict, List, Optional
 
+import pytest
 import spacy
+from spacy.attrs import LEMMA, ORTH, TAG
+from spacy.tokens import Doc
+from spacy.vocab import Vocab
 
 from pymusas.spacy_api.taggers import rules  # noqa: F401
+from pymusas.spacy_api.taggers.rules import SingleWordRuleHashLookup
 from pymusas.taggers.rules.mwe import MWERule
 from pymusas.taggers.rules.rule import Rule
 from pymusas.taggers.rules.single_word import SingleWordRule
@@ -29,3 +34,25 @@ def test_rule_list() -> None:
     list_of_rules = rule_list_call(*(single_rule, mwe_rule))
     assert isinstance(list_of_rules, List)
     assert [single_rule, mwe_rule] == list_of_rules
+
+
+@pytest.mark.parametrize("pos_mapper", [None, {'NN': ['noun', 'b|noun'], 'JJ': ['adj']}])
+def test_single_word_rule_hash_lookup(pos_mapper: Optional[Dict[str, List[str]]]) -> None:
+    lexicon = {'bank|noun': ['I1.1'], 'Bank|NN': ['Z3'], 'river|noun': ['W3'],
+               'a|b|noun': ['Z1'], 'a|b|c': ['Z2'], 'bank|': ['Z4']}
+    lemma_lexicon = {'bank': ['I1.1'], 'a|b': ['Z1'], 'river': ['W3']}
+    single_word_rule = SingleWordRule(lexicon, lemma_lexicon, pos_mapper)
+    hash_lookup = SingleWordRuleHashLookup(single_word_rule)
+
+    tokens = ['Bank', 'a|b', 'a', 'Rivers', 'BANK', 'bank']
+    lemmas = ['bank', 'a|b', 'a', 'River', '', 'bank']
+    pos_tags = ['NN', 'noun', 'b|c', 'NN', 'JJ', '']
+    docs = [Doc(Vocab(), words=tokens, lemmas=lemmas, tags=pos_tags),
+            Doc(Vocab(), words=tokens[::-1], lemmas=lemmas[::-1], tags=pos_tags[::-1])]
+    sentences = [(doc.to_array([ORTH, LEMMA, TAG]), doc.vocab.strings) for doc in docs]
+    expected_output = [single_word_rule(tokens, lemmas, pos_tags),
+                       single_word_rule(tokens[::-1], lemmas[::-1], pos_tags[::-1])]
+    assert any(expected_output[0])
+    assert expected_output[0] == hash_lookup(*sentences[0])
+    assert expected_output == list(hash_lookup.call_batch(sentences))
+    assert [] == list(hash_lookup.call_batch([]))
@@ -1,10 +1,13 @@
 import pytest
 from spacy.language import Language
 from spacy.tokens import Doc, Token
+from spacy.vocab import Vocab
 
 from pymusas.spacy_api.utils import (
+    _token_extension_user_data_layout,
     remove_custom_token_extension,
     set_custom_token_extension,
+    set_token_extension_values,
     update_factory_attributes,
 )
 
@@ -38,6 +41,37 @@ def test_remove_custom_token_extension() -> None:
     assert Token.has_extension('tags')
     remove_custom_token_extension('tags')
     assert not Token.has_extension('tags')
+
+
+def test_set_token_extension_values() -> None:
+    set_custom_token_extension('bulk_tags')
+    set_tags: list[list[str]] = []
+    Token.set_extension('setter_tags', getter=lambda token: None,
+                        setter=lambda token, value: set_tags.append(value))
+    try:
+        # Fails if spaCy changes how it stores the values of `Token._` in
+        # `Doc.user_data`, in which case the values are no longer set in bulk.
+        assert _token_extension_user_data_layout('bulk_tags')
+
+        words = ['The', 'river', 'bank']
+        values = [['Z5'], ['W3', 'M4'], ['I1.1']]
+        bulk_doc = Doc(Vocab(), words=words)
+        set_token_extension_values(bulk_doc, 'bulk_tags', iter(values))
+        token_doc = Doc(Vocab(), words=words)
+        for token, value in zip(token_doc, values):
+            token._.bulk_tags = value
+        assert values == [token._.bulk_tags for token in bulk_doc]
+        assert token_doc.user_data == bulk_doc.user_data
+        assert bulk_doc.copy().user_data == bulk_doc.user_data
+        assert values == [token._.bulk_tags for token in Doc(Vocab()).from_bytes(bulk_doc.to_bytes())]
+
+        # A custom attribute with a setter is set through the `Token._` of each token.
+        set_token_extension_values(bulk_doc, 'setter_tags', values)
+        assert values == set_tags
+        assert token_doc.user_data == bulk_doc.user_data
+    finally:
+        remove_custom_token_extension('bulk_tags')
+        remove_custom_token_extension('setter_tags')
     # check that we can remove an extension that doesn't exist
     remove_custom_token_extension('tags')
 
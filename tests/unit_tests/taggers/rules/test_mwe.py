@@ -254,6 +254,11 @@ def test_mwe_rule__NON_SPECIAL_CASES(non_special_data: Tuple[Tuple[List[str],
     compare_token_ranking_meta_data(expected_ranking_meta_data,
                                     mwe_rule(tokens, lemmas, pos_tags))
 
+    # The rule matches are the same when a batch of sentences is tagged
+    sentences = [(tokens, lemmas, pos_tags), (tokens[1:], lemmas[1:], pos_tags[1:]),
+                 (tokens, lemmas, pos_tags)]
+    assert [mwe_rule(*sentence) for sentence in sentences] == list(mwe_rule.call_batch(sentences))
+
 
 @pytest.mark.parametrize('from_bytes', [False, True])
 def test_mwe_rules_WILDCARD_CASES(wildcard_data: Tuple[Tuple[List[str],
@@ -277,6 +282,11 @@ def test_mwe_rules_WILDCARD_CASES(wildcard_data: Tuple[Tuple[List[str],
     compare_token_ranking_meta_data(expected_ranking_meta_data,
                                     mwe_rule(tokens, lemmas, pos_tags))
 
+    # The rule matches are the same when a batch of sentences is tagged
+    sentences = [(tokens, lemmas, pos_tags), (tokens[1:], lemmas[1:], pos_tags[1:]),
+                 (tokens, lemmas, pos_tags)]
+    assert [mwe_rule(*sentence) for sentence in sentences] == list(mwe_rule.call_batch(sentences))
+
 
 def test_to_from_bytes() -> None:
     lexicon = {
@@ -25,6 +25,7 @@ def test_rule() -> None:
 
     concrete_rule = TestRule()
     assert [[]] == concrete_rule([], [], [])
+    assert [[[]], [[]]] == list(concrete_rule.call_batch([([], [], []), (['a'], ['a'], ['DET'])]))
     assert isinstance(concrete_rule, Rule)
 
     assert b'test' == concrete_rule.to_bytes()
@@ -175,6 +175,11 @@ def test_single_word_rule__NON_SPECIAL_CASES(from_bytes: bool) -> None:
     compare_token_ranking_meta_data(expected_ranking_meta_data,
                                     single_rule(tokens, lemmas, pos_tags))
 
+    # The rule matches are the same when a batch of sentences is tagged
+    sentences = [(tokens, lemmas, pos_tags), (tokens[1:], lemmas[1:], pos_tags[1:]),
+                 (tokens, lemmas, pos_tags)]
+    assert [single_rule(*sentence) for sentence in sentences] == list(single_rule.call_batch(sentences))
+
 
 @pytest.mark.parametrize('from_bytes', [False, True])
 def test_single_word_rule_pos_mapper__NON_SPECIAL_CASES(from_bytes: bool
@@ -196,6 +201,11 @@ def test_single_word_rule_pos_mapper__NON_SPECIAL_CASES(from_bytes: bool
     compare_token_ranking_meta_data(expected_ranking_meta_data,
                                     single_rule(tokens, lemmas, pos_tags))
 
+    # The rule matches are the same when a batch of sentences is tagged
+    sentences = [(tokens, lemmas, pos_tags), (tokens[1:], lemmas[1:], pos_tags[1:]),
+                 (tokens, lemmas, pos_tags)]
+    assert [single_rule(*sentence) for sentence in sentences] == list(single_rule.call_batch(sentences))
+
 
 @pytest.mark.parametrize("pos_mapper", [None, {'NN': ['adv', 'noun']}])
 def test_to_from_bytes(pos_mapper: Optional[Dict[str, List[str]]]) -> None:
@@ -0,0 +1,236 @@
+import asyncio
+from pathlib import Path
+import threading
+import time
+from typing import List, Tuple
+
+import pytest
+
+from pymusas.lexicon_collection import LexiconCollection, MWELexiconCollection
+from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker
+from pymusas.taggers.async_tagger import AsyncTagger
+from pymusas.taggers.rule_based import RuleBasedTagger
+from pymusas.taggers.rules.mwe import MWERule
+from pymusas.taggers.rules.rule import Rule
+from pymusas.taggers.rules.single_word import SingleWordRule
+
+
+DATA_DIR = Path(__file__, '..', '..', 'data').resolve()
+TAGGER_DATA_DIR = Path(DATA_DIR, 'taggers', 'rule_based')
+
+
+class RecordingTagger():
+    '''
+    A tagger that tags every token as `Z1` and records the number of calls
+    and the maximum number of concurrent calls. Raises a `ValueError` if the
+    tokens are `['error']`.
+    '''
+
+    def __init__(self, sleep: float = 0.0) -> None:
+        self.sleep = sleep
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, tokens: List[str]) -> List[Tuple[List[str], List[Tuple[int, int]]]]:
+        with self._lock:
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.running, self.max_running)
+        time.sleep(self.sleep)
+        with self._lock:
+            self.running -= 1
+        if tokens == ['error']:
+            raise ValueError('error')
+        return [(['Z1'], [(index, index + 1)]) for index in range(len(tokens))]
+
+
+class BatchRecordingTagger(RecordingTagger):
+    '''
+    A `RecordingTagger` with a `tag_batch` method, like the
+    :class:`pymusas.taggers.neural.NeuralTagger`, that records the sentences
+    of each batch.
+    '''
+
+    def __init__(self, sleep: float = 0.0) -> None:
+        super().__init__(sleep)
+        self.batches: List[List[List[str]]] = []
+
+    def tag_batch(self, sentences: List[List[str]]) -> List[List[Tuple[List[str], List[Tuple[int, int]]]]]:
+        with self._lock:
+            self.batches.append(sentences)
+        return [self(tokens) for tokens in sentences]
+
+
+def create_rule_based_tagger() -> RuleBasedTagger:
+    single_lexicon_file = Path(TAGGER_DATA_DIR, 'single_lexicon.tsv')
+    mwe_lexicon_file = Path(TAGGER_DATA_DIR, 'mwe_lexicon.tsv')
+    rules: List[Rule] = [
+        SingleWordRule(LexiconCollection.from_tsv(single_lexicon_file),
+                       LexiconCollection.from_tsv(single_lexicon_file, include_pos=False)),
+        MWERule(MWELexiconCollection.from_tsv(mwe_lexicon_file))
+    ]
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+    return RuleBasedTagger(rules, ranker)
+
+
+def test_async_tagger__init__() -> None:
+    tagger = create_rule_based_tagger()
+    with AsyncTagger(tagger) as async_tagger:
+        assert 'process' == async_tagger.executor_type
+        assert 32 == async_tagger.max_batch_size
+        assert async_tagger.max_concurrency >= 1
+    with AsyncTagger(RecordingTagger(), max_workers=3, max_batch_size=2) as async_tagger:
+        assert 'thread' == async_tagger.executor_type
+        assert 3 == async_tagger.max_concurrency
+        assert 2 == async_tagger.max_batch_size
+    with AsyncTagger(tagger, executor='thread', max_workers=3, max_concurrency=1) as async_tagger:
+        assert 'thread' == async_tagger.executor_type
+        assert 1 == async_tagger.max_concurrency
+
+    with pytest.raises(ValueError):
+        AsyncTagger(tagger, executor='gpu')
+    with pytest.raises(ValueError):
+        AsyncTagger(tagger, max_concurrency=0)
+    with pytest.raises(ValueError):
+        AsyncTagger(tagger, max_batch_size=0)
+
+
+@pytest.mark.parametrize("executor", ['thread', 'process'])
+def test_async_tagger_rule_based(executor: str) -> None:
+    tagger = create_rule_based_tagger()
+    sentences = [
+        (['East', 'London', 'is', 'great'], ['east', 'london', 'be', 'great'],
+         ['noun', 'noun', 'verb', 'adj']),
+        (['the', 'river', '.'], ['the', 'river', '.'], ['det', 'noun', 'punc']),
+        (['London'], ['london'], ['noun'])
+    ] * 5
+    expected_output = [tagger(*sentence) for sentence in sentences]
+
+    async def tag() -> None:
+        async with AsyncTagger(tagger, executor=executor, max_workers=2,
+                               max_batch_size=4) as async_tagger:
+            assert expected_output == await async_tagger.tag_sentences(sentences)
+            assert expected_output[0] == await async_tagger(*sentences[0])
+            assert tagger(sentences[1][0], ['', '', ''], ['', '', '']) \
+                == await async_tagger(sentences[1][0])
+
+    asyncio.run(tag())
+
+
+def test_async_tagger_batching_and_concurrency() -> None:
+    tagger = RecordingTagger(sleep=0.05)
+    sentences: List[Tuple[List[str], List[str], List[str]]] \
+        = [([str(index)] * (index + 1), [], []) for index in range(10)]
+
+    async def tag() -> None:
+        with AsyncTagger(tagger, max_workers=4, max_concurrency=2,
+                         max_batch_size=3) as async_tagger:
+            output = await async_tagger.tag_sentences(sentences)
+            for index, tags_indexes in enumerate(output):
+                assert index + 1 == len(tags_indexes)
+            # 10 sentences in batches of at most 3, with at most 2 batches
+            # being tagged at the same time.
+            assert 10 == tagger.calls
+            assert 2 == tagger.max_running
+
+            with pytest.raises(ValueError):
+                await async_tagger(['error'])
+            # The error of one sentence does not affect the other sentences
+            # in the batch.
+            results = await asyncio.gather(async_tagger(['a']), async_tagger(['error']),
+                                           return_exceptions=True)
+            assert [(['Z1'], [(0, 1)])] == results[0]
+            assert isinstance(results[1], ValueError)
+
+        with pytest.raises(RuntimeError):
+            await async_tagger(['a'])
+
+    asyncio.run(tag())
+
+
+def test_async_tagger_tag_batch() -> None:
+    tagger = BatchRecordingTagger(sleep=0.05)
+    sentences: List[Tuple[List[str], List[str], List[str]]] \
+        = [([str(index)], [], []) for index in range(5)]
+
+    async def tag() -> None:
+        async with AsyncTagger(tagger, max_workers=1, max_batch_size=3) as async_tagger:
+            output = await async_tagger.tag_sentences(sentences)
+            assert [[(['Z1'], [(0, 1)])]] * 5 == output
+            assert [[['0'], ['1'], ['2']], [['3'], ['4']]] == tagger.batches
+
+            # If the batch fails each sentence is tagged separately so that
+            # the error only affects the sentence that caused it.
+            tagger.batches.clear()
+            tagger.calls = 0
+            results = await asyncio.gather(async_tagger(['a']), async_tagger(['error']),
+                                           async_tagger(['b']), return_exceptions=True)
+            assert [[['a'], ['error'], ['b']]] == tagger.batches
+            assert [(['Z1'], [(0, 1)])] == results[0]
+            assert isinstance(results[1], ValueError)
+            assert [(['Z1'], [(0, 1)])] == results[2]
+            assert 5 == tagger.calls
+
+    asyncio.run(tag())
+
+
+def test_async_tagger_close() -> None:
+    tagger = RecordingTagger(sleep=0.5)
+
+    async def tag() -> None:
+        with AsyncTagger(tagger, max_workers=1) as async_tagger:
+            request = asyncio.ensure_future(async_tagger(['a']))
+            await asyncio.sleep(0.05)
+        # Leaving the `with` block does not wait for the batch being tagged.
+        assert not request.done()
+        assert 1 == tagger.running
+        assert [(['Z1'], [(0, 1)])] == await request
+
+    asyncio.run(tag())
+
+
+def test_async_tagger_async_close() -> None:
+    tagger = RecordingTagger(sleep=0.2)
+
+    async def tag() -> None:
+        async with AsyncTagger(tagger, max_workers=1, max_batch_size=1) as async_tagger:
+            first = asyncio.ensure_future(async_tagger(['a']))
+            second = asyncio.ensure_future(async_tagger(['b']))
+            await asyncio.sleep(0.05)
+        # Leaving the `async with` block cancels the request that has not been
+        # sent to the executor and waits for the batch being tagged.
+        assert first.done()
+        assert [(['Z1'], [(0, 1)])] == first.result()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        assert 1 == tagger.calls
+        with pytest.raises(RuntimeError):
+            await async_tagger(['c'])
+
+    asyncio.run(tag())
+
+
+def test_async_tagger_cancellation() -> None:
+    tagger = RecordingTagger(sleep=0.1)
+
+    async def tag() -> None:
+        with AsyncTagger(tagger, max_workers=1, max_batch_size=1) as async_tagger:
+            first = asyncio.ensure_future(async_tagger(['a']))
+            second = asyncio.ensure_future(async_tagger(['b']))
+            await asyncio.sleep(0.01)
+            # The second request is waiting for the first to finish so it
+            # will never be sent to the executor.
+            second.cancel()
+            assert [(['Z1'], [(0, 1)])] == await first
+            with pytest.raises(asyncio.CancelledError):
+                await second
+            assert 1 == tagger.calls
+
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(async_tagger(['c']), timeout=0.01)
+            # The event loop is not blocked while tagging.
+            assert [(['Z1'], [(0, 1)])] == await async_tagger(['d'])
+
+    asyncio.run(tag())
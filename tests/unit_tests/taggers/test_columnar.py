@@ -0,0 +1,108 @@
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+
+from pymusas.taggers.columnar import ColumnarTags, TagSequenceVocabulary
+
+
+TAGS_INDEXES: List[Tuple[List[str], List[Tuple[int, int]]]] = [
+    (['Z99'], [(0, 1)]),
+    (['W3', 'M4'], [(1, 3)]),
+    (['W3', 'M4'], [(1, 3)]),
+    (['PUNCT'], [(3, 4)]),
+    (['Z99'], [(4, 5)])
+]
+
+
+def test_tag_sequence_vocabulary() -> None:
+    vocabulary = TagSequenceVocabulary()
+    assert 0 == len(vocabulary)
+    assert ['Z99'] not in vocabulary
+    assert 0 == vocabulary.add(['Z99'])
+    assert 1 == vocabulary.add(iter(['W3', 'M4']))
+    assert 0 == vocabulary.add(('Z99',))
+    assert 2 == vocabulary.add([])
+    assert 3 == len(vocabulary)
+    assert ('Z99',) == vocabulary[0]
+    assert ('W3', 'M4') == vocabulary[1]
+    assert tuple() == vocabulary[2]
+    assert ['W3', 'M4'] in vocabulary
+    assert ('W3',) not in vocabulary
+    assert 'Z99' not in vocabulary
+    with pytest.raises(IndexError):
+        vocabulary[3]
+
+
+def test_columnar_tags() -> None:
+    columnar_tags = ColumnarTags.from_tags_indexes(TAGS_INDEXES)
+    assert 5 == len(columnar_tags)
+    assert 3 == len(columnar_tags.vocabulary)
+    assert [0, 1, 1, 2, 0] == columnar_tags.tag_sequence_ids.tolist()
+    assert [0, 1, 1, 3, 4] == columnar_tags.start_indexes.tolist()
+    assert [1, 3, 3, 4, 5] == columnar_tags.end_indexes.tolist()
+    for array in [columnar_tags.tag_sequence_ids, columnar_tags.start_indexes,
+                  columnar_tags.end_indexes]:
+        assert np.int32 == array.dtype
+    
+    for index, expected_tags_indexes in enumerate(TAGS_INDEXES):
+        assert expected_tags_indexes == columnar_tags[index]
+        assert tuple(expected_tags_indexes[0]) == columnar_tags.tags(index)
+    assert TAGS_INDEXES[-1] == columnar_tags[-1]
+    assert TAGS_INDEXES == list(columnar_tags)
+    assert TAGS_INDEXES == columnar_tags.to_list()
+    assert columnar_tags == TAGS_INDEXES
+    assert columnar_tags != TAGS_INDEXES[1:]
+    assert columnar_tags != 1
+    assert 'ColumnarTags' in repr(columnar_tags)
+    # The returned views can be modified without modifying the columnar tags.
+    tags, indexes = columnar_tags[0]
+    tags.append('Z1')
+    indexes.append((0, 2))
+    assert TAGS_INDEXES[0] == columnar_tags[0]
+    with pytest.raises(IndexError):
+        columnar_tags[5]
+
+    # Slicing shares the same arrays and vocabulary
+    sliced_columnar_tags = columnar_tags[1:3]
+    assert isinstance(sliced_columnar_tags, ColumnarTags)
+    assert TAGS_INDEXES[1:3] == list(sliced_columnar_tags)
+    assert np.shares_memory(sliced_columnar_tags.start_indexes, columnar_tags.start_indexes)
+    assert sliced_columnar_tags.vocabulary is columnar_tags.vocabulary
+
+    # Equality between columnar tags
+    vocabulary = TagSequenceVocabulary()
+    vocabulary.add(['N1'])
+    other_vocabulary_columnar_tags = ColumnarTags.from_tags_indexes(TAGS_INDEXES, vocabulary)
+    assert [1, 2, 2, 3, 1] == other_vocabulary_columnar_tags.tag_sequence_ids.tolist()
+    assert columnar_tags == other_vocabulary_columnar_tags
+    assert columnar_tags == ColumnarTags.from_tags_indexes(TAGS_INDEXES, columnar_tags.vocabulary)
+    assert columnar_tags != sliced_columnar_tags
+    different_tags = ColumnarTags.from_tags_indexes([(['N1'], [(0, 1)])] + TAGS_INDEXES[1:])
+    assert columnar_tags != different_tags
+    different_indexes = ColumnarTags.from_tags_indexes([(['Z99'], [(0, 2)])] + TAGS_INDEXES[1:])
+    assert columnar_tags != different_indexes
+
+    # Sharing a vocabulary
+    shared_vocabulary = TagSequenceVocabulary()
+    first = ColumnarTags.from_tags_indexes(TAGS_INDEXES[:2], shared_vocabulary)
+    second = ColumnarTags.from_tags_indexes(TAGS_INDEXES[2:], shared_vocabulary)
+    assert first.vocabulary is second.vocabulary
+    assert 3 == len(shared_vocabulary)
+    assert [1, 2, 0] == second.tag_sequence_ids.tolist()
+
+    empty_columnar_tags = ColumnarTags.from_tags_indexes([])
+    assert 0 == len(empty_columnar_tags)
+    assert [] == list(empty_columnar_tags)
+    assert empty_columnar_tags == []
+
+
+def test_columnar_tags_errors() -> None:
+    with pytest.raises(ValueError):
+        ColumnarTags.from_tags_indexes([(['Z99'], [(0, 1), (2, 3)])])
+    with pytest.raises(ValueError):
+        ColumnarTags.from_tags_indexes([(['Z99'], [])])
+    with pytest.raises(ValueError):
+        ColumnarTags([0, 1], [0], [1], TagSequenceVocabulary())
+    with pytest.raises(ValueError):
+        ColumnarTags([[0]], [[0]], [[1]], TagSequenceVocabulary())
@@ -1,13 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import pytest
 
 from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker
+from pymusas.taggers.columnar import ColumnarTags
 from pymusas.taggers.hybrid import HybridTagger
 from pymusas.taggers.neural import NeuralTagger
+from pymusas.taggers.rule_based import RuleBasedTagger
 from pymusas.taggers.rules.single_word import SingleWordRule
 
 from .test_rule_based import generate_test_data, mwe_word_rule, single_word_rule
+from .utils import save_token_layer_bem
 
 
 DATA_DIR = Path(__file__, '..', '..', 'data').resolve()
@@ -125,3 +129,137 @@ def test_hybrid_tagger__call__(neural_tagger: NeuralTagger) -> None:
     expected_output[3] = (["X2.4", "P1"], [(3, 4)])
     tagger_output = tagger(test_tokens, test_lemmas, test_pos_tags)
     assert expected_output == tagger_output
+
+
+def test_hybrid_tagger_tag_columnar(neural_tagger: NeuralTagger) -> None:
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments([single_word_rule(None)]))
+    tagger = HybridTagger([single_word_rule(None)], ranker, neural_tagger)
+    test_data_file = Path(TAGGER_DATA_DIR, 'rule_based_single_input_output.json')
+    (test_tokens, test_lemmas, test_pos_tags, _) = generate_test_data(test_data_file)
+    columnar_tags = tagger.tag_columnar(test_tokens, test_lemmas, test_pos_tags)
+    assert isinstance(columnar_tags, ColumnarTags)
+    assert tagger(test_tokens, test_lemmas, test_pos_tags) == list(columnar_tags)
+
+
+def test_hybrid_tagger_context_window(neural_tagger: NeuralTagger) -> None:
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments([single_word_rule(None)]))
+    with pytest.raises(ValueError):
+        HybridTagger([single_word_rule(None)], ranker, neural_tagger, context_window=-1)
+
+    tagger = HybridTagger([single_word_rule(None)], ranker, neural_tagger)
+    assert tagger.context_window is None
+    test_data_file = Path(TAGGER_DATA_DIR, 'rule_based_single_input_output.json')
+    (test_tokens, test_lemmas, test_pos_tags, _) = generate_test_data(test_data_file)
+    expected_output = tagger(test_tokens, test_lemmas, test_pos_tags)
+
+    # A context window that covers all of the tokens is the same as no context window
+    tagger = HybridTagger([single_word_rule(None)], ranker, neural_tagger,
+                          context_window=len(test_tokens))
+    assert expected_output == tagger(test_tokens, test_lemmas, test_pos_tags)
+
+    # Only the unknown token, index 1, is tagged by the neural tagger using
+    # a context window of 1 token either side of it.
+    tagger = HybridTagger([single_word_rule(None)], ranker, neural_tagger, context_window=1)
+    context_window_output = tagger(test_tokens, test_lemmas, test_pos_tags)
+    assert neural_tagger(test_tokens[0:3])[1] == context_window_output[1]
+    assert expected_output[:1] + expected_output[2:] \
+        == context_window_output[:1] + context_window_output[2:]
+
+
+@pytest.mark.parametrize("context_window", [None, 1])
+def test_hybrid_tagger_neural_disambiguation(neural_tagger: NeuralTagger,
+                                             context_window: int | None) -> None:
+    lemma_lexicon = {'river': ['W3/M4', 'N5+', 'Z2'], 'bank': ['I1.1', 'W3/M4'], 'full': ['N5.1+']}
+    rule = SingleWordRule({}, lemma_lexicon)
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments([rule]))
+    tokens = ['The', 'river', 'bank', 'was', 'full']
+    lemmas = ['the', 'river', 'bank', 'be', 'full']
+    pos_tags = ['', '', '', '', '']
+
+    tagger = HybridTagger([rule], ranker, neural_tagger, context_window=context_window)
+    assert not tagger.neural_disambiguation
+    expected_output = tagger(tokens, lemmas, pos_tags)
+    assert (['I1.1', 'W3/M4'], [(2, 3)]) == expected_output[2]
+
+    tagger = HybridTagger([rule], ranker, neural_tagger, context_window=context_window,
+                          neural_disambiguation=True)
+    output = tagger(tokens, lemmas, pos_tags)
+    # Unknown tokens and tokens with one rule based tag are not changed.
+    for token_index in [0, 3, 4]:
+        assert expected_output[token_index] == output[token_index]
+    # The tags of ambiguous tokens are re-ranked by the neural tagger, which
+    # only scores the rule based tags.
+    for token_index in [1, 2]:
+        tags, indexes = output[token_index]
+        assert expected_output[token_index][1] == indexes
+        assert sorted(expected_output[token_index][0]) == sorted(tags)
+    if context_window is None:
+        neural_tags_indexes = neural_tagger(tokens, [None, ['W3/M4', 'N5+', 'Z2'], ['I1.1', 'W3/M4'], None, None])
+        for token_index in [1, 2]:
+            neural_tags = neural_tags_indexes[token_index][0]
+            assert neural_tags == output[token_index][0][:len(neural_tags)]
+
+
+def test_hybrid_tagger_lazy_neural_tagger() -> None:
+    neural_tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu",
+                                 top_n=2, lazy_load=True)
+    rule = SingleWordRule({}, {'river': ['W3/M4', 'N5+'], 'bank': ['I1.1']})
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments([rule]))
+    tagger = HybridTagger([rule], ranker, neural_tagger)
+
+    # The model is not loaded when the rules tag all of the tokens
+    assert [(['W3/M4', 'N5+'], [(0, 1)]), (['I1.1'], [(1, 2)])] \
+        == tagger(['river', 'bank'], ['river', 'bank'], ['', ''])
+    was_loaded = neural_tagger.is_loaded
+
+    output = tagger(['river', 'bank', 'fish'], ['river', 'bank', 'fish'], ['', '', ''])
+    assert (False, True) == (was_loaded, neural_tagger.is_loaded)
+    assert 2 == len(output[2][0])
+
+
+@pytest.mark.parametrize("token_layers", [False, True])
+@pytest.mark.parametrize("context_window,neural_disambiguation", [(None, False), (1, True)])
+def test_hybrid_tagger_tag_deferred(context_window: int | None, neural_disambiguation: bool,
+                                    token_layers: bool, tmp_path: Path) -> None:
+    # With `token_layers` the neural model's token layers attend over the
+    # sub-word tokens, the deferred tags should still not depend on the other
+    # requests that are tagged in the same batch.
+    pretrained_model_name_or_path = "ucrelnlp/PyMUSAS-Neural-English-Small-BEM"
+    if token_layers:
+        pretrained_model_name_or_path = str(save_token_layer_bem(tmp_path / "model"))
+    neural_tagger = NeuralTagger(pretrained_model_name_or_path, device="cpu", top_n=-1)
+    rule = SingleWordRule({}, {'river': ['W3/M4', 'N5+'], 'bank': ['I1.1'], 'the': ['Z5']})
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments([rule]))
+    with pytest.raises(ValueError):
+        HybridTagger([rule], ranker, neural_tagger, deferred_max_batch_size=0)
+    with pytest.raises(ValueError):
+        HybridTagger([rule], ranker, neural_tagger, deferred_max_wait=-1.0)
+    tagger = HybridTagger([rule], ranker, neural_tagger, context_window=context_window,
+                          neural_disambiguation=neural_disambiguation, deferred_max_batch_size=4)
+    assert (4, 0.005) == (tagger.deferred_max_batch_size, tagger.deferred_max_wait)
+    rule_based_tagger = RuleBasedTagger([rule], ranker)
+    sentences = [['the', 'river', 'bank'], ['the', 'fish', 'swam', 'to', 'the', 'river'],
+                 ['fish', 'and', 'chips'], ['bank'],
+                 ['a', 'much', 'longer', 'sentence', 'about', 'the', 'fish', 'and', 'the', 'river', 'bank']]
+    expected_outputs = [tagger(tokens, tokens, [''] * len(tokens)) for tokens in sentences]
+
+    # The rule based tags are returned at once and the hybrid tags are the
+    # same as the tags from `__call__`, including when called from many threads.
+    def tag_deferred(tokens: list[str]) -> list[tuple[list[str], list[tuple[int, int]]]]:
+        rule_based_tags_indexes, future = tagger.tag_deferred(tokens, tokens, [''] * len(tokens))
+        assert rule_based_tagger(tokens, tokens, [''] * len(tokens)) == rule_based_tags_indexes
+        return future.result(timeout=60)
+    with ThreadPoolExecutor(4) as executor:
+        assert expected_outputs * 2 == list(executor.map(tag_deferred, sentences * 2))
+    # Requests that are made together are tagged in the same batch
+    futures = [tagger.tag_deferred(tokens, tokens, [''] * len(tokens))[1] for tokens in sentences]
+    assert expected_outputs == [future.result(timeout=60) for future in futures]
+
+    # The future is already done when the `NeuralTagger` is not required
+    _, future = tagger.tag_deferred(['the', 'bank'], ['the', 'bank'], ['', ''])
+    assert future.done()
+    assert [(['Z5'], [(0, 1)]), (['I1.1'], [(1, 2)])] == future.result()
+
+    tagger.close()
+    with pytest.raises(RuntimeError):
+        tagger.tag_deferred(['fish'], ['fish'], [''])
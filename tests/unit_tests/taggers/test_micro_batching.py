@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import threading
+
+import pytest
+
+from pymusas.taggers.micro_batching import MicroBatchScheduler
+from pymusas.taggers.neural import NeuralTagger
+
+from .utils import save_token_layer_bem
+
+
+@pytest.mark.parametrize("token_layers", [False, True])
+def test_micro_batch_scheduler(token_layers: bool, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # With `token_layers` the model's token layers attend over the sub-word
+    # tokens, the tags of each caller should still be the same as tagging
+    # its sentence by itself whatever else is in the batch.
+    pretrained_model_name_or_path = "ucrelnlp/PyMUSAS-Neural-English-Small-BEM"
+    if token_layers:
+        pretrained_model_name_or_path = str(save_token_layer_bem(tmp_path / "model"))
+    neural_tagger = NeuralTagger(pretrained_model_name_or_path, device="cpu", top_n=-1)
+    with pytest.raises(ValueError):
+        MicroBatchScheduler(neural_tagger, max_batch_size=0)
+    with pytest.raises(ValueError):
+        MicroBatchScheduler(neural_tagger, max_wait=-1.0)
+    with pytest.raises(ValueError):
+        MicroBatchScheduler(neural_tagger, max_tokens_per_batch=0)
+
+    sentences = [['The', 'river', 'bank'], ['Hello'], ['The', 'fish', 'swam', 'to', 'the', 'river'],
+                 ['Fish', 'and', 'chips']]
+    expected_outputs = [neural_tagger(tokens) for tokens in sentences]
+
+    batch_sizes: list[int] = []
+    tag_batch = neural_tagger.tag_batch
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking_tag_batch(*args, **kwargs):  # type: ignore[no-untyped-def]
+        if not started.is_set():
+            started.set()
+            release.wait()
+        batch_sizes.append(len(args[0]))
+        return tag_batch(*args, **kwargs)
+    monkeypatch.setattr(neural_tagger, 'tag_batch', blocking_tag_batch)
+
+    scheduler = MicroBatchScheduler(neural_tagger, max_batch_size=3, max_wait=10,
+                                    max_tokens_per_batch=512)
+    assert (3, 10, 512) == (scheduler.max_batch_size, scheduler.max_wait,
+                            scheduler.max_tokens_per_batch)
+    # Blocks the background thread so that the sentences from the other
+    # threads are queued and batched together.
+    blocking_futures = [scheduler.submit(tokens) for tokens in sentences[:3]]
+    started.wait()
+    with ThreadPoolExecutor(9) as executor:
+        futures = [executor.submit(scheduler, tokens) for tokens in sentences * 2 + sentences[:1]]
+        while scheduler.queue_depth < 9:
+            threading.Event().wait(0.001)
+        assert 9 == scheduler.statistics().queue_depth
+        release.set()
+        assert expected_outputs * 2 + expected_outputs[:1] == [future.result(timeout=60) for future in futures]
+    assert expected_outputs[:3] == [future.result() for future in blocking_futures]
+
+    with pytest.raises(ValueError):
+        scheduler.submit(['Hello'], [None, None])
+    # Candidate tags can be given for some of the sentences in a batch.
+    candidate_futures = [scheduler.submit(['The', 'river', 'bank'], [None, ['W3', 'M4'], None]),
+                         scheduler.submit(['Hello']), scheduler.submit(['Fish'], [['L2']])]
+    candidate_outputs = [future.result(timeout=60) for future in candidate_futures]
+    assert neural_tagger(['The', 'river', 'bank'], [None, ['W3', 'M4'], None]) == candidate_outputs[0]
+    assert expected_outputs[1] == candidate_outputs[1]
+    assert neural_tagger(['Fish'], [['L2']]) == candidate_outputs[2]
+
+    scheduler.close()
+    with pytest.raises(RuntimeError):
+        scheduler(['Hello'])
+    assert [3, 3, 3, 3, 3] == batch_sizes
+    statistics = scheduler.statistics()
+    assert (0, 5, 15) == (statistics.queue_depth, statistics.number_of_batches,
+                          statistics.number_of_items)
+    assert {3: 5} == statistics.batch_size_histogram
+    # A queue depth larger than the batch size shows that the sentences were
+    # queued faster than they were tagged.
+    assert {3: 3, 6: 1, 9: 1} == statistics.queue_depth_histogram
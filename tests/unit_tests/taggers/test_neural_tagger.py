@@ -1,6 +1,32 @@
+import os
+from pathlib import Path
+import pickle
+import shutil
+import threading
+
+from huggingface_hub import snapshot_download
 import pytest
+from safetensors.torch import load_file, save_file
+import torch
+from torch._dynamo.exc import TorchDynamoException
+from wsd_torch_models.bem import BEM
+
+from pymusas.taggers.columnar import ColumnarTags, TagSequenceVocabulary
+from pymusas.taggers.neural import (
+    NeuralTagger,
+    SubWordCache,
+    label_embedding_matrix,
+    lexicon_candidate_tags,
+    load_wsd_model,
+    maximum_sub_words,
+    padded_text_encoding,
+    predict_tags,
+    set_torch_threads,
+    validate_candidate_tags,
+    wsd_model_identity,
+)
 
-from pymusas.taggers.neural import NeuralTagger
+from .utils import save_token_layer_bem
 
 
 TEST_TOKENS: list[str] = ['Sporting', 'community', 'hack', 'had', '.', '49557282']
@@ -54,3 +80,592 @@ def test_neural_tagger__call__(top_n: int) -> None:
         tags, tag_indicies = tags_and_indicies
         assert ["Z9"] == tags
         assert [(index, index + 1)] == tag_indicies
+
+
+def test_neural_tagger_tag_columnar() -> None:
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=2)
+    vocabulary = TagSequenceVocabulary()
+    columnar_tags = tagger.tag_columnar(TEST_TOKENS, vocabulary)
+    assert isinstance(columnar_tags, ColumnarTags)
+    assert columnar_tags.vocabulary is vocabulary
+    assert tagger(TEST_TOKENS) == list(columnar_tags)
+    for index, (tags, tag_indicies) in enumerate(columnar_tags):
+        assert EXPECTED_TAG_OUTPUT[index][:2] == tags
+        assert EXPECTED_TAG_INDICIES[index] == tag_indicies
+
+
+@pytest.mark.parametrize("max_tokens_per_batch", [1, 16, 4096])
+def test_neural_tagger_tag_batch(max_tokens_per_batch: int) -> None:
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5)
+    sentences = [TEST_TOKENS, [], ["", "  \n "], TEST_TOKENS[2:], TEST_TOKENS[:1]]
+    expected_output = [tagger(tokens) for tokens in sentences]
+    assert expected_output == tagger.tag_batch(sentences, max_tokens_per_batch=max_tokens_per_batch)
+    assert [] == tagger.tag_batch([])
+    for index, (tags, tag_indicies) in enumerate(tagger.tag_batch([TEST_TOKENS])[0]):
+        assert EXPECTED_TAG_OUTPUT[index] == tags
+        assert EXPECTED_TAG_INDICIES[index] == tag_indicies
+
+    with pytest.raises(ValueError):
+        tagger.tag_batch([TEST_TOKENS], max_tokens_per_batch=0)
+
+
+def test_neural_tagger_cache(tmp_path: Path) -> None:
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5)
+    assert tagger.cache is None
+    assert tagger.persistent_cache is None
+    tagger.clear_cache()
+    with pytest.raises(ValueError):
+        NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", cache_size=-1)
+
+    cache_path = Path(tmp_path, 'cache.sqlite')
+    sentences = [TEST_TOKENS, TEST_TOKENS[:2], TEST_TOKENS]
+    expected_output = tagger.tag_batch(sentences)
+    cached_tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu",
+                                 top_n=5, cache_size=10, cache_path=cache_path)
+    assert cached_tagger.cache is not None
+    assert cached_tagger.persistent_cache is not None
+    assert expected_output == cached_tagger.tag_batch(sentences)
+    assert (0, 3) == (cached_tagger.cache.hits, cached_tagger.cache.misses)
+    assert 2 == len(cached_tagger.cache)
+    assert 2 == len(cached_tagger.persistent_cache)
+    # Modifying the output does not modify the cache
+    output = cached_tagger(TEST_TOKENS)
+    assert 1 == cached_tagger.cache.hits
+    output[0][0].append('Z99')
+    assert expected_output[0] == cached_tagger(TEST_TOKENS)
+
+    # The `top_n` is part of the cache key
+    cached_tagger.top_n = 1
+    for index, (tags, _) in enumerate(cached_tagger(TEST_TOKENS)):
+        assert EXPECTED_TAG_OUTPUT[index][:1] == tags
+    assert 3 == len(cached_tagger.persistent_cache)
+
+    # The persistent cache is re-used by another tagger, the model is not used.
+    persistent_tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu",
+                                     top_n=5, cache_path=cache_path)
+    persistent_tagger.wsd_model = None  # type: ignore[assignment]
+    assert expected_output == persistent_tagger.tag_batch(sentences)
+    assert persistent_tagger.persistent_cache is not None
+    assert 3 == persistent_tagger.persistent_cache.hits
+
+    # The version of the model is part of the persistent cache key, the tags
+    # of a model that has been saved again, e.g. retrained, are not re-used.
+    model_directory = Path(snapshot_download("ucrelnlp/PyMUSAS-Neural-English-Small-BEM",
+                                             local_dir=tmp_path / "model"))
+    local_tagger = NeuralTagger(model_directory, device="cpu", top_n=5, cache_path=cache_path)
+    assert expected_output == local_tagger.tag_batch(sentences)
+    assert local_tagger.persistent_cache is not None
+    assert (0, 3) == (local_tagger.persistent_cache.hits, local_tagger.persistent_cache.misses)
+    local_tagger = NeuralTagger(model_directory, device="cpu", top_n=5, cache_path=cache_path)
+    assert expected_output == local_tagger.tag_batch(sentences)
+    assert local_tagger.persistent_cache is not None
+    assert 3 == local_tagger.persistent_cache.hits
+    model_file_stat = Path(model_directory, "model.safetensors").stat()
+    os.utime(Path(model_directory, "model.safetensors"),
+             ns=(model_file_stat.st_atime_ns, model_file_stat.st_mtime_ns + 1_000_000_000))
+    local_tagger = NeuralTagger(model_directory, device="cpu", top_n=5, cache_path=cache_path)
+    assert expected_output == local_tagger.tag_batch(sentences)
+    assert local_tagger.persistent_cache is not None
+    assert (0, 3) == (local_tagger.persistent_cache.hits, local_tagger.persistent_cache.misses)
+
+    cached_tagger.clear_cache()
+    assert 0 == len(cached_tagger.cache)
+    assert 0 == len(cached_tagger.persistent_cache)
+
+
+def test_neural_tagger_quantize() -> None:
+    with pytest.raises(ValueError):
+        NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", quantize="int4")
+    with pytest.raises(ValueError):
+        NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="meta", quantize="dynamic-int8")
+
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu",
+                          top_n=5, quantize="dynamic-int8")
+    assert "dynamic-int8" == tagger.quantize
+    assert not any(type(module) is torch.nn.Linear for module in tagger.wsd_model.modules())
+    tags_indexes = tagger(TEST_TOKENS)
+    assert len(TEST_TOKENS) == len(tags_indexes)
+    for index, (tags, tag_indicies) in enumerate(tags_indexes):
+        assert 5 == len(tags)
+        assert EXPECTED_TAG_INDICIES[index] == tag_indicies
+
+
+@pytest.mark.parametrize("autocast", [False, True])
+def test_neural_tagger_dtype(autocast: bool) -> None:
+    with pytest.raises(ValueError):
+        NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", dtype="int8")
+    with pytest.raises(ValueError):
+        NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", autocast=True)
+    with pytest.raises(ValueError):
+        NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", dtype="bfloat16", quantize="dynamic-int8")
+
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu",
+                          top_n=5, dtype="bfloat16", autocast=autocast)
+    assert "bfloat16" == tagger.dtype
+    assert autocast == tagger.autocast
+    expected_parameter_dtype = torch.float32 if autocast else torch.bfloat16
+    assert expected_parameter_dtype == next(tagger.wsd_model.parameters()).dtype
+    # The tags are always ranked at the original precision
+    assert tagger.wsd_model.label_definition_embeddings is not None
+    assert torch.float32 == tagger.wsd_model.label_definition_embeddings.dtype
+    for index, (tags, tag_indicies) in enumerate(tagger(TEST_TOKENS)):
+        assert 5 == len(tags)
+        assert EXPECTED_TAG_OUTPUT[index][0] in tags
+        assert EXPECTED_TAG_INDICIES[index] == tag_indicies
+
+
+def test_neural_tagger_compile_model(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5)
+    assert not tagger.compile_model
+    assert tagger.compile_cache_path is None
+    sentences = [TEST_TOKENS, TEST_TOKENS[:2], TEST_TOKENS[1:4]]
+    expected_output = tagger.tag_batch(sentences)
+
+    # Padding the batch shapes to the next power of two does not change the tags
+    with torch.inference_mode():
+        for max_tokens_per_batch in [1, 16, 4096]:
+            assert predict_tags(tagger.wsd_model, tagger.tokenizer, sentences, 5, max_tokens_per_batch) \
+                == predict_tags(tagger.wsd_model, tagger.tokenizer, sentences, 5, max_tokens_per_batch,
+                                bucket_shapes=True)
+
+    # Errors that are not from compiling the model are raised rather than
+    # the batch being tagged again by the uncompiled model.
+    def failing_text_encoder(sub_word_ids: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+        raise torch.OutOfMemoryError('Out of memory')
+    monkeypatch.setattr(tagger, '_text_encoder', failing_text_encoder)
+    with pytest.raises(torch.OutOfMemoryError):
+        tagger.tag_batch(sentences)
+
+    # If the model cannot be compiled the uncompiled model is used
+    def failing_compiled_text_encoder(sub_word_ids: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+        raise TorchDynamoException("Compiler failure")
+    monkeypatch.setattr(tagger, '_text_encoder', failing_compiled_text_encoder)
+    with pytest.warns(UserWarning):
+        assert expected_output == tagger.tag_batch(sentences)
+    assert tagger._text_encoder is None
+
+    # If the model cannot be compiled the uncompiled model is used
+    def failing_compile(*args: object, **kwargs: object) -> None:
+        raise RuntimeError('torch.compile is not supported')
+    monkeypatch.setattr(torch, 'compile', failing_compile)
+    with pytest.warns(UserWarning):
+        tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu",
+                              top_n=5, compile_model=True)
+    assert tagger._text_encoder is None
+    assert expected_output == tagger.tag_batch(sentences)
+    monkeypatch.undo()
+
+    compile_cache_path = Path(tmp_path, 'compile_cache.bin')
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5,
+                          compile_model=True, compile_cache_path=compile_cache_path)
+    assert tagger._text_encoder is not None
+    assert expected_output == tagger.tag_batch(sentences)
+    assert compile_cache_path.exists()
+    # The compiled artifacts are written to a temporary file that replaces
+    # the compile cache file.
+    assert [compile_cache_path] == list(tmp_path.iterdir())
+
+
+def test_label_embedding_matrix() -> None:
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5)
+    label_definition_embeddings = tagger.wsd_model.label_definition_embeddings
+    assert label_definition_embeddings is not None
+    assert tagger.wsd_model.embedding_index_to_label is not None
+    number_labels = len(tagger.wsd_model.embedding_index_to_label)
+    embedding_dimension = label_definition_embeddings.shape[-1]
+
+    label_embeddings = label_embedding_matrix(tagger.wsd_model)
+    assert (embedding_dimension, number_labels) == tuple(label_embeddings.shape)
+    assert label_embeddings.is_contiguous()
+    assert torch.equal(label_definition_embeddings[0, 3], label_embeddings[:, 3])
+    assert tagger._label_embeddings is not None
+    assert torch.equal(label_embeddings, tagger._label_embeddings)
+
+    # The tags are the same as the BEM model's own predictions
+    with torch.inference_mode():
+        expected_tags = tagger.wsd_model.predict(TEST_TOKENS, sub_word_tokenizer=tagger.tokenizer, top_n=5)
+        assert [expected_tags] == predict_tags(tagger.wsd_model, tagger.tokenizer, [TEST_TOKENS], 5,
+                                               label_embeddings=label_embeddings)
+
+    tagger.wsd_model.label_definition_embeddings = None
+    with pytest.raises(ValueError):
+        label_embedding_matrix(tagger.wsd_model)
+
+
+def test_predict_tags_sliding_windows() -> None:
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=2)
+    model_max_sub_words = maximum_sub_words(tagger.wsd_model, tagger.tokenizer)
+    assert model_max_sub_words <= tagger.wsd_model.base_model.config.max_position_embeddings
+    sentences = [TEST_TOKENS, [], TEST_TOKENS * 2]
+    with torch.inference_mode():
+        expected_output = predict_tags(tagger.wsd_model, tagger.tokenizer, sentences, 2)
+        # Sentences that are shorter than `max_sub_words` are not split
+        assert expected_output == predict_tags(tagger.wsd_model, tagger.tokenizer, sentences, 2,
+                                               max_sub_words=model_max_sub_words)
+        # A sentence longer than the model's maximum sequence length is split
+        # into windows, every token is still tagged.
+        long_sentence = TEST_TOKENS * (model_max_sub_words // len(TEST_TOKENS) + 1)
+        windowed_output = predict_tags(tagger.wsd_model, tagger.tokenizer, [long_sentence] + sentences, 2,
+                                       max_sub_words=model_max_sub_words)
+        assert expected_output == windowed_output[1:]
+        assert len(long_sentence) == len(windowed_output[0])
+        assert all(2 == len(token_tags) for token_tags in windowed_output[0])
+
+        small_windows_output = predict_tags(tagger.wsd_model, tagger.tokenizer, sentences, 2,
+                                            max_sub_words=8, sub_word_stride=3)
+        assert [len(sentence) for sentence in sentences] == [len(tags) for tags in small_windows_output]
+
+        with pytest.raises(ValueError):
+            predict_tags(tagger.wsd_model, tagger.tokenizer, sentences, 2,
+                         max_sub_words=tagger.tokenizer.num_special_tokens_to_add())
+        with pytest.raises(ValueError):
+            predict_tags(tagger.wsd_model, tagger.tokenizer, sentences, 2,
+                         max_sub_words=8, sub_word_stride=0)
+
+
+@pytest.mark.parametrize("batch_first", [True, False])
+def test_predict_tags_token_layers(tmp_path: Path, batch_first: bool) -> None:
+    # The token layers of this model attend over the sub-word tokens, the
+    # batched predictions should not depend on the padding or on the other
+    # sentences in the batch.
+    model_directory = save_token_layer_bem(tmp_path / "model", batch_first)
+    wsd_model = load_wsd_model(str(model_directory)).eval()
+    tagger = NeuralTagger(str(model_directory), device="cpu", top_n=-1)
+    sentences = [TEST_TOKENS, ["a"], [], TEST_TOKENS[::-1] * 3, ["Hack", "."]]
+    with torch.inference_mode():
+        expected_output = [wsd_model.predict(sentence, tagger.tokenizer) if sentence else []
+                           for sentence in sentences]
+        assert expected_output == predict_tags(wsd_model, tagger.tokenizer, sentences)
+        for max_tokens_per_batch in [1, 16]:
+            assert expected_output == predict_tags(wsd_model, tagger.tokenizer, sentences,
+                                                   max_tokens_per_batch=max_tokens_per_batch)
+        assert expected_output == predict_tags(wsd_model, tagger.tokenizer, sentences,
+                                               bucket_shapes=True)
+        assert expected_output[:1] == predict_tags(wsd_model, tagger.tokenizer, sentences[:1])
+
+        sub_word_ids = tagger.tokenizer([TEST_TOKENS, ["a"]], is_split_into_words=True,
+                                        padding=True, return_tensors="pt")
+        padded_encoding = padded_text_encoding(wsd_model, sub_word_ids["input_ids"],
+                                               sub_word_ids["attention_mask"])
+        number_sub_words = int(sub_word_ids["attention_mask"][1].sum())
+        expected_encoding = wsd_model.text_encoding(sub_word_ids["input_ids"][1:, :number_sub_words],
+                                                    sub_word_ids["attention_mask"][1:, :number_sub_words])
+        assert torch.allclose(expected_encoding, padded_encoding[1:, :number_sub_words], atol=1e-5)
+
+    expected_tagger_output = [[(tags, [(index, index + 1)]) for index, tags in enumerate(sentence_tags)]
+                              for sentence_tags in expected_output]
+    assert expected_tagger_output == tagger.tag_batch(sentences)
+    assert expected_tagger_output == [tagger(sentence) for sentence in sentences]
+
+
+def test_sub_word_cache() -> None:
+    with pytest.raises(ValueError):
+        NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", sub_word_cache_size=-1)
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5)
+    assert tagger.sub_word_cache is None
+    sentences = [TEST_TOKENS, [], ['The', 'the', '  ', '', 'café', 'The'], TEST_TOKENS[::-1]]
+
+    # The sub-word token ids are the same as those from the tokenizer
+    sub_word_cache = SubWordCache(tagger.tokenizer, 4)
+    expected_sub_word_tokens = tagger.tokenizer(sentences, padding=False, truncation=False,
+                                                is_split_into_words=True)
+    expected_word_ids = [expected_sub_word_tokens.word_ids(index) for index in range(len(sentences))]
+    for _ in range(2):
+        sub_word_ids, word_ids = sub_word_cache(sentences)
+        assert expected_sub_word_tokens['input_ids'] == sub_word_ids
+        assert expected_word_ids == word_ids
+    assert 4 == len(sub_word_cache.cache)
+    assert sub_word_cache.cache.hits > 0
+
+    expected_output = tagger.tag_batch(sentences)
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5,
+                          sub_word_cache_size=100)
+    assert tagger.sub_word_cache is not None
+    assert expected_output == tagger.tag_batch(sentences)
+    assert 0 == tagger.sub_word_cache.cache.hits
+    assert expected_output == tagger.tag_batch(sentences)
+    assert tagger.sub_word_cache.cache.misses == tagger.sub_word_cache.cache.hits
+
+
+def test_neural_tagger_candidate_tags(tmp_path: Path) -> None:
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=-1)
+    assert tagger.wsd_model.embedding_index_to_label is not None
+    labels = list(tagger.wsd_model.embedding_index_to_label.values())
+    all_tags = tagger(TEST_TOKENS)
+
+    # Candidate tags that contain every label give the same ranking
+    assert all_tags == tagger(TEST_TOKENS, [labels for _ in TEST_TOKENS])
+
+    candidate_tags: list[list[str] | None] = [[labels[3], labels[1], labels[3], 'UNKNOWN'], None,
+                                              ['UNKNOWN'], [labels[0]], [labels[2], labels[5]], None]
+    candidate_output = tagger(TEST_TOKENS, candidate_tags)
+    for (tags, indexes), (expected_tags, expected_indexes), token_candidate_tags \
+            in zip(candidate_output, all_tags, candidate_tags):
+        assert expected_indexes == indexes
+        known_candidate_tags = [tag for tag in token_candidate_tags or [] if tag in labels]
+        if not known_candidate_tags:
+            # Falls back to all of the tags
+            assert expected_tags == tags
+        else:
+            assert [tag for tag in expected_tags if tag in known_candidate_tags] == tags
+
+    # At most `top_n` candidate tags are returned
+    top_1_tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=1,
+                                cache_size=10)
+    no_candidate_tags: list[list[str] | None] = [None for _ in TEST_TOKENS]
+    top_1_output = top_1_tagger.tag_batch([TEST_TOKENS, TEST_TOKENS], candidate_tags=[candidate_tags, no_candidate_tags])
+    assert [[tags[:1] for tags, _ in candidate_output], [tags[:1] for tags, _ in all_tags]] \
+        == [[tags for tags, _ in sentence_output] for sentence_output in top_1_output]
+    # The cache key includes the candidate tags
+    assert top_1_output == top_1_tagger.tag_batch([TEST_TOKENS, TEST_TOKENS], candidate_tags=[candidate_tags, no_candidate_tags])
+
+    with pytest.raises(ValueError):
+        tagger(TEST_TOKENS, candidate_tags[:2])
+    with pytest.raises(ValueError):
+        top_1_tagger.tag_batch([TEST_TOKENS], candidate_tags=[])
+
+    lexicon_lookup = {'sporting': [labels[0], labels[1]], 'had': [labels[2]]}
+    assert [[labels[0], labels[1]], None, None, [labels[2]], None, None] \
+        == lexicon_candidate_tags(TEST_TOKENS, lexicon_lookup)
+    with pytest.raises(ValueError):
+        lexicon_candidate_tags(TEST_TOKENS, lexicon_lookup, ['sporting'])
+
+
+def test_validate_candidate_tags() -> None:
+    sentences = [['The', 'river'], ['bank']]
+    validate_candidate_tags(sentences, [[None, ['W3']], [['I1.1', 'W3']]])
+    validate_candidate_tags([], [])
+    with pytest.raises(ValueError):
+        validate_candidate_tags(sentences, [[None, ['W3']]])
+    with pytest.raises(ValueError):
+        validate_candidate_tags(sentences, [[None], [['I1.1']]])
+
+
+def test_neural_tagger_lazy_load(monkeypatch: pytest.MonkeyPatch) -> None:
+    expected_output = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5)(TEST_TOKENS)
+
+    number_of_loads = 0
+    from_pretrained = BEM.from_pretrained
+
+    def counting_from_pretrained(*args: object, **kwargs: object) -> BEM:
+        nonlocal number_of_loads
+        number_of_loads += 1
+        return from_pretrained(*args, **kwargs)  # type: ignore[arg-type]
+    monkeypatch.setattr(BEM, 'from_pretrained', counting_from_pretrained)
+
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5,
+                          cache_size=10, lazy_load=True)
+    assert tagger.lazy_load
+    assert 0 == number_of_loads
+    # An unloaded tagger can be pickled without the model
+    unpickled_tagger = pickle.loads(pickle.dumps(tagger))
+    was_loaded = unpickled_tagger.is_loaded
+    assert expected_output == unpickled_tagger(TEST_TOKENS)
+    assert (False, True) == (was_loaded, unpickled_tagger.is_loaded)
+    assert 1 == number_of_loads
+
+    # The model is only loaded once when many threads require it at the same time
+    barrier = threading.Barrier(4)
+    outputs: list[list[tuple[list[str], list[tuple[int, int]]]]] = []
+
+    def tag() -> None:
+        barrier.wait()
+        outputs.append(tagger(TEST_TOKENS))
+    threads = [threading.Thread(target=tag) for _ in range(4)]
+    was_loaded = tagger.is_loaded
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 2 == number_of_loads
+    assert (False, True) == (was_loaded, tagger.is_loaded)
+    assert [expected_output] * 4 == outputs
+
+    # Warm up loads the model without using the cache
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5,
+                          cache_size=10, lazy_load=True)
+    tagger.warm_up()
+    assert tagger.is_loaded
+    assert tagger.cache is not None
+    assert 0 == len(tagger.cache)
+    assert 3 == number_of_loads
+    tagger.warm_up(TEST_TOKENS)
+    assert 3 == number_of_loads
+
+    assert NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu").is_loaded
+
+
+def test_neural_tagger_lazy_load_model_identity(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    number_of_identities = 0
+
+    def counting_wsd_model_identity(pretrained_model_name_or_path: str | Path) -> str:
+        nonlocal number_of_identities
+        number_of_identities += 1
+        return wsd_model_identity(pretrained_model_name_or_path)
+    monkeypatch.setattr('pymusas.taggers.neural.wsd_model_identity', counting_wsd_model_identity)
+
+    # The identity of a HuggingFace Hub model requires a download, therefore
+    # it is not found when a lazy loaded tagger is created.
+    cache_path = tmp_path / 'cache.sqlite'
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5,
+                          cache_path=cache_path, lazy_load=True)
+    assert (False, 0) == (tagger.is_loaded, number_of_identities)
+
+    model_directory = save_token_layer_bem(tmp_path / "model")
+    tagger = NeuralTagger(str(model_directory), device="cpu", top_n=5,
+                          cache_path=cache_path, lazy_load=True)
+    assert (False, 0) == (tagger.is_loaded, number_of_identities)
+    expected_output = tagger(TEST_TOKENS)
+    assert tagger(TEST_TOKENS) == expected_output
+    assert 1 == number_of_identities
+    assert tagger.model_identity[0] == wsd_model_identity(model_directory)
+
+    tagger = NeuralTagger(str(model_directory), device="cpu", top_n=5,
+                          cache_path=cache_path, lazy_load=True)
+    assert expected_output == tagger(TEST_TOKENS)
+    assert tagger.persistent_cache is not None
+    assert 1 == tagger.persistent_cache.hits
+    assert (False, 2) == (tagger.is_loaded, number_of_identities)
+
+
+def test_set_torch_threads(monkeypatch: pytest.MonkeyPatch) -> None:
+    with pytest.raises(ValueError):
+        set_torch_threads(num_threads=0)
+    with pytest.raises(ValueError):
+        set_torch_threads(num_interop_threads=0)
+    number_threads = torch.get_num_threads()
+    try:
+        set_torch_threads(num_threads=1)
+        assert 1 == torch.get_num_threads()
+    finally:
+        torch.set_num_threads(number_threads)
+
+    # The number of inter-op threads is not set when it is already the same,
+    # and a warning is raised when it can no longer be set.
+    def failing_set_num_interop_threads(num_interop_threads: int) -> None:
+        raise RuntimeError('Error: cannot set number of interop threads after parallel work has started')
+    monkeypatch.setattr(torch, 'set_num_interop_threads', failing_set_num_interop_threads)
+    set_torch_threads(num_interop_threads=torch.get_num_interop_threads())
+    with pytest.warns(UserWarning):
+        set_torch_threads(num_interop_threads=torch.get_num_interop_threads() + 1)
+
+
+def test_neural_tagger_threads_and_warm_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    with pytest.raises(ValueError):
+        NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", num_threads=0)
+    with pytest.raises(ValueError):
+        NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", num_interop_threads=0)
+
+    warm_up_sentences: list[list[list[str]]] = []
+    _predict_tags = NeuralTagger._predict_tags
+
+    def recording_predict_tags(self: NeuralTagger, sentences: list[list[str]],
+                               *args: object, **kwargs: object) -> list[list[list[str]]]:
+        warm_up_sentences.append(sentences)
+        return _predict_tags(self, sentences, *args, **kwargs)  # type: ignore[arg-type]
+    monkeypatch.setattr(NeuralTagger, '_predict_tags', recording_predict_tags)
+
+    number_threads = torch.get_num_threads()
+    try:
+        tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu",
+                              num_threads=1, warm_up_on_load=True, cache_size=10)
+        assert (1, None, True) == (tagger.num_threads, tagger.num_interop_threads, tagger.warm_up_on_load)
+        assert 1 == torch.get_num_threads()
+        # The warm up happens when the model is loaded and does not use the cache
+        assert [[['Warm', 'up']]] == warm_up_sentences
+        assert tagger.cache is not None
+        assert 0 == len(tagger.cache)
+
+        # When lazily loaded the threads are set, and the warm up happens, when the model is loaded
+        torch.set_num_threads(number_threads)
+        tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu",
+                              num_threads=1, warm_up_on_load=True, lazy_load=True)
+        assert [number_threads, 1] == [torch.get_num_threads(), len(warm_up_sentences)]
+        tagger(TEST_TOKENS)
+        assert 1 == torch.get_num_threads()
+        # The first call is recorded before it loads, and warms up, the model
+        assert [[['Warm', 'up']], [TEST_TOKENS], [['Warm', 'up']]] == warm_up_sentences
+    finally:
+        torch.set_num_threads(number_threads)
+
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu")
+    assert (None, None, False) == (tagger.num_threads, tagger.num_interop_threads, tagger.warm_up_on_load)
+
+
+def test_load_wsd_model() -> None:
+    wsd_model = load_wsd_model("ucrelnlp/PyMUSAS-Neural-English-Small-BEM")
+    low_memory_wsd_model = load_wsd_model("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", low_memory=True)
+    state_dict = wsd_model.state_dict()
+    low_memory_state_dict = low_memory_wsd_model.state_dict()
+    assert set(state_dict) == set(low_memory_state_dict)
+    for name, tensor in state_dict.items():
+        assert torch.equal(tensor, low_memory_state_dict[name])
+    assert wsd_model.label_definition_embeddings is not None
+    assert low_memory_wsd_model.label_definition_embeddings is not None
+    assert torch.equal(wsd_model.label_definition_embeddings, low_memory_wsd_model.label_definition_embeddings)
+    assert wsd_model.embedding_index_to_label == low_memory_wsd_model.embedding_index_to_label
+
+    tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5)
+    low_memory_tagger = NeuralTagger("ucrelnlp/PyMUSAS-Neural-English-Small-BEM", device="cpu", top_n=5,
+                                     low_memory_load=True)
+    assert (False, True) == (tagger.low_memory_load, low_memory_tagger.low_memory_load)
+    assert tagger(TEST_TOKENS) == low_memory_tagger(TEST_TOKENS)
+
+
+def test_load_wsd_model_low_memory_missing_parameters(tmp_path: Path) -> None:
+    model_directory = Path(snapshot_download("ucrelnlp/PyMUSAS-Neural-English-Small-BEM",
+                                             local_dir=tmp_path / "model"))
+    model_file = model_directory / "model.safetensors"
+    weights = load_file(model_file)
+    missing_parameter = sorted(weights)[0]
+    del weights[missing_parameter]
+    model_file.unlink()
+    save_file(weights, model_file)
+    del weights
+
+    # The missing parameter is initialised through `BEM.from_pretrained`
+    # rather than left uninitialised.
+    with pytest.warns(UserWarning, match=missing_parameter):
+        wsd_model = load_wsd_model(model_directory, low_memory=True)
+    assert not any(parameter.is_meta for parameter in wsd_model.parameters())
+    for name, tensor in load_file(model_file).items():
+        assert torch.equal(tensor, wsd_model.state_dict()[name])
+
+
+def test_wsd_model_identity(tmp_path: Path) -> None:
+    model_directory = tmp_path / "model"
+    model_directory.mkdir()
+    model_file = model_directory / "model.safetensors"
+    model_file.write_bytes(b"weights")
+    os.utime(model_file, ns=(1_000_000_000, 1_000_000_000))
+    model_identity = wsd_model_identity(model_directory)
+    assert isinstance(model_identity, str)
+    assert model_identity == wsd_model_identity(str(model_directory))
+    assert model_identity == wsd_model_identity(tmp_path / "model" / ".." / "model")
+
+    # Same size and modification time, the file contents are not read.
+    model_file.write_bytes(b"WEIGHTS")
+    os.utime(model_file, ns=(1_000_000_000, 1_000_000_000))
+    assert model_identity == wsd_model_identity(model_directory)
+    # Retrained model
+    os.utime(model_file, ns=(2_000_000_000, 2_000_000_000))
+    assert model_identity != wsd_model_identity(model_directory)
+    model_identity = wsd_model_identity(model_directory)
+    model_file.write_bytes(b"new weights")
+    os.utime(model_file, ns=(2_000_000_000, 2_000_000_000))
+    assert model_identity != wsd_model_identity(model_directory)
+    model_identity = wsd_model_identity(model_directory)
+    (model_directory / "config.json").write_text("{}")
+    assert model_identity != wsd_model_identity(model_directory)
+
+    # Same files in a different directory
+    other_model_directory = tmp_path / "other_model"
+    shutil.copytree(model_directory, other_model_directory)
+    assert wsd_model_identity(model_directory) != wsd_model_identity(other_model_directory)
+
+
+def test_wsd_model_identity_hub_model() -> None:
+    hub_model_identity = wsd_model_identity("ucrelnlp/PyMUSAS-Neural-English-Small-BEM")
+    model_id, commit_hash = hub_model_identity.split("@")
+    assert "ucrelnlp/PyMUSAS-Neural-English-Small-BEM" == model_id
+    assert 40 == len(commit_hash)
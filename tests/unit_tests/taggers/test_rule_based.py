@@ -1,12 +1,15 @@
 import json
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import pytest
 
-from pymusas.lexicon_collection import LexiconCollection, MWELexiconCollection
+from pymusas.lexicon_collection import LexiconCollection, LexiconType, MWELexiconCollection
+from pymusas.rankers.lexical_match import LexicalMatch
 from pymusas.rankers.lexicon_entry import ContextualRuleBasedRanker
-from pymusas.taggers.rule_based import RuleBasedTagger
+from pymusas.rankers.ranking_meta_data import RankingMetaData
+from pymusas.taggers.columnar import ColumnarTags, TagSequenceVocabulary
+from pymusas.taggers.rule_based import RuleBasedTagger, best_ranks_to_tags_indexes, default_tag, updated_cache_state
 from pymusas.taggers.rules.mwe import MWERule
 from pymusas.taggers.rules.single_word import SingleWordRule
 
@@ -190,3 +193,198 @@ def test_rule_based_tagger__call__() -> None:
                               mwe_word_rule(None)], ranker)
     tagger_output = tagger(test_tokens, test_lemmas, test_pos_tags)
     assert expected_output == tagger_output
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 100])
+def test_rule_based_tagger_tag_stream(chunk_size: int) -> None:
+    ranker = ContextualRuleBasedRanker(1, 0)
+    tagger = RuleBasedTagger([], ranker)
+    assert [] == list(tagger.tag_stream([], chunk_size))
+    expected_output = [
+        (['Z99'], [(0, 1)]),
+        (['PUNCT'], [(1, 2)]),
+        (['N1'], [(2, 3)])
+    ]
+    token_stream = [('London', '', ''), ('.', '', 'punc'), ('1', '', 'num')]
+    assert expected_output == list(tagger.tag_stream(token_stream, chunk_size))
+
+    with pytest.raises(ValueError):
+        list(tagger.tag_stream(token_stream, 0))
+    with pytest.raises(ValueError):
+        list(tagger.tag_stream(token_stream, chunk_size, -1))
+
+    # The output of streaming the tokens should be the same as tagging all
+    # of the tokens at once, this includes MWEs that span chunk boundaries.
+    ranker = ContextualRuleBasedRanker(3, 0)
+    tagger = RuleBasedTagger([single_word_rule(None), mwe_word_rule(None)], ranker)
+    for test_file_name in ['rule_based_single_input_output.json',
+                           'rule_based_mwe_input_output.json',
+                           'rule_based_single_mwe_input_output.json']:
+        test_data_file = Path(TAGGER_DATA_DIR, test_file_name)
+        (test_tokens, test_lemmas, test_pos_tags, _) = generate_test_data(test_data_file)
+        # Repeat the tokens to create a stream that is longer than the chunk size
+        test_tokens = test_tokens * 3
+        test_lemmas = test_lemmas * 3
+        test_pos_tags = test_pos_tags * 3
+        expected_output = tagger(test_tokens, test_lemmas, test_pos_tags)
+        assert expected_output == list(tagger.tag_stream(zip(test_tokens, test_lemmas, test_pos_tags),
+                                                         chunk_size))
+
+
+def test_rule_based_tagger_cache() -> None:
+    with pytest.raises(ValueError):
+        RuleBasedTagger([], ContextualRuleBasedRanker(1, 0), cache_size=-1)
+    tagger = RuleBasedTagger([], ContextualRuleBasedRanker(1, 0))
+    assert tagger.cache is None
+    tagger.clear_cache()
+
+    rules = [single_word_rule(None), mwe_word_rule(None)]
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+    no_cache_tagger = RuleBasedTagger(rules, ranker, set(['punc']), set(['num']))
+    tagger = RuleBasedTagger(rules, ranker, set(['punc']), set(['num']), cache_size=2)
+    assert tagger.cache is not None
+    assert 2 == tagger.cache.maxsize
+    
+    test_data_file = Path(TAGGER_DATA_DIR, 'rule_based_single_mwe_input_output.json')
+    tokens, lemmas, pos_tags, expected_output = generate_test_data(test_data_file)
+    assert expected_output == tagger(tokens, lemmas, pos_tags)
+    assert expected_output == tagger(tokens, lemmas, pos_tags)
+    assert (1, 1) == (tagger.cache.hits, tagger.cache.misses)
+    assert 1 == len(tagger.cache)
+
+    # Modifying the returned value should not modify the cached value.
+    cached_output = tagger(tokens, lemmas, pos_tags)
+    cached_output[0][0].append('Z1')
+    cached_output[0][1].append((0, 1))
+    assert expected_output == tagger(tokens, lemmas, pos_tags)
+
+    # The POS tags are part of the cache key.
+    tokens, lemmas, pos_tags = tokens[:4], lemmas[:4], pos_tags[:4]
+    different_pos_tags = ['' for _ in pos_tags]
+    assert no_cache_tagger(tokens, lemmas, pos_tags) == tagger(tokens, lemmas, pos_tags)
+    assert no_cache_tagger(tokens, lemmas, different_pos_tags) \
+        == tagger(tokens, lemmas, different_pos_tags)
+    assert 2 == len(tagger.cache)
+
+    # The cache is cleared when the rules, ranker or default tags change
+    tagger.rules = []
+    assert [(['Z99'], [(0, 1)])] == tagger(tokens[:1], lemmas[:1], ['digit'])
+    assert 1 == len(tagger.cache)
+    tagger.default_number_tags = set(['num'])
+    assert [(['Z99'], [(0, 1)])] == tagger(tokens[:1], lemmas[:1], ['digit'])
+    assert 1 == len(tagger.cache)
+    tagger.default_number_tags = set(['num', 'digit'])
+    assert [(['N1'], [(0, 1)])] == tagger(tokens[:1], lemmas[:1], ['digit'])
+    assert 1 == len(tagger.cache)
+    tagger.ranker = ContextualRuleBasedRanker(1, 0)
+    tagger(tokens, lemmas, pos_tags)
+    assert 1 == len(tagger.cache)
+
+    tagger.clear_cache()
+    assert 0 == len(tagger.cache)
+
+
+@pytest.mark.parametrize("num_workers", [1, 4])
+@pytest.mark.parametrize("cache_size", [0, 5])
+def test_rule_based_tagger_tag_sentences(num_workers: int, cache_size: int) -> None:
+    rule_pos_mapper = {'adj': ['noun', 'adj'], 'noun': ['adj', 'noun']}
+    rules = [single_word_rule(rule_pos_mapper), mwe_word_rule(rule_pos_mapper)]
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+    tagger = RuleBasedTagger(rules, ranker, set(['punc']), set(['num']), cache_size=cache_size)
+    
+    sentences: List[Tuple[List[str], List[str], List[str]]] = []
+    for test_file_name in ['rule_based_single_input_output.json',
+                           'rule_based_mwe_input_output.json',
+                           'rule_based_single_mwe_input_output.json']:
+        test_data_file = Path(TAGGER_DATA_DIR, test_file_name)
+        tokens, lemmas, pos_tags, _ = generate_test_data(test_data_file)
+        for start_index in range(len(tokens)):
+            sentences.append((tokens[start_index:], lemmas[start_index:], pos_tags[start_index:]))
+    sentences = sentences * 3
+    
+    no_cache_tagger = RuleBasedTagger(rules, ranker, set(['punc']), set(['num']))
+    expected_output = [no_cache_tagger(*sentence) for sentence in sentences]
+    assert expected_output == tagger.tag_sentences(sentences, num_workers=num_workers)
+    assert expected_output == tagger.tag_sentences(iter(sentences), num_workers=num_workers)
+    assert [] == tagger.tag_sentences([], num_workers=num_workers)
+
+    with pytest.raises(ValueError):
+        tagger.tag_sentences(sentences, num_workers=0)
+    with pytest.raises(ValueError):
+        tagger.tag_sentences([(['a'], [], [])], num_workers=num_workers)
+
+
+def test_rule_based_tagger_tag_columnar(monkeypatch: pytest.MonkeyPatch) -> None:
+    rules = [single_word_rule(None), mwe_word_rule(None)]
+    ranker = ContextualRuleBasedRanker(*ContextualRuleBasedRanker.get_construction_arguments(rules))
+    tagger = RuleBasedTagger(rules, ranker, set(['punc']), set(['num']))
+    cached_tagger = RuleBasedTagger(rules, ranker, set(['punc']), set(['num']), cache_size=10)
+
+    from_tags_indexes = ColumnarTags.from_tags_indexes
+    from_tags_indexes_calls: List[int] = []
+
+    def recording_from_tags_indexes(*args: Any, **kwargs: Any) -> ColumnarTags:
+        from_tags_indexes_calls.append(1)
+        return from_tags_indexes(*args, **kwargs)
+    monkeypatch.setattr(ColumnarTags, 'from_tags_indexes', staticmethod(recording_from_tags_indexes))
+
+    vocabulary = TagSequenceVocabulary()
+    for test_file_name in ['rule_based_single_input_output.json',
+                           'rule_based_mwe_input_output.json',
+                           'rule_based_single_mwe_input_output.json']:
+        test_data_file = Path(TAGGER_DATA_DIR, test_file_name)
+        tokens, lemmas, pos_tags, expected_output = generate_test_data(test_data_file)
+        columnar_tags = tagger.tag_columnar(tokens, lemmas, pos_tags)
+        assert expected_output == list(columnar_tags)
+        columnar_tags = tagger.tag_columnar(tokens, lemmas, pos_tags, vocabulary)
+        assert expected_output == list(columnar_tags)
+        assert columnar_tags.vocabulary is vocabulary
+        # The columns are created directly, not from the output of `__call__`
+        assert not from_tags_indexes_calls
+        # When the tagger has a cache the columns are created from the cached output.
+        for _ in range(2):
+            assert columnar_tags == cached_tagger.tag_columnar(tokens, lemmas, pos_tags, vocabulary)
+        assert 2 == len(from_tags_indexes_calls)
+        from_tags_indexes_calls.clear()
+    assert len(vocabulary) > 0
+
+    assert 0 == len(tagger.tag_columnar([], [], []))
+    with pytest.raises(ValueError):
+        tagger.tag_columnar(['a'], [], [])
+
+
+def test_default_tag() -> None:
+    assert 'PUNCT' == default_tag('punc', {'punc'}, {'num'})
+    assert 'N1' == default_tag('num', {'punc'}, {'num'})
+    assert 'Z99' == default_tag('noun', {'punc'}, {'num'})
+    # Punctuation takes precedence over numbers
+    assert 'PUNCT' == default_tag('x', {'x'}, {'x'})
+
+
+def test_best_ranks_to_tags_indexes() -> None:
+    mwe_rank = RankingMetaData(LexiconType.MWE_NON_SPECIAL, 2, 0, False, LexicalMatch.TOKEN,
+                               1, 3, 'river|noun bank|noun', ('W3', 'M4'))
+    token_best_ranks: List[Optional[RankingMetaData]] = [None, mwe_rank, mwe_rank, None, None]
+    expected_tags_indexes = [(['PUNCT'], [(0, 1)]), (['W3', 'M4'], [(1, 3)]), (['W3', 'M4'], [(1, 3)]),
+                             (['N1'], [(3, 4)]), (['Z99'], [(4, 5)])]
+    tags_indexes = best_ranks_to_tags_indexes(token_best_ranks, ['punc', 'noun', 'noun', 'num', 'det'],
+                                              {'punc'}, {'num'})
+    assert expected_tags_indexes == tags_indexes
+    # Each token has its own copy of the tags and indexes
+    assert tags_indexes[1][0] is not tags_indexes[2][0]
+
+
+def test_updated_cache_state() -> None:
+    rule = SingleWordRule({}, {})
+    ranker = ContextualRuleBasedRanker(1, 0)
+    cache_state = updated_cache_state(None, [rule], ranker, {'punc'}, {'num'})
+    assert cache_state is not None
+    assert updated_cache_state(cache_state, [rule], ranker, {'punc'}, {'num'}) is None
+    # A new list of the same rules and new sets of the same tags are not changes
+    assert updated_cache_state(cache_state, list([rule]), ranker, set(['punc']), set(['num'])) is None
+    assert updated_cache_state(cache_state, [SingleWordRule({}, {})], ranker, {'punc'}, {'num'}) is not None
+    assert updated_cache_state(cache_state, [rule], ContextualRuleBasedRanker(1, 0),
+                               {'punc'}, {'num'}) is not None
+    assert updated_cache_state(cache_state, [rule], ranker, {'PUNCT'}, {'num'}) is not None
+    assert updated_cache_state(cache_state, [rule], ranker, {'punc'}, {'NUM'}) is not None
+    assert updated_cache_state(cache_state, [], ranker, {'punc'}, {'num'}) is not None
@@ -0,0 +1,44 @@
+from pathlib import Path
+import string
+
+import torch
+from transformers import BertConfig, BertModel, BertTokenizerFast
+from wsd_torch_models.bem import BEM
+
+
+TOKEN_LAYER_BEM_LABELS: list[str] = ['A1', 'A5.1', 'B1', 'G2.2', 'K5.1', 'N1',
+                                     'O2', 'S2', 'T1.2', 'Z5', 'Z8', 'Z99']
+
+
+def save_token_layer_bem(directory: Path, batch_first: bool = True) -> Path:
+    '''
+    Saves a small randomly initialised BEM model, that has a transformer
+    encoder token layer and a scalar mix, and its character level tokenizer
+    to `directory` so that the neural taggers can be tested offline with a
+    model whose token encodings depend on the other sub-word tokens in the
+    batch if padding is not handled. Returns the `directory`.
+    '''
+    vocab = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+    characters = string.ascii_lowercase + string.digits + string.punctuation
+    vocab.extend(characters)
+    vocab.extend(f'##{character}' for character in characters)
+    directory.mkdir(parents=True, exist_ok=True)
+    vocab_file = directory / 'vocab.txt'
+    vocab_file.write_text('\n'.join(vocab) + '\n', encoding='utf-8')
+    tokenizer = BertTokenizerFast(vocab_file=str(vocab_file))  # type: ignore[no-untyped-call]
+    tokenizer.save_pretrained(str(directory))
+
+    torch.manual_seed(0)
+    base_model_config = BertConfig(vocab_size=len(vocab), hidden_size=32,  # type: ignore[no-untyped-call]
+                                   num_hidden_layers=2, num_attention_heads=2,
+                                   intermediate_size=64, max_position_embeddings=128)
+    base_model = BertModel(base_model_config)  # type: ignore[no-untyped-call]
+    wsd_model = BEM('tiny-bert', freeze_base_model=False, number_transformer_encoder_layers=1,
+                    transformer_encoder_hidden_dim=16, transformer_encoder_num_heads=2,
+                    batch_first=batch_first, base_model=base_model)
+    wsd_model.label_definition_embeddings = torch.randn(1, len(TOKEN_LAYER_BEM_LABELS), 16)
+    wsd_model.label_to_definition = {label: label for label in TOKEN_LAYER_BEM_LABELS}
+    wsd_model.embedding_index_to_label = dict(enumerate(TOKEN_LAYER_BEM_LABELS))
+    wsd_model.inference_ready = True
+    wsd_model.save_pretrained(directory)
+    return directory
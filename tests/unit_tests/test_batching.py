@@ -0,0 +1,89 @@
+from concurrent.futures import Future
+import threading
+
+import pytest
+
+from pymusas.batching import BackgroundBatcher
+
+
+def test_background_batcher() -> None:
+    with pytest.raises(ValueError):
+        BackgroundBatcher(lambda batch: batch, max_batch_size=0)
+    with pytest.raises(ValueError):
+        BackgroundBatcher(lambda batch: batch, max_wait=-1)
+
+    batches: list[list[int]] = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def process_batch(batch: list[int]) -> list[str]:
+        batches.append(batch)
+        if batch == [-3, -2, -1]:
+            started.set()
+            release.wait()
+        if 13 in batch:
+            raise ValueError('Unlucky number')
+        return [str(item) for item in batch]
+
+    batcher = BackgroundBatcher(process_batch, max_batch_size=3, max_wait=10)
+    assert (3, 10) == (batcher.max_batch_size, batcher.max_wait)
+    # Blocks the background thread so that the other items are queued.
+    blocking_futures = [batcher.submit(item) for item in [-3, -2, -1]]
+    started.wait()
+    futures = [batcher.submit(item) for item in range(5)]
+    cancelled_future = batcher.submit(5)
+    assert cancelled_future.cancel()
+    error_futures = [batcher.submit(13), batcher.submit(14), batcher.submit(15)]
+    release.set()
+    assert ['0', '1', '2', '3', '4'] == [future.result() for future in futures]
+    # Only the item that fails is set to the exception, the other items in
+    # its batch are processed again in a batch by themselves.
+    with pytest.raises(ValueError):
+        error_futures[0].result()
+    assert ['14', '15'] == [future.result() for future in error_futures[1:]]
+    assert ['-3', '-2', '-1'] == [future.result() for future in blocking_futures]
+    batcher.close()
+    # The batch is processed once it is full, the cancelled item is not processed.
+    assert [[-3, -2, -1], [0, 1, 2], [3, 4], [13, 14, 15], [13], [14], [15]] == batches
+    statistics = batcher.statistics()
+    assert (0, 4, 11) == (statistics.queue_depth, statistics.number_of_batches,
+                          statistics.number_of_items)
+    assert {2: 1, 3: 3} == statistics.batch_size_histogram
+    # The queue depth includes the cancelled item and the items in the batch.
+    assert {3: 2, 6: 1, 9: 1} == statistics.queue_depth_histogram
+
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
+    batcher.close()
+
+    # The batch is processed after `max_wait` seconds when it is not full.
+    with BackgroundBatcher(process_batch, max_batch_size=100, max_wait=0.01) as batcher:
+        waiting_future: Future[str] = batcher.submit(7)
+        assert '7' == waiting_future.result(timeout=10)
+    # Closing a batcher that has not been used does nothing.
+    BackgroundBatcher(process_batch).close()
+
+
+def test_background_batcher_number_of_results() -> None:
+    started = threading.Event()
+    release = threading.Event()
+
+    def process_batch(batch: list[int | None]) -> list[str]:
+        if batch == [-1]:
+            started.set()
+            release.wait()
+        # Items that are `None` have no result.
+        return [str(item) for item in batch if item is not None]
+
+    # If `process_batch` does not return one result per item, the future of
+    # every item is still set, the items without a result are set to a `ValueError`.
+    with BackgroundBatcher(process_batch, max_batch_size=3, max_wait=10) as batcher:
+        blocking_future = batcher.submit(-1)
+        started.wait()
+        futures = [batcher.submit(item) for item in [1, None, 2]]
+        release.set()
+        assert '-1' == blocking_future.result(timeout=10)
+        assert '1' == futures[0].result(timeout=10)
+        with pytest.raises(ValueError):
+            futures[1].result(timeout=10)
+        assert '2' == futures[2].result(timeout=10)
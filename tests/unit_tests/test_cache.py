@@ -0,0 +1,124 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pickle
+
+import pytest
+
+from pymusas.cache import LRUCache, SQLiteCache, sequences_hash
+
+
+def test_sequences_hash() -> None:
+    tokens = ['Hello', 'world']
+    lemmas = ['hello', 'world']
+    pos_tags = ['INTJ', 'NOUN']
+    assert 16 == len(sequences_hash(tokens, lemmas, pos_tags))
+    assert sequences_hash(tokens, lemmas, pos_tags) == sequences_hash(tuple(tokens), lemmas, pos_tags)
+    assert sequences_hash(tokens, lemmas, pos_tags) != sequences_hash(tokens, tokens, pos_tags)
+    assert sequences_hash(['a b'], ['c']) != sequences_hash(['a', 'b'], ['c'])
+    assert sequences_hash([], []) != sequences_hash([])
+
+
+def test_lru_cache() -> None:
+    with pytest.raises(ValueError):
+        LRUCache(0)
+    
+    cache: LRUCache[str, int] = LRUCache(2)
+    assert 2 == cache.maxsize
+    assert 0 == len(cache)
+    assert 0.0 == cache.hit_rate
+    assert cache.get('a') is None
+    assert (0, 1) == (cache.hits, cache.misses)
+
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert 2 == len(cache)
+    assert 'a' in cache
+    assert 1 == cache.get('a')
+    # `b` is the least recently used item so it is removed.
+    cache.put('c', 3)
+    assert 2 == len(cache)
+    assert 'b' not in cache
+    assert cache.get('b') is None
+    assert 3 == cache.get('c')
+    # Updating an item makes it the most recently used.
+    cache.put('a', 4)
+    cache.put('d', 5)
+    assert 'c' not in cache
+    assert 4 == cache.get('a')
+    assert (3, 2) == (cache.hits, cache.misses)
+    assert 0.6 == cache.hit_rate
+
+    cache.clear()
+    assert 0 == len(cache)
+    assert (3, 2) == (cache.hits, cache.misses)
+
+
+def test_lru_cache_pickle() -> None:
+    cache: LRUCache[str, int] = LRUCache(2)
+    cache.put('a', 1)
+    cache.get('a')
+    pickled_cache = pickle.loads(pickle.dumps(cache))
+    assert 1 == pickled_cache.get('a')
+    assert (2, 0) == (pickled_cache.hits, pickled_cache.misses)
+    pickled_cache.put('b', 2)
+    pickled_cache.put('c', 3)
+    assert 'a' not in pickled_cache
+
+
+def test_lru_cache_threads() -> None:
+    cache: LRUCache[int, int] = LRUCache(50)
+
+    def use_cache(key: int) -> None:
+        for offset in range(100):
+            cache.put(key + offset, key)
+            cache.get(key + offset)
+            cache.get(-1)
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(use_cache, range(0, 1600, 100)))
+    assert 50 == len(cache)
+    assert 3200 == cache.hits + cache.misses
+    assert 1600 <= cache.misses
+
+
+def test_sqlite_cache(tmp_path: Path) -> None:
+    cache_path = Path(tmp_path, 'cache.sqlite')
+    cache = SQLiteCache(cache_path)
+    assert cache_path == cache.path
+    assert 0 == len(cache)
+    assert 0.0 == cache.hit_rate
+    assert cache.get(b'a') is None
+    assert b'a' not in cache
+    assert 'a' not in cache
+
+    cache.put(b'a', [['Z1', 'Z2'], ['A1']])
+    cache.put_many([(b'b', [['Z3']]), (b'c', [])])
+    assert 3 == len(cache)
+    assert b'a' in cache
+    assert [['Z1', 'Z2'], ['A1']] == cache.get(b'a')
+    assert [] == cache.get(b'c')
+    assert (2, 1, 2 / 3) == (cache.hits, cache.misses, cache.hit_rate)
+    # Replacing a value
+    cache.put(b'a', [['Z5']])
+    assert [['Z5']] == cache.get(b'a')
+    cache.close()
+
+    # The values persist when the cache is re-opened
+    cache = SQLiteCache(cache_path)
+    assert 3 == len(cache)
+    assert [['Z3']] == cache.get(b'b')
+
+    pickled_cache = pickle.loads(pickle.dumps(cache))
+    assert [['Z3']] == pickled_cache.get(b'b')
+    assert 2 == pickled_cache.hits
+    pickled_cache.close()
+
+    cache.clear()
+    assert 0 == len(cache)
+    assert cache.get(b'b') is None
+
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(lambda index: cache.put(bytes([index]), [[str(index)]]), range(50)))
+        assert all(executor.map(lambda index: cache.get(bytes([index])) == [[str(index)]], range(50)))
+    assert 50 == len(cache)
+    cache.close()
@@ -0,0 +1,102 @@
+import gc
+import threading
+import time
+
+import pytest
+
+from pymusas.base import Serialise
+from pymusas.registry import (
+    ResourceRegistry,
+    serialise_object_registry,
+    shared_serialise_object,
+    shared_serialise_object_list,
+    shared_serialise_object_list_from_bytes,
+)
+from pymusas.taggers.rules.mwe import MWERule
+from pymusas.taggers.rules.single_word import SingleWordRule
+
+
+class Resource:
+    pass
+
+
+def test_resource_registry() -> None:
+    registry: ResourceRegistry[str, Resource] = ResourceRegistry()
+    assert 0 == len(registry)
+    resource = registry.get_or_create('a', Resource)
+    assert registry.get_or_create('a', Resource) is resource
+    assert registry.get_or_create('b', Resource) is not resource
+    assert (1, 2) == (registry.hits, registry.misses)
+    assert 'a' in registry
+    # The resources are released once they are no longer used
+    assert 1 == len(registry)
+    del resource
+    gc.collect()
+    assert 'a' not in registry
+    assert 0 == len(registry)
+
+    # A resource that fails to be created is not added
+    def failing_create() -> Resource:
+        raise ValueError('Cannot create')
+    with pytest.raises(ValueError):
+        registry.get_or_create('a', failing_create)
+    assert 'a' not in registry
+    resource = registry.get_or_create('a', Resource)
+    assert registry.get_or_create('a', Resource) is resource
+
+    # The resource is only created once when many threads request it at the same time
+    number_of_creates = 0
+    barrier = threading.Barrier(4)
+    resources: list[Resource] = []
+
+    def slow_create() -> Resource:
+        nonlocal number_of_creates
+        number_of_creates += 1
+        time.sleep(0.05)
+        return Resource()
+
+    def get() -> None:
+        barrier.wait()
+        resources.append(registry.get_or_create('c', slow_create))
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 1 == number_of_creates
+    assert 4 == len(resources)
+    assert all(shared_resource is resources[0] for shared_resource in resources)
+
+
+def test_shared_serialise_object() -> None:
+    lexicon = {'river|noun': ['W3/M4', 'N5+'], 'bank|noun': ['I1.1']}
+    rule = SingleWordRule(lexicon, {'bank': ['I1.1']})
+    shared_rule = shared_serialise_object(rule)
+    assert shared_rule is rule
+    # Rules with the same lexicons and POS mapper are shared
+    assert shared_serialise_object(SingleWordRule(dict(lexicon), {'bank': ['I1.1']})) is rule
+    # Rules with a different POS mapper are not shared
+    pos_mapper = {'NOUN': ['noun']}
+    pos_mapper_rule = shared_serialise_object(SingleWordRule(lexicon, {'bank': ['I1.1']}, pos_mapper))
+    assert pos_mapper_rule is not rule
+    assert pos_mapper_rule.pos_mapper == pos_mapper  # type: ignore[attr-defined]
+
+    mwe_rule = MWERule({'river_noun bank_noun': ['W3']})
+    rules = shared_serialise_object_list([SingleWordRule(lexicon, {'bank': ['I1.1']}), mwe_rule])
+    assert [rule, mwe_rule] == rules
+    assert rules[0] is rule
+    # Only objects that are not in the registry are loaded from bytes
+    rules_bytes = Serialise.serialise_object_list_to_bytes([rule, mwe_rule, pos_mapper_rule])
+    loaded_rules = shared_serialise_object_list_from_bytes(rules_bytes)
+    assert [rule, mwe_rule, pos_mapper_rule] == loaded_rules
+    assert all(loaded_rule is original_rule
+               for loaded_rule, original_rule in zip(loaded_rules, [rule, mwe_rule, pos_mapper_rule]))
+
+    # Rules that are no longer used are released
+    number_of_rules = len(serialise_object_registry)
+    del rule, shared_rule, rules, loaded_rules, mwe_rule
+    gc.collect()
+    assert number_of_rules - 2 == len(serialise_object_registry)
+    loaded_rules = shared_serialise_object_list_from_bytes(rules_bytes)
+    assert number_of_rules == len(serialise_object_registry)
+    assert loaded_rules[2] is pos_mapper_rule
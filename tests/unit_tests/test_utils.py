@@ -3,7 +3,12 @@ from typing import List, Set, Tuple
 
 import pytest
 
-from pymusas.utils import token_pos_tags_in_lexicon_entry, unique_pos_tags_in_lexicon_entry
+from pymusas.utils import (
+    context_windows,
+    sliding_windows,
+    token_pos_tags_in_lexicon_entry,
+    unique_pos_tags_in_lexicon_entry,
+)
 
 
 @pytest.fixture
@@ -71,3 +76,39 @@ def test_unique_pos_tags_in_lexicon_entry(examples: List[str],
     for value_error_example in value_error_examples:
         with pytest.raises(ValueError):
             unique_pos_tags_in_lexicon_entry(value_error_example)
+
+
+def test_context_windows() -> None:
+    assert [] == context_windows([], 10, 2)
+    assert [(3, 4), (5, 6)] == context_windows([5, 3], 10, 0)
+    assert [(3, 5)] == context_windows([3, 4], 10, 0)
+    assert [(0, 3), (6, 10)] == context_windows([1, 7, 8, 8], 10, 1)
+    # Windows next to each other are merged
+    assert [(0, 6)] == context_windows([1, 4], 10, 1)
+    assert [(0, 10)] == context_windows([0, 9], 10, 100)
+
+    with pytest.raises(ValueError):
+        context_windows([1], 10, -1)
+
+
+def test_sliding_windows() -> None:
+    assert [] == sliding_windows([], 3, 1)
+    assert [(0, 2)] == sliding_windows([1, 2], 3, 1)
+    assert [(0, 3), (2, 5), (4, 6)] == sliding_windows([1] * 6, 3, 2)
+    # A stride as large as the windows gives windows that do not overlap
+    assert [(0, 3), (3, 6)] == sliding_windows([1] * 6, 3, 3)
+    # A token longer than the maximum length is a window of its own
+    assert [(0, 1), (1, 2), (2, 3)] == sliding_windows([1, 5, 1], 3, 1)
+    # Every token is in at least one window
+    lengths = [3, 1, 2, 2, 1, 4, 1, 1, 2]
+    windows = sliding_windows(lengths, 5, 2)
+    assert 0 == windows[0][0] and len(lengths) == windows[-1][1]
+    for (_, end), (next_start, _) in zip(windows, windows[1:]):
+        assert next_start <= end
+    for start, end in windows:
+        assert end - start == 1 or sum(lengths[start: end]) <= 5
+
+    with pytest.raises(ValueError):
+        sliding_windows([1], 0, 1)
+    with pytest.raises(ValueError):
+        sliding_windows([1], 3, 0)